@@ -1,6 +1,6 @@
 """
 Multi-level caching strategy for analytics data.
-Implements memory, Redis, and materialized view caching with intelligent invalidation.
+Implements memory, Redis, and materialized view caching with tag-based invalidation.
 """
 
 import json
@@ -12,8 +12,8 @@ from dataclasses import dataclass, asdict
 from django.core.cache import cache
 from django.conf import settings
 from django.utils import timezone
-import redis
-from cachetools import TTLCache
+
+from shared.tiered_cache import TieredCache
 
 logger = logging.getLogger(__name__)
 
@@ -63,22 +63,6 @@ class AnalyticsCacheManager:
     """
     
     def __init__(self):
-        # Level 1: Memory cache (fastest, smallest)
-        self.memory_cache = TTLCache(maxsize=1000, ttl=60)
-        
-        # Level 2: Redis cache (fast, distributed)
-        try:
-            self.redis_client = redis.Redis(
-                host=getattr(settings, 'REDIS_HOST', 'localhost'),
-                port=getattr(settings, 'REDIS_PORT', 6379),
-                db=getattr(settings, 'REDIS_ANALYTICS_DB', 1),
-                decode_responses=True
-            )
-            self.redis_available = True
-        except Exception as e:
-            logger.warning(f"Redis not available for analytics caching: {e}")
-            self.redis_available = False
-        
         # Cache configuration
         self.default_ttl = {
             'memory': 60,      # 1 minute
@@ -86,6 +70,15 @@ class AnalyticsCacheManager:
             'materialized': 3600,  # 1 hour
         }
         
+        # Levels 1 and 2: bounded LRU memory tier over the shared Redis cache
+        self.tiered_cache = TieredCache(
+            namespace='analytics',
+            memory_maxsize=getattr(settings, 'ANALYTICS_MEMORY_CACHE_SIZE', 1000),
+            memory_ttl=self.default_ttl['memory'],
+            default_timeout=self.default_ttl['redis'],
+            cache_alias=getattr(settings, 'ANALYTICS_CACHE_ALIAS', 'default'),
+        )
+        
         # Performance tracking
         self.cache_stats = {
             'memory_hits': 0,
@@ -95,6 +88,32 @@ class AnalyticsCacheManager:
             'total_requests': 0
         }
     
+    @staticmethod
+    def cache_tags(
+        analytics_type: Optional[str] = None,
+        company_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> List[str]:
+        """
+        Invalidation tags for an entry. Combined type/company and type/user
+        tags let a single type be invalidated for one tenant or user.
+        """
+        tags = []
+        if analytics_type:
+            tags.append(f"type:{analytics_type}")
+        if company_id:
+            tags.append(f"company:{company_id}")
+        if user_id:
+            tags.append(f"user:{user_id}")
+        if analytics_type and company_id:
+            tags.append(f"type:{analytics_type}:company:{company_id}")
+        if analytics_type and user_id:
+            tags.append(f"type:{analytics_type}:user:{user_id}")
+        return tags
+    
+    def _tags_for_key(self, cache_key: CacheKey) -> List[str]:
+        return self.cache_tags(cache_key.analytics_type, cache_key.company_id, cache_key.user_id)
+    
     def generate_cache_key(
         self, 
         analytics_type: str,
@@ -130,37 +149,25 @@ class AnalyticsCacheManager:
         self.cache_stats['total_requests'] += 1
         cache_key_str = cache_key.to_string()
         
-        # Level 1: Memory cache (fastest)
-        if cache_key_str in self.memory_cache:
-            self.cache_stats['memory_hits'] += 1
-            logger.debug(f"Memory cache hit for {cache_key_str}")
+        # Levels 1 and 2: memory tier, then shared Redis tier
+        try:
+            cached_data, level = self.tiered_cache.get_with_level(
+                cache_key_str, self._tags_for_key(cache_key)
+            )
+        except Exception as e:
+            logger.warning(f"Tiered cache lookup failed: {e}")
+            cached_data, level = None, None
+        
+        if level is not None:
+            cache_level = 'memory' if level == 'memory' else 'redis'
+            self.cache_stats[f'{cache_level}_hits'] += 1
+            logger.debug(f"{cache_level.capitalize()} cache hit for {cache_key_str}")
             return CacheResult(
-                data=self.memory_cache[cache_key_str],
-                cache_level='memory',
+                data=cached_data,
+                cache_level=cache_level,
                 hit_time=timezone.now()
             )
         
-        # Level 2: Redis cache (fast)
-        if self.redis_available:
-            try:
-                redis_data = self.redis_client.get(cache_key_str)
-                if redis_data:
-                    self.cache_stats['redis_hits'] += 1
-                    logger.debug(f"Redis cache hit for {cache_key_str}")
-                    
-                    result_data = json.loads(redis_data)
-                    
-                    # Promote to memory cache
-                    self.memory_cache[cache_key_str] = result_data
-                    
-                    return CacheResult(
-                        data=result_data,
-                        cache_level='redis',
-                        hit_time=timezone.now()
-                    )
-            except Exception as e:
-                logger.warning(f"Redis cache lookup failed: {e}")
-        
         # Level 3: Materialized view cache
         if analytics_definition and analytics_definition.materialized_view:
             materialized_data = await self.get_materialized_data(
@@ -196,33 +203,19 @@ class AnalyticsCacheManager:
         cache_key_str = cache_key.to_string()
         
         try:
-            # Serialize data
-            serialized_data = data
-            if not isinstance(data, (str, int, float, bool, type(None))):
-                serialized_data = json.dumps(data, default=str)
-            
-            success = True
-            
-            # Store in memory cache
-            if cache_level in ['all', 'memory']:
-                ttl = custom_ttl or self.default_ttl['memory']
-                self.memory_cache[cache_key_str] = data
-                logger.debug(f"Cached result in memory: {cache_key_str}")
-            
-            # Store in Redis cache
-            if cache_level in ['all', 'redis'] and self.redis_available:
-                try:
-                    ttl = custom_ttl or self.default_ttl['redis']
-                    self.redis_client.setex(
-                        cache_key_str,
-                        ttl,
-                        serialized_data if isinstance(serialized_data, str) else json.dumps(serialized_data, default=str)
-                    )
-                    logger.debug(f"Cached result in Redis: {cache_key_str}")
-                except Exception as e:
-                    logger.warning(f"Failed to cache in Redis: {e}")
-                    success = False
+            store_memory = cache_level in ['all', 'memory', 'materialized']
+            store_redis = cache_level in ['all', 'redis', 'materialized']
+            ttl = custom_ttl or self.default_ttl['redis']
             
+            success = self.tiered_cache.set(
+                cache_key_str,
+                data,
+                tags=self._tags_for_key(cache_key),
+                timeout=ttl,
+                memory=store_memory,
+                shared=store_redis
+            )
+            logger.debug(f"Cached result ({cache_level}): {cache_key_str}")
             return success
             
         except Exception as e:
@@ -350,52 +343,36 @@ class AnalyticsCacheManager:
         user_id: Optional[int] = None
     ) -> int:
         """
-        Invalidate cache entries based on patterns or specific criteria.
-        Returns number of invalidated entries.
-        """
-        invalidated_count = 0
+        Invalidate cache entries by analytics type, company or user.
         
+        Invalidation bumps a tag generation rather than scanning keys, so it
+        is O(1) regardless of cache size. A raw ``pattern`` cannot be mapped
+        to tags and clears the whole analytics namespace.
+        Returns the number of tag generations bumped.
+        """
         try:
-            # Build invalidation pattern
             if pattern:
-                cache_pattern = pattern
+                tag = None
+            elif analytics_type and user_id:
+                tag = f"type:{analytics_type}:user:{user_id}"
+            elif analytics_type and company_id:
+                tag = f"type:{analytics_type}:company:{company_id}"
+            elif analytics_type:
+                tag = f"type:{analytics_type}"
+            elif user_id:
+                tag = f"user:{user_id}"
+            elif company_id:
+                tag = f"company:{company_id}"
             else:
-                pattern_parts = ["analytics"]
-                if analytics_type:
-                    pattern_parts.append(analytics_type)
-                else:
-                    pattern_parts.append("*")
-                
-                if user_id:
-                    pattern_parts.append(f"user:{user_id}")
-                elif company_id:
-                    pattern_parts.append(f"*:company:{company_id}")
-                else:
-                    pattern_parts.append("*")
-                
-                cache_pattern = ":".join(pattern_parts) + "*"
+                tag = None
             
-            # Invalidate memory cache
-            keys_to_remove = []
-            for key in self.memory_cache.keys():
-                if self.matches_pattern(key, cache_pattern):
-                    keys_to_remove.append(key)
-            
-            for key in keys_to_remove:
-                del self.memory_cache[key]
-                invalidated_count += 1
-            
-            # Invalidate Redis cache
-            if self.redis_available:
-                try:
-                    redis_keys = self.redis_client.keys(cache_pattern)
-                    if redis_keys:
-                        deleted = self.redis_client.delete(*redis_keys)
-                        invalidated_count += deleted
-                except Exception as e:
-                    logger.warning(f"Failed to invalidate Redis cache: {e}")
+            if tag is None:
+                invalidated_count = self.tiered_cache.clear()
+                logger.info(f"Invalidated analytics cache namespace (pattern: {pattern or 'all'})")
+            else:
+                invalidated_count = self.tiered_cache.invalidate(tag)
+                logger.info(f"Invalidated analytics cache tag: {tag}")
             
-            logger.info(f"Invalidated {invalidated_count} cache entries with pattern: {cache_pattern}")
             return invalidated_count
             
         except Exception as e:
@@ -411,9 +388,10 @@ class AnalyticsCacheManager:
         """Get cache performance statistics"""
         total_requests = self.cache_stats['total_requests']
         if total_requests == 0:
-            return self.cache_stats
+            return {**self.cache_stats, 'tiers': self.tiered_cache.stats()}
         
         stats = self.cache_stats.copy()
+        stats['tiers'] = self.tiered_cache.stats()
         stats['memory_hit_rate'] = (stats['memory_hits'] / total_requests) * 100
         stats['redis_hit_rate'] = (stats['redis_hits'] / total_requests) * 100
         stats['materialized_hit_rate'] = (stats['materialized_hits'] / total_requests) * 100
@@ -425,12 +403,8 @@ class AnalyticsCacheManager:
     def clear_all_cache(self) -> bool:
         """Clear all cache levels - use with caution"""
         try:
-            # Clear memory cache
-            self.memory_cache.clear()
-            
-            # Clear Redis cache
-            if self.redis_available:
-                self.redis_client.flushdb()
+            # Drop the memory tier and orphan every Redis entry in the namespace
+            self.tiered_cache.clear()
             
             # Reset stats
             self.cache_stats = {key: 0 for key in self.cache_stats.keys()}
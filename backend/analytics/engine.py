@@ -6,9 +6,10 @@ Handles all analytics requests with caching, optimization, and role-based access
 import json
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import connection
 from django.utils import timezone
@@ -18,6 +19,11 @@ from .models import AnalyticsDefinition, AnalyticsExecution, AnalyticsCache
 from .permissions import analytics_permission_manager, AnalyticsPermission
 from .caching import analytics_cache_manager, CacheKey, CacheResult
 from .query_optimizer import query_optimizer, QueryContext, QueryOptimization
+from .rollups import AnalyticsRollupService
+from .metrics import AnalyticsMetrics
+from shared.async_db import AsyncDatabaseExecutor
+from shared.single_flight import SingleFlight
+from shared.streaming_export import SQLRows, StreamingExport, DEFAULT_CHUNK_SIZE
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -64,17 +70,17 @@ class UnifiedAnalyticsEngine:
         self.permission_manager = analytics_permission_manager
         self.cache_manager = analytics_cache_manager
         self.query_optimizer = query_optimizer
+        self.single_flight = SingleFlight('analytics', wait_timeout=30.0, lock_timeout=120)
         
-        # Performance tracking
-        self.execution_stats = {
-            'total_requests': 0,
-            'successful_requests': 0,
-            'failed_requests': 0,
-            'cache_hits': 0,
-            'average_response_time': 0.0,
-            'requests_by_type': {},
-            'requests_by_role': {}
-        }
+        # Blocking ORM/cursor work runs here so it never stalls the event loop
+        self.db = AsyncDatabaseExecutor(
+            'analytics',
+            max_workers=getattr(settings, 'ANALYTICS_DB_MAX_WORKERS', 8),
+            max_concurrency=getattr(settings, 'ANALYTICS_DB_MAX_CONCURRENCY', None)
+        )
+        
+        # Performance tracking (shared by the event loop and DB worker threads)
+        self.metrics = AnalyticsMetrics()
     
     async def get_analytics(
         self,
@@ -105,16 +111,11 @@ class UnifiedAnalyticsEngine:
         """
         start_time = timezone.now()
         execution_id = None
+        user_role = getattr(user, 'role', 'DRIVER')
         
         try:
             # Track request
-            self.execution_stats['total_requests'] += 1
-            self.execution_stats['requests_by_type'][analytics_type] = \
-                self.execution_stats['requests_by_type'].get(analytics_type, 0) + 1
-            
-            user_role = getattr(user, 'role', 'DRIVER')
-            self.execution_stats['requests_by_role'][user_role] = \
-                self.execution_stats['requests_by_role'].get(user_role, 0) + 1
+            self.metrics.record_request(analytics_type, user_role)
             
             # Validate request
             request = AnalyticsRequest(
@@ -146,15 +147,18 @@ class UnifiedAnalyticsEngine:
             if cache_enabled and not real_time:
                 cache_result = await self._get_from_cache(request, analytics_def)
                 if cache_result:
-                    self.execution_stats['cache_hits'] += 1
+                    self.metrics.record_cache_hit()
             
             # Execute query if no cache hit
             if not cache_result:
-                cache_result = await self._execute_analytics_query(request, analytics_def)
-                
-                # Cache the result
-                if cache_enabled:
-                    await self._cache_result(request, analytics_def, cache_result)
+                if cache_enabled and not real_time:
+                    cache_result = await self._execute_single_flight(request, analytics_def)
+                else:
+                    cache_result = await self._execute_analytics_query(request, analytics_def)
+                    
+                    # Cache the result
+                    if cache_enabled:
+                        await self._cache_result(request, analytics_def, cache_result)
             
             # Process result for user role
             processed_result = await self._process_result_for_user(
@@ -166,11 +170,20 @@ class UnifiedAnalyticsEngine:
             await self._update_execution_record(execution_id, 'COMPLETED', execution_time, processed_result)
             
             # Update stats
-            self.execution_stats['successful_requests'] += 1
-            self._update_average_response_time(execution_time)
+            self.metrics.record_outcome(analytics_type, user_role, 'success', execution_time)
             
             return processed_result
             
+        except asyncio.CancelledError:
+            # Client went away; the DB executor has already cancelled the running statement
+            logger.info(f"Analytics request cancelled: {analytics_type}")
+            if execution_id:
+                await asyncio.shield(
+                    self._update_execution_record(execution_id, 'FAILED', 0, None, 'Cancelled by client')
+                )
+            self.metrics.record_outcome(analytics_type, user_role, 'cancelled')
+            raise
+            
         except Exception as e:
             logger.error(f"Analytics execution failed: {str(e)}", exc_info=True)
             
@@ -178,9 +191,75 @@ class UnifiedAnalyticsEngine:
             if execution_id:
                 await self._update_execution_record(execution_id, 'FAILED', 0, None, str(e))
             
-            self.execution_stats['failed_requests'] += 1
+            self.metrics.record_outcome(analytics_type, user_role, 'failed')
             raise
     
+    async def get_composite_analytics(
+        self,
+        analytics_types: List[str],
+        user: User,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Run several independent analytics for one dashboard concurrently.
+        A failing panel is reported under its type without failing the rest;
+        cancelling the caller cancels every panel still running.
+        """
+        results = await asyncio.gather(
+            *(self.get_analytics(analytics_type, user, **kwargs) for analytics_type in analytics_types),
+            return_exceptions=True
+        )
+        
+        composite = {}
+        for analytics_type, result in zip(analytics_types, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                composite[analytics_type] = {'error': str(result)}
+            else:
+                composite[analytics_type] = result
+        return composite
+    
+    async def export_analytics(
+        self,
+        analytics_type: str,
+        user: User,
+        export_format: str,
+        filters: Optional[Dict[str, Any]] = None,
+        time_range: str = '30d',
+        granularity: str = 'auto',
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> StreamingExport:
+        """
+        Streaming export of raw analytics rows.
+        
+        Validation and permission checks run here; the query itself runs on a
+        server-side cursor when the returned export is consumed (e.g. by
+        shared.streaming_export.streaming_response), so rows are never
+        materialised or cached in full.
+        """
+        request = AnalyticsRequest(
+            analytics_type=analytics_type,
+            user=user,
+            filters=filters or {},
+            time_range=time_range,
+            granularity=granularity,
+            cache_enabled=False,
+            export_format=export_format
+        )
+        
+        await self._validate_request(request)
+        
+        analytics_def = await self._get_analytics_definition(analytics_type)
+        if not analytics_def:
+            raise ValidationError(f"Analytics type '{analytics_type}' not found")
+        
+        await self._check_permissions(request, analytics_def)
+        
+        sql, query_params = await self._prepare_query(request, analytics_def)
+        logger.info(f"Streaming {export_format} export of {analytics_type} for user {user.id}")
+        return StreamingExport(None, SQLRows(sql, query_params, chunk_size=chunk_size), batch_size=chunk_size)
+    
     async def _validate_request(self, request: AnalyticsRequest):
         """Validate analytics request parameters"""
         # Validate user authentication
@@ -199,19 +278,15 @@ class UnifiedAnalyticsEngine:
         
         # Validate export format if specified
         if request.export_format:
-            valid_formats = ['pdf', 'csv', 'excel', 'json']
+            valid_formats = ['pdf', 'csv', 'excel', 'json', 'ndjson', 'arrow', 'parquet']
             if request.export_format not in valid_formats:
                 raise ValidationError(f"Invalid export format: {request.export_format}")
     
     async def _get_analytics_definition(self, analytics_type: str) -> Optional[AnalyticsDefinition]:
         """Get analytics definition from database"""
-        try:
-            return await AnalyticsDefinition.objects.aget(
-                analytics_type=analytics_type,
-                is_active=True
-            )
-        except AnalyticsDefinition.DoesNotExist:
-            return None
+        return await self.db.run(
+            AnalyticsDefinition.objects.filter(analytics_type=analytics_type, is_active=True).first
+        )
     
     async def _check_permissions(self, request: AnalyticsRequest, analytics_def: AnalyticsDefinition):
         """Check if user has permission to access analytics"""
@@ -220,7 +295,8 @@ class UnifiedAnalyticsEngine:
             raise PermissionDenied(f"User does not have access to {request.analytics_type}")
         
         # Check definition-specific permissions
-        if not analytics_def.can_user_access(request.user):
+        # has_perm() may load the user's permissions from the database
+        if not await self.db.run(analytics_def.can_user_access, request.user):
             raise PermissionDenied("User does not meet analytics definition requirements")
         
         # Check time range permissions
@@ -231,7 +307,7 @@ class UnifiedAnalyticsEngine:
         
         # Check export permissions
         if request.export_format:
-            if not analytics_def.can_user_export(request.user, request.export_format):
+            if not await self.db.run(analytics_def.can_user_export, request.user, request.export_format):
                 raise PermissionDenied(f"User cannot export in {request.export_format} format")
         
         # Check real-time permissions
@@ -244,7 +320,8 @@ class UnifiedAnalyticsEngine:
         analytics_def: AnalyticsDefinition
     ) -> str:
         """Create execution record for tracking"""
-        execution = AnalyticsExecution.objects.create(
+        execution = await self.db.run(
+            AnalyticsExecution.objects.create,
             analytics_definition=analytics_def,
             user=request.user,
             company_id=getattr(request.user, 'company_id', None),
@@ -255,13 +332,9 @@ class UnifiedAnalyticsEngine:
         )
         return str(execution.id)
     
-    async def _get_from_cache(
-        self, 
-        request: AnalyticsRequest, 
-        analytics_def: AnalyticsDefinition
-    ) -> Optional[CacheResult]:
-        """Try to get result from cache"""
-        cache_key = self.cache_manager.generate_cache_key(
+    def _cache_key(self, request: AnalyticsRequest, analytics_def: AnalyticsDefinition) -> CacheKey:
+        """Cache key for a request, scoped to the user for user-scoped analytics"""
+        return self.cache_manager.generate_cache_key(
             analytics_type=request.analytics_type,
             user_id=request.user.id if analytics_def.data_scope == 'user' else None,
             company_id=getattr(request.user, 'company_id', None),
@@ -269,15 +342,76 @@ class UnifiedAnalyticsEngine:
             time_range=request.time_range,
             granularity=request.granularity
         )
+    
+    async def _get_from_cache(
+        self, 
+        request: AnalyticsRequest, 
+        analytics_def: AnalyticsDefinition
+    ) -> Optional[CacheResult]:
+        """Try to get result from cache"""
+        cache_key = self._cache_key(request, analytics_def)
         
         return await self.cache_manager.get_cached_analytics(cache_key, analytics_def)
     
+    async def _execute_single_flight(
+        self, 
+        request: AnalyticsRequest, 
+        analytics_def: AnalyticsDefinition
+    ) -> CacheResult:
+        """
+        Execute and cache the query in one worker per cache key; concurrent
+        misses for the same key wait for that result instead of re-running it.
+        """
+        async def compute():
+            result = await self._execute_analytics_query(request, analytics_def)
+            await self._cache_result(request, analytics_def, result)
+            return result
+        
+        return await self.single_flight.acoalesce(
+            self._cache_key(request, analytics_def).to_string(),
+            compute=compute,
+            lookup=lambda: self._get_from_cache(request, analytics_def)
+        )
+    
     async def _execute_analytics_query(
         self, 
         request: AnalyticsRequest, 
         analytics_def: AnalyticsDefinition
     ) -> CacheResult:
         """Execute the analytics query"""
+        # Trend analytics with rollups only touch raw tables for the open bucket
+        rollup_result = await self._execute_from_rollups(request)
+        if rollup_result is not None:
+            return rollup_result
+        
+        # Execute optimized query
+        start_time = timezone.now()
+        
+        try:
+            sql, query_params = await self._prepare_query(request, analytics_def)
+            
+            # Execute query
+            result_data = await self.db.run(self._run_query, sql, query_params)
+            
+            query_time = (timezone.now() - start_time).total_seconds() * 1000
+            
+            return CacheResult(
+                data=result_data,
+                cache_level='database',
+                hit_time=timezone.now(),
+                computation_time_ms=int(query_time)
+            )
+            
+        except Exception as e:
+            logger.error(f"Query execution failed: {str(e)}")
+            raise
+    
+    async def _prepare_query(
+        self,
+        request: AnalyticsRequest,
+        analytics_def: AnalyticsDefinition
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Optimized SQL and user-filtered parameters for a request"""
         # Estimate data volume for optimization
         data_volume = await self._estimate_data_volume(request, analytics_def)
         
@@ -299,37 +433,56 @@ class UnifiedAnalyticsEngine:
             context=query_context
         )
         
-        # Execute optimized query
+        # Get filtered query parameters
+        query_params = self.permission_manager.get_filtered_query_params(
+            request.user, 
+            self._build_query_params(request)
+        )
+        
+        return optimization.optimized_query, query_params
+    
+    @staticmethod
+    def _run_query(sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run SQL on a DB worker thread and return rows as dictionaries"""
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    async def _execute_from_rollups(self, request: AnalyticsRequest) -> Optional[CacheResult]:
+        """
+        Serve the request from time-bucketed rollups when its type has them.
+        Returns None for arbitrary filters or user/depot scopes, which the
+        rollups are not keyed by.
+        """
+        if request.filters or not AnalyticsRollupService.supports(request.analytics_type):
+            return None
+        
+        data_scope = self.permission_manager.get_user_permissions(request.user).data_scope
+        company_id = getattr(request.user, 'company_id', None)
+        if data_scope == 'global':
+            company_id = None
+        elif data_scope != 'company' or not company_id:
+            return None
+        
         start_time = timezone.now()
+        data = await self.db.run(
+            AnalyticsRollupService.query,
+            request.analytics_type,
+            start=self._parse_time_range(request.time_range),
+            end=start_time,
+            granularity=request.granularity,
+            company_id=company_id
+        )
+        if data is None:
+            return None
         
-        try:
-            # Get filtered query parameters
-            query_params = self.permission_manager.get_filtered_query_params(
-                request.user, 
-                self._build_query_params(request)
-            )
-            
-            # Execute query
-            with connection.cursor() as cursor:
-                cursor.execute(optimization.optimized_query, query_params)
-                columns = [col[0] for col in cursor.description]
-                rows = cursor.fetchall()
-                
-                # Convert to list of dictionaries
-                result_data = [dict(zip(columns, row)) for row in rows]
-            
-            query_time = (timezone.now() - start_time).total_seconds() * 1000
-            
-            return CacheResult(
-                data=result_data,
-                cache_level='database',
-                hit_time=timezone.now(),
-                computation_time_ms=int(query_time)
-            )
-            
-        except Exception as e:
-            logger.error(f"Query execution failed: {str(e)}")
-            raise
+        return CacheResult(
+            data=data,
+            cache_level='rollup',
+            hit_time=timezone.now(),
+            computation_time_ms=int((timezone.now() - start_time).total_seconds() * 1000)
+        )
     
     async def _cache_result(
         self, 
@@ -338,14 +491,7 @@ class UnifiedAnalyticsEngine:
         result: CacheResult
     ):
         """Cache the analytics result"""
-        cache_key = self.cache_manager.generate_cache_key(
-            analytics_type=request.analytics_type,
-            user_id=request.user.id if analytics_def.data_scope == 'user' else None,
-            company_id=getattr(request.user, 'company_id', None),
-            filters=request.filters,
-            time_range=request.time_range,
-            granularity=request.granularity
-        )
+        cache_key = self._cache_key(request, analytics_def)
         
         await self.cache_manager.cache_result(
             cache_key=cache_key,
@@ -526,36 +672,34 @@ class UnifiedAnalyticsEngine:
     ):
         """Update execution record with results"""
         try:
-            execution = await AnalyticsExecution.objects.aget(id=execution_id)
-            
-            if status == 'COMPLETED':
-                execution.mark_completed(
-                    execution_time_ms=execution_time,
-                    result_size_bytes=len(json.dumps(asdict(result), default=str)) if result else 0,
-                    rows_returned=len(result.data) if result and result.data else 0
-                )
-            else:
-                execution.mark_failed(error_message)
-                
+            await self.db.run(
+                self._save_execution_record, execution_id, status, execution_time, result, error_message
+            )
         except Exception as e:
             logger.warning(f"Failed to update execution record: {e}")
     
-    def _update_average_response_time(self, execution_time: float):
-        """Update rolling average response time"""
-        current_avg = self.execution_stats['average_response_time']
-        total_requests = self.execution_stats['successful_requests']
+    @staticmethod
+    def _save_execution_record(
+        execution_id: str, 
+        status: str, 
+        execution_time: int, 
+        result: Optional[AnalyticsResult], 
+        error_message: str
+    ):
+        execution = AnalyticsExecution.objects.get(id=execution_id)
         
-        if total_requests == 1:
-            self.execution_stats['average_response_time'] = execution_time
+        if status == 'COMPLETED':
+            execution.mark_completed(
+                execution_time_ms=execution_time,
+                result_size_bytes=len(json.dumps(asdict(result), default=str)) if result else 0,
+                rows_returned=len(result.data) if result and result.data else 0
+            )
         else:
-            # Rolling average calculation
-            self.execution_stats['average_response_time'] = (
-                (current_avg * (total_requests - 1)) + execution_time
-            ) / total_requests
+            execution.mark_failed(error_message)
     
     def get_engine_stats(self) -> Dict[str, Any]:
         """Get engine performance statistics"""
-        stats = self.execution_stats.copy()
+        stats = self.metrics.snapshot()
         
         # Add cache statistics
         cache_stats = self.cache_manager.get_cache_stats()
@@ -564,6 +708,8 @@ class UnifiedAnalyticsEngine:
         # Add optimization statistics
         optimization_stats = self.query_optimizer.get_optimization_stats()
         stats['optimization_stats'] = optimization_stats
+        stats['single_flight'] = self.single_flight.stats()
+        stats['db_executor'] = self.db.stats()
         
         # Calculate success rate
         if stats['total_requests'] > 0:
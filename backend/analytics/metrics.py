@@ -0,0 +1,71 @@
+"""
+Thread-safe metrics for the unified analytics engine.
+
+Counters are updated from the event loop and from database worker threads,
+so all writes go through one lock. Each update is mirrored to Prometheus so
+the figures survive across processes; snapshot() serves the per-process view
+returned by get_engine_stats().
+"""
+
+import threading
+from collections import Counter
+from typing import Any, Dict
+
+from prometheus_client import Counter as PrometheusCounter, Histogram
+
+ANALYTICS_REQUESTS = PrometheusCounter(
+    'safeshipper_analytics_requests_total',
+    'Analytics engine requests by type, role and outcome',
+    ['analytics_type', 'role', 'outcome'],
+)
+ANALYTICS_LATENCY = Histogram(
+    'safeshipper_analytics_request_seconds',
+    'Analytics engine request latency',
+    ['analytics_type'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class AnalyticsMetrics:
+    """Per-process request counters and average response time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+        self._by_type: Counter = Counter()
+        self._by_role: Counter = Counter()
+        self._total_response_ms = 0.0
+
+    def record_request(self, analytics_type: str, role: str):
+        with self._lock:
+            self._counters['total_requests'] += 1
+            self._by_type[analytics_type] += 1
+            self._by_role[role] += 1
+
+    def record_cache_hit(self):
+        with self._lock:
+            self._counters['cache_hits'] += 1
+
+    def record_outcome(self, analytics_type: str, role: str, outcome: str, response_ms: float = 0.0):
+        """outcome is 'success', 'failed' or 'cancelled'."""
+        with self._lock:
+            self._counters[f'{outcome}_requests'] += 1
+            if outcome == 'success':
+                self._total_response_ms += response_ms
+        ANALYTICS_REQUESTS.labels(analytics_type=analytics_type, role=role, outcome=outcome).inc()
+        if outcome == 'success':
+            ANALYTICS_LATENCY.labels(analytics_type=analytics_type).observe(response_ms / 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            successful = self._counters['success_requests']
+            return {
+                'total_requests': self._counters['total_requests'],
+                'successful_requests': successful,
+                'failed_requests': self._counters['failed_requests'],
+                'cancelled_requests': self._counters['cancelled_requests'],
+                'cache_hits': self._counters['cache_hits'],
+                'average_response_time': self._total_response_ms / successful if successful else 0.0,
+                'requests_by_type': dict(self._by_type),
+                'requests_by_role': dict(self._by_role),
+            }
@@ -5,7 +5,6 @@ Defines analytics queries, caching strategies, and access permissions.
 
 from django.db import models
 from django.contrib.auth import get_user_model
-from django.contrib.postgres.fields import JSONField
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
@@ -80,8 +79,8 @@ class AnalyticsDefinition(models.Model):
     base_table = models.CharField(max_length=100, help_text="Primary table for the analytics")
     
     # Permission Configuration
-    required_roles = JSONField(default=list, help_text="List of roles that can access this analytics")
-    required_permissions = JSONField(default=list, help_text="List of permissions required")
+    required_roles = models.JSONField(default=list, help_text="List of roles that can access this analytics")
+    required_permissions = models.JSONField(default=list, help_text="List of permissions required")
     data_scope = models.CharField(max_length=20, choices=DataScope.choices, default=DataScope.COMPANY)
     
     # Performance Configuration
@@ -103,8 +102,8 @@ class AnalyticsDefinition(models.Model):
     last_computed = models.DateTimeField(null=True, blank=True)
     
     # Export Configuration
-    export_formats = JSONField(default=list, help_text="Allowed export formats: pdf, csv, excel, json")
-    export_permissions = JSONField(default=list, help_text="Roles allowed to export this analytics")
+    export_formats = models.JSONField(default=list, help_text="Allowed export formats: pdf, csv, excel, json")
+    export_permissions = models.JSONField(default=list, help_text="Roles allowed to export this analytics")
     
     class Meta:
         db_table = 'analytics_definitions'
@@ -234,7 +233,7 @@ class AnalyticsExecution(models.Model):
     # Execution Context
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     company_id = models.IntegerField(null=True, blank=True)
-    filters = JSONField(default=dict)
+    filters = models.JSONField(default=dict)
     time_range = models.CharField(max_length=20)
     granularity = models.CharField(max_length=20, default='auto')
     
@@ -329,13 +328,13 @@ class AnalyticsAlert(models.Model):
     ])
     
     # Alert Rules
-    condition = JSONField(default=dict, help_text="Complex alert conditions")
+    condition = models.JSONField(default=dict, help_text="Complex alert conditions")
     check_interval = models.IntegerField(default=300, help_text="Check interval in seconds")
     cooldown_period = models.IntegerField(default=3600, help_text="Cooldown period between alerts in seconds")
     
     # Notification Configuration
-    notification_channels = JSONField(default=list, help_text="List of notification channels (email, slack, etc.)")
-    recipients = JSONField(default=list, help_text="List of recipient emails/users")
+    notification_channels = models.JSONField(default=list, help_text="List of notification channels (email, slack, etc.)")
+    recipients = models.JSONField(default=list, help_text="List of recipient emails/users")
     
     # Metadata
     is_active = models.BooleanField(default=True)
@@ -355,4 +354,70 @@ class AnalyticsAlert(models.Model):
         ]
     
     def __str__(self):
-        return f"Alert: {self.name} ({self.severity})"
\ No newline at end of file
+        return f"Alert: {self.name} ({self.severity})"
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Pre-aggregated metrics for one analytics type, company and time bucket.
+    Metrics are additive counters so coarser buckets are sums of finer ones.
+    A null company holds the all-company total for the bucket.
+    """
+    
+    class Bucket(models.TextChoices):
+        HOUR = 'hour', 'Hourly'
+        DAY = 'day', 'Daily'
+        MONTH = 'month', 'Monthly'
+    
+    analytics_type = models.CharField(max_length=50)
+    bucket = models.CharField(max_length=10, choices=Bucket.choices)
+    bucket_start = models.DateTimeField()
+    company = models.ForeignKey(
+        'companies.Company',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='analytics_rollups'
+    )
+    metrics = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_rollups'
+        ordering = ['bucket_start']
+        indexes = [
+            models.Index(fields=['analytics_type', 'bucket', 'company', 'bucket_start']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['analytics_type', 'bucket', 'company', 'bucket_start'],
+                name='unique_analytics_rollup_bucket',
+            ),
+            models.UniqueConstraint(
+                fields=['analytics_type', 'bucket', 'bucket_start'],
+                condition=models.Q(company__isnull=True),
+                name='unique_analytics_rollup_total_bucket',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.analytics_type} {self.bucket} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+
+class AnalyticsRollupWatermark(models.Model):
+    """
+    Records how far each rollup level is complete. Buckets starting before
+    complete_until are served from AnalyticsRollup; later ones from raw tables.
+    """
+    
+    analytics_type = models.CharField(max_length=50)
+    bucket = models.CharField(max_length=10, choices=AnalyticsRollup.Bucket.choices)
+    complete_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_rollup_watermarks'
+        unique_together = ['analytics_type', 'bucket']
+    
+    def __str__(self):
+        return f"{self.analytics_type} {self.bucket} complete until {self.complete_until}"
@@ -0,0 +1,383 @@
+"""
+Time-bucketed rollups for the unified analytics engine.
+
+Hourly buckets are aggregated from the raw tables, daily buckets from hourly
+ones and monthly buckets from daily ones, so each refresh only reads the rows
+of recently closed buckets. Reads pick the coarsest bucket that still satisfies
+the requested granularity and only query raw tables for buckets the rollups
+do not cover yet, normally just the still-open one. A one-year daily trend
+reads ~365 rollup rows instead of every shipment of the year.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.utils import timezone
+
+from .models import AnalyticsRollup, AnalyticsRollupWatermark
+
+logger = logging.getLogger(__name__)
+
+Bucket = AnalyticsRollup.Bucket
+
+BUCKET_TRUNC = {
+    Bucket.HOUR: TruncHour,
+    Bucket.DAY: TruncDay,
+    Bucket.MONTH: TruncMonth,
+}
+
+# Finer level each bucket level is summed from (None = raw tables)
+BUCKET_SOURCE = {
+    Bucket.HOUR: None,
+    Bucket.DAY: Bucket.HOUR,
+    Bucket.MONTH: Bucket.DAY,
+}
+
+# Coarsest stored bucket that can answer each requested granularity
+GRANULARITY_BUCKETS = {
+    'hour': Bucket.HOUR,
+    'day': Bucket.DAY,
+    'week': Bucket.DAY,
+    'month': Bucket.MONTH,
+    'year': Bucket.MONTH,
+}
+
+# Re-aggregate this far behind the watermark to absorb late-arriving rows
+LATE_ARRIVAL_WINDOW = timedelta(hours=2)
+
+
+# Companies a shipment belongs to, as in AnalyticsPermissionManager.get_data_scope_filter
+SHIPMENT_COMPANY_FIELDS = ('customer_id', 'carrier_id')
+
+
+@dataclass(frozen=True)
+class RollupSource:
+    """
+    How to aggregate one analytics type from its base table. A row counts
+    towards every company in its company_fields, once per company.
+    """
+
+    model: str
+    timestamp_field: str
+    company_fields: Tuple[str, ...]
+    metrics: Callable[[], Dict[str, Any]]
+    derived: Callable[[Dict[str, Any]], Dict[str, Any]] = field(default=lambda counters: {})
+    base_filter: Callable[[], Q] = field(default=Q)
+
+    def queryset(self):
+        return apps.get_model(self.model).objects.filter(self.base_filter())
+
+    def company_filter(self, company_id) -> Q:
+        condition = Q()
+        for company_field in self.company_fields:
+            condition |= Q(**{company_field: company_id})
+        return condition
+
+
+def _rate(part: str, total: str) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def derive(counters):
+        denominator = counters.get(total) or 0
+        value = round((counters.get(part) or 0) / denominator * 100, 1) if denominator else 0
+        return {f"{part.replace('_count', '')}_rate": value}
+    return derive
+
+
+ROLLUP_SOURCES: Dict[str, RollupSource] = {
+    'shipment_trends': RollupSource(
+        model='shipments.Shipment',
+        timestamp_field='created_at',
+        company_fields=SHIPMENT_COMPANY_FIELDS,
+        metrics=lambda: {
+            'shipment_count': Count('id', distinct=True),
+            'delivered_count': Count('id', filter=Q(status='DELIVERED'), distinct=True),
+            'cancelled_count': Count('id', filter=Q(status='CANCELLED'), distinct=True),
+            'dangerous_goods_count': Count('id', filter=Q(items__is_dangerous_good=True), distinct=True),
+        },
+        derived=_rate('delivered_count', 'shipment_count'),
+    ),
+    'delivery_performance': RollupSource(
+        model='shipments.Shipment',
+        timestamp_field='actual_delivery_date',
+        company_fields=SHIPMENT_COMPANY_FIELDS,
+        metrics=lambda: {
+            'delivered_count': Count('id'),
+            'with_estimate_count': Count('id', filter=Q(estimated_delivery_date__isnull=False)),
+            'on_time_count': Count('id', filter=Q(actual_delivery_date__lte=F('estimated_delivery_date'))),
+            'delivered_weight_kg': Sum('dead_weight_kg'),
+        },
+        derived=_rate('on_time_count', 'with_estimate_count'),
+        base_filter=lambda: Q(actual_delivery_date__isnull=False),
+    ),
+}
+
+
+# ----------------------------------------------------------------------
+# Bucket arithmetic (in the current time zone, as Trunc* functions)
+# ----------------------------------------------------------------------
+
+def bucket_floor(bucket: str, moment: datetime) -> datetime:
+    local = timezone.localtime(moment)
+    if bucket == Bucket.HOUR:
+        return local.replace(minute=0, second=0, microsecond=0)
+    if bucket == Bucket.DAY:
+        return timezone.make_aware(datetime.combine(local.date(), time.min))
+    return timezone.make_aware(datetime.combine(local.date().replace(day=1), time.min))
+
+
+def period_start(granularity: str, moment: datetime) -> datetime:
+    """Start of the reporting period a bucket belongs to (week and year regroup stored buckets)."""
+    local = timezone.localtime(moment)
+    if granularity == 'week':
+        monday = local.date() - timedelta(days=local.weekday())
+        return timezone.make_aware(datetime.combine(monday, time.min))
+    if granularity == 'year':
+        return timezone.make_aware(datetime.combine(date(local.year, 1, 1), time.min))
+    return local
+
+
+def _add_counters(target: Dict[str, Any], counters: Dict[str, Any]) -> None:
+    for name, value in counters.items():
+        target[name] = (target.get(name) or 0) + (value or 0)
+
+
+class AnalyticsRollupService:
+    """Maintain and read AnalyticsRollup buckets."""
+
+    @staticmethod
+    def supports(analytics_type: str) -> bool:
+        return analytics_type in ROLLUP_SOURCES
+
+    @staticmethod
+    def choose_bucket(granularity: str, start: datetime, end: datetime) -> Optional[str]:
+        """Coarsest bucket satisfying the granularity; None when rollups are too coarse (minutes)."""
+        if granularity == 'auto':
+            span = end - start
+            if span <= timedelta(days=2):
+                return Bucket.HOUR
+            if span <= timedelta(days=92):
+                return Bucket.DAY
+            return Bucket.MONTH
+        return GRANULARITY_BUCKETS.get(granularity)
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def aggregate_raw(
+        cls,
+        analytics_type: str,
+        bucket: str,
+        start: datetime,
+        end: datetime,
+        company_id=None,
+        by_company: bool = True,
+    ) -> Dict[Tuple[datetime, Any], Dict[str, Any]]:
+        """
+        Counters per (bucket_start, company_id) from the base table for [start, end).
+
+        Without a company_id the all-company totals are keyed by None, plus,
+        with by_company, one entry per company the rows belong to. With a
+        company_id only that company's counters are returned.
+        """
+        source = ROLLUP_SOURCES[analytics_type]
+        ts = source.timestamp_field
+        queryset = source.queryset().filter(**{f"{ts}__gte": start, f"{ts}__lt": end})
+        if company_id is not None:
+            return cls._group(source, bucket, queryset.filter(source.company_filter(company_id)), company_id=company_id)
+
+        counters = cls._group(source, bucket, queryset)
+        if by_company:
+            for index, company_field in enumerate(source.company_fields):
+                scoped = queryset.filter(**{f"{company_field}__isnull": False})
+                # A company in several roles on one row counts it once
+                for earlier_field in source.company_fields[:index]:
+                    scoped = scoped.exclude(**{earlier_field: F(company_field)})
+                for key, metrics in cls._group(source, bucket, scoped, company_field=company_field).items():
+                    _add_counters(counters.setdefault(key, {}), metrics)
+        return counters
+
+    @staticmethod
+    def _group(
+        source: RollupSource,
+        bucket: str,
+        queryset,
+        company_field: Optional[str] = None,
+        company_id=None,
+    ) -> Dict[Tuple[datetime, Any], Dict[str, Any]]:
+        """Counters per bucket, keyed by the company_field value or else company_id."""
+        group_by = ['rollup_bucket'] + ([company_field] if company_field else [])
+        grouped = queryset.annotate(
+            rollup_bucket=BUCKET_TRUNC[bucket](source.timestamp_field)
+        ).values(*group_by).annotate(**source.metrics()).order_by()
+
+        metric_names = list(source.metrics())
+        return {
+            (row['rollup_bucket'], row[company_field] if company_field else company_id): {
+                name: row[name] or 0 for name in metric_names
+            }
+            for row in grouped
+        }
+
+    @classmethod
+    def aggregate_rollups(
+        cls,
+        analytics_type: str,
+        bucket: str,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[Tuple[datetime, Any], Dict[str, Any]]:
+        """Counters per (bucket_start, company_id) summed from the next finer stored level."""
+        counters: Dict[Tuple[datetime, Any], Dict[str, Any]] = defaultdict(dict)
+        rows = AnalyticsRollup.objects.filter(
+            analytics_type=analytics_type,
+            bucket=BUCKET_SOURCE[bucket],
+            bucket_start__gte=start,
+            bucket_start__lt=end,
+        ).values_list('bucket_start', 'company_id', 'metrics')
+
+        for bucket_start, company_id, metrics in rows:
+            _add_counters(counters[(bucket_floor(bucket, bucket_start), company_id)], metrics)
+        return counters
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def refresh(cls, analytics_type: str, now: Optional[datetime] = None, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Recompute closed buckets from the last watermark (less the late-arrival
+        window), finest level first. Returns rows written per level.
+
+        An explicit `since` starts at the beginning of that month so every
+        coarser bucket is summed from a complete set of finer ones. The first
+        refresh of a type backfills from the month of its earliest source row,
+        since query() trusts the rollups for everything before the watermark.
+        """
+        now = now or timezone.now()
+        watermark = cls.watermark(analytics_type, Bucket.HOUR)
+        if since is None and watermark:
+            since = watermark - LATE_ARRIVAL_WINDOW
+        else:
+            since = bucket_floor(Bucket.MONTH, since or cls.earliest(analytics_type) or now)
+
+        written = {}
+        window_start = since
+        for bucket in (Bucket.HOUR, Bucket.DAY, Bucket.MONTH):
+            start = bucket_floor(bucket, window_start)
+            end = bucket_floor(bucket, now)
+            if start >= end:
+                written[bucket] = 0
+                continue
+
+            if BUCKET_SOURCE[bucket] is None:
+                counters = cls.aggregate_raw(analytics_type, bucket, start, end)
+            else:
+                counters = cls.aggregate_rollups(analytics_type, bucket, start, end)
+            written[bucket] = cls._replace(analytics_type, bucket, start, end, counters)
+            window_start = start
+
+        logger.info(f"Refreshed {analytics_type} rollups: {written}")
+        return written
+
+    @staticmethod
+    def earliest(analytics_type: str) -> Optional[datetime]:
+        """Timestamp of the type's earliest source row, None if it has none."""
+        source = ROLLUP_SOURCES[analytics_type]
+        return source.queryset().aggregate(earliest=Min(source.timestamp_field))['earliest']
+
+    @classmethod
+    def _replace(cls, analytics_type: str, bucket: str, start: datetime, end: datetime, counters) -> int:
+        """Replace the stored buckets in [start, end) and advance the watermark to end."""
+        rows = [
+            AnalyticsRollup(
+                analytics_type=analytics_type, bucket=bucket, bucket_start=bucket_start,
+                company_id=company_id, metrics=metrics
+            )
+            for (bucket_start, company_id), metrics in counters.items()
+        ]
+
+        with transaction.atomic():
+            AnalyticsRollup.objects.filter(
+                analytics_type=analytics_type, bucket=bucket, bucket_start__gte=start, bucket_start__lt=end
+            ).delete()
+            AnalyticsRollup.objects.bulk_create(rows, batch_size=1000)
+            current = cls.watermark(analytics_type, bucket)
+            if current is None or end > current:
+                AnalyticsRollupWatermark.objects.update_or_create(
+                    analytics_type=analytics_type, bucket=bucket, defaults={'complete_until': end}
+                )
+        return len(rows)
+
+    @staticmethod
+    def watermark(analytics_type: str, bucket: str) -> Optional[datetime]:
+        return AnalyticsRollupWatermark.objects.filter(
+            analytics_type=analytics_type, bucket=bucket
+        ).values_list('complete_until', flat=True).first()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def query(
+        cls,
+        analytics_type: str,
+        start: datetime,
+        end: datetime,
+        granularity: str = 'auto',
+        company_id=None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Series for [start, end) from rollups plus a raw tail for buckets past
+        the watermark. company_id None reads the all-company totals. Returns
+        None when rollups cannot answer (unknown type, minute granularity or
+        never refreshed) so the caller falls back to its base query.
+        """
+        if not cls.supports(analytics_type):
+            return None
+        bucket = cls.choose_bucket(granularity, start, end)
+        if bucket is None:
+            return None
+        watermark = cls.watermark(analytics_type, bucket)
+        if watermark is None:
+            return None
+
+        source = ROLLUP_SOURCES[analytics_type]
+        first_bucket = bucket_floor(bucket, start)
+        series: Dict[datetime, Dict[str, Any]] = defaultdict(dict)
+
+        closed = AnalyticsRollup.objects.filter(
+            analytics_type=analytics_type,
+            bucket=bucket,
+            bucket_start__gte=first_bucket,
+            bucket_start__lt=min(watermark, end),
+        )
+        closed = closed.filter(company_id=company_id) if company_id is not None else closed.filter(company__isnull=True)
+        for bucket_start, metrics in closed.values_list('bucket_start', 'metrics'):
+            _add_counters(series[period_start(granularity, bucket_start)], metrics)
+
+        if watermark < end:
+            tail = cls.aggregate_raw(
+                analytics_type, bucket, max(watermark, first_bucket), end, company_id=company_id, by_company=False
+            )
+            for (bucket_start, _company), metrics in tail.items():
+                _add_counters(series[period_start(granularity, bucket_start)], metrics)
+
+        return [
+            {
+                'period': period.isoformat(),
+                'company_id': company_id,
+                **counters,
+                **source.derived(counters),
+            }
+            for period, counters in sorted(series.items())
+        ]
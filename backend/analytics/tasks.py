@@ -0,0 +1,38 @@
+"""
+Celery tasks maintaining analytics rollups.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from celery import shared_task
+from django.utils import timezone
+
+from .rollups import AnalyticsRollupService, ROLLUP_SOURCES
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_analytics_rollups(analytics_type: Optional[str] = None, rebuild_days: Optional[int] = None):
+    """
+    Roll recently closed hours into hourly, daily and monthly buckets.
+    With rebuild_days, re-aggregate from the start of the month that many
+    days back to pick up late or backdated source rows.
+    """
+    since = timezone.now() - timedelta(days=rebuild_days) if rebuild_days else None
+    types = [analytics_type] if analytics_type else list(ROLLUP_SOURCES)
+
+    results = {}
+    for name in types:
+        try:
+            results[name] = AnalyticsRollupService.refresh(name, since=since)
+        except Exception as e:
+            logger.error(f"Failed to refresh {name} analytics rollups: {e}")
+            results[name] = {'error': str(e)}
+
+    return {
+        'status': 'success',
+        'rollups': results
+    }
@@ -0,0 +1,108 @@
+"""
+Tests for time-bucketed analytics rollups.
+"""
+
+from datetime import datetime, timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from companies.models import Company
+from freight_types.models import FreightType
+from shipments.models import Shipment
+from .models import AnalyticsRollup
+from .rollups import AnalyticsRollupService, Bucket, bucket_floor
+
+
+@override_settings(TIME_ZONE='UTC')
+class BucketFloorTests(TestCase):
+    """Test bucket arithmetic"""
+
+    def test_floors_to_start_of_bucket(self):
+        moment = timezone.make_aware(datetime(2025, 3, 14, 15, 9, 26, 535))
+
+        self.assertEqual(bucket_floor(Bucket.HOUR, moment), timezone.make_aware(datetime(2025, 3, 14, 15)))
+        self.assertEqual(bucket_floor(Bucket.DAY, moment), timezone.make_aware(datetime(2025, 3, 14)))
+        self.assertEqual(bucket_floor(Bucket.MONTH, moment), timezone.make_aware(datetime(2025, 3, 1)))
+
+
+@override_settings(TIME_ZONE='UTC')
+class AnalyticsRollupServiceTests(TestCase):
+    """Test refreshing and reading shipment trend rollups"""
+
+    def setUp(self):
+        self.customer = Company.objects.create(name='Rollup Customer', company_type='CUSTOMER')
+        self.carrier = Company.objects.create(name='Rollup Carrier', company_type='CARRIER')
+        self.other_customer = Company.objects.create(name='Other Customer', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.now = timezone.make_aware(datetime(2025, 6, 15, 12, 30))
+
+    def _shipment(self, created_at, customer=None, carrier=None):
+        shipment = Shipment.objects.create(
+            customer=customer or self.customer,
+            carrier=carrier or self.carrier,
+            origin_location='Perth',
+            destination_location='Broome',
+            freight_type=self.freight_type,
+        )
+        Shipment.objects.filter(pk=shipment.pk).update(created_at=created_at)
+        return shipment
+
+    def _total(self, series):
+        return sum(row['shipment_count'] for row in series)
+
+    def test_first_refresh_backfills_from_earliest_row(self):
+        self._shipment(self.now - timedelta(days=200))
+        self._shipment(self.now - timedelta(days=1))
+
+        AnalyticsRollupService.refresh('shipment_trends', now=self.now)
+
+        series = AnalyticsRollupService.query(
+            'shipment_trends', self.now - timedelta(days=365), self.now, granularity='month'
+        )
+        self.assertEqual(self._total(series), 2)
+
+    def test_rollups_are_kept_per_tenant_company(self):
+        self._shipment(self.now - timedelta(days=3))
+        self._shipment(self.now - timedelta(days=2), customer=self.other_customer)
+        # A carrier shipping for itself counts once
+        self._shipment(self.now - timedelta(days=1), customer=self.carrier)
+
+        AnalyticsRollupService.refresh('shipment_trends', now=self.now)
+        start = self.now - timedelta(days=30)
+
+        def total(company_id):
+            return self._total(AnalyticsRollupService.query(
+                'shipment_trends', start, self.now, granularity='day', company_id=company_id
+            ))
+
+        self.assertEqual(total(None), 3)
+        self.assertEqual(total(self.customer.pk), 1)
+        self.assertEqual(total(self.other_customer.pk), 1)
+        self.assertEqual(total(self.carrier.pk), 3)
+
+    def test_query_reads_rows_past_the_watermark(self):
+        self._shipment(self.now - timedelta(days=1))
+        AnalyticsRollupService.refresh('shipment_trends', now=self.now)
+        self._shipment(self.now + timedelta(minutes=10))
+
+        series = AnalyticsRollupService.query(
+            'shipment_trends', self.now - timedelta(days=2), self.now + timedelta(hours=1),
+            granularity='hour', company_id=self.customer.pk
+        )
+        self.assertEqual(self._total(series), 2)
+
+    def test_refresh_replaces_buckets_in_window(self):
+        self._shipment(self.now - timedelta(hours=3))
+        AnalyticsRollupService.refresh('shipment_trends', now=self.now)
+        AnalyticsRollupService.refresh('shipment_trends', now=self.now + timedelta(hours=1))
+
+        hourly = AnalyticsRollup.objects.filter(
+            analytics_type='shipment_trends', bucket=Bucket.HOUR, company__isnull=True
+        )
+        self.assertEqual(sum(row.metrics['shipment_count'] for row in hourly), 1)
+
+    def test_query_without_refresh_falls_back(self):
+        self.assertIsNone(AnalyticsRollupService.query('shipment_trends', self.now - timedelta(days=1), self.now))
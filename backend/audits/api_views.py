@@ -1,7 +1,6 @@
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.db import models
 from django.db.models import Q, Count, Avg, Sum, F, Case, When, IntegerField
@@ -29,10 +28,11 @@ from .signals import log_custom_action
 from .permissions import AuditPermissions
 from companies.models import Company
 from .compliance_monitoring import ComplianceMonitoringService
+from shared.pagination import KeysetPagination
 
 
-class AuditLogPagination(PageNumberPagination):
-    """Custom pagination for audit logs"""
+class AuditLogPagination(KeysetPagination):
+    """Custom pagination for audit logs; ?cursor= pages by keyset"""
     page_size = 25
     page_size_query_param = 'page_size'
     max_page_size = 100
@@ -273,6 +273,7 @@ class AuditLogViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = AuditLogFilter
     ordering = ['-timestamp']
+    keyset_ordering = ['-timestamp', '-id']
     
     def get_queryset(self):
         """Company-based data filtering for multi-tenant architecture"""
@@ -850,6 +851,7 @@ class ShipmentAuditLogListView(generics.ListAPIView):
     serializer_class = ShipmentAuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = AuditLogPagination
+    keyset_ordering = ['-audit_log__timestamp', '-id']
     
     def get_queryset(self):
         """Get audit logs for specific shipment"""
@@ -866,7 +868,9 @@ class ShipmentAuditLogListView(generics.ListAPIView):
                     message="You don't have permission to view this shipment's audit logs."
                 )
         
-        return ShipmentAuditLog.objects.filter(shipment=shipment)
+        return ShipmentAuditLog.objects.filter(shipment=shipment).select_related(
+            'audit_log', 'audit_log__user'
+        )
     
     def list(self, request, *args, **kwargs):
         """Log the shipment audit access"""
@@ -1208,6 +1208,7 @@ class EmergencyViewSet(viewsets.ViewSet):
                 
                 # Broadcast emergency alert
                 from .tasks import send_bulk_notifications
+                from .dispatcher import EMERGENCY_LANE, PRIORITY_LANES
                 
                 # Get emergency contacts (this would be configured per organization)
                 emergency_contacts = User.objects.filter(
@@ -1231,7 +1232,9 @@ class EmergencyViewSet(viewsets.ViewSet):
                         }
                     ])
                 
-                task_result = send_bulk_notifications.delay(notifications)
+                task_result = send_bulk_notifications.apply_async(
+                    args=[notifications], kwargs={'lane': EMERGENCY_LANE}, **PRIORITY_LANES[EMERGENCY_LANE]
+                )
                 
                 return Response({
                     'message': 'Emergency alert broadcasted',
@@ -1438,6 +1441,7 @@ Reason: {reason}""",
             
             # Send escalation notifications
             from .tasks import send_bulk_notifications
+            from .dispatcher import EMERGENCY_LANE, PRIORITY_LANES
             
             # Notify all channel members
             members = channel.memberships.filter(is_active=True)
@@ -1453,7 +1457,9 @@ Reason: {reason}""",
                     })
             
             if notifications:
-                send_bulk_notifications.delay(notifications)
+                send_bulk_notifications.apply_async(
+                    args=[notifications], kwargs={'lane': EMERGENCY_LANE}, **PRIORITY_LANES[EMERGENCY_LANE]
+                )
             
             return Response({
                 'message': 'Emergency escalated successfully',
@@ -0,0 +1,510 @@
+# communications/dispatcher.py
+"""
+Fan-out aware notification dispatcher.
+
+Recipients, preferences and push devices are resolved with a fixed number of
+queries, deliveries are grouped by channel and provider, and each provider
+batch is handed to a single Celery task on the queue of its priority lane.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pytz
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+EMERGENCY_LANE = 'emergency'
+STANDARD_LANE = 'standard'
+DIGEST_LANE = 'digest'
+
+# Each lane has its own queue so emergency traffic never waits behind digests
+PRIORITY_LANES = {
+    EMERGENCY_LANE: {'queue': 'notifications_emergency', 'priority': 9},
+    STANDARD_LANE: {'queue': 'notifications', 'priority': 5},
+    DIGEST_LANE: {'queue': 'notifications_digest', 'priority': 0},
+}
+
+# Maximum deliveries handed to one provider call
+DEFAULT_BATCH_SIZES = {
+    'expo': 100,    # Expo push API accepts at most 100 messages per request
+    'fcm': 500,     # FCM multicast limit
+    'smtp': 50,     # Messages sent over one pooled SMTP connection
+    'twilio': 25,   # Twilio has no batch API; bounds task runtime instead
+}
+
+EMERGENCY_DELIVERY_METHODS = ['EMAIL', 'SMS', 'PUSH']
+
+# NotificationPreference.notification_type -> PushNotificationDevice preference key
+DEVICE_PREFERENCE_KEYS = {
+    'EMERGENCY': 'emergency_alerts',
+    'SHIPMENT_UPDATE': 'shipment_updates',
+}
+
+
+def lane_for_priority(priority: int) -> str:
+    """Map a NotificationQueue priority (1=highest, 10=lowest) to a lane."""
+    if priority <= 1:
+        return EMERGENCY_LANE
+    if priority <= 5:
+        return STANDARD_LANE
+    return DIGEST_LANE
+
+
+def is_quiet_hours(start, end, tz_name: str = 'UTC', now: Optional[datetime] = None) -> bool:
+    """Check whether the current time in tz_name falls between start and end."""
+    if not start or not end:
+        return False
+
+    try:
+        user_tz = pytz.timezone(tz_name or 'UTC')
+    except pytz.UnknownTimeZoneError:
+        user_tz = pytz.UTC
+
+    current_time = (now or timezone.now()).astimezone(user_tz).time()
+
+    if start <= end:
+        # Same day quiet hours
+        return start <= current_time <= end
+    # Quiet hours span midnight
+    return current_time >= start or current_time <= end
+
+
+def provider_for(channel: str, recipient: str) -> Optional[str]:
+    """Return the provider that delivers a channel/recipient pair."""
+    if channel == 'email':
+        return 'smtp'
+    if channel == 'sms':
+        return 'twilio'
+    if channel == 'push':
+        return 'expo' if recipient.startswith('ExponentPushToken[') else 'fcm'
+    return None
+
+
+def get_batch_size(provider: str) -> int:
+    overrides = getattr(settings, 'NOTIFICATION_PROVIDER_BATCH_SIZES', {})
+    return overrides.get(provider, DEFAULT_BATCH_SIZES.get(provider, 50))
+
+
+@dataclass
+class Delivery:
+    """A single message to a single address."""
+    channel: str
+    recipient: str
+    message: str = ''
+    subject: str = ''
+    html_message: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    queue_id: Optional[str] = None  # NotificationQueue row updated with the outcome
+
+    @property
+    def provider(self) -> Optional[str]:
+        return provider_for(self.channel, self.recipient)
+
+
+@dataclass
+class ResolvedRecipient:
+    """A user/address pair that passed preference and quiet hours checks."""
+    user: Any
+    delivery_method: str
+    address: str
+
+
+def load_preferences(user_ids: Iterable, notification_type: str) -> Dict[Any, List]:
+    """Load enabled NotificationPreference rows for many users in one query."""
+    from .models import NotificationPreference
+
+    preferences = defaultdict(list)
+    for preference in NotificationPreference.objects.filter(
+        user_id__in=list(user_ids),
+        notification_type=notification_type,
+        is_enabled=True
+    ):
+        preferences[preference.user_id].append(preference)
+    return preferences
+
+
+def load_push_tokens(user_ids: Iterable, preference_key: Optional[str] = None) -> Dict[Any, List[str]]:
+    """Load active push tokens for many users in one query."""
+    from notifications.models import PushNotificationDevice
+
+    tokens = defaultdict(list)
+    devices = PushNotificationDevice.objects.filter(user_id__in=list(user_ids), is_active=True)
+    for device in devices:
+        if preference_key and not device.should_receive_notification(preference_key):
+            continue
+        tokens[device.user_id].append(device.expo_push_token)
+    return tokens
+
+
+def resolve_recipients(
+    user_ids: Iterable,
+    notification_type: str,
+    is_emergency: bool = False,
+    delivery_methods: Optional[List[str]] = None,
+    now: Optional[datetime] = None
+) -> List[ResolvedRecipient]:
+    """
+    Resolve users to delivery addresses honoring preferences and quiet hours.
+
+    Emergency notifications bypass preferences and quiet hours and go out on
+    every channel in delivery_methods (EMAIL, SMS and PUSH by default).
+    Costs one query for users, one for preferences and one for push devices.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+
+    users = {user.pk: user for user in User.objects.filter(pk__in=user_ids, is_active=True)}
+    now = now or timezone.now()
+
+    methods_by_user = defaultdict(list)
+    if is_emergency:
+        for user_id in users:
+            methods_by_user[user_id] = list(delivery_methods or EMERGENCY_DELIVERY_METHODS)
+    else:
+        for user_id, preferences in load_preferences(users.keys(), notification_type).items():
+            for preference in preferences:
+                if delivery_methods and preference.delivery_method not in delivery_methods:
+                    continue
+                if not preference.immediate:
+                    continue
+                if is_quiet_hours(preference.quiet_hours_start, preference.quiet_hours_end,
+                                  preference.timezone, now):
+                    continue
+                methods_by_user[user_id].append(preference.delivery_method)
+
+    push_user_ids = [user_id for user_id, methods in methods_by_user.items() if 'PUSH' in methods]
+    push_tokens = load_push_tokens(
+        push_user_ids, DEVICE_PREFERENCE_KEYS.get(notification_type)
+    ) if push_user_ids else {}
+
+    resolved = []
+    for user_id, methods in methods_by_user.items():
+        user = users[user_id]
+        for method in dict.fromkeys(methods):
+            if method == 'EMAIL' and user.email:
+                resolved.append(ResolvedRecipient(user, method, user.email))
+            elif method == 'SMS':
+                phone = user.mobile_number or user.phone_number
+                if phone:
+                    resolved.append(ResolvedRecipient(user, method, phone))
+            elif method == 'PUSH':
+                for token in push_tokens.get(user_id, []):
+                    resolved.append(ResolvedRecipient(user, method, token))
+
+    return resolved
+
+
+def users_in_feedback_quiet_hours(user_ids: Iterable, is_emergency: bool = False,
+                                  now: Optional[datetime] = None) -> set:
+    """Return the subset of user_ids currently inside their feedback quiet hours."""
+    from notifications.notification_preferences import FeedbackNotificationPreference
+
+    quiet = set()
+    preferences = FeedbackNotificationPreference.objects.filter(
+        user_id__in=list(user_ids), quiet_hours_enabled=True
+    )
+    for preference in preferences:
+        if is_emergency and preference.emergency_override_enabled:
+            continue
+        if is_quiet_hours(preference.quiet_hours_start, preference.quiet_hours_end,
+                          preference.quiet_hours_timezone, now):
+            quiet.add(preference.user_id)
+    return quiet
+
+
+class NotificationDispatcher:
+    """
+    Collects deliveries and dispatches them as provider-sized batches.
+
+    Usage:
+        dispatcher = NotificationDispatcher(lane=EMERGENCY_LANE)
+        dispatcher.add_for_users(user_ids, 'EMERGENCY', subject, message, is_emergency=True)
+        dispatcher.dispatch()
+    """
+
+    def __init__(self, lane: str = STANDARD_LANE):
+        if lane not in PRIORITY_LANES:
+            raise ValueError(f"Unknown notification lane: {lane}")
+        self.lane = lane
+        self.deliveries: List[Delivery] = []
+
+    def add(self, channel: str, recipient: str, message: str = '', subject: str = '',
+            html_message: Optional[str] = None, data: Optional[Dict] = None,
+            queue_id: Optional[str] = None) -> Optional[Delivery]:
+        """Add a single delivery. Unknown channels and empty recipients are skipped."""
+        channel = (channel or '').lower()
+        if not recipient or provider_for(channel, recipient) is None:
+            logger.warning(f"Skipping notification with channel={channel!r} and no deliverable recipient")
+            return None
+
+        delivery = Delivery(
+            channel=channel,
+            recipient=recipient,
+            message=message or '',
+            subject=subject or '',
+            html_message=html_message or None,
+            data=data or {},
+            queue_id=str(queue_id) if queue_id else None
+        )
+        self.deliveries.append(delivery)
+        return delivery
+
+    def add_many(self, notification_data: Iterable[Dict[str, Any]]) -> int:
+        """Add deliveries in the send_bulk_notifications payload format."""
+        added = 0
+        for notification in notification_data:
+            channel = notification.get('type')
+            delivery = self.add(
+                channel=channel,
+                recipient=notification.get('recipient'),
+                message=notification.get('body' if channel == 'push' else 'message')
+                or notification.get('message', ''),
+                subject=notification.get('title' if channel == 'push' else 'subject')
+                or notification.get('subject', ''),
+                html_message=notification.get('html_message'),
+                data=notification.get('data'),
+                queue_id=notification.get('queue_id')
+            )
+            added += delivery is not None
+        return added
+
+    def add_for_users(self, user_ids: Iterable, notification_type: str, subject: str, message: str,
+                      html_message: Optional[str] = None, data: Optional[Dict] = None,
+                      is_emergency: bool = False, delivery_methods: Optional[List[str]] = None) -> int:
+        """Resolve users in bulk and add one delivery per resolved address."""
+        recipients = resolve_recipients(user_ids, notification_type, is_emergency, delivery_methods)
+        for recipient in recipients:
+            self.add(
+                channel=recipient.delivery_method.lower(),
+                recipient=recipient.address,
+                message=message,
+                subject=subject,
+                html_message=html_message if recipient.delivery_method == 'EMAIL' else None,
+                data=data
+            )
+        return len(recipients)
+
+    def batches(self) -> List[Dict[str, Any]]:
+        """Group deliveries by channel and provider, chunked to provider batch sizes."""
+        groups = defaultdict(list)
+        for delivery in self.deliveries:
+            groups[(delivery.channel, delivery.provider)].append(delivery)
+
+        batches = []
+        for (channel, provider), deliveries in groups.items():
+            size = get_batch_size(provider)
+            for start in range(0, len(deliveries), size):
+                batches.append({
+                    'channel': channel,
+                    'provider': provider,
+                    'deliveries': deliveries[start:start + size],
+                })
+        return batches
+
+    def dispatch(self) -> List[Dict[str, Any]]:
+        """Enqueue one task per provider batch on this dispatcher's lane."""
+        from .tasks import dispatch_notification_batch
+
+        lane = PRIORITY_LANES[self.lane]
+        results = []
+        for batch in self.batches():
+            payload = [asdict(delivery) for delivery in batch['deliveries']]
+            try:
+                task = dispatch_notification_batch.apply_async(
+                    args=[batch['channel'], batch['provider'], payload],
+                    queue=lane['queue'],
+                    priority=lane['priority']
+                )
+                results.append({
+                    'channel': batch['channel'],
+                    'provider': batch['provider'],
+                    'lane': self.lane,
+                    'size': len(payload),
+                    'task_id': task.id,
+                    'status': 'queued',
+                })
+            except Exception as exc:
+                logger.error(f"Failed to queue {batch['provider']} batch of {len(payload)}: {str(exc)}")
+                results.append({
+                    'channel': batch['channel'],
+                    'provider': batch['provider'],
+                    'lane': self.lane,
+                    'size': len(payload),
+                    'status': 'failed',
+                    'error': str(exc),
+                })
+
+        logger.info(
+            f"Dispatched {len(self.deliveries)} notifications in {len(results)} batches on {self.lane} lane"
+        )
+        self.deliveries = []
+        return results
+
+
+def send_provider_batch(channel: str, provider: str, deliveries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Deliver one provider batch and record the outcome on NotificationQueue rows.
+
+    Returns a summary with sent_count, failed_count and per-recipient errors.
+    """
+    senders = {
+        'smtp': _send_email_batch,
+        'expo': _send_expo_batch,
+        'fcm': _send_fcm_batch,
+        'twilio': _send_sms_batch,
+    }
+    sender = senders.get(provider)
+    if sender is None:
+        return {'status': 'failed', 'error': f'Unknown provider: {provider}', 'sent_count': 0,
+                'failed_count': len(deliveries)}
+
+    try:
+        sent, failed = sender(deliveries)
+    except Exception as exc:
+        logger.error(f"{provider} batch of {len(deliveries)} {channel} notifications failed: {str(exc)}")
+        sent, failed = [], [(delivery, str(exc)) for delivery in deliveries]
+
+    _record_queue_outcome(sent, failed)
+
+    return {
+        'status': 'success' if not failed else ('partial' if sent else 'failed'),
+        'channel': channel,
+        'provider': provider,
+        'sent_count': len(sent),
+        'failed_count': len(failed),
+        'errors': [{'recipient': delivery['recipient'], 'error': error} for delivery, error in failed] or None,
+    }
+
+
+def _send_email_batch(deliveries):
+    """Send all messages over one SMTP connection."""
+    from django.core.mail import EmailMultiAlternatives, get_connection
+
+    from_email = settings.DEFAULT_FROM_EMAIL
+    connection = get_connection(fail_silently=False)
+    messages = []
+    for delivery in deliveries:
+        email = EmailMultiAlternatives(
+            subject=delivery['subject'] or 'SafeShipper Notification',
+            body=delivery['message'],
+            from_email=from_email,
+            to=[delivery['recipient']],
+            connection=connection
+        )
+        if delivery.get('html_message'):
+            email.attach_alternative(delivery['html_message'], 'text/html')
+        messages.append(email)
+
+    connection.open()
+    try:
+        sent_count = connection.send_messages(messages) or 0
+    finally:
+        connection.close()
+
+    if sent_count == len(deliveries):
+        return deliveries, []
+    # Backends only report a count, so a short send fails the whole batch for retry
+    return [], [(delivery, 'SMTP backend did not accept message') for delivery in deliveries]
+
+
+def _send_expo_batch(deliveries):
+    """Send push messages to Expo in requests of at most 100 messages."""
+    from notifications.services import PushNotificationService
+
+    service = PushNotificationService()
+    sent, failed = [], []
+    for start in range(0, len(deliveries), service.batch_size):
+        chunk = deliveries[start:start + service.batch_size]
+        messages = [{
+            'to': delivery['recipient'],
+            'title': delivery['subject'] or 'SafeShipper',
+            'body': delivery['message'],
+            'data': delivery.get('data') or {},
+            'priority': 'high',
+            'sound': 'default',
+        } for delivery in chunk]
+
+        response = service._send_to_expo(messages)
+        if not response.get('success'):
+            failed.extend((delivery, response.get('error', 'Batch send failed')) for delivery in chunk)
+            continue
+
+        tickets = response.get('data', [])
+        for index, delivery in enumerate(chunk):
+            ticket = tickets[index] if index < len(tickets) else {}
+            if ticket.get('status') == 'ok':
+                sent.append(delivery)
+            else:
+                failed.append((delivery, ticket.get('message', 'Unknown error')))
+    return sent, failed
+
+
+def _send_fcm_batch(deliveries):
+    """Send FCM pushes, one multicast per distinct title/body/data."""
+    from .sms_service import push_notification_service
+
+    groups = defaultdict(list)
+    for delivery in deliveries:
+        key = (delivery['subject'], delivery['message'], repr(sorted((delivery.get('data') or {}).items())))
+        groups[key].append(delivery)
+
+    sent, failed = [], []
+    for group in groups.values():
+        first = group[0]
+        result = push_notification_service.send_bulk_push_notification(
+            device_tokens=[delivery['recipient'] for delivery in group],
+            title=first['subject'] or 'SafeShipper',
+            body=first['message'],
+            data=first.get('data') or None
+        )
+        per_token = result.get('results') or []
+        for index, delivery in enumerate(group):
+            error = per_token[index].get('error') if index < len(per_token) else None
+            if result.get('status') == 'failed':
+                failed.append((delivery, result.get('error', 'Push failed')))
+            elif error:
+                failed.append((delivery, error))
+            else:
+                sent.append(delivery)
+    return sent, failed
+
+
+def _send_sms_batch(deliveries):
+    """Send SMS sequentially through the shared Twilio client."""
+    from .sms_service import sms_service
+
+    sent, failed = [], []
+    for delivery in deliveries:
+        result = sms_service.send_sms(delivery['recipient'], delivery['message'])
+        if result.get('status') == 'success':
+            sent.append(delivery)
+        else:
+            failed.append((delivery, result.get('error', 'SMS failed')))
+    return sent, failed
+
+
+def _record_queue_outcome(sent, failed):
+    """Bulk update NotificationQueue rows referenced by a batch."""
+    from django.db.models import F
+    from .models import NotificationQueue
+
+    sent_ids = [delivery['queue_id'] for delivery in sent if delivery.get('queue_id')]
+    if sent_ids:
+        NotificationQueue.objects.filter(id__in=sent_ids).update(status='SENT', sent_at=timezone.now())
+
+    errors = defaultdict(list)
+    for delivery, error in failed:
+        if delivery.get('queue_id'):
+            errors[error].append(delivery['queue_id'])
+    for error, queue_ids in errors.items():
+        NotificationQueue.objects.filter(id__in=queue_ids).update(
+            status='FAILED', last_error=error, retry_count=F('retry_count') + 1
+        )
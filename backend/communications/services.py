@@ -11,7 +11,11 @@ from .models import (
     Channel, ChannelMembership, Message, MessageRead, DirectMessage,
     NotificationPreference, NotificationQueue
 )
-from .tasks import send_email, send_sms, send_push_notification, send_bulk_notifications
+from .tasks import send_email, send_sms, send_push_notification
+from .dispatcher import (
+    NotificationDispatcher, EMERGENCY_LANE, is_quiet_hours, lane_for_priority,
+    load_preferences, resolve_recipients
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -427,24 +431,17 @@ class NotificationService:
                 is_active=True
             ).exclude(user=sender).select_related('user')
             
-            # Get notification preferences for each member
+            # Load notification preferences for all unmuted members in one query
             notifications_to_send = []
+            unmuted = [membership for membership in memberships if not membership.is_muted]
+            preferences_by_user = load_preferences(
+                [membership.user_id for membership in unmuted], 'CHANNEL_MESSAGE'
+            )
             
-            for membership in memberships:
+            for membership in unmuted:
                 user = membership.user
                 
-                # Skip if user has muted this channel
-                if membership.is_muted:
-                    continue
-                
-                # Get user's notification preferences
-                preferences = NotificationPreference.objects.filter(
-                    user=user,
-                    notification_type='CHANNEL_MESSAGE',
-                    is_enabled=True
-                )
-                
-                for preference in preferences:
+                for preference in preferences_by_user.get(user.pk, []):
                     # Check if it's within quiet hours
                     if NotificationService._is_quiet_hours(user, preference):
                         continue
@@ -538,26 +535,29 @@ class NotificationService:
                     is_active=True
                 )
             
-            notifications_to_send = []
+            # Emergency notifications override quiet hours and user preferences;
+            # recipients and push devices are resolved in bulk
+            resolved = resolve_recipients(
+                [recipient.pk for recipient in recipients], 'EMERGENCY', is_emergency=True
+            )
             
-            for recipient in recipients:
-                # Emergency notifications override quiet hours and user preferences
-                for delivery_method in ['EMAIL', 'SMS', 'PUSH']:
-                    notification_data = {
-                        'user': recipient,
-                        'notification_type': 'EMERGENCY',
-                        'delivery_method': delivery_method,
-                        'subject': f'EMERGENCY ALERT: {alert_type}',
-                        'message': message,
-                        'recipient_address': NotificationService._get_recipient_address(recipient, delivery_method),
-                        'priority': 1,  # Highest priority
-                        'metadata': {
-                            'alert_type': alert_type,
-                            'severity': severity,
-                            'override_preferences': True
-                        }
+            notifications_to_send = [
+                {
+                    'user': recipient.user,
+                    'notification_type': 'EMERGENCY',
+                    'delivery_method': recipient.delivery_method,
+                    'subject': f'EMERGENCY ALERT: {alert_type}',
+                    'message': message,
+                    'recipient_address': recipient.address,
+                    'priority': 1,  # Highest priority
+                    'metadata': {
+                        'alert_type': alert_type,
+                        'severity': severity,
+                        'override_preferences': True
                     }
-                    notifications_to_send.append(notification_data)
+                }
+                for recipient in resolved
+            ]
             
             if notifications_to_send:
                 NotificationService._queue_notifications(notifications_to_send)
@@ -570,30 +570,32 @@ class NotificationService:
     def _queue_notifications(notifications_data):
         """Queue notifications for delivery."""
         try:
-            notification_objects = []
-            
-            for data in notifications_data:
-                notification = NotificationQueue.objects.create(**data)
-                notification_objects.append(notification)
-            
-            # Trigger async delivery for high-priority notifications
-            high_priority_notifications = [
-                n for n in notification_objects if n.priority <= 3
-            ]
-            
-            if high_priority_notifications:
-                # Send immediately for high priority
-                bulk_data = []
-                for notification in high_priority_notifications:
-                    bulk_data.append({
-                        'type': notification.delivery_method.lower(),
-                        'recipient': notification.recipient_address,
-                        'subject': notification.subject,
-                        'message': notification.message,
-                        'html_message': notification.html_message
-                    })
+            notification_objects = NotificationQueue.objects.bulk_create([
+                NotificationQueue(**data) for data in notifications_data
+            ])
+            
+            # Trigger async delivery for high-priority notifications, grouped
+            # into provider batches on the lane matching their priority
+            dispatchers = {}
+            for notification in notification_objects:
+                if notification.priority > 3:
+                    continue
                 
-                send_bulk_notifications.delay(bulk_data)
+                lane = lane_for_priority(notification.priority)
+                dispatcher = dispatchers.setdefault(lane, NotificationDispatcher(lane=lane))
+                dispatcher.add(
+                    channel=notification.delivery_method,
+                    recipient=notification.recipient_address,
+                    message=notification.message,
+                    subject=notification.subject,
+                    html_message=notification.html_message,
+                    data=notification.metadata,
+                    queue_id=notification.id
+                )
+            
+            # Emergency lane goes first
+            for lane in sorted(dispatchers, key=lambda name: name != EMERGENCY_LANE):
+                dispatchers[lane].dispatch()
             
         except Exception as e:
             logger.error(f"Error queueing notifications: {str(e)}")
@@ -601,28 +603,7 @@ class NotificationService:
     @staticmethod
     def _is_quiet_hours(user, preference):
         """Check if current time is within user's quiet hours."""
-        if not preference.quiet_hours_start or not preference.quiet_hours_end:
-            return False
-        
-        try:
-            from datetime import datetime
-            import pytz
-            
-            user_tz = pytz.timezone(preference.timezone)
-            current_time = datetime.now(user_tz).time()
-            
-            start_time = preference.quiet_hours_start
-            end_time = preference.quiet_hours_end
-            
-            if start_time <= end_time:
-                # Same day quiet hours
-                return start_time <= current_time <= end_time
-            else:
-                # Quiet hours span midnight
-                return current_time >= start_time or current_time <= end_time
-                
-        except Exception:
-            return False
+        return is_quiet_hours(preference.quiet_hours_start, preference.quiet_hours_end, preference.timezone)
 
     @staticmethod
     def _get_recipient_address(user, delivery_method):
@@ -159,61 +159,46 @@ def send_shipment_event_notifications(event_id: str):
 
 
 @shared_task
-def send_bulk_notifications(notification_data: List[Dict[str, Any]]):
+def send_bulk_notifications(notification_data: List[Dict[str, Any]], lane: str = 'standard'):
     """
     Send bulk notifications efficiently.
     Each notification_data item should contain:
     - type: 'email', 'sms', 'push'
     - recipient: email/phone/device_token
     - content: notification content
+
+    Deliveries are grouped by channel and provider and sent as provider-sized
+    batches on the given priority lane ('emergency', 'standard' or 'digest').
     """
-    results = []
-    
-    for notification in notification_data:
-        try:
-            notification_type = notification.get('type')
-            recipient = notification.get('recipient')
-            
-            if notification_type == 'email':
-                result = send_email.delay(
-                    recipient_email=recipient,
-                    subject=notification.get('subject', 'SafeShipper Notification'),
-                    message=notification.get('message', ''),
-                    html_message=notification.get('html_message')
-                )
-            elif notification_type == 'sms':
-                result = send_sms.delay(
-                    phone_number=recipient,
-                    message=notification.get('message', '')
-                )
-            elif notification_type == 'push':
-                result = send_push_notification.delay(
-                    device_token=recipient,
-                    title=notification.get('title', 'SafeShipper'),
-                    body=notification.get('body', ''),
-                    data=notification.get('data')
-                )
-            else:
-                logger.error(f"Unknown notification type: {notification_type}")
-                continue
-                
-            results.append({
-                'type': notification_type,
-                'recipient': recipient,
-                'task_id': result.id,
-                'status': 'queued'
-            })
-            
-        except Exception as exc:
-            logger.error(f"Failed to queue notification: {str(exc)}")
-            results.append({
-                'type': notification.get('type', 'unknown'),
-                'recipient': notification.get('recipient', 'unknown'),
-                'status': 'failed',
-                'error': str(exc)
-            })
-    
-    return results
+    from .dispatcher import NotificationDispatcher
+
+    dispatcher = NotificationDispatcher(lane=lane)
+    queued = dispatcher.add_many(notification_data)
+    if queued < len(notification_data):
+        logger.error(f"Skipped {len(notification_data) - queued} notifications with unknown type or recipient")
+
+    return dispatcher.dispatch()
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def dispatch_notification_batch(self, channel: str, provider: str, deliveries: List[Dict[str, Any]]):
+    """
+    Deliver one provider batch built by NotificationDispatcher.
+    Email batches share one SMTP connection and push batches map to single Expo requests.
+    """
+    from .dispatcher import send_provider_batch
+
+    logger.info(f"Sending {len(deliveries)} {channel} notifications via {provider}")
+    result = send_provider_batch(channel, provider, deliveries)
+
+    if result['status'] == 'failed' and self.request.retries < self.max_retries:
+        # Nothing in the batch went out, so the whole batch is safe to retry
+        logger.info(f"Retrying {provider} batch (attempt {self.request.retries + 1})")
+        raise self.retry(exc=Exception(f"{provider} batch failed"))
+
+    if result['failed_count']:
+        logger.error(f"{result['failed_count']} of {len(deliveries)} {channel} notifications failed via {provider}")
+    return result
 
 
 @shared_task
@@ -245,46 +230,38 @@ def send_emergency_alert(shipment_id: str, alert_type: str, message: str, severi
             is_automated=True
         )
         
-        # Send immediate notifications via all channels
+        # Send immediate notifications via all channels on the emergency lane
+        from .dispatcher import NotificationDispatcher, EMERGENCY_LANE
+
+        dispatcher = NotificationDispatcher(lane=EMERGENCY_LANE)
+        html_message = _render_emergency_email_template(shipment, alert_type, message)
+        push_data = {
+            'shipment_id': str(shipment_id),
+            'alert_type': alert_type,
+            'severity': severity,
+            'event_id': str(event.id)
+        }
         for contact in emergency_contacts:
-            # Send email
             if contact.get('email'):
-                send_email.apply_async(
-                    args=[
-                        contact['email'],
-                        f'EMERGENCY ALERT - {alert_type}',
-                        f'Emergency alert for shipment {shipment.tracking_number}:\n\n{message}',
-                        _render_emergency_email_template(shipment, alert_type, message)
-                    ],
-                    priority=9  # Highest priority
+                dispatcher.add(
+                    'email', contact['email'],
+                    message=f'Emergency alert for shipment {shipment.tracking_number}:\n\n{message}',
+                    subject=f'EMERGENCY ALERT - {alert_type}',
+                    html_message=html_message
                 )
-            
-            # Send SMS
             if contact.get('phone'):
-                send_sms.apply_async(
-                    args=[
-                        contact['phone'],
-                        f'EMERGENCY: {alert_type} - Shipment {shipment.tracking_number}. {message}'
-                    ],
-                    priority=9
+                dispatcher.add(
+                    'sms', contact['phone'],
+                    message=f'EMERGENCY: {alert_type} - Shipment {shipment.tracking_number}. {message}'
                 )
-            
-            # Send push notification
             if contact.get('device_token'):
-                send_push_notification.apply_async(
-                    args=[
-                        contact['device_token'],
-                        f'EMERGENCY: {alert_type}',
-                        message,
-                        {
-                            'shipment_id': str(shipment_id),
-                            'alert_type': alert_type,
-                            'severity': severity,
-                            'event_id': str(event.id)
-                        }
-                    ],
-                    priority=9
+                dispatcher.add(
+                    'push', contact['device_token'],
+                    message=message,
+                    subject=f'EMERGENCY: {alert_type}',
+                    data=push_data
                 )
+        dispatcher.dispatch()
         
         logger.critical(f"Emergency alert sent to {len(emergency_contacts)} contacts for shipment {shipment_id}")
         
@@ -0,0 +1 @@
+# communications/tests/__init__.py
\ No newline at end of file
@@ -0,0 +1,130 @@
+# communications/tests/test_dispatcher.py
+from datetime import datetime, time
+from unittest.mock import patch, MagicMock
+
+import pytz
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from notifications.models import PushNotificationDevice
+from ..models import NotificationPreference, NotificationQueue
+from ..dispatcher import (
+    NotificationDispatcher, EMERGENCY_LANE, DIGEST_LANE, STANDARD_LANE,
+    is_quiet_hours, lane_for_priority, resolve_recipients, send_provider_batch
+)
+
+User = get_user_model()
+
+
+class DispatcherHelperTests(TestCase):
+    """Test lane mapping and quiet hours"""
+
+    def test_lane_for_priority(self):
+        self.assertEqual(lane_for_priority(1), EMERGENCY_LANE)
+        self.assertEqual(lane_for_priority(3), STANDARD_LANE)
+        self.assertEqual(lane_for_priority(8), DIGEST_LANE)
+
+    def test_overnight_quiet_hours(self):
+        night = datetime(2025, 1, 10, 23, 30, tzinfo=pytz.UTC)
+        noon = datetime(2025, 1, 10, 12, 0, tzinfo=pytz.UTC)
+
+        self.assertTrue(is_quiet_hours(time(22, 0), time(7, 0), 'UTC', night))
+        self.assertFalse(is_quiet_hours(time(22, 0), time(7, 0), 'UTC', noon))
+        self.assertFalse(is_quiet_hours(None, time(7, 0), 'UTC', night))
+
+
+class NotificationDispatcherTests(TestCase):
+    """Test bulk resolution and provider batching"""
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(
+                username=f'dispatch{index}@test.com',
+                email=f'dispatch{index}@test.com',
+                password='testpass123',
+                mobile_number='+61400000000'
+            )
+            for index in range(3)
+        ]
+        for index, user in enumerate(self.users):
+            PushNotificationDevice.objects.create(
+                user=user,
+                expo_push_token=f'ExponentPushToken[dispatch-{index}]',
+                device_platform='android',
+                device_identifier=f'dispatch-device-{index}'
+            )
+
+    def test_resolve_recipients_honors_preferences_and_quiet_hours(self):
+        awake, asleep, _ = self.users
+        NotificationPreference.objects.create(
+            user=awake, notification_type='SHIPMENT_UPDATE', delivery_method='PUSH'
+        )
+        NotificationPreference.objects.create(
+            user=asleep, notification_type='SHIPMENT_UPDATE', delivery_method='EMAIL',
+            quiet_hours_start=time(0, 0), quiet_hours_end=time(23, 59)
+        )
+
+        with self.assertNumQueries(3):
+            resolved = resolve_recipients([user.pk for user in self.users], 'SHIPMENT_UPDATE')
+
+        self.assertEqual(
+            [(recipient.user, recipient.delivery_method, recipient.address) for recipient in resolved],
+            [(awake, 'PUSH', 'ExponentPushToken[dispatch-0]')]
+        )
+
+    def test_emergency_bypasses_preferences(self):
+        resolved = resolve_recipients([self.users[0].pk], 'EMERGENCY', is_emergency=True)
+
+        self.assertEqual(
+            sorted(recipient.delivery_method for recipient in resolved), ['EMAIL', 'PUSH', 'SMS']
+        )
+
+    def test_push_is_batched_by_expo_limit(self):
+        dispatcher = NotificationDispatcher()
+        for index in range(250):
+            dispatcher.add('push', f'ExponentPushToken[bulk-{index}]', message='Hello')
+        for index in range(10):
+            dispatcher.add('email', f'bulk{index}@test.com', message='Hello')
+
+        batches = dispatcher.batches()
+        push_sizes = [len(batch['deliveries']) for batch in batches if batch['provider'] == 'expo']
+        email_sizes = [len(batch['deliveries']) for batch in batches if batch['provider'] == 'smtp']
+
+        self.assertEqual(push_sizes, [100, 100, 50])
+        self.assertEqual(email_sizes, [10])
+
+    def test_dispatch_uses_lane_queue(self):
+        dispatcher = NotificationDispatcher(lane=EMERGENCY_LANE)
+        dispatcher.add('email', 'alert@test.com', message='Evacuate', subject='EMERGENCY')
+
+        with patch('communications.tasks.dispatch_notification_batch.apply_async') as apply_async:
+            apply_async.return_value = MagicMock(id='task-1')
+            results = dispatcher.dispatch()
+
+        self.assertEqual(results[0]['task_id'], 'task-1')
+        self.assertEqual(apply_async.call_args.kwargs['queue'], 'notifications_emergency')
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    def test_email_batch_updates_queue_rows(self):
+        rows = NotificationQueue.objects.bulk_create([
+            NotificationQueue(
+                user=user,
+                notification_type='SYSTEM',
+                delivery_method='EMAIL',
+                message='Batch test',
+                recipient_address=user.email
+            )
+            for user in self.users
+        ])
+        deliveries = [
+            {'channel': 'email', 'recipient': row.recipient_address, 'message': row.message,
+             'subject': 'Batch', 'html_message': None, 'data': {}, 'queue_id': str(row.id)}
+            for row in rows
+        ]
+
+        result = send_provider_batch('email', 'smtp', deliveries)
+
+        self.assertEqual(result['sent_count'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(NotificationQueue.objects.filter(status='SENT').count(), 3)
@@ -2,29 +2,26 @@
 # Leverages existing spaCy infrastructure, DG database, and OpenAI integration
 
 import re
+import hashlib
 import logging
 from typing import Dict, List, Optional, Tuple, Any, Set
 from dataclasses import dataclass
 from decimal import Decimal
 import json
 
-import spacy
-from spacy.matcher import Matcher, PhraseMatcher
-from django.core.cache import cache
 from django.db.models import Q
 from django.conf import settings
 
-from .models import DangerousGood, DGProductSynonym, SegregationGroup
-from .services import match_synonym_to_dg, find_dgs_by_text_search
+from .models import DangerousGood, SegregationGroup
+from .services import DGTextCatalog, match_synonym_to_dg, find_dgs_by_text_search
+from shared.single_flight import SingleFlight
+from shared.lazy_init import lazy_service
+from shared.nlp_models import nlp_models
+from shared import nlp_worker
 
 logger = logging.getLogger(__name__)
 
-# Load spaCy model (reuse from SDS service)
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    logger.warning("spaCy English model not found. Install with: python -m spacy download en_core_web_sm")
-    nlp = None
+dg_analysis_flight = SingleFlight('dg_analysis')
 
 @dataclass
 class DGDetectionResult:
@@ -60,12 +57,7 @@ class EnhancedDGDetectionService:
         self.cache_timeout = getattr(settings, 'DG_DETECTION_CACHE_TIMEOUT', 1800)  # 30 minutes
         self.confidence_threshold = 0.6
         
-        # Initialize matchers
-        self.phrase_matcher = None
-        self.pattern_matcher = None
-        
-        if nlp:
-            self._initialize_matchers()
+        # spaCy matchers are built lazily, per process (see dangerous_goods.nlp_matching)
         
         # UN number patterns
         self.un_patterns = [
@@ -92,38 +84,14 @@ class EnhancedDGDetectionService:
             r'\bPG\s*([I]{1,3}|1|2|3)\b'
         ]
 
-    def _initialize_matchers(self):
-        """Initialize spaCy matchers with dangerous goods terms"""
-        if not nlp:
-            return
-            
-        self.phrase_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
-        self.pattern_matcher = Matcher(nlp.vocab)
-        
-        # Load dangerous goods terms from database
-        try:
-            # Get all dangerous goods proper shipping names
-            dg_names = list(DangerousGood.objects.values_list('proper_shipping_name', flat=True))
-            dg_simplified = list(DangerousGood.objects.values_list('simplified_name', flat=True))
-            
-            # Get all synonyms
-            synonyms = list(DGProductSynonym.objects.values_list('synonym', flat=True))
-            
-            # Combine and filter
-            all_terms = list(set([term for term in dg_names + dg_simplified + synonyms if term and len(term) > 3]))
-            
-            # Add to phrase matcher
-            patterns = [nlp(term) for term in all_terms[:1000]]  # Limit for performance
-            self.phrase_matcher.add("DANGEROUS_GOODS", patterns)
-            
-            # Add UN number patterns
-            un_pattern = [{"TEXT": {"REGEX": r"UN"}}, {"TEXT": {"REGEX": r"\d{4}"}}]
-            self.pattern_matcher.add("UN_NUMBER", [un_pattern])
-            
-            logger.info(f"Initialized NLP matchers with {len(patterns)} dangerous goods terms")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize NLP matchers: {e}")
+    def nlp_available(self) -> bool:
+        """Whether NLP matching can run, without loading a model in this process"""
+        if nlp_worker.remote_enabled():
+            try:
+                return nlp_worker.call('dg_nlp_available')
+            except nlp_worker.NLPWorkerError:
+                return False
+        return nlp_models.is_available()
 
     def analyze_document_text(
         self, 
@@ -142,20 +110,95 @@ class EnhancedDGDetectionService:
         Returns:
             DocumentAnalysisResult with detected items and analysis
         """
-        # Generate cache key
-        cache_key = None
-        if use_cache:
-            cache_key = f"dg_analysis:{hash(text)}"
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                logger.info("DG analysis cache hit")
-                return DocumentAnalysisResult(**cached_result)
+        if not use_cache:
+            return self._analyze_batch([text], advanced_features)[0]
+        
+        # Concurrent requests for the same document share one analysis
+        return dg_analysis_flight.get_or_compute(
+            self._cache_key(text, advanced_features),
+            lambda: self._analyze_batch([text], advanced_features)[0],
+            ttl=self.cache_timeout
+        )
+
+    def analyze_documents(
+        self,
+        texts: List[str],
+        use_cache: bool = True,
+        advanced_features: bool = True,
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None
+    ) -> List[DocumentAnalysisResult]:
+        """
+        Analyze many documents at once; results are in the order of texts
         
+        Gives the same results as analyze_document_text per text, but spaCy
+        processes all texts as one stream (nlp.pipe) and candidate dangerous
+        goods for every document are resolved against a single catalog load
+        instead of per-term queries. Cached documents are fetched in one round
+        trip and identical texts are analyzed once.
+        
+        Args:
+            texts: Document texts to analyze
+            use_cache: Whether to use Redis caching
+            advanced_features: Enable advanced NLP features
+            batch_size: Documents per nlp.pipe batch (default NLP_PIPE_BATCH_SIZE)
+            n_process: Processes for nlp.pipe (default NLP_PIPE_PROCESSES)
+        """
+        keys = [self._cache_key(text, advanced_features) for text in texts]
+        results = dg_analysis_flight.get_many(set(keys)) if use_cache else {}
+        
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in results:
+                pending.setdefault(key, text)
+        
+        if pending:
+            analyzed = self._analyze_batch(list(pending.values()), advanced_features, batch_size, n_process)
+            for key, result in zip(pending, analyzed):
+                results[key] = result
+                if use_cache:
+                    dg_analysis_flight.put(key, result, ttl=self.cache_timeout)
+        
+        logger.info(f"Analyzed {len(texts)} documents ({len(pending)} computed, {len(texts) - len(pending)} cached or repeated)")
+        return [results[key] for key in keys]
+
+    @staticmethod
+    def _cache_key(text: str, advanced_features: bool) -> str:
+        # Content hash is stable across processes, unlike hash(text)
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{digest}:{'advanced' if advanced_features else 'basic'}"
+
+    def _analyze_batch(
+        self,
+        texts: List[str],
+        advanced_features: bool,
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None
+    ) -> List[DocumentAnalysisResult]:
+        """Run the detection pipeline for texts without caching"""
+        catalog = DGTextCatalog.load()
+        if advanced_features:
+            nlp_matches = self._nlp_matches(texts, batch_size, n_process)
+        else:
+            nlp_matches = [[] for _ in texts]
+        return [
+            self._analyze_document_text(text, catalog, matches, advanced_features)
+            for text, matches in zip(texts, nlp_matches)
+        ]
+
+    def _analyze_document_text(
+        self,
+        text: str,
+        catalog: DGTextCatalog,
+        nlp_matches: List[Dict],
+        advanced_features: bool
+    ) -> DocumentAnalysisResult:
+        """Detection pipeline for one text, given its NLP matches"""
         detected_items = []
         processing_methods = []
         
         # Method 1: Existing text search (baseline)
-        legacy_matches = find_dgs_by_text_search(text)
+        legacy_matches = find_dgs_by_text_search(text, catalog=catalog)
         for match in legacy_matches:
             detected_items.append(DGDetectionResult(
                 dangerous_good=match['dangerous_good'],
@@ -169,20 +212,20 @@ class EnhancedDGDetectionService:
         processing_methods.append("legacy_search")
         
         # Method 2: UN number pattern matching
-        un_matches = self._detect_un_numbers(text)
+        un_matches = self._detect_un_numbers(text, catalog)
         detected_items.extend(un_matches)
         if un_matches:
             processing_methods.append("un_pattern")
         
         # Method 3: Advanced NLP analysis (if spaCy available)
-        if nlp and advanced_features:
-            nlp_matches = self._analyze_with_nlp(text)
-            detected_items.extend(nlp_matches)
-            if nlp_matches:
+        if advanced_features:
+            nlp_results = self._resolve_nlp_matches(nlp_matches, catalog)
+            detected_items.extend(nlp_results)
+            if nlp_results:
                 processing_methods.append("nlp_analysis")
         
         # Method 4: Context-aware detection
-        context_matches = self._detect_with_context(text)
+        context_matches = self._detect_with_context(text, catalog)
         detected_items.extend(context_matches)
         if context_matches:
             processing_methods.append("context_analysis")
@@ -222,39 +265,9 @@ class EnhancedDGDetectionService:
             quality_metrics=quality_metrics
         )
         
-        # Cache result
-        if use_cache and cache_key:
-            cache.set(cache_key, {
-                'detected_items': [
-                    {
-                        'dangerous_good': {
-                            'id': str(item.dangerous_good.id),
-                            'un_number': item.dangerous_good.un_number,
-                            'proper_shipping_name': item.dangerous_good.proper_shipping_name,
-                            'hazard_class': item.dangerous_good.hazard_class,
-                            'packing_group': item.dangerous_good.packing_group
-                        },
-                        'matched_term': item.matched_term,
-                        'confidence': item.confidence,
-                        'match_type': item.match_type,
-                        'context': item.context,
-                        'position': item.position,
-                        'extracted_quantity': item.extracted_quantity,
-                        'extracted_weight': item.extracted_weight,
-                        'extracted_packaging': item.extracted_packaging,
-                        'nlp_entities': item.nlp_entities or []
-                    } for item in result.detected_items
-                ],
-                'confidence_score': result.confidence_score,
-                'processing_method': result.processing_method,
-                'extracted_quantities': result.extracted_quantities,
-                'regulatory_flags': result.regulatory_flags,
-                'quality_metrics': result.quality_metrics
-            }, self.cache_timeout)
-        
         return result
 
-    def _detect_un_numbers(self, text: str) -> List[DGDetectionResult]:
+    def _detect_un_numbers(self, text: str, catalog: DGTextCatalog) -> List[DGDetectionResult]:
         """Detect UN numbers using pattern matching"""
         results = []
         
@@ -264,8 +277,8 @@ class EnhancedDGDetectionService:
                 un_number = match.group(1) if len(match.groups()) > 0 else match.group(0).replace('UN', '').strip()
                 
                 # Look up dangerous good by UN number
-                try:
-                    dg = DangerousGood.objects.get(un_number=un_number)
+                dg = catalog.get_by_un_number(un_number)
+                if dg:
                     results.append(DGDetectionResult(
                         dangerous_good=dg,
                         matched_term=match.group(0),
@@ -274,66 +287,51 @@ class EnhancedDGDetectionService:
                         context=self._extract_context(text, match.group(0), match.start()),
                         position=(match.start(), match.end())
                     ))
-                except DangerousGood.DoesNotExist:
-                    continue
                     
         return results
 
-    def _analyze_with_nlp(self, text: str) -> List[DGDetectionResult]:
-        """Analyze text using spaCy NLP"""
-        if not nlp or not self.phrase_matcher:
-            return []
-            
+    def _nlp_matches(self, texts: List[str], batch_size: Optional[int], n_process: Optional[int]) -> List[List[Dict]]:
+        """spaCy matches for each text (in-process or on the NLP worker)"""
+        try:
+            return nlp_worker.run('dg_nlp_matches_batch', texts, batch_size=batch_size, n_process=n_process)
+        except nlp_worker.NLPWorkerError as e:
+            logger.warning(f"NLP analysis skipped: {e}")
+            return [[] for _ in texts]
+
+    def _resolve_nlp_matches(self, matches: List[Dict], catalog: DGTextCatalog) -> List[DGDetectionResult]:
+        """Dangerous goods for NLP phrase and UN-pattern matches"""
         results = []
-        doc = nlp(text)
-        
-        # Use phrase matcher
-        matches = self.phrase_matcher(doc)
-        for match_id, start, end in matches:
-            matched_span = doc[start:end]
-            matched_text = matched_span.text
-            
-            # Look up the dangerous good
-            dg = match_synonym_to_dg(matched_text)
-            if dg:
-                # Extract named entities around the match
-                entities = self._extract_nearby_entities(doc, start, end)
-                
-                results.append(DGDetectionResult(
-                    dangerous_good=dg,
-                    matched_term=matched_text,
-                    confidence=0.85,
-                    match_type='nlp_phrase',
-                    context=str(doc[max(0, start-10):min(len(doc), end+10)]),
-                    position=(matched_span.start_char, matched_span.end_char),
-                    nlp_entities=entities
-                ))
-        
-        # Use pattern matcher for UN numbers
-        pattern_matches = self.pattern_matcher(doc)
-        for match_id, start, end in pattern_matches:
-            if nlp.vocab.strings[match_id] == "UN_NUMBER":
-                matched_span = doc[start:end]
+        for match in matches:
+            if match['kind'] == 'phrase':
+                # Look up the dangerous good
+                dg = catalog.match_term(match['text'])
+                if dg:
+                    results.append(DGDetectionResult(
+                        dangerous_good=dg,
+                        matched_term=match['text'],
+                        confidence=0.85,
+                        match_type='nlp_phrase',
+                        context=match['context'],
+                        position=(match['start_char'], match['end_char']),
+                        nlp_entities=match['entities']
+                    ))
+            elif match['kind'] == 'un_number':
                 # Extract UN number and look up
-                un_text = matched_span.text
-                un_match = re.search(r'\d{4}', un_text)
-                if un_match:
-                    try:
-                        dg = DangerousGood.objects.get(un_number=un_match.group(0))
-                        results.append(DGDetectionResult(
-                            dangerous_good=dg,
-                            matched_term=matched_span.text,
-                            confidence=0.9,
-                            match_type='nlp_pattern',
-                            context=str(doc[max(0, start-5):min(len(doc), end+5)]),
-                            position=(matched_span.start_char, matched_span.end_char)
-                        ))
-                    except DangerousGood.DoesNotExist:
-                        continue
+                un_match = re.search(r'\d{4}', match['text'])
+                dg = catalog.get_by_un_number(un_match.group(0)) if un_match else None
+                if dg:
+                    results.append(DGDetectionResult(
+                        dangerous_good=dg,
+                        matched_term=match['text'],
+                        confidence=0.9,
+                        match_type='nlp_pattern',
+                        context=match['context'],
+                        position=(match['start_char'], match['end_char'])
+                    ))
         
         return results
 
-    def _detect_with_context(self, text: str) -> List[DGDetectionResult]:
+    def _detect_with_context(self, text: str, catalog: DGTextCatalog) -> List[DGDetectionResult]:
         """Detect dangerous goods using contextual analysis"""
         results = []
         
@@ -351,8 +349,8 @@ class EnhancedDGDetectionService:
                 # Extract the substance name
                 substance_text = match.group(-1).strip()  # Last group
                 
-                # Try to match against database
-                dg = match_synonym_to_dg(substance_text)
+                # Try to match against the catalog
+                dg = catalog.match_term(substance_text)
                 if dg:
                     results.append(DGDetectionResult(
                         dangerous_good=dg,
@@ -457,24 +455,6 @@ class EnhancedDGDetectionService:
                 return text[start:end].strip()
             return matched_term
 
-    def _extract_nearby_entities(self, doc, start: int, end: int) -> List[Dict]:
-        """Extract named entities near a match"""
-        entities = []
-        
-        # Look for entities within 10 tokens
-        search_start = max(0, start - 10)
-        search_end = min(len(doc), end + 10)
-        
-        for ent in doc.ents:
-            if search_start <= ent.start < search_end:
-                entities.append({
-                    'text': ent.text,
-                    'label': ent.label_,
-                    'confidence': 0.8  # spaCy doesn't provide confidence for NER
-                })
-        
-        return entities
-
     def _extract_quantities_and_packaging(self, item: DGDetectionResult, text: str):
         """Extract quantities and packaging information for a detected item"""
         context_window = item.context if item.context else text
@@ -582,5 +562,5 @@ class EnhancedDGDetectionService:
             'quantity_extraction_rate': with_quantities / total_items if total_items else 0.0
         }
 
-# Service instance
-enhanced_dg_detection = EnhancedDGDetectionService()
\ No newline at end of file
+# Service instance, built on first use
+enhanced_dg_detection = lazy_service('dangerous_goods.ai_detection', EnhancedDGDetectionService)
\ No newline at end of file
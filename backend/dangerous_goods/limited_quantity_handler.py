@@ -94,12 +94,14 @@ class LimitedQuantityHandler:
     DEFAULT_MAX_GROSS_MASS_PER_PACKAGE = Decimal('30.0')  # 30kg per package
     DEFAULT_MAX_VOLUME_AEROSOLS = Decimal('1.0')  # 1L for aerosols
     
-    def validate_lq_consignment_item(self, item: 'ConsignmentItem') -> Dict:
+    def validate_lq_consignment_item(self, item: 'ConsignmentItem', lq_limits: Optional[Dict] = None) -> Dict:
         """
         Validate if a consignment item qualifies for Limited Quantity transport.
         
         Args:
             item: ConsignmentItem to validate
+            lq_limits: Optional preloaded LQ limits keyed by dangerous good id;
+                a missing key is treated as no specific limit
             
         Returns:
             Dict with validation results
@@ -126,15 +128,17 @@ class LimitedQuantityHandler:
         dg = item.dangerous_good_entry
         
         # Check if this DG can be transported as LQ
-        try:
-            lq_limit = LimitedQuantityLimit.objects.get(dangerous_good=dg)
-            if not lq_limit.is_lq_permitted:
-                result['reasons'].append(f"{dg.un_number} cannot be transported as Limited Quantity")
-                return result
-        except LimitedQuantityLimit.DoesNotExist:
+        if lq_limits is not None:
+            lq_limit = lq_limits.get(dg.id)
+        else:
+            lq_limit = LimitedQuantityLimit.objects.filter(dangerous_good=dg).first()
+        
+        if lq_limit is None:
             # Use default rules if no specific limit exists
-            lq_limit = None
             result['warnings'].append("No specific LQ limits found, using defaults")
+        elif not lq_limit.is_lq_permitted:
+            result['reasons'].append(f"{dg.un_number} cannot be transported as Limited Quantity")
+            return result
         
         # Calculate actual quantities
         if dg.physical_form == 'LIQUID':
@@ -193,7 +197,7 @@ class LimitedQuantityHandler:
         result['can_be_lq'] = True
         
         # Check if it's actually marked as LQ
-        if item.dg_quantity_type == ConsignmentItem.DGQuantityType.LIMITED_QUANTITY:
+        if item.dg_quantity_type == 'LIMITED_QUANTITY':
             result['is_valid_lq'] = True
         else:
             result['warnings'].append("Item qualifies for LQ but is not marked as Limited Quantity")
@@ -207,23 +211,29 @@ class LimitedQuantityHandler:
         
         return result
     
-    def calculate_lq_placard_requirements(self, shipment: 'Shipment') -> Dict:
+    def calculate_lq_placard_requirements(self, shipment: 'Shipment', dangerous_items: Optional[List] = None) -> Dict:
         """
         Calculate Limited Quantity specific placard requirements.
         
         Args:
             shipment: Shipment to analyze
+            dangerous_items: Optional preloaded dangerous goods items of the
+                shipment (e.g. from its hazard profile) to avoid re-querying
             
         Returns:
             Dict with LQ placard requirements
         """
-        lq_items = shipment.items.filter(
-            is_dangerous_good=True,
-            dg_quantity_type='LIMITED_QUANTITY'
-        )
+        if dangerous_items is None:
+            dangerous_items = list(
+                shipment.items.filter(is_dangerous_good=True).select_related('dangerous_good_entry')
+            )
+        lq_items = [
+            item for item in dangerous_items
+            if item.dg_quantity_type == 'LIMITED_QUANTITY'
+        ]
         
         result = {
-            'has_lq': lq_items.exists(),
+            'has_lq': bool(lq_items),
             'total_lq_weight_kg': 0,
             'total_lq_packages': 0,
             'lq_placard_required': False,
@@ -232,7 +242,7 @@ class LimitedQuantityHandler:
             'lq_items': []
         }
         
-        if not lq_items.exists():
+        if not lq_items:
             return result
         
         # Calculate totals
@@ -249,13 +259,7 @@ class LimitedQuantityHandler:
             })
         
         # Check if there are also non-LQ dangerous goods
-        non_lq_dg = shipment.items.filter(
-            is_dangerous_good=True
-        ).exclude(
-            dg_quantity_type=ConsignmentItem.DGQuantityType.LIMITED_QUANTITY
-        )
-        
-        if non_lq_dg.exists():
+        if len(lq_items) < len(dangerous_items):
             result['mixed_load'] = True
             result['combined_calculation_required'] = True
         
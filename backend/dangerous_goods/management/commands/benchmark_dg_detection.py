@@ -0,0 +1,86 @@
+# dangerous_goods/management/commands/benchmark_dg_detection.py
+"""
+Benchmark dangerous goods detection throughput.
+
+Builds synthetic manifests from dangerous goods in the database and reports
+documents/sec for analyzing them one at a time with analyze_document_text
+versus together with analyze_documents, for batches of 1, 10 and 100
+manifests. Caching is disabled so every run does the full analysis.
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dangerous_goods.ai_detection_service import enhanced_dg_detection
+from dangerous_goods.models import DangerousGood
+
+
+class Command(BaseCommand):
+    help = 'Benchmark documents/sec of per-document versus batched dangerous goods detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1, 10, 100], help='Batch sizes (number of manifests)'
+        )
+        parser.add_argument('--items', type=int, default=8, help='Dangerous goods lines per synthetic manifest')
+        parser.add_argument('--basic', action='store_true', help='Disable NLP and OpenAI features')
+        parser.add_argument('--batch-size', type=int, help='nlp.pipe batch size')
+        parser.add_argument('--n-process', type=int, help='nlp.pipe processes')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        dangerous_goods = list(
+            DangerousGood.objects.values_list('un_number', 'proper_shipping_name', 'hazard_class')[:2000]
+        )
+        if not dangerous_goods:
+            raise CommandError('No dangerous goods in the database to build manifests from')
+
+        advanced = not options['basic']
+        self.stdout.write(
+            f"{len(dangerous_goods)} dangerous goods, {options['items']} items per manifest, "
+            f"advanced features {'on' if advanced else 'off'}, "
+            f"NLP {'available' if enhanced_dg_detection.nlp_available() else 'unavailable'}"
+        )
+        self.stdout.write(f"{'manifests':>10} {'sequential':>14} {'batched':>14} {'speedup':>9}")
+
+        for size in options['sizes']:
+            texts = [self._manifest_text(rng, dangerous_goods, options['items'], n) for n in range(size)]
+
+            started = time.perf_counter()
+            for text in texts:
+                enhanced_dg_detection.analyze_document_text(text, use_cache=False, advanced_features=advanced)
+            sequential = time.perf_counter() - started
+
+            started = time.perf_counter()
+            enhanced_dg_detection.analyze_documents(
+                texts,
+                use_cache=False,
+                advanced_features=advanced,
+                batch_size=options['batch_size'],
+                n_process=options['n_process']
+            )
+            batched = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{size:>10} {size / sequential:>10.1f} d/s {size / batched:>10.1f} d/s "
+                f"{sequential / batched:>8.2f}x"
+            )
+
+    @staticmethod
+    def _manifest_text(rng, dangerous_goods, items, number):
+        lines = [
+            f"DANGEROUS GOODS MANIFEST BM-{number:05d}",
+            "Consignor: Example Chemicals Pty Ltd, 12 Industrial Rd, Perth WA",
+            "Consignee: Northern Mining Supplies, Port Hedland WA",
+            "",
+        ]
+        for un_number, name, hazard_class in rng.sample(dangerous_goods, min(items, len(dangerous_goods))):
+            quantity = rng.choice(['20 L', '200 kg', '4 x 5 L', '1000 L', '25 kg'])
+            packaging = rng.choice(['drums', 'IBC', 'boxes', 'bags'])
+            un_number = un_number.upper().replace('UN', '').strip()
+            lines.append(f"UN{un_number} {name}, Class {hazard_class}, {quantity} in {packaging}")
+        lines.append("Emergency contact: 1800 000 000")
+        return "\n".join(lines)
@@ -2,7 +2,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
-from simple_history.models import HistoricalRecords
+from shared.history import DeferredHistoricalRecords
 from users.models import User
 
 class PackingGroup(models.TextChoices):
@@ -99,7 +99,7 @@ class DangerousGood(models.Model):
     # last_checked_at = models.DateTimeField(_("Last Regulatory Check"), null=True, blank=True) # For tracking when data was last verified against regs
 
     # Add history tracking
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
 
     class Meta:
         verbose_name = _("Dangerous Good")
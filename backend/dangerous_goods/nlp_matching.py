@@ -0,0 +1,158 @@
+# dangerous_goods/nlp_matching.py
+"""
+spaCy phrase/pattern matching of dangerous goods terms.
+
+One DGTermMatcher is built per process on first use from the shared spaCy
+pipeline (shared.nlp_models). Matching returns plain dictionaries so it can
+run in-process or in the NLP worker (shared.nlp_worker) interchangeably;
+database lookups of the matched goods stay with the caller.
+"""
+
+import logging
+import multiprocessing
+import threading
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from shared.nlp_models import default_model_name, nlp_models
+from shared.nlp_worker import nlp_operation
+
+logger = logging.getLogger(__name__)
+
+# Limit for performance; terms beyond this are covered by the text search
+MAX_PHRASE_TERMS = 1000
+
+DEFAULT_PIPE_BATCH_SIZE = 32
+
+
+class DGTermMatcher:
+    """PhraseMatcher over DG names/synonyms plus a UN number token pattern"""
+
+    def __init__(self, model_name: str):
+        from spacy.matcher import Matcher, PhraseMatcher
+        from .models import DangerousGood, DGProductSynonym
+
+        self.nlp = nlp = nlp_models.get(model_name)
+        self.phrase_matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        self.pattern_matcher = Matcher(nlp.vocab)
+
+        # Dangerous goods proper shipping names, simplified names and synonyms
+        dg_names = DangerousGood.objects.values_list('proper_shipping_name', 'simplified_name')
+        synonyms = DGProductSynonym.objects.values_list('synonym', flat=True)
+        terms = {term for pair in dg_names for term in pair if term and len(term) > 3}
+        terms.update(term for term in synonyms if term and len(term) > 3)
+
+        patterns = nlp_models.phrase_patterns(sorted(terms)[:MAX_PHRASE_TERMS], model_name)
+        self.phrase_matcher.add("DANGEROUS_GOODS", patterns)
+
+        un_pattern = [{"TEXT": {"REGEX": r"UN"}}, {"TEXT": {"REGEX": r"\d{4}"}}]
+        self.pattern_matcher.add("UN_NUMBER", [un_pattern])
+
+        self.term_count = len(patterns)
+        logger.info(f"Initialized NLP matchers with {self.term_count} dangerous goods terms")
+
+    @staticmethod
+    def _nearby_entities(doc, start: int, end: int) -> List[Dict]:
+        """Named entities within 10 tokens of a match"""
+        search_start = max(0, start - 10)
+        search_end = min(len(doc), end + 10)
+        return [
+            {
+                'text': ent.text,
+                'label': ent.label_,
+                'confidence': 0.8  # spaCy doesn't provide confidence for NER
+            }
+            for ent in doc.ents
+            if search_start <= ent.start < search_end
+        ]
+
+    def match_doc(self, doc) -> List[Dict]:
+        matches = []
+        for match_id, start, end in self.phrase_matcher(doc):
+            span = doc[start:end]
+            matches.append({
+                'kind': 'phrase',
+                'text': span.text,
+                'start_char': span.start_char,
+                'end_char': span.end_char,
+                'context': str(doc[max(0, start - 10):min(len(doc), end + 10)]),
+                'entities': self._nearby_entities(doc, start, end),
+            })
+        for match_id, start, end in self.pattern_matcher(doc):
+            if self.nlp.vocab.strings[match_id] == "UN_NUMBER":
+                span = doc[start:end]
+                matches.append({
+                    'kind': 'un_number',
+                    'text': span.text,
+                    'start_char': span.start_char,
+                    'end_char': span.end_char,
+                    'context': str(doc[max(0, start - 5):min(len(doc), end + 5)]),
+                    'entities': [],
+                })
+        return matches
+
+
+_matcher: Optional[DGTermMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_dg_matcher() -> Optional[DGTermMatcher]:
+    """Process-wide matcher, built on first use; None if no spaCy model is available"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                model_name = default_model_name()
+                if nlp_models.get(model_name) is None:
+                    return None
+                try:
+                    _matcher = DGTermMatcher(model_name)
+                except Exception as e:
+                    logger.error(f"Failed to initialize NLP matchers: {e}")
+                    return None
+    return _matcher
+
+
+def reset_dg_matcher():
+    """Rebuild the matcher on next use (e.g. after DG terms changed)"""
+    global _matcher
+    with _matcher_lock:
+        _matcher = None
+
+
+@nlp_operation('dg_nlp_available', warm=True)
+def dg_nlp_available() -> bool:
+    return get_dg_matcher() is not None
+
+
+def _pipe_processes(n_process: Optional[int], text_count: int, batch_size: int) -> int:
+    n_process = n_process or getattr(settings, 'NLP_PIPE_PROCESSES', 1)
+    # A single batch cannot be split, and daemonic processes (Celery prefork
+    # children) are not allowed to start the worker processes nlp.pipe needs
+    if text_count <= batch_size or multiprocessing.current_process().daemon:
+        return 1
+    return n_process
+
+
+@nlp_operation('dg_nlp_matches_batch')
+def dg_nlp_matches_batch(texts: List[str], batch_size: Optional[int] = None,
+                         n_process: Optional[int] = None) -> List[List[Dict]]:
+    """
+    Matches for each text, in order. Texts are streamed through nlp.pipe so
+    tokenization and the pipeline run in batches rather than per document.
+    """
+    matcher = get_dg_matcher()
+    if matcher is None:
+        return [[] for _ in texts]
+    batch_size = batch_size or getattr(settings, 'NLP_PIPE_BATCH_SIZE', DEFAULT_PIPE_BATCH_SIZE)
+    docs = matcher.nlp.pipe(
+        texts, batch_size=batch_size, n_process=_pipe_processes(n_process, len(texts), batch_size)
+    )
+    return [matcher.match_doc(doc) for doc in docs]
+
+
+@nlp_operation('dg_nlp_matches')
+def dg_nlp_matches(text: str) -> List[Dict]:
+    """Phrase and UN-pattern matches in text, as plain dictionaries"""
+    return dg_nlp_matches_batch([text])[0]
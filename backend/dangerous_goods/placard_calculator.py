@@ -99,7 +99,10 @@ class ADGPlacardCalculator:
         Analyze shipment contents and calculate relevant quantities.
         Enhanced with proper Limited Quantity handling.
         """
-        dg_items = shipment.items.filter(is_dangerous_good=True)
+        from shipments.hazard_profile import ShipmentHazardProfile
+        
+        profile = ShipmentHazardProfile.for_shipment(shipment)
+        dg_items = profile.dangerous_items
         
         # Initialize totals
         total_dg_weight_kg = 0
@@ -111,7 +114,7 @@ class ADGPlacardCalculator:
         
         # LQ analysis using enhanced handler
         lq_handler = LimitedQuantityHandler()
-        lq_analysis = lq_handler.calculate_lq_placard_requirements(shipment)
+        lq_analysis = lq_handler.calculate_lq_placard_requirements(shipment, dg_items)
         
         # Item-by-item analysis
         item_details = []
@@ -122,7 +125,7 @@ class ADGPlacardCalculator:
             
             # Validate LQ status if item claims to be LQ
             if item_data['is_limited_quantity']:
-                lq_validation = lq_handler.validate_lq_consignment_item(item)
+                lq_validation = lq_handler.validate_lq_consignment_item(item, profile.lq_limits)
                 lq_validation_results.append({
                     'item_id': item.id,
                     'validation': lq_validation
@@ -182,7 +185,7 @@ class ADGPlacardCalculator:
             'combined_quantity_kg': combined_quantity_kg,
             'class_2_1_quantity_kg': class_2_1_quantity_kg,
             'has_large_receptacles': has_large_receptacles,
-            'item_count': dg_items.count(),
+            'item_count': len(dg_items),
             'item_details': item_details,
             'lq_analysis': lq_analysis,
             'lq_validation_results': lq_validation_results,
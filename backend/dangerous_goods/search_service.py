@@ -16,6 +16,7 @@ from elasticsearch import Elasticsearch
 
 from .models import DangerousGood, DGProductSynonym
 from .ai_detection_service import DGDetectionResult
+from shared.lazy_init import lazy_service
 
 logger = logging.getLogger(__name__)
 
@@ -518,5 +519,5 @@ class EnhancedDGSearchService:
             'elasticsearch_available': self.es_client is not None
         }
 
-# Service instance
-enhanced_search_service = EnhancedDGSearchService()
\ No newline at end of file
+# Service instance, built on first use (creates the Elasticsearch client)
+enhanced_search_service = lazy_service('dangerous_goods.search_service', EnhancedDGSearchService)
\ No newline at end of file
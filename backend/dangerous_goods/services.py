@@ -35,12 +35,55 @@ def match_synonym_to_dg(text: str) -> Optional[DangerousGood]:
         return dg_match
     return None
 
-def find_dgs_by_text_search(text_content: str) -> List[Dict[str, Union[DangerousGood, str, float]]]:
+class DGTextCatalog:
+    """
+    Dangerous goods names, synonyms and UN numbers loaded in two queries, so
+    many texts (or many terms within one text) can be matched without a
+    database lookup per term.
+    """
+
+    def __init__(self, dangerous_goods, synonyms):
+        self.dangerous_goods = list(dangerous_goods)
+        self.synonyms = {}
+        for synonym_obj in synonyms:
+            self.synonyms[synonym_obj.synonym.lower()] = {
+                'dangerous_good': synonym_obj.dangerous_good,
+                'original_synonym': synonym_obj.synonym
+            }
+        self.by_un_number = {}
+        self.by_name = {}
+        for dg in self.dangerous_goods:
+            if dg.un_number:
+                self.by_un_number.setdefault(dg.un_number.upper(), dg)
+            for name in (dg.proper_shipping_name, dg.simplified_name):
+                if name:
+                    self.by_name.setdefault(name.lower(), dg)
+
+    @classmethod
+    def load(cls) -> 'DGTextCatalog':
+        return cls(
+            DangerousGood.objects.all(),
+            DGProductSynonym.objects.select_related('dangerous_good').all()
+        )
+
+    def get_by_un_number(self, un_number: str) -> Optional[DangerousGood]:
+        return self.by_un_number.get(un_number.upper())
+
+    def match_term(self, text: str) -> Optional[DangerousGood]:
+        """In-memory equivalent of match_synonym_to_dg"""
+        text_lower = text.lower()
+        synonym_data = self.synonyms.get(text_lower)
+        if synonym_data:
+            return synonym_data['dangerous_good']
+        return self.by_name.get(text_lower)
+
+def find_dgs_by_text_search(text_content: str, catalog: Optional[DGTextCatalog] = None) -> List[Dict[str, Union[DangerousGood, str, float]]]:
     """
     Efficiently search for dangerous goods by analyzing text content using multi-pass scanning.
     
     Args:
         text_content: The text content to analyze for dangerous goods
+        catalog: Preloaded DGTextCatalog, to share one load across many texts
         
     Returns:
         List of dictionaries containing:
@@ -55,17 +98,10 @@ def find_dgs_by_text_search(text_content: str) -> List[Dict[str, Union[Dangerous
     results = []
     text_lower = text_content.lower()
     
-    # Pre-load all synonyms with their dangerous goods in a single query
-    synonyms_query = DGProductSynonym.objects.select_related('dangerous_good').all()
-    synonym_mapping = {}
-    for synonym_obj in synonyms_query:
-        synonym_mapping[synonym_obj.synonym.lower()] = {
-            'dangerous_good': synonym_obj.dangerous_good,
-            'original_synonym': synonym_obj.synonym
-        }
-    
-    # Pre-load all dangerous goods for direct name matching
-    dangerous_goods = DangerousGood.objects.all()
+    # Pre-load all synonyms and dangerous goods (one query each) unless the caller shares a catalog
+    catalog = catalog or DGTextCatalog.load()
+    synonym_mapping = catalog.synonyms
+    dangerous_goods = catalog.dangerous_goods
     
     # Pass 1: Exact UN number matching (highest confidence)
     un_pattern = r'\bUN\s*(\d{4})\b'
@@ -78,7 +114,7 @@ def find_dgs_by_text_search(text_content: str) -> List[Dict[str, Union[Dangerous
             continue
         found_un_numbers.add(un_number)
         
-        dg = get_dangerous_good_by_un_number(un_number)
+        dg = catalog.get_by_un_number(un_number)
         if dg:
             results.append({
                 'dangerous_good': dg,
@@ -0,0 +1,73 @@
+# dangerous_goods/tests/test_batch_detection.py
+from django.test import TestCase
+
+from ..ai_detection_service import EnhancedDGDetectionService
+from ..models import DangerousGood, DGProductSynonym, PackingGroup
+from ..services import DGTextCatalog, find_dgs_by_text_search
+
+
+class BatchDetectionTests(TestCase):
+    """Test analyze_documents against per-document analysis"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dg_acetone = DangerousGood.objects.create(
+            un_number='1090',
+            proper_shipping_name='ACETONE',
+            hazard_class='3',
+            packing_group=PackingGroup.II,
+            simplified_name='Acetone'
+        )
+        cls.dg_acid = DangerousGood.objects.create(
+            un_number='1779',
+            proper_shipping_name='FORMIC ACID',
+            hazard_class='8',
+            packing_group=PackingGroup.II,
+            simplified_name='Formic Acid'
+        )
+        DGProductSynonym.objects.create(
+            dangerous_good=cls.dg_acetone,
+            synonym='Dimethyl ketone',
+            source=DGProductSynonym.Source.MANUAL
+        )
+
+    def setUp(self):
+        self.service = EnhancedDGDetectionService()
+        self.texts = [
+            "UN1090 Acetone, 200 L in drums",
+            "Substance: Dimethyl ketone\nClass 8 formic acid 25 kg bags",
+            "General cargo, no dangerous goods",
+            "UN1090 Acetone, 200 L in drums",
+        ]
+
+    def _summary(self, result):
+        return sorted(
+            (item.dangerous_good.id, item.match_type, item.confidence) for item in result.detected_items
+        )
+
+    def test_matches_per_document_results(self):
+        batched = self.service.analyze_documents(self.texts, use_cache=False, advanced_features=False)
+        single = [
+            self.service.analyze_document_text(text, use_cache=False, advanced_features=False)
+            for text in self.texts
+        ]
+
+        self.assertEqual(len(batched), len(self.texts))
+        for batch_result, single_result in zip(batched, single):
+            self.assertEqual(self._summary(batch_result), self._summary(single_result))
+        self.assertEqual(self._summary(batched[2]), [])
+
+    def test_catalog_loaded_once_per_batch(self):
+        # One query for dangerous goods and one for synonyms, however many documents
+        with self.assertNumQueries(2):
+            self.service.analyze_documents(self.texts * 5, use_cache=False, advanced_features=False)
+
+    def test_catalog_matches_database_lookup(self):
+        catalog = DGTextCatalog.load()
+        self.assertEqual(catalog.match_term('dimethyl KETONE'), self.dg_acetone)
+        self.assertEqual(catalog.match_term('Formic Acid'), self.dg_acid)
+        self.assertIsNone(catalog.match_term('water'))
+        self.assertEqual(
+            find_dgs_by_text_search(self.texts[0], catalog=catalog),
+            find_dgs_by_text_search(self.texts[0])
+        )
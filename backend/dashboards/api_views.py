@@ -7,7 +7,8 @@ from .services import (
     get_capacity_optimization_dashboard,
     get_marketplace_analytics,
     get_route_optimization_analytics,
-    get_comprehensive_dashboard_data
+    get_comprehensive_dashboard_data,
+    get_cached_dashboard
 )
 
 class ComplianceDashboardView(APIView):
@@ -36,7 +37,7 @@ class ComplianceDashboardView(APIView):
             - last_updated: Timestamp of when the data was last updated
         """
         try:
-            data = get_compliance_dashboard_data(request.user)
+            data = get_cached_dashboard('compliance', request.user, get_compliance_dashboard_data)
             return Response(data)
         except Exception as e:
             return Response({
@@ -62,7 +63,7 @@ class CapacityOptimizationDashboardView(APIView):
         Get capacity optimization dashboard data.
         """
         try:
-            data = get_capacity_optimization_dashboard(request.user)
+            data = get_cached_dashboard('capacity_optimization', request.user, get_capacity_optimization_dashboard)
             return Response(data)
         except Exception as e:
             return Response({
@@ -89,7 +90,7 @@ class MarketplaceDashboardView(APIView):
         Get marketplace analytics data.
         """
         try:
-            data = get_marketplace_analytics(request.user)
+            data = get_cached_dashboard('marketplace', request.user, get_marketplace_analytics)
             return Response(data)
         except Exception as e:
             return Response({
@@ -115,7 +116,7 @@ class RouteOptimizationDashboardView(APIView):
         Get route optimization analytics data.
         """
         try:
-            data = get_route_optimization_analytics(request.user)
+            data = get_cached_dashboard('route_optimization', request.user, get_route_optimization_analytics)
             return Response(data)
         except Exception as e:
             return Response({
@@ -151,7 +152,7 @@ class ComprehensiveDashboardView(APIView):
             - generated_at: Timestamp of data generation
         """
         try:
-            data = get_comprehensive_dashboard_data(request.user)
+            data = get_cached_dashboard('comprehensive', request.user, get_comprehensive_dashboard_data)
             
             # Add user context
             data['user_context'] = {
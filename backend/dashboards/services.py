@@ -1,4 +1,4 @@
-from typing import Dict, Optional, List
+from typing import Callable, Dict, Optional, List
 from django.db.models import Count, Q, Sum, Avg, F, Value, FloatField
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, Coalesce
 from django.utils import timezone
@@ -15,6 +15,39 @@ from enterprise_auth.models import AuthenticationLog, MFADevice, SSOProvider, Se
 from audits.models import AuditLog, ComplianceAuditLog, ShipmentAuditLog
 from inspections.models import Inspection, InspectionItem
 from training.models import TrainingRecord, ComplianceStatus, TrainingEnrollment
+from shared.single_flight import SingleFlight
+
+# Dashboards are polled by every open client; a short TTL plus single-flight
+# keeps an expiry from turning into one full recomputation per poller.
+DASHBOARD_CACHE_TTL = 60
+DASHBOARD_STALE_TTL = 120
+
+dashboard_flight = SingleFlight('dashboards')
+
+
+def dashboard_scope(user: User) -> str:
+    """
+    Cache scope for a user's dashboard data. Admins see the same unfiltered
+    data and share one entry; everyone else gets role/depot/user filtering,
+    so their entries are per user.
+    """
+    if user.role == User.Role.ADMIN:
+        return 'admin'
+    return f"user:{user.pk}"
+
+
+def get_cached_dashboard(name: str, user: User, builder: Callable[[User], Dict]) -> Dict:
+    """
+    Return builder(user), computed by at most one worker per dashboard scope
+    and served from cache (or briefly stale) to everyone else.
+    """
+    return dashboard_flight.get_or_compute(
+        f"{name}:{dashboard_scope(user)}",
+        lambda: builder(user),
+        ttl=DASHBOARD_CACHE_TTL,
+        stale_ttl=DASHBOARD_STALE_TTL
+    )
+
 
 def get_compliance_dashboard_data(user: User) -> Dict:
     """
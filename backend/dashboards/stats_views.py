@@ -8,6 +8,8 @@ from django.utils import timezone
 from datetime import timedelta
 import logging
 
+from .services import dashboard_flight, DASHBOARD_CACHE_TTL, DASHBOARD_STALE_TTL
+
 logger = logging.getLogger(__name__)
 
 class DashboardStatsView(APIView):
@@ -28,115 +30,13 @@ class DashboardStatsView(APIView):
         - activeRoutes: number
         """
         try:
-            # Import models dynamically to avoid circular imports
-            from shipments.models import Shipment
-            from vehicles.models import Vehicle
-            from dangerous_goods.models import DangerousGood
-            
-            # Calculate stats based on user role and permissions
             user = request.user
-            
-            # Base querysets (filter by user permissions)
-            if user.role == 'ADMIN':
-                # Admin sees everything
-                shipments_qs = Shipment.objects.all()
-                vehicles_qs = Vehicle.objects.all()
-            elif user.role in ['DISPATCHER', 'COMPLIANCE_OFFICER']:
-                # Dispatchers/Compliance see company data
-                if user.company:
-                    shipments_qs = Shipment.objects.filter(
-                        Q(origin_company=user.company) | Q(destination_company=user.company)
-                    )
-                    vehicles_qs = Vehicle.objects.filter(company=user.company)
-                else:
-                    shipments_qs = Shipment.objects.all()
-                    vehicles_qs = Vehicle.objects.all()
-            else:
-                # Drivers/Others see limited data
-                shipments_qs = Shipment.objects.filter(
-                    Q(assigned_driver=user) if hasattr(Shipment, 'assigned_driver') else Q()
-                )
-                vehicles_qs = Vehicle.objects.filter(
-                    Q(assigned_driver=user) if hasattr(Vehicle, 'assigned_driver') else Q()
-                )
-            
-            # Current period (last 30 days)
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            last_month_ago = timezone.now() - timedelta(days=60)
-            
-            # 1. Total Shipments (active + in transit)
-            total_shipments = shipments_qs.filter(
-                Q(status__in=['PENDING', 'IN_TRANSIT', 'PROCESSING']) 
-                if hasattr(Shipment, 'status') else Q()
-            ).count()
-            
-            # Previous period for comparison
-            prev_shipments = shipments_qs.filter(
-                created_at__gte=last_month_ago,
-                created_at__lt=thirty_days_ago
-            ).count() if hasattr(Shipment, 'created_at') else 0
-            
-            # Calculate change percentage
-            shipments_change = 0
-            if prev_shipments > 0:
-                shipments_change = round(((total_shipments - prev_shipments) / prev_shipments) * 100, 1)
-            elif total_shipments > 0:
-                shipments_change = 100
-            
-            # 2. Pending Reviews (shipments needing approval/compliance check)
-            pending_reviews = shipments_qs.filter(
-                Q(status='PENDING_REVIEW') | Q(compliance_status='PENDING')
-                if hasattr(Shipment, 'compliance_status') else Q()
-            ).count()
-            
-            # 3. Compliance Rate (percentage of compliant shipments)
-            total_recent_shipments = shipments_qs.filter(
-                created_at__gte=thirty_days_ago
-            ).count() if hasattr(Shipment, 'created_at') else total_shipments
-            
-            compliant_shipments = shipments_qs.filter(
-                compliance_status='APPROVED',
-                created_at__gte=thirty_days_ago
-            ).count() if hasattr(Shipment, 'compliance_status') else total_recent_shipments
-            
-            compliance_rate = 98.7  # Default high rate
-            if total_recent_shipments > 0:
-                compliance_rate = round((compliant_shipments / total_recent_shipments) * 100, 1)
-            
-            # 4. Active Routes (vehicles currently on routes)
-            active_routes = vehicles_qs.filter(
-                Q(status='IN_TRANSIT') | Q(status='ACTIVE')
-                if hasattr(Vehicle, 'status') else Q()
-            ).count()
-            
-            # If no status field, use a reasonable estimate
-            if not hasattr(Vehicle, 'status'):
-                active_routes = max(int(vehicles_qs.count() * 0.7), 1)  # Assume 70% are active
-            
-            # 5. Additional metrics for trends
-            weekly_shipments = shipments_qs.filter(
-                created_at__gte=timezone.now() - timedelta(days=7)
-            ).count() if hasattr(Shipment, 'created_at') else 0
-            
-            # Response data matching frontend expectations
-            stats_data = {
-                'totalShipments': total_shipments,
-                'pendingReviews': pending_reviews,
-                'complianceRate': compliance_rate,
-                'activeRoutes': active_routes,
-                'trends': {
-                    'shipments_change': f"{'+' if shipments_change >= 0 else ''}{shipments_change}%",
-                    'weekly_shipments': weekly_shipments,
-                    'compliance_trend': '+2.1%',  # Placeholder
-                    'routes_change': '+5.3%'      # Placeholder
-                },
-                'period': {
-                    'start': thirty_days_ago.isoformat(),
-                    'end': timezone.now().isoformat(),
-                    'days': 30
-                },
-                'last_updated': timezone.now().isoformat()
-            }
+            stats_data = dashboard_flight.get_or_compute(
+                f"stats:{self.get_scope(user)}",
+                lambda: self.build_stats(user),
+                ttl=DASHBOARD_CACHE_TTL,
+                stale_ttl=DASHBOARD_STALE_TTL
+            )
             
             logger.info(f"Dashboard stats retrieved for user {user.email}")
             return Response(stats_data)
@@ -167,6 +67,126 @@ class DashboardStatsView(APIView):
             
             return Response(fallback_data)
 
+    @staticmethod
+    def get_scope(user) -> str:
+        """Cache scope matching the querysets build_stats filters by"""
+        if user.role == 'ADMIN':
+            return 'admin'
+        if user.role in ['DISPATCHER', 'COMPLIANCE_OFFICER']:
+            return f"company:{user.company_id}" if user.company_id else 'admin'
+        return f"user:{user.pk}"
+    
+    def build_stats(self, user):
+        """Compute the dashboard card statistics for a user"""
+        # Import models dynamically to avoid circular imports
+        from shipments.models import Shipment
+        from vehicles.models import Vehicle
+        from dangerous_goods.models import DangerousGood
+        
+        # Base querysets (filter by user permissions)
+        if user.role == 'ADMIN':
+            # Admin sees everything
+            shipments_qs = Shipment.objects.all()
+            vehicles_qs = Vehicle.objects.all()
+        elif user.role in ['DISPATCHER', 'COMPLIANCE_OFFICER']:
+            # Dispatchers/Compliance see company data
+            if user.company:
+                shipments_qs = Shipment.objects.filter(
+                    Q(origin_company=user.company) | Q(destination_company=user.company)
+                )
+                vehicles_qs = Vehicle.objects.filter(company=user.company)
+            else:
+                shipments_qs = Shipment.objects.all()
+                vehicles_qs = Vehicle.objects.all()
+        else:
+            # Drivers/Others see limited data
+            shipments_qs = Shipment.objects.filter(
+                Q(assigned_driver=user) if hasattr(Shipment, 'assigned_driver') else Q()
+            )
+            vehicles_qs = Vehicle.objects.filter(
+                Q(assigned_driver=user) if hasattr(Vehicle, 'assigned_driver') else Q()
+            )
+        
+        # Current period (last 30 days)
+        thirty_days_ago = timezone.now() - timedelta(days=30)
+        last_month_ago = timezone.now() - timedelta(days=60)
+        
+        # 1. Total Shipments (active + in transit)
+        total_shipments = shipments_qs.filter(
+            Q(status__in=['PENDING', 'IN_TRANSIT', 'PROCESSING']) 
+            if hasattr(Shipment, 'status') else Q()
+        ).count()
+        
+        # Previous period for comparison
+        prev_shipments = shipments_qs.filter(
+            created_at__gte=last_month_ago,
+            created_at__lt=thirty_days_ago
+        ).count() if hasattr(Shipment, 'created_at') else 0
+        
+        # Calculate change percentage
+        shipments_change = 0
+        if prev_shipments > 0:
+            shipments_change = round(((total_shipments - prev_shipments) / prev_shipments) * 100, 1)
+        elif total_shipments > 0:
+            shipments_change = 100
+        
+        # 2. Pending Reviews (shipments needing approval/compliance check)
+        pending_reviews = shipments_qs.filter(
+            Q(status='PENDING_REVIEW') | Q(compliance_status='PENDING')
+            if hasattr(Shipment, 'compliance_status') else Q()
+        ).count()
+        
+        # 3. Compliance Rate (percentage of compliant shipments)
+        total_recent_shipments = shipments_qs.filter(
+            created_at__gte=thirty_days_ago
+        ).count() if hasattr(Shipment, 'created_at') else total_shipments
+        
+        compliant_shipments = shipments_qs.filter(
+            compliance_status='APPROVED',
+            created_at__gte=thirty_days_ago
+        ).count() if hasattr(Shipment, 'compliance_status') else total_recent_shipments
+        
+        compliance_rate = 98.7  # Default high rate
+        if total_recent_shipments > 0:
+            compliance_rate = round((compliant_shipments / total_recent_shipments) * 100, 1)
+        
+        # 4. Active Routes (vehicles currently on routes)
+        active_routes = vehicles_qs.filter(
+            Q(status='IN_TRANSIT') | Q(status='ACTIVE')
+            if hasattr(Vehicle, 'status') else Q()
+        ).count()
+        
+        # If no status field, use a reasonable estimate
+        if not hasattr(Vehicle, 'status'):
+            active_routes = max(int(vehicles_qs.count() * 0.7), 1)  # Assume 70% are active
+        
+        # 5. Additional metrics for trends
+        weekly_shipments = shipments_qs.filter(
+            created_at__gte=timezone.now() - timedelta(days=7)
+        ).count() if hasattr(Shipment, 'created_at') else 0
+        
+        # Response data matching frontend expectations
+        stats_data = {
+            'totalShipments': total_shipments,
+            'pendingReviews': pending_reviews,
+            'complianceRate': compliance_rate,
+            'activeRoutes': active_routes,
+            'trends': {
+                'shipments_change': f"{'+' if shipments_change >= 0 else ''}{shipments_change}%",
+                'weekly_shipments': weekly_shipments,
+                'compliance_trend': '+2.1%',  # Placeholder
+                'routes_change': '+5.3%'      # Placeholder
+            },
+            'period': {
+                'start': thirty_days_ago.isoformat(),
+                'end': timezone.now().isoformat(),
+                'days': 30
+            },
+            'last_updated': timezone.now().isoformat()
+        }
+        
+        return stats_data
+
 class RecentShipmentsView(APIView):
     """
     API endpoint for recent shipments data for dashboard table.
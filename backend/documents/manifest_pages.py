@@ -0,0 +1,115 @@
+# documents/manifest_pages.py
+"""
+Content-addressed, per-page stages of manifest analysis.
+
+Corrected re-uploads of a manifest usually differ from the previous file by
+a page or two. Each PDF page is fingerprinted from its content stream, fonts
+and embedded images, and the output of every analysis stage is cached under
+that fingerprint, so re-analysing a document only recomputes the pages whose
+content changed. Page numbers are not part of the fingerprint: a page that
+moved keeps its cached results.
+
+Stages (see ManifestAnalyzer.analyze_pages):
+
+- ``text``: positioned text lines of the page
+- ``quantities``: quantities and weights found in each text line
+- ``dg_matches``: dangerous goods matched on the page; also keyed by the
+  dangerous goods catalog version, as the result depends on it
+- ``tables``: tables found on the page (AdvancedTableExtractor)
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+# Bump when the output or logic of any stage changes, to ignore older entries
+STAGE_VERSION = 1
+
+DEFAULT_PAGE_CACHE_TIMEOUT = 7 * 24 * 3600  # 7 days
+
+
+def page_fingerprint(page) -> str:
+    """
+    Hash of what determines a page's analysis: geometry, content stream,
+    fonts and embedded image data. Object numbers are left out so re-saving
+    a file does not change the fingerprints of untouched pages.
+    """
+    document = page.parent
+    digest = hashlib.sha256()
+    digest.update(f"{tuple(page.rect)}:{page.rotation}".encode('utf-8'))
+    digest.update(page.read_contents() or b'')
+
+    # (xref, ext, type, basefont, name, encoding): text bytes decode through the font
+    for basefont, encoding in sorted({(font[3], font[5]) for font in page.get_fonts()}):
+        digest.update(f"font:{basefont}:{encoding}".encode('utf-8'))
+
+    # Scanned pages are mostly a single image drawn by an unchanged content stream
+    for image in page.get_images():
+        digest.update(hashlib.sha256(document.xref_stream_raw(image[0]) or b'').digest())
+
+    return digest.hexdigest()
+
+
+def dg_catalog_version() -> str:
+    """Changes whenever a dangerous good or synonym is added, changed or removed"""
+    from dangerous_goods.models import DangerousGood, DGProductSynonym
+
+    parts = []
+    for model in (DangerousGood, DGProductSynonym):
+        state = model.objects.aggregate(count=Count('pk'), updated=Max('updated_at'))
+        parts.append(f"{state['count']}:{state['updated'].isoformat() if state['updated'] else ''}")
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class PageStageCache:
+    """Cached results of one analysis stage, keyed by page fingerprint"""
+
+    def __init__(self, stage: str, variant: str = '', timeout: int = None):
+        self.stage = stage
+        self.variant = variant
+        self.timeout = timeout or getattr(settings, 'MANIFEST_PAGE_CACHE_TIMEOUT', DEFAULT_PAGE_CACHE_TIMEOUT)
+
+    def _key(self, fingerprint: str) -> str:
+        variant = f":{self.variant}" if self.variant else ''
+        return f"manifest_page:v{STAGE_VERSION}:{self.stage}{variant}:{fingerprint}"
+
+    def get_many(self, fingerprints: Iterable[str]) -> Dict[str, Any]:
+        """Cached results for the fingerprints that have one, in one round trip"""
+        keys = {self._key(fingerprint): fingerprint for fingerprint in set(fingerprints)}
+        try:
+            found = cache.get_many(list(keys))
+        except Exception as e:
+            logger.warning(f"Page cache read failed for stage {self.stage}: {e}")
+            return {}
+        return {keys[key]: value for key, value in found.items() if value is not None}
+
+    def set_many(self, results: Dict[str, Any]):
+        if not results:
+            return
+        try:
+            cache.set_many(
+                {self._key(fingerprint): value for fingerprint, value in results.items()},
+                self.timeout
+            )
+        except Exception as e:
+            logger.warning(f"Page cache write failed for stage {self.stage}: {e}")
+
+    def resolve(self, fingerprints: List[str], compute) -> Tuple[List[Any], Set[str]]:
+        """
+        Results for each fingerprint, in order, calling compute(index) only for
+        pages without a cached result. Identical pages are computed once.
+        Also returns the fingerprints that were computed.
+        """
+        results = self.get_many(fingerprints)
+        computed = {}
+        for index, fingerprint in enumerate(fingerprints):
+            if fingerprint not in results:
+                results[fingerprint] = computed[fingerprint] = compute(index)
+        self.set_many(computed)
+        return [results[fingerprint] for fingerprint in fingerprints], set(computed)
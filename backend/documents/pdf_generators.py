@@ -5,10 +5,13 @@ from typing import Dict, List, Optional, BinaryIO
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
-from weasyprint import HTML, CSS
-from weasyprint.text.fonts import FontConfiguration
 import logging
 
+from shared.lazy_init import lazy_import
+
+# WeasyPrint pulls in Pango/cairo bindings; load it when a PDF is first rendered
+weasyprint = lazy_import('weasyprint')
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +21,7 @@ class PDFGenerator:
     """
     
     def __init__(self):
+        from weasyprint.text.fonts import FontConfiguration
         self.font_config = FontConfiguration()
         self.base_css = self._get_base_css()
     
@@ -205,8 +209,8 @@ class PDFGenerator:
             combined_css = self.base_css + "\n" + additional_css
             
             # Generate PDF
-            html = HTML(string=html_content)
-            css = CSS(string=combined_css, font_config=self.font_config)
+            html = weasyprint.HTML(string=html_content)
+            css = weasyprint.CSS(string=combined_css, font_config=self.font_config)
             
             pdf_bytes = html.write_pdf(stylesheets=[css], font_config=self.font_config)
             
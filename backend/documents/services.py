@@ -5,18 +5,21 @@ import time
 from typing import Dict, List, Tuple, Optional
 from difflib import SequenceMatcher
 
-import fitz  # PyMuPDF
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 
 from dangerous_goods.models import DangerousGood, DGProductSynonym
-from dangerous_goods.services import match_synonym_to_dg, get_dangerous_good_by_un_number, find_dgs_by_text_search
+from dangerous_goods.services import match_synonym_to_dg, get_dangerous_good_by_un_number, find_dgs_by_text_search, DGTextCatalog
+from shipments.hazard_profile import ShipmentHazardProfile
 from .pdf_generators import ShipmentReportGenerator, ComplianceCertificateGenerator, ManifestGenerator, PDFGenerator
 from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import HTML, CSS
 from io import BytesIO
-import fitz  # PyMuPDF for PDF merging
+
+from shared.lazy_init import lazy_import
+from .manifest_pages import PageStageCache, dg_catalog_version, page_fingerprint
+
+fitz = lazy_import('fitz')  # PyMuPDF for PDF merging, loaded on first use
 
 logger = logging.getLogger(__name__)
 
@@ -56,25 +59,8 @@ class ManifestAnalyzer:
             logger.info(f"Extracting text from PDF: {pdf_path} ({pdf_document.page_count} pages)")
             
             for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                
-                # Extract text blocks with position information
-                blocks = page.get_text("dict")
-                
-                for block in blocks.get("blocks", []):
-                    if "lines" in block:  # Text block
-                        for line in block["lines"]:
-                            line_text = ""
-                            for span in line.get("spans", []):
-                                line_text += span.get("text", "")
-                            
-                            if line_text.strip():
-                                text_blocks.append({
-                                    'text': line_text.strip(),
-                                    'page': page_num + 1,
-                                    'bbox': line.get("bbox", []),
-                                    'confidence': 1.0  # PDF text extraction is generally reliable
-                                })
+                for line in self._extract_page_lines(pdf_document[page_num]):
+                    text_blocks.append({**line, 'page': page_num + 1})
             
             pdf_document.close()
             
@@ -85,6 +71,150 @@ class ManifestAnalyzer:
             logger.error(f"Failed to extract text from PDF {document.id}: {str(e)}")
             raise Exception(f"PDF text extraction failed: {str(e)}")
     
+    def _extract_page_lines(self, page) -> List[Dict]:
+        """Text lines of one PDF page with their positions"""
+        lines = []
+        
+        # Extract text blocks with position information
+        blocks = page.get_text("dict")
+        
+        for block in blocks.get("blocks", []):
+            if "lines" in block:  # Text block
+                for line in block["lines"]:
+                    line_text = ""
+                    for span in line.get("spans", []):
+                        line_text += span.get("text", "")
+                    
+                    if line_text.strip():
+                        lines.append({
+                            'text': line_text.strip(),
+                            'bbox': list(line.get("bbox", [])),
+                            'confidence': 1.0  # PDF text extraction is generally reliable
+                        })
+        
+        return lines
+    
+    def analyze_pages(self, document) -> Dict:
+        """
+        Extract text and find dangerous goods page by page, reusing cached
+        stage results for pages whose content has not changed since any
+        earlier analysis (see documents.manifest_pages).
+        
+        Args:
+            document: Document model instance
+            
+        Returns:
+            Dictionary with text_blocks, matches (as from
+            analyze_text_with_multi_pass_scanning), page_fingerprints and
+            the page numbers that had to be recomputed
+        """
+        try:
+            pdf_document = fitz.open(document.file.path)
+        except Exception as e:
+            logger.error(f"Failed to open PDF {document.id}: {str(e)}")
+            raise Exception(f"PDF text extraction failed: {str(e)}")
+        
+        try:
+            pages = [pdf_document[page_num] for page_num in range(pdf_document.page_count)]
+            fingerprints = [page_fingerprint(page) for page in pages]
+            
+            # Stage 1: text lines per page
+            page_lines, text_computed = PageStageCache('text').resolve(
+                fingerprints, lambda index: self._extract_page_lines(pages[index])
+            )
+        finally:
+            pdf_document.close()
+        
+        # Stage 2: quantities and weights per text line
+        page_quantities, _ = PageStageCache('quantities').resolve(
+            fingerprints,
+            lambda index: [self.extract_quantities_and_weights(line['text']) for line in page_lines[index]]
+        )
+        
+        # Stage 3: dangerous goods per page, valid for the current catalog only
+        catalog = []
+        
+        def match_page(index):
+            if not catalog:
+                catalog.append(DGTextCatalog.load())
+            return self._match_page_lines(page_lines[index], catalog[0])
+        
+        page_matches, matches_computed = PageStageCache('dg_matches', variant=dg_catalog_version()).resolve(
+            fingerprints, match_page
+        )
+        
+        # Merge the per-page results
+        text_blocks = []
+        for page_num, lines in enumerate(page_lines, start=1):
+            text_blocks.extend({**line, 'page': page_num} for line in lines)
+        
+        dangerous_goods = DangerousGood.objects.in_bulk(
+            {match['dangerous_good_id'] for matches in page_matches for match in matches}
+        )
+        all_matches = []
+        for index, matches in enumerate(page_matches):
+            for match in matches:
+                dg = dangerous_goods.get(match['dangerous_good_id'])
+                if dg is None:
+                    continue
+                line = page_lines[index][match['line']]
+                all_matches.append({
+                    'un_number': dg.un_number,
+                    'dangerous_good': dg,
+                    'found_text': line['text'],
+                    'matched_term': match['matched_term'],
+                    'page': index + 1,
+                    'bbox': line['bbox'],
+                    'confidence': match['confidence'],
+                    'match_type': match['match_type'],
+                    **page_quantities[index][match['line']]
+                })
+        all_matches.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        recomputed = text_computed | matches_computed
+        return {
+            'text_blocks': text_blocks,
+            'matches': all_matches,
+            'page_fingerprints': fingerprints,
+            'recomputed_pages': [
+                page_num for page_num, fingerprint in enumerate(fingerprints, start=1) if fingerprint in recomputed
+            ]
+        }
+    
+    def _match_page_lines(self, lines: List[Dict], catalog: DGTextCatalog) -> List[Dict]:
+        """
+        Dangerous goods found on one page, as catalog ids and line indexes so
+        the result can be cached independently of page number.
+        """
+        if not lines:
+            return []
+        
+        page_text = " ".join(line['text'] for line in lines)
+        matches = []
+        seen_un_numbers = set()
+        
+        for result in find_dgs_by_text_search(page_text, catalog=catalog):
+            dg = result['dangerous_good']
+            # One match per UN number and page, highest confidence first
+            if dg.un_number in seen_un_numbers:
+                continue
+            seen_un_numbers.add(dg.un_number)
+            
+            # First line containing the match, falling back to the page's first line
+            term = result['matched_term'].lower()
+            line_index = next(
+                (index for index, line in enumerate(lines) if term in line['text'].lower()), 0
+            )
+            matches.append({
+                'dangerous_good_id': dg.pk,
+                'matched_term': result['matched_term'],
+                'confidence': result['confidence'],
+                'match_type': result['match_type'],
+                'line': line_index
+            })
+        
+        return matches
+    
     def analyze_text_with_multi_pass_scanning(self, text_blocks: List[Dict]) -> List[Dict]:
         """
         Analyze text using multi-pass scanning strategy with synonym lookup.
@@ -255,6 +385,7 @@ class ManifestAnalyzer:
         for match in matches:
             dg = match['dangerous_good']
             formatted_dg = {
+                'dangerous_good_id': str(dg.pk),
                 'un_number': match['un_number'],
                 'proper_shipping_name': dg.proper_shipping_name,
                 'hazard_class': dg.hazard_class,
@@ -343,8 +474,9 @@ class ConsolidatedReportGenerator(PDFGenerator):
             'include_sections': include_sections,
         }
         
-        # Get dangerous goods items
-        dangerous_items = shipment.items.filter(is_dangerous_good=True)
+        # Get dangerous goods items from the shared shipment hazard profile
+        hazard_profile = ShipmentHazardProfile.for_shipment(shipment)
+        dangerous_items = hazard_profile.dangerous_items
         context['dangerous_items'] = dangerous_items
         
         # Shipment Report Section
@@ -361,19 +493,19 @@ class ConsolidatedReportGenerator(PDFGenerator):
         
         # Compatibility Report Section
         if include_sections.get('compatibility_report', True):
-            context['compatibility_data'] = self._prepare_compatibility_context(shipment, dangerous_items)
+            context['compatibility_data'] = self._prepare_compatibility_context(shipment, hazard_profile)
         
         # SDS Documents Section
         if include_sections.get('sds_documents', True):
-            context['sds_data'] = self._prepare_sds_context(dangerous_items)
+            context['sds_data'] = self._prepare_sds_context(shipment, dangerous_items)
         
         # Emergency Procedures Section
         if include_sections.get('emergency_procedures', True):
-            context['epg_data'] = self._prepare_epg_context(dangerous_items)
+            context['epg_data'] = self._prepare_epg_context(shipment, dangerous_items)
         
         return context
     
-    def _prepare_compatibility_context(self, shipment, dangerous_items) -> Dict:
+    def _prepare_compatibility_context(self, shipment, hazard_profile) -> Dict:
         """Prepare compatibility analysis context"""
         compatibility_results = []
         compatibility_status = 'COMPATIBLE'
@@ -381,13 +513,7 @@ class ConsolidatedReportGenerator(PDFGenerator):
         warnings = []
         
         # Group dangerous items by hazard class
-        hazard_classes = {}
-        for item in dangerous_items:
-            if item.dangerous_good_entry:
-                hazard_class = item.dangerous_good_entry.hazard_class
-                if hazard_class not in hazard_classes:
-                    hazard_classes[hazard_class] = []
-                hazard_classes[hazard_class].append(item)
+        hazard_classes = hazard_profile.items_by_hazard_class()
         
         # Check compatibility between different hazard classes
         incompatible_combinations = {
@@ -417,7 +543,7 @@ class ConsolidatedReportGenerator(PDFGenerator):
             'analysis_date': timezone.now(),
         }
     
-    def _prepare_sds_context(self, dangerous_items) -> Dict:
+    def _prepare_sds_context(self, shipment, dangerous_items) -> Dict:
         """Prepare Safety Data Sheets context"""
         sds_data = []
         
@@ -426,7 +552,7 @@ class ConsolidatedReportGenerator(PDFGenerator):
                 dg = item.dangerous_good_entry
                 
                 # Check if SDS documents exist for this dangerous good
-                sds_documents = item.shipment.documents.filter(
+                sds_documents = shipment.documents.filter(
                     document_type='SDS',
                     dangerous_good_entries__un_number=dg.un_number
                 ).distinct()
@@ -452,7 +578,7 @@ class ConsolidatedReportGenerator(PDFGenerator):
             'sds_available_count': sum(1 for item in sds_data if item['sds_available']),
         }
     
-    def _prepare_epg_context(self, dangerous_items) -> Dict:
+    def _prepare_epg_context(self, shipment, dangerous_items) -> Dict:
         """Prepare Emergency Procedure Guidelines context"""
         epg_data = []
         
@@ -465,7 +591,7 @@ class ConsolidatedReportGenerator(PDFGenerator):
                     from emergency_procedures.models import EmergencyProcedure
                     procedures = EmergencyProcedure.objects.filter(
                         applicable_hazard_classes__contains=[dg.hazard_class],
-                        company=item.shipment.company
+                        company=shipment.company
                     )
                 except Exception:
                     procedures = []
@@ -664,8 +790,9 @@ def analyze_manifest(document) -> Dict:
     try:
         analyzer = ManifestAnalyzer()
         
-        # Extract text from PDF
-        text_blocks = analyzer.extract_text_from_pdf(document)
+        # Extract text and find dangerous goods per page, reusing unchanged pages
+        pages = analyzer.analyze_pages(document)
+        text_blocks = pages['text_blocks']
         
         if not text_blocks:
             return {
@@ -678,8 +805,7 @@ def analyze_manifest(document) -> Dict:
                 }
             }
         
-        # Use multi-pass scanning strategy to find dangerous goods
-        potential_dgs = analyzer.analyze_text_with_multi_pass_scanning(text_blocks)
+        potential_dgs = pages['matches']
         
         # Prepare unmatched text (text blocks that might contain DGs but weren't matched)
         matched_blocks = set()
@@ -702,13 +828,16 @@ def analyze_manifest(document) -> Dict:
                 'total_potential_dgs': len(formatted_dgs),
                 'processing_time_seconds': round(processing_time, 2),
                 'unmatched_blocks_with_indicators': len(unmatched_text),
-                'scanning_strategy': 'multi_pass_with_synonyms'
+                'scanning_strategy': 'multi_pass_with_synonyms',
+                'page_fingerprints': pages['page_fingerprints'],
+                'recomputed_pages': pages['recomputed_pages']
             }
         }
         
         logger.info(
             f"Completed manifest analysis for document {document.id} in {processing_time:.2f}s. "
-            f"Found {len(formatted_dgs)} potential dangerous goods"
+            f"Found {len(formatted_dgs)} potential dangerous goods, "
+            f"recomputed {len(pages['recomputed_pages'])} of {len(pages['page_fingerprints'])} pages"
         )
         
         return result
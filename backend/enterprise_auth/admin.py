@@ -4,6 +4,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from simple_history.admin import SimpleHistoryAdmin
+from shared.history import update_with_history
 from .models import (
     SSOProvider, UserSSOAccount, MFADevice, 
     AuthenticationLog, SecurityPolicy
@@ -116,10 +117,10 @@ class MFADeviceAdmin(SimpleHistoryAdmin):
         """Ensure only one primary device per user"""
         if obj.is_primary:
             # Set other devices as non-primary
-            MFADevice.objects.filter(
-                user=obj.user, 
-                is_primary=True
-            ).exclude(id=obj.id).update(is_primary=False)
+            update_with_history(
+                MFADevice.objects.filter(user=obj.user, is_primary=True).exclude(id=obj.id),
+                change_reason=f"Replaced as primary by {obj}", user=request.user, is_primary=False
+            )
         
         super().save_model(request, obj, form, change)
 
@@ -234,9 +235,10 @@ class SecurityPolicyAdmin(SimpleHistoryAdmin):
         """Ensure only one active policy"""
         if obj.is_active:
             # Set other policies as inactive
-            SecurityPolicy.objects.filter(
-                is_active=True
-            ).exclude(id=obj.id).update(is_active=False)
+            update_with_history(
+                SecurityPolicy.objects.filter(is_active=True).exclude(id=obj.id),
+                change_reason=f"Deactivated by policy {obj}", user=request.user, is_active=False
+            )
         
         super().save_model(request, obj, form, change)
 
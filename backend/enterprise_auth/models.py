@@ -2,7 +2,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
-from simple_history.models import HistoricalRecords
+from shared.history import DeferredHistoricalRecords
 import uuid
 
 User = get_user_model()
@@ -45,7 +45,7 @@ class SSOProvider(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         verbose_name = _("SSO Provider")
@@ -73,7 +73,7 @@ class UserSSOAccount(models.Model):
     last_login = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         verbose_name = _("User SSO Account")
@@ -113,7 +113,7 @@ class MFADevice(models.Model):
     last_used = models.DateTimeField(null=True, blank=True)
     use_count = models.PositiveIntegerField(default=0)
     
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         verbose_name = _("MFA Device")
@@ -217,7 +217,7 @@ class SecurityPolicy(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         verbose_name = _("Security Policy")
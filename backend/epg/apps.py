@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EpgConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'epg'
+
+    def ready(self):
+        import epg.signals  # noqa
@@ -1,14 +1,50 @@
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from typing import List, Dict, Optional
+import copy
+import hashlib
+import json
 import logging
 
 from .models import EmergencyProcedureGuide, ShipmentEmergencyPlan, EmergencyType, SeverityLevel
 from shipments.models import Shipment
+from shipments.hazard_profile import ShipmentHazardProfile
 from dangerous_goods.models import DangerousGood
+from shared.tiered_cache import TieredCache
 
 logger = logging.getLogger(__name__)
 
+# Plan sections depend only on the set of dangerous goods and the active EPGs, so
+# shipments carrying the same goods share them. EPG changes clear the namespace
+# (see epg/signals.py); the timeout bounds staleness from DangerousGood edits.
+PLAN_SECTIONS_TIMEOUT = 60 * 60
+plan_sections_cache = TieredCache(
+    namespace='epg_plan_sections',
+    memory_maxsize=500,
+    memory_ttl=300,
+    default_timeout=PLAN_SECTIONS_TIMEOUT,
+)
+
+
+def subsidiary_risk_classes(dg: DangerousGood) -> List[str]:
+    """Subsidiary risk classes of a dangerous good, from its comma-separated field"""
+    return [risk.strip() for risk in (dg.subsidiary_risks or '').split(',') if risk.strip()]
+
+
+def hazard_set_signature(dangerous_goods: List[DangerousGood]) -> str:
+    """
+    Hash of the dangerous goods fields emergency plan sections are built
+    from, and of the current date, since EPGs become active by effective date.
+    """
+    entries = sorted(
+        [str(dg.pk), dg.un_number, dg.proper_shipping_name, dg.hazard_class,
+         dg.subsidiary_risks or '', dg.packing_group or '']
+        for dg in dangerous_goods
+    )
+    payload = json.dumps([timezone.now().date().isoformat(), entries], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
 class EmergencyPlanGenerator:
     """
     Service for automatically generating emergency plans for shipments
@@ -34,26 +70,21 @@ class EmergencyPlanGenerator:
         if not dangerous_goods:
             raise ValueError("Shipment contains no dangerous goods requiring emergency planning")
         
-        # Find relevant EPGs
-        relevant_epgs = self._find_relevant_epgs(dangerous_goods)
+        # EPG-derived sections, shared by every shipment with the same dangerous goods
+        sections = self._get_plan_sections(dangerous_goods)
         
-        if not relevant_epgs:
+        if sections is None:
             raise ValueError("No emergency procedure guides found for dangerous goods in shipment")
         
         # Generate plan number
         plan_number = self._generate_plan_number(shipment)
         
-        # Assess hazards
-        hazard_assessment = self._assess_shipment_hazards(dangerous_goods, relevant_epgs)
+        hazard_assessment = sections['hazard_assessment']
+        hazard_assessment['assessment_timestamp'] = timezone.now().isoformat()
         
-        # Generate plan content
+        # Generate shipment-specific content
         executive_summary = self._generate_executive_summary(shipment, dangerous_goods, hazard_assessment)
-        immediate_actions = self._consolidate_immediate_actions(relevant_epgs)
-        specialized_procedures = self._generate_specialized_procedures(dangerous_goods, relevant_epgs)
-        
-        # Generate route-specific information
         route_contacts = self._generate_route_emergency_contacts(shipment)
-        notification_matrix = self._generate_notification_matrix(dangerous_goods, relevant_epgs)
         
         # Create emergency plan
         emergency_plan = ShipmentEmergencyPlan.objects.create(
@@ -61,30 +92,24 @@ class EmergencyPlanGenerator:
             plan_number=plan_number,
             executive_summary=executive_summary,
             hazard_assessment=hazard_assessment,
-            immediate_response_actions=immediate_actions,
-            specialized_procedures=specialized_procedures,
+            immediate_response_actions=sections['immediate_actions'],
+            specialized_procedures=sections['specialized_procedures'],
             route_emergency_contacts=route_contacts,
-            notification_matrix=notification_matrix,
+            notification_matrix=sections['notification_matrix'],
             generated_by=user,
             status='GENERATED'
         )
         
         # Link referenced EPGs
-        emergency_plan.referenced_epgs.set(relevant_epgs)
+        emergency_plan.referenced_epgs.set(sections['epg_ids'])
         
         logger.info(f"Emergency plan {plan_number} generated successfully")
         return emergency_plan
     
     def _get_shipment_dangerous_goods(self, shipment: Shipment) -> List[DangerousGood]:
         """Get all dangerous goods in the shipment"""
-        # Get dangerous goods from shipment items
-        dangerous_goods = []
-        
-        # Check if shipment has items with dangerous goods
-        if hasattr(shipment, 'items'):
-            for item in shipment.items.filter(is_dangerous_good=True):
-                if hasattr(item, 'dangerous_good') and item.dangerous_good:
-                    dangerous_goods.append(item.dangerous_good)
+        # Get dangerous goods from the shared shipment hazard profile
+        dangerous_goods = ShipmentHazardProfile.for_shipment(shipment).dangerous_goods
         
         # Fallback: check manifests for dangerous goods
         if not dangerous_goods and hasattr(shipment, 'manifests'):
@@ -102,34 +127,66 @@ class EmergencyPlanGenerator:
         
         return unique_dgs
     
-    def _find_relevant_epgs(self, dangerous_goods: List[DangerousGood]) -> List[EmergencyProcedureGuide]:
-        """Find EPGs relevant to the dangerous goods"""
-        relevant_epgs = []
+    def _get_plan_sections(self, dangerous_goods: List[DangerousGood]) -> Optional[Dict]:
+        """
+        Hazard assessment, immediate actions, specialized procedures,
+        notification matrix and referenced EPG ids for a set of dangerous
+        goods, memoized by hazard_set_signature(). None if no EPG applies.
+        """
+        signature = hazard_set_signature(dangerous_goods)
+        sections = plan_sections_cache.get(signature)
         
-        for dg in dangerous_goods:
-            # First, look for specific EPGs for this dangerous good
-            specific_epgs = EmergencyProcedureGuide.objects.filter(
-                dangerous_good=dg,
-                status='ACTIVE',
-                effective_date__lte=timezone.now().date()
-            ).order_by('-effective_date')
+        if sections is None:
+            relevant_epgs = self._find_relevant_epgs(dangerous_goods)
+            if not relevant_epgs:
+                return None
             
-            if specific_epgs.exists():
-                relevant_epgs.extend(specific_epgs)
-            else:
-                # Fall back to generic hazard class EPGs
-                generic_epgs = EmergencyProcedureGuide.objects.filter(
-                    dangerous_good__isnull=True,
-                    hazard_class=dg.hazard_class,
-                    status='ACTIVE',
-                    effective_date__lte=timezone.now().date()
-                ).order_by('-effective_date')
-                
-                if generic_epgs.exists():
-                    relevant_epgs.extend(generic_epgs[:1])  # Take most recent
+            sections = {
+                'epg_ids': [str(epg.pk) for epg in relevant_epgs],
+                'hazard_assessment': self._assess_shipment_hazards(dangerous_goods, relevant_epgs),
+                'immediate_actions': self._consolidate_immediate_actions(relevant_epgs),
+                'specialized_procedures': self._generate_specialized_procedures(dangerous_goods, relevant_epgs),
+                'notification_matrix': self._generate_notification_matrix(dangerous_goods, relevant_epgs),
+            }
+            plan_sections_cache.set(signature, sections)
         
-        # Remove duplicates
-        return list(set(relevant_epgs))
+        # Callers fill in per-plan values, which must not leak into the memory tier
+        return copy.deepcopy(sections)
+    
+    def _find_relevant_epgs(self, dangerous_goods: List[DangerousGood]) -> List[EmergencyProcedureGuide]:
+        """
+        Find EPGs relevant to the dangerous goods in one query.
+        
+        Every active EPG specific to one of the dangerous goods applies. A
+        dangerous good without one falls back to the most recent generic EPG
+        for its hazard class.
+        """
+        if not dangerous_goods:
+            return []
+        
+        dg_ids = [dg.pk for dg in dangerous_goods]
+        active = EmergencyProcedureGuide.objects.filter(
+            status='ACTIVE',
+            effective_date__lte=timezone.now().date()
+        )
+        
+        # Dangerous goods in the set with this hazard class and no specific EPG
+        uncovered = DangerousGood.objects.filter(
+            pk__in=dg_ids,
+            hazard_class=OuterRef('hazard_class')
+        ).filter(~Exists(active.filter(dangerous_good=OuterRef('pk'))))
+        
+        latest_generic = active.filter(
+            dangerous_good__isnull=True,
+            hazard_class=OuterRef('hazard_class')
+        ).order_by('-effective_date', '-created_at').values('pk')[:1]
+        
+        return list(
+            active.filter(
+                Q(dangerous_good_id__in=dg_ids) |
+                Q(Exists(uncovered), dangerous_good__isnull=True, pk=Subquery(latest_generic))
+            ).select_related('dangerous_good').order_by('hazard_class', '-effective_date', 'epg_number')
+        )
     
     def _generate_plan_number(self, shipment: Shipment) -> str:
         """Generate unique plan number"""
@@ -145,8 +202,7 @@ class EmergencyPlanGenerator:
         
         for dg in dangerous_goods:
             hazard_classes.add(dg.hazard_class)
-            if dg.subsidiary_risk_classes:
-                subsidiary_risks.update(dg.subsidiary_risk_classes)
+            subsidiary_risks.update(subsidiary_risk_classes(dg))
         
         for epg in epgs:
             # Track highest severity level
@@ -173,7 +229,7 @@ class EmergencyPlanGenerator:
                     'proper_shipping_name': dg.proper_shipping_name,
                     'hazard_class': dg.hazard_class,
                     'packing_group': dg.packing_group,
-                    'subsidiary_risks': dg.subsidiary_risk_classes or []
+                    'subsidiary_risks': subsidiary_risk_classes(dg)
                 }
                 for dg in dangerous_goods
             ]
@@ -529,4 +585,4 @@ class EPGTemplateService:
                 'personal_protection': 'Acid-resistant suit, face shield, chemical-resistant gloves and boots',
                 'notification_requirements': 'Notify emergency services, poison control, and environmental authorities'
             }
-        }
\ No newline at end of file
+        }
\ No newline at end of file
@@ -11,6 +11,7 @@ from django.db.models import Q, Sum, Count
 from decimal import Decimal
 
 from shipments.models import Shipment, ConsignmentItem
+from shipments.hazard_profile import ShipmentHazardProfile
 from dangerous_goods.models import DangerousGood
 from .models import ERGContentIntelligence
 
@@ -101,12 +102,7 @@ class ShipmentAnalysisService:
 
     def _get_dangerous_goods_items(self, shipment: Shipment) -> List[ConsignmentItem]:
         """Get all dangerous goods items from shipment"""
-        return list(
-            shipment.items.filter(
-                is_dangerous_good=True,
-                dangerous_good_entry__isnull=False
-            ).select_related('dangerous_good_entry')
-        )
+        return ShipmentHazardProfile.for_shipment(shipment).classified_items
 
     def _extract_un_numbers_data(self, dangerous_items: List[ConsignmentItem]) -> Dict[str, Dict]:
         """
@@ -565,16 +561,7 @@ class ShipmentAnalysisService:
         
         This is the core method that drives UN number-based EPG generation.
         """
-        dangerous_items = self._get_dangerous_goods_items(shipment)
-        
-        un_numbers = []
-        for item in dangerous_items:
-            if item.dangerous_good_entry and item.dangerous_good_entry.un_number:
-                un_number = item.dangerous_good_entry.un_number
-                if un_number not in un_numbers:
-                    un_numbers.append(un_number)
-        
-        return sorted(un_numbers)
+        return ShipmentHazardProfile.for_shipment(shipment).un_numbers
 
     def get_erg_guides_for_shipment(self, shipment: Shipment) -> List[str]:
         """
@@ -583,16 +570,7 @@ class ShipmentAnalysisService:
         Returns:
             List of ERG guide numbers needed for emergency procedures
         """
-        dangerous_items = self._get_dangerous_goods_items(shipment)
-        
-        erg_guides = []
-        for item in dangerous_items:
-            if (item.dangerous_good_entry and 
-                item.dangerous_good_entry.erg_guide_number and
-                item.dangerous_good_entry.erg_guide_number not in erg_guides):
-                erg_guides.append(item.dangerous_good_entry.erg_guide_number)
-        
-        return sorted(erg_guides)
+        return ShipmentHazardProfile.for_shipment(shipment).erg_guides
 
     def get_enhanced_intelligence_for_shipment(self, shipment: Shipment) -> List[ERGContentIntelligence]:
         """
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import EmergencyProcedureGuide
+
+
+def _clear_plan_sections():
+    """
+    Drop memoized emergency plan sections now and again after commit, so a
+    plan generated while the transaction is open cannot re-cache old EPGs.
+    """
+    from .services import plan_sections_cache
+
+    plan_sections_cache.clear()
+    transaction.on_commit(plan_sections_cache.clear)
+
+
+@receiver(post_save, sender=EmergencyProcedureGuide)
+def epg_saved_receiver(sender, instance, **kwargs):
+    _clear_plan_sections()
+
+
+@receiver(post_delete, sender=EmergencyProcedureGuide)
+def epg_deleted_receiver(sender, instance, **kwargs):
+    _clear_plan_sections()
@@ -1,3 +1,88 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from dangerous_goods.models import DangerousGood
+from .models import EmergencyProcedureGuide, SeverityLevel
+from .services import EmergencyPlanGenerator, plan_sections_cache
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EmergencyPlanGeneratorTests(TestCase):
+    """Test set-based EPG resolution and memoized plan sections"""
+
+    def setUp(self):
+        cache.clear()
+        plan_sections_cache.memory.clear()
+        self.generator = EmergencyPlanGenerator()
+        self.gasoline = DangerousGood.objects.create(
+            un_number='UN1203', proper_shipping_name='Gasoline', hazard_class='3', packing_group='II'
+        )
+        self.ethanol = DangerousGood.objects.create(
+            un_number='UN1170', proper_shipping_name='Ethanol', hazard_class='3', packing_group='II'
+        )
+        self.acid = DangerousGood.objects.create(
+            un_number='UN1789', proper_shipping_name='Hydrochloric acid', hazard_class='8',
+            packing_group='II', subsidiary_risks='6.1, 5.1'
+        )
+        today = timezone.now().date()
+        self.gasoline_epg = self._epg('EPG-UN1203', '3', dangerous_good=self.gasoline)
+        self.old_class_3 = self._epg('EPG-HC3-OLD', '3', effective_date=today - timedelta(days=30))
+        self.class_3 = self._epg('EPG-HC3', '3', effective_date=today - timedelta(days=1))
+        self.class_8 = self._epg('EPG-HC8', '8', severity_level=SeverityLevel.CRITICAL)
+        self._epg('EPG-HC8-FUTURE', '8', effective_date=today + timedelta(days=1))
+        self._epg('EPG-HC8-DRAFT', '8', status='DRAFT')
+
+    def _epg(self, epg_number, hazard_class, status='ACTIVE', **kwargs):
+        return EmergencyProcedureGuide.objects.create(
+            epg_number=epg_number,
+            title=epg_number,
+            hazard_class=hazard_class,
+            immediate_actions=f"{epg_number} actions",
+            personal_protection='PPE',
+            fire_procedures=f"{epg_number} fire",
+            notification_requirements='Notify emergency services',
+            status=status,
+            **kwargs
+        )
+
+    def test_specific_epgs_take_precedence_over_generic(self):
+        with self.assertNumQueries(1):
+            epgs = self.generator._find_relevant_epgs([self.gasoline])
+
+        self.assertEqual(epgs, [self.gasoline_epg])
+
+    def test_uncovered_goods_fall_back_to_latest_generic_epg(self):
+        with self.assertNumQueries(1):
+            epgs = self.generator._find_relevant_epgs([self.gasoline, self.ethanol, self.acid])
+
+        self.assertEqual(set(epgs), {self.gasoline_epg, self.class_3, self.class_8})
+
+    def test_plan_sections_are_memoized_per_hazard_set(self):
+        first = self.generator._get_plan_sections([self.gasoline, self.acid])
+
+        with self.assertNumQueries(0):
+            second = self.generator._get_plan_sections([self.acid, self.gasoline])
+
+        self.assertEqual(second, first)
+        self.assertEqual(set(first['epg_ids']), {str(self.gasoline_epg.pk), str(self.class_8.pk)})
+        self.assertEqual(first['hazard_assessment']['overall_severity'], SeverityLevel.CRITICAL)
+        self.assertCountEqual(first['hazard_assessment']['subsidiary_risks'], ['6.1', '5.1'])
+
+    def test_epg_change_clears_memoized_sections(self):
+        self.generator._get_plan_sections([self.ethanol])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ethanol_epg = self._epg('EPG-UN1170', '3', dangerous_good=self.ethanol)
+
+        sections = self.generator._get_plan_sections([self.ethanol])
+        self.assertEqual(sections['epg_ids'], [str(ethanol_epg.pk)])
+
+    def test_no_applicable_epg_returns_none(self):
+        other = DangerousGood.objects.create(
+            un_number='UN1005', proper_shipping_name='Ammonia, anhydrous', hazard_class='2.3'
+        )
+
+        self.assertIsNone(self.generator._get_plan_sections([other]))
@@ -0,0 +1,79 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from companies.models import Company
+from dangerous_goods.models import DangerousGood
+from erp_integration.services import ERPManifestImportService
+from erp_integration.stub_erp import StubERPServer, create_stub_erp_system
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batch manifest import against a local stub ERP (all changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Manifests to import')
+        parser.add_argument('--latency', type=float, default=0.05, help='Stub ERP response time in seconds')
+        parser.add_argument('--dangerous-goods', type=int, default=3, help='Dangerous goods per manifest')
+        parser.add_argument('--concurrency', type=int, help='Concurrent fetches (default: ERP_IMPORT_CONCURRENCY)')
+        parser.add_argument('--rate', type=float, help='Requests per second (default: ERP_IMPORT_REQUESTS_PER_SECOND)')
+        parser.add_argument('--chunk-size', type=int, help='Manifests per transaction (default: ERP_IMPORT_CHUNK_SIZE)')
+        parser.add_argument(
+            '--sequential',
+            action='store_true',
+            help='Also time importing the same manifests one at a time with import_manifest_from_erp'
+        )
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['concurrency']:
+            overrides['ERP_IMPORT_CONCURRENCY'] = options['concurrency']
+        if options['rate'] is not None:
+            overrides['ERP_IMPORT_REQUESTS_PER_SECOND'] = options['rate']
+        if options['chunk_size']:
+            overrides['ERP_IMPORT_CHUNK_SIZE'] = options['chunk_size']
+
+        dangerous_goods = [
+            {'un_number': un_number, 'proper_shipping_name': name}
+            for un_number, name in DangerousGood.objects.values_list(
+                'un_number', 'proper_shipping_name'
+            )[:options['dangerous_goods']]
+        ]
+        references = [f'BENCH-{index:05d}' for index in range(options['count'])]
+
+        with StubERPServer(latency=options['latency'], dangerous_goods=dangerous_goods) as server, \
+                override_settings(**overrides):
+            with transaction.atomic():
+                company = Company.objects.create(name='Benchmark Carrier', company_type='CARRIER')
+                user = User.objects.create_user(
+                    username='erp-benchmark', email='erp-benchmark@example.com', password=None
+                )
+                erp_system = create_stub_erp_system(server, company, user, name='Benchmark stub ERP')
+                service = ERPManifestImportService(erp_system)
+
+                if options['sequential']:
+                    started = time.monotonic()
+                    for reference in references:
+                        service.import_manifest_from_erp(f'SEQ-{reference}')
+                    self._report('Sequential', len(references), time.monotonic() - started)
+
+                server.max_in_flight = 0
+                started = time.monotonic()
+                results = service.batch_import_manifests(references)
+                self._report('Batch', len(references), time.monotonic() - started)
+                self.stdout.write(
+                    f"  {results['success_count']} imported, {results['error_count']} failed, "
+                    f"{server.max_in_flight} requests in flight at most"
+                )
+
+                transaction.set_rollback(True)
+
+    def _report(self, label, count, elapsed):
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {count} manifests in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s)'
+        ))
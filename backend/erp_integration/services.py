@@ -1,12 +1,20 @@
 import json
 import requests
 import logging
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from celery import shared_task
+from requests.adapters import HTTPAdapter
 
 from .models import (
     ERPSystem, IntegrationEndpoint, DataSyncJob, ERPMapping,
@@ -15,7 +23,8 @@ from .models import (
 from shipments.models import Shipment
 from companies.models import Company
 from freight_types.models import FreightType
-from manifests.models import Manifest
+from manifests.models import Manifest, ManifestDangerousGoodMatch
+from dangerous_goods.models import DangerousGood
 
 logger = logging.getLogger(__name__)
 
@@ -130,9 +139,10 @@ class ERPIntegrationService:
         return sync_job
     
     def transform_data(self, data: Dict[str, Any], endpoint: IntegrationEndpoint, 
-                      direction: str) -> Dict[str, Any]:
-        """Transform data using field mappings"""
-        mappings = endpoint.field_mappings.filter(is_active=True)
+                      direction: str, mappings: Optional[List[ERPMapping]] = None) -> Dict[str, Any]:
+        """Transform data using field mappings (the endpoint's active ones unless given)"""
+        if mappings is None:
+            mappings = endpoint.field_mappings.filter(is_active=True)
         transformed = {}
         
         for mapping in mappings:
@@ -340,6 +350,91 @@ class ShipmentSyncService:
             return False
 
 
+DEFAULT_IMPORT_CONCURRENCY = 8
+DEFAULT_IMPORT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_IMPORT_CHUNK_SIZE = 50
+# Retries of a manifest fetch the ERP answered with 429 or 503
+MAX_THROTTLED_RETRIES = 2
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+class ERPRateLimiter:
+    """
+    Token bucket limiting requests to one ERP system, shared by every import
+    thread of this process. A rate of 0 means no limit.
+    """
+    
+    _limiters: Dict[Any, 'ERPRateLimiter'] = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def for_system(cls, erp_system: ERPSystem, rate: float) -> 'ERPRateLimiter':
+        with cls._registry_lock:
+            limiter = cls._limiters.get(erp_system.pk)
+            if limiter is None or limiter.rate != rate:
+                limiter = cls._limiters[erp_system.pk] = cls(rate)
+            return limiter
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _ManifestParties:
+    """
+    Customers, carriers and freight types for a chunk of manifests: existing
+    ones loaded with one query each, missing ones created up front, so the
+    manifests can be written without further lookups.
+    """
+    
+    def __init__(self, service: 'ERPManifestImportService', manifests: List[Dict[str, Any]]):
+        names = {m.get('customer_name', 'Unknown Customer') for m in manifests}
+        names |= {m.get('carrier_name', 'Unknown Carrier') for m in manifests}
+        self.companies = {}
+        for company in Company.objects.filter(name__in=names):
+            self.companies.setdefault(company.name, company)
+        for manifest_data in manifests:
+            customer_name = manifest_data.get('customer_name', 'Unknown Customer')
+            if customer_name not in self.companies:
+                self.companies[customer_name] = service._get_or_create_customer_company(manifest_data)
+            carrier_name = manifest_data.get('carrier_name', 'Unknown Carrier')
+            if carrier_name not in self.companies:
+                self.companies[carrier_name] = service._get_or_create_carrier_company(manifest_data)
+        
+        codes = {m.get('freight_type', 'GENERAL') for m in manifests}
+        self.freight_types = {ft.code: ft for ft in FreightType.objects.filter(code__in=codes)}
+        self.default_freight_type = self.freight_types.get('GENERAL')
+        if any(code not in self.freight_types for code in codes) and self.default_freight_type is None:
+            self.default_freight_type = service._get_or_create_freight_type({'freight_type': 'GENERAL'})
+    
+    def customer(self, manifest_data: Dict[str, Any]) -> Company:
+        return self.companies[manifest_data.get('customer_name', 'Unknown Customer')]
+    
+    def carrier(self, manifest_data: Dict[str, Any]) -> Company:
+        return self.companies[manifest_data.get('carrier_name', 'Unknown Carrier')]
+    
+    def freight_type(self, manifest_data: Dict[str, Any]) -> FreightType:
+        return self.freight_types.get(manifest_data.get('freight_type', 'GENERAL'), self.default_freight_type)
+
+
 class ERPManifestImportService:
     """Service for importing manifests from ERP systems"""
     
@@ -388,7 +483,7 @@ class ERPManifestImportService:
             
             # Import dangerous goods if requested
             dangerous_goods_count = 0
-            if import_dangerous_goods:
+            if import_dangerous_goods and manifest:
                 dangerous_goods_count = self._import_dangerous_goods(
                     manifest, transformed_data
                 )
@@ -451,167 +546,215 @@ class ERPManifestImportService:
     
     def _fetch_manifest_data(self, endpoint: IntegrationEndpoint, external_reference: str) -> Optional[Dict[str, Any]]:
         """Fetch manifest data from ERP system"""
-        try:
-            auth_config = self.erp_system.authentication_config
-            headers = self.integration_service._build_headers(auth_config)
-            
-            # Build URL with external reference
-            url = f"{self.erp_system.base_url.rstrip('/')}/{endpoint.path.lstrip('/')}/{external_reference}"
-            
-            response = requests.get(
-                url,
-                headers=headers,
-                timeout=30,
-                verify=auth_config.get('verify_ssl', True)
-            )
+        manifest_data, error = self._request_manifest(requests, endpoint, external_reference)
+        if error:
+            logger.error(f"Failed to fetch manifest data: {error}")
+        return manifest_data
+    
+    def _request_manifest(self, http, endpoint: IntegrationEndpoint, external_reference: str,
+                          limiter: Optional[ERPRateLimiter] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        GET one manifest with http (requests or a Session). Returns the data
+        and an error message, one of them None. Uses no database connection,
+        so it can run in fetch threads.
+        """
+        auth_config = self.erp_system.authentication_config
+        headers = self.integration_service._build_headers(auth_config)
+        
+        # Build URL with external reference
+        url = f"{self.erp_system.base_url.rstrip('/')}/{endpoint.path.lstrip('/')}/{external_reference}"
+        
+        for attempt in range(MAX_THROTTLED_RETRIES + 1):
+            if limiter:
+                limiter.acquire()
+            try:
+                response = http.get(
+                    url,
+                    headers=headers,
+                    timeout=30,
+                    verify=auth_config.get('verify_ssl', True)
+                )
+            except Exception as e:
+                return None, f'Error fetching manifest data: {str(e)}'
             
             if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Failed to fetch manifest data: {response.status_code} - {response.text}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error fetching manifest data: {str(e)}")
-            return None
+                try:
+                    return response.json(), None
+                except ValueError as e:
+                    return None, f'Invalid manifest data: {str(e)}'
+            
+            if response.status_code in (429, 503) and attempt < MAX_THROTTLED_RETRIES:
+                time.sleep(self._retry_after(response))
+                continue
+            return None, f'HTTP {response.status_code}: {response.text[:200]}'
+    
+    @staticmethod
+    def _retry_after(response) -> float:
+        try:
+            return min(float(response.headers.get('Retry-After', 1)), MAX_RETRY_AFTER_SECONDS)
+        except ValueError:
+            return 1.0
     
     def _create_shipment_from_manifest(self, manifest_data: Dict[str, Any], 
                                      external_reference: str, 
                                      preserve_external_ids: bool = True) -> Optional['Shipment']:
         """Create SafeShipper shipment from manifest data"""
         try:
-            from companies.models import Company
-            from freight_types.models import FreightType
-            
-            # Get customer company (this would need to be mapped from ERP data)
-            customer_company = self._get_or_create_customer_company(manifest_data)
-            
-            # Get carrier company (this would need to be mapped from ERP data)
-            carrier_company = self._get_or_create_carrier_company(manifest_data)
-            
-            # Get freight type
-            freight_type = self._get_or_create_freight_type(manifest_data)
-            
-            # Create shipment
-            shipment_data = {
-                'reference_number': external_reference if preserve_external_ids else None,
-                'customer': customer_company,
-                'carrier': carrier_company,
-                'freight_type': freight_type,
-                'origin_location': manifest_data.get('origin_location', ''),
-                'destination_location': manifest_data.get('destination_location', ''),
-                'status': 'PENDING',
-                'instructions': manifest_data.get('special_instructions', ''),
-                'dead_weight_kg': manifest_data.get('weight_kg'),
-                'volumetric_weight_m3': manifest_data.get('volume_m3'),
-                'estimated_pickup_date': self._parse_date(manifest_data.get('pickup_date')),
-                'estimated_delivery_date': self._parse_date(manifest_data.get('delivery_date')),
-            }
-            
-            # Remove None values
-            shipment_data = {k: v for k, v in shipment_data.items() if v is not None}
-            
-            shipment = Shipment.objects.create(**shipment_data)
-            
-            # Generate tracking number if not preserving external IDs
-            if not preserve_external_ids:
-                from shipments.models import generate_tracking_number
-                shipment.tracking_number = generate_tracking_number()
-                shipment.save()
-            
-            return shipment
-            
+            return self._save_shipment(manifest_data, external_reference, preserve_external_ids)
         except Exception as e:
             logger.error(f"Failed to create shipment from manifest: {str(e)}")
             return None
     
+    def _save_shipment(self, manifest_data: Dict[str, Any], external_reference: str,
+                       preserve_external_ids: bool = True,
+                       parties: Optional[_ManifestParties] = None) -> Shipment:
+        """Create the shipment for manifest_data; raises on failure"""
+        if parties:
+            customer_company = parties.customer(manifest_data)
+            carrier_company = parties.carrier(manifest_data)
+            freight_type = parties.freight_type(manifest_data)
+        else:
+            # Get customer and carrier companies (this would need to be mapped from ERP data)
+            customer_company = self._get_or_create_customer_company(manifest_data)
+            carrier_company = self._get_or_create_carrier_company(manifest_data)
+            freight_type = self._get_or_create_freight_type(manifest_data)
+        
+        shipment_data = {
+            'reference_number': external_reference if preserve_external_ids else None,
+            'customer': customer_company,
+            'carrier': carrier_company,
+            'freight_type': freight_type,
+            'origin_location': manifest_data.get('origin_location', ''),
+            'destination_location': manifest_data.get('destination_location', ''),
+            'status': 'PENDING',
+            'instructions': manifest_data.get('special_instructions', ''),
+            'dead_weight_kg': manifest_data.get('weight_kg'),
+            'volumetric_weight_m3': manifest_data.get('volume_m3'),
+            'estimated_pickup_date': self._parse_date(manifest_data.get('pickup_date')),
+            'estimated_delivery_date': self._parse_date(manifest_data.get('delivery_date')),
+        }
+        
+        # Remove None values; Shipment.save() generates the tracking number
+        shipment_data = {k: v for k, v in shipment_data.items() if v is not None}
+        
+        return Shipment.objects.create(**shipment_data)
+    
     def _create_manifest_record(self, manifest_data: Dict[str, Any], 
                                external_reference: str, 
                                manifest_type: str, 
                                shipment: Optional[Shipment] = None) -> Optional['Manifest']:
         """Create SafeShipper manifest record"""
         try:
-            from manifests.models import Manifest, ManifestType
-            from documents.models import Document
-            
-            # Map manifest type
-            manifest_type_mapping = {
-                'shipment': ManifestType.PACKING_LIST,
-                'invoice': ManifestType.COMMERCIAL_INVOICE,
-                'packing_list': ManifestType.PACKING_LIST,
-                'customs': ManifestType.CUSTOMS_DECLARATION
-            }
-            
-            mapped_type = manifest_type_mapping.get(manifest_type, ManifestType.PACKING_LIST)
-            
-            # Create document record first
-            document = Document.objects.create(
-                name=f"ERP Manifest - {external_reference}",
-                document_type='manifest',
-                file_size=0,  # ERP imported, no file
-                description=f"Manifest imported from ERP system: {self.erp_system.name}"
-            )
-            
-            # Create manifest
-            manifest = Manifest.objects.create(
-                document=document,
-                shipment=shipment,
-                manifest_type=mapped_type,
-                status='CONFIRMED',  # ERP data is pre-confirmed
-                file_name=f"erp_manifest_{external_reference}",
-                analysis_results={'source': 'erp_import', 'external_reference': external_reference}
-            )
-            
-            return manifest
-            
+            return self._save_manifest_record(manifest_data, external_reference, manifest_type, shipment)
         except Exception as e:
             logger.error(f"Failed to create manifest record: {str(e)}")
             return None
     
+    def _save_manifest_record(self, manifest_data: Dict[str, Any], external_reference: str,
+                              manifest_type: str, shipment: Optional[Shipment] = None) -> Optional['Manifest']:
+        """Create the document and manifest records; raises on failure"""
+        from manifests.models import ManifestType
+        from documents.models import Document
+        
+        # A manifest belongs to a shipment
+        if shipment is None:
+            return None
+        
+        # Map manifest type
+        manifest_type_mapping = {
+            'shipment': ManifestType.PACKING_LIST,
+            'invoice': ManifestType.COMMERCIAL_INVOICE,
+            'packing_list': ManifestType.PACKING_LIST,
+            'customs': ManifestType.CUSTOMS_DECLARATION
+        }
+        
+        mapped_type = manifest_type_mapping.get(manifest_type, ManifestType.PACKING_LIST)
+        file_name = f"erp_manifest_{external_reference}"
+        
+        # Create document record first; the document types share the manifest type values
+        document = Document.objects.create(
+            document_type=mapped_type,
+            original_filename=file_name,
+            mime_type='application/json',
+            file_size=0,  # ERP imported, no file
+            shipment=shipment,
+            validation_results={
+                'source': 'erp_import',
+                'description': f"Manifest imported from ERP system: {self.erp_system.name}"
+            }
+        )
+        
+        return Manifest.objects.create(
+            document=document,
+            shipment=shipment,
+            manifest_type=mapped_type,
+            status='CONFIRMED',  # ERP data is pre-confirmed
+            file_name=file_name,
+            analysis_results={'source': 'erp_import', 'external_reference': external_reference}
+        )
+    
     def _import_dangerous_goods(self, manifest: 'Manifest', manifest_data: Dict[str, Any]) -> int:
         """Import dangerous goods from manifest data"""
         try:
-            from dangerous_goods.models import DangerousGood
-            from manifests.models import ManifestDangerousGoodMatch
-            
-            dangerous_goods_items = manifest_data.get('dangerous_goods', [])
-            imported_count = 0
-            
-            for dg_item in dangerous_goods_items:
-                # Try to find matching dangerous good
-                un_number = dg_item.get('un_number')
-                proper_name = dg_item.get('proper_shipping_name')
-                
-                dangerous_good = None
-                
-                if un_number:
-                    dangerous_good = DangerousGood.objects.filter(
-                        un_number=un_number
-                    ).first()
-                
-                if not dangerous_good and proper_name:
-                    dangerous_good = DangerousGood.objects.filter(
-                        proper_shipping_name__icontains=proper_name
-                    ).first()
-                
-                if dangerous_good:
-                    # Create manifest match
-                    ManifestDangerousGoodMatch.objects.create(
-                        manifest=manifest,
-                        dangerous_good=dangerous_good,
-                        found_text=dg_item.get('description', proper_name or un_number),
-                        match_type='EXACT_SYNONYM',
-                        confidence_score=1.0,
-                        is_confirmed=True  # ERP data is pre-confirmed
-                    )
-                    imported_count += 1
-            
-            return imported_count
+            dangerous_goods_items = manifest_data.get('dangerous_goods') or []
+            matches = self._build_dangerous_good_matches(
+                manifest, dangerous_goods_items, self._match_dangerous_goods(dangerous_goods_items)
+            )
+            ManifestDangerousGoodMatch.objects.bulk_create(matches)
+            return len(matches)
             
         except Exception as e:
             logger.error(f"Failed to import dangerous goods: {str(e)}")
             return 0
     
+    def _match_dangerous_goods(self, dangerous_goods_items: List[Dict[str, Any]]) -> List[Optional[DangerousGood]]:
+        """
+        The dangerous good each item refers to, by UN number, else by proper
+        shipping name, or None. Two queries however many items there are.
+        """
+        un_numbers = {item.get('un_number') for item in dangerous_goods_items if item.get('un_number')}
+        by_un_number = {}
+        if un_numbers:
+            for dangerous_good in DangerousGood.objects.filter(un_number__in=un_numbers):
+                by_un_number.setdefault(dangerous_good.un_number, dangerous_good)
+        
+        names = {
+            item.get('proper_shipping_name') for item in dangerous_goods_items
+            if item.get('proper_shipping_name') and item.get('un_number') not in by_un_number
+        }
+        by_name = {}
+        if names:
+            name_query = Q()
+            for name in names:
+                name_query |= Q(proper_shipping_name__icontains=name)
+            candidates = list(DangerousGood.objects.filter(name_query))
+            for name in names:
+                needle = name.lower()
+                by_name[name] = next(
+                    (dg for dg in candidates if needle in dg.proper_shipping_name.lower()), None
+                )
+        
+        return [
+            by_un_number.get(item.get('un_number')) or by_name.get(item.get('proper_shipping_name'))
+            for item in dangerous_goods_items
+        ]
+    
+    def _build_dangerous_good_matches(self, manifest: 'Manifest', dangerous_goods_items: List[Dict[str, Any]],
+                                      dangerous_goods: List[Optional[DangerousGood]]) -> List[ManifestDangerousGoodMatch]:
+        """Unsaved matches for the items a dangerous good was found for"""
+        matches = []
+        for dg_item, dangerous_good in zip(dangerous_goods_items, dangerous_goods):
+            if dangerous_good:
+                matches.append(ManifestDangerousGoodMatch(
+                    manifest=manifest,
+                    dangerous_good=dangerous_good,
+                    found_text=dg_item.get('description') or dg_item.get('proper_shipping_name') or dg_item.get('un_number'),
+                    match_type='EXACT_SYNONYM',
+                    confidence_score=1.0,
+                    is_confirmed=True  # ERP data is pre-confirmed
+                ))
+        return matches
+    
     def _get_or_create_customer_company(self, manifest_data: Dict[str, Any]) -> 'Company':
         """Get or create customer company from manifest data"""
         try:
@@ -748,44 +891,281 @@ class ERPManifestImportService:
     
     def batch_import_manifests(self, external_references: List[str], 
                               manifest_type: str = 'shipment',
+                              sync_job: Optional[DataSyncJob] = None,
                               **kwargs) -> Dict[str, Any]:
-        """Import multiple manifests in batch"""
+        """
+        Import multiple manifests in batch.
+        
+        Manifests are fetched by a pool of threads, within the ERP system's
+        concurrency and request rate limits (ERPConfiguration keys
+        manifest_import_concurrency and manifest_import_requests_per_second,
+        else the ERP_IMPORT_* settings), while the manifests already fetched
+        are written. Writes happen in chunks of ERP_IMPORT_CHUNK_SIZE, each in
+        one transaction with one dangerous goods lookup for the whole chunk;
+        a manifest that fails to write is rolled back alone.
+        
+        Every chunk commits a checkpoint of the references imported and
+        failed on the batch's DataSyncJob. To finish a batch that failed or
+        was interrupted, pass that job as sync_job, or use
+        resume_batch_import(): imported references are skipped and failed
+        ones are retried.
+        """
+        options = {
+            'import_dangerous_goods': kwargs.get('import_dangerous_goods', True),
+            'create_shipment': kwargs.get('create_shipment', True),
+            'preserve_external_ids': kwargs.get('preserve_external_ids', True),
+        }
+        references = list(dict.fromkeys(external_references))
         results = {
             'successful': [],
             'failed': [],
-            'total': len(external_references),
+            'total': len(references),
             'success_count': 0,
-            'error_count': 0
+            'error_count': 0,
+            'skipped_count': 0,
+            'sync_job_id': None
         }
         
-        for external_reference in external_references:
+        endpoint = self._find_manifest_endpoint(manifest_type)
+        if not endpoint:
+            error = f'No active endpoint found for manifest type: {manifest_type}'
+            results['failed'] = [{'external_reference': ref, 'error': error} for ref in references]
+            results['error_count'] = len(references)
+            return results
+        
+        if sync_job is None:
+            sync_job = DataSyncJob.objects.create(
+                erp_system=self.erp_system,
+                endpoint=endpoint,
+                job_type='bulk',
+                direction='pull',
+                request_payload={
+                    'operation': 'manifest_import',
+                    'external_references': references,
+                    'manifest_type': manifest_type,
+                    'options': options
+                }
+            )
+        results['sync_job_id'] = str(sync_job.id)
+        
+        completed = sync_job.response_data.get('completed', {})
+        pending = [ref for ref in references if ref not in completed]
+        results['skipped_count'] = len(references) - len(pending)
+        
+        sync_job.status = 'running'
+        sync_job.started_at = sync_job.started_at or timezone.now()
+        sync_job.completed_at = None
+        sync_job.save(update_fields=['status', 'started_at', 'completed_at'])
+        
+        mappings = list(endpoint.field_mappings.filter(is_active=True))
+        try:
+            with closing(self._fetch_manifests_pipelined(endpoint, pending)) as chunks:
+                for chunk in chunks:
+                    self._import_manifest_chunk(sync_job, endpoint, mappings, chunk, manifest_type, options, results)
+        except Exception as e:
+            # The checkpoint holds every chunk written so far
+            logger.error(f"Batch manifest import {sync_job.id} stopped: {str(e)}")
+            sync_job.status = 'failed'
+            sync_job.error_message = str(e)
+            sync_job.completed_at = timezone.now()
+            sync_job.save(update_fields=['status', 'error_message', 'completed_at'])
+            raise
+        
+        failures = sync_job.response_data.get('failed', {})
+        if not failures:
+            sync_job.status = 'completed'
+        else:
+            sync_job.status = 'partial' if sync_job.response_data.get('completed') else 'failed'
+        sync_job.error_message = ''
+        sync_job.completed_at = timezone.now()
+        sync_job.save(update_fields=['status', 'error_message', 'completed_at'])
+        
+        return results
+    
+    def resume_batch_import(self, sync_job: DataSyncJob) -> Dict[str, Any]:
+        """Finish the batch import checkpointed on sync_job"""
+        payload = sync_job.request_payload
+        return self.batch_import_manifests(
+            payload.get('external_references', []),
+            payload.get('manifest_type', 'shipment'),
+            sync_job=sync_job,
+            **payload.get('options', {})
+        )
+    
+    def _fetch_manifests_pipelined(self, endpoint: IntegrationEndpoint, references: List[str]):
+        """
+        Yield (reference, data, error) in chunks, in reference order. The next
+        two chunks are fetched in threads while the caller writes a chunk.
+        """
+        config = self.integration_service.config
+        concurrency = max(1, int(config.get(
+            'manifest_import_concurrency',
+            getattr(settings, 'ERP_IMPORT_CONCURRENCY', DEFAULT_IMPORT_CONCURRENCY)
+        )))
+        rate = float(config.get(
+            'manifest_import_requests_per_second',
+            getattr(settings, 'ERP_IMPORT_REQUESTS_PER_SECOND', DEFAULT_IMPORT_REQUESTS_PER_SECOND)
+        ))
+        chunk_size = max(1, getattr(settings, 'ERP_IMPORT_CHUNK_SIZE', DEFAULT_IMPORT_CHUNK_SIZE))
+        limiter = ERPRateLimiter.for_system(self.erp_system, rate)
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        remaining = iter(references)
+        in_flight = deque()
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='erp-manifest-fetch')
+        
+        def submit_next():
+            for reference in islice(remaining, max(0, 2 * chunk_size - len(in_flight))):
+                in_flight.append((reference, executor.submit(
+                    self._request_manifest, session, endpoint, reference, limiter
+                )))
+        
+        try:
+            submit_next()
+            while in_flight:
+                chunk = []
+                while in_flight and len(chunk) < chunk_size:
+                    reference, future = in_flight.popleft()
+                    chunk.append((reference,) + future.result())
+                submit_next()
+                yield chunk
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+            session.close()
+    
+    def _import_manifest_chunk(self, sync_job: DataSyncJob, endpoint: IntegrationEndpoint,
+                               mappings: List[ERPMapping], chunk: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+                               manifest_type: str, options: Dict[str, bool], results: Dict[str, Any]):
+        """Write a chunk of fetched manifests, and the checkpoint, in one transaction"""
+        imported = {}
+        failed = {}
+        fetched = []
+        for reference, manifest_data, error in chunk:
+            if error:
+                failed[reference] = f'Failed to fetch manifest data for reference {reference}: {error}'
+            else:
+                fetched.append((reference, self.integration_service.transform_data(
+                    manifest_data, endpoint, 'pull', mappings=mappings
+                )))
+        
+        checkpoint = sync_job.response_data
+        try:
+            with transaction.atomic():
+                if fetched:
+                    imported = self._write_manifests(sync_job, fetched, manifest_type, options, failed)
+                self._save_checkpoint(sync_job, imported, failed)
+        except Exception as e:
+            logger.error(f"Failed to write manifest chunk for batch {sync_job.id}: {str(e)}")
+            sync_job.response_data = checkpoint
+            imported = {}
+            for reference, _ in fetched:
+                failed.setdefault(reference, f'Failed to import manifest: {str(e)}')
+            self._save_checkpoint(sync_job, {}, failed)
+        
+        ERPEventLog.objects.bulk_create([
+            ERPEventLog(
+                erp_system=self.erp_system,
+                sync_job=sync_job,
+                event_type='manifest_import_failed',
+                severity='error',
+                message=f'Failed to import manifest: {reference}',
+                details={'external_reference': reference, 'error': error}
+            )
+            for reference, error in failed.items()
+        ])
+        
+        for reference, imported_ids in imported.items():
+            results['successful'].append({
+                'external_reference': reference,
+                'shipment_id': imported_ids['shipment_id'],
+                'manifest_id': imported_ids['manifest_id']
+            })
+        for reference, error in failed.items():
+            results['failed'].append({'external_reference': reference, 'error': error})
+        results['success_count'] += len(imported)
+        results['error_count'] += len(failed)
+    
+    def _write_manifests(self, sync_job: DataSyncJob, fetched: List[Tuple[str, Dict[str, Any]]],
+                         manifest_type: str, options: Dict[str, bool], failed: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Create the shipments, manifests and dangerous goods matches of a chunk,
+        each manifest in a savepoint. Adds write failures to failed and returns
+        the imported references.
+        """
+        parties = _ManifestParties(self, [data for _, data in fetched]) if options['create_shipment'] else None
+        
+        items_by_reference = {
+            reference: (manifest_data.get('dangerous_goods') or []) if options['import_dangerous_goods'] else []
+            for reference, manifest_data in fetched
+        }
+        matched = iter(self._match_dangerous_goods(
+            [item for items in items_by_reference.values() for item in items]
+        ))
+        
+        imported = {}
+        matches = []
+        events = []
+        for reference, manifest_data in fetched:
+            items = items_by_reference[reference]
+            dangerous_goods = [next(matched) for _ in items]
             try:
-                result = self.import_manifest_from_erp(
-                    external_reference, manifest_type, **kwargs
-                )
-                
-                if result['success']:
-                    results['successful'].append({
-                        'external_reference': external_reference,
-                        'shipment_id': result.get('shipment_id'),
-                        'manifest_id': result.get('manifest_id')
-                    })
-                    results['success_count'] += 1
-                else:
-                    results['failed'].append({
-                        'external_reference': external_reference,
-                        'error': result.get('error')
-                    })
-                    results['error_count'] += 1
-                    
+                with transaction.atomic():
+                    shipment = None
+                    if options['create_shipment']:
+                        shipment = self._save_shipment(
+                            manifest_data, reference, options['preserve_external_ids'], parties
+                        )
+                    manifest = self._save_manifest_record(manifest_data, reference, manifest_type, shipment)
             except Exception as e:
-                results['failed'].append({
-                    'external_reference': external_reference,
-                    'error': str(e)
-                })
-                results['error_count'] += 1
+                failed[reference] = f'Failed to import manifest: {str(e)}'
+                continue
+            
+            manifest_matches = self._build_dangerous_good_matches(manifest, items, dangerous_goods) if manifest else []
+            matches.extend(manifest_matches)
+            details = {
+                'external_reference': reference,
+                'manifest_type': manifest_type,
+                'shipment_id': str(shipment.id) if shipment else None,
+                'manifest_id': str(manifest.id) if manifest else None,
+                'dangerous_goods_count': len(manifest_matches)
+            }
+            imported[reference] = {
+                'shipment_id': details['shipment_id'],
+                'manifest_id': details['manifest_id'],
+                'dangerous_goods_found': details['dangerous_goods_count']
+            }
+            events.append(ERPEventLog(
+                erp_system=self.erp_system,
+                sync_job=sync_job,
+                event_type='manifest_imported',
+                severity='info',
+                message=f'Successfully imported manifest: {reference}',
+                details=details
+            ))
         
-        return results
+        ManifestDangerousGoodMatch.objects.bulk_create(matches)
+        ERPEventLog.objects.bulk_create(events)
+        return imported
+    
+    def _save_checkpoint(self, sync_job: DataSyncJob, imported: Dict[str, Dict[str, Any]], failed: Dict[str, str]):
+        """Record references imported and failed so far on the batch job"""
+        completed = {**sync_job.response_data.get('completed', {}), **imported}
+        failures = {
+            reference: error
+            for reference, error in {**sync_job.response_data.get('failed', {}), **failed}.items()
+            if reference not in completed
+        }
+        sync_job.response_data = {**sync_job.response_data, 'completed': completed, 'failed': failures}
+        sync_job.records_successful = len(completed)
+        sync_job.records_failed = len(failures)
+        sync_job.records_processed = len(completed) + len(failures)
+        sync_job.save(update_fields=['response_data', 'records_successful', 'records_failed', 'records_processed'])
 
 
 class ERPDataMappingService:
@@ -903,6 +1283,19 @@ def sync_data_async(sync_job_id: str, data: Optional[Dict[str, Any]] = None):
             pass
 
 
+@shared_task
+def batch_import_manifests_async(erp_system_id: str, external_references: Optional[List[str]] = None,
+                                 manifest_type: str = 'shipment', sync_job_id: Optional[str] = None,
+                                 **options) -> Dict[str, Any]:
+    """Batch manifest import; with sync_job_id, resume that batch from its checkpoint"""
+    erp_system = ERPSystem.objects.get(id=erp_system_id)
+    service = ERPManifestImportService(erp_system)
+    if sync_job_id:
+        sync_job = DataSyncJob.objects.get(id=sync_job_id, erp_system=erp_system)
+        return service.resume_batch_import(sync_job)
+    return service.batch_import_manifests(external_references or [], manifest_type, **options)
+
+
 def _execute_push_sync(sync_job: DataSyncJob, integration_service: ERPIntegrationService,
                       data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     """Execute push synchronization"""
@@ -0,0 +1,149 @@
+"""
+Local stand-in for an ERP system's manifest endpoint, for benchmarking and
+testing manifest imports without a real ERP.
+
+StubERPServer serves GET <path>/<reference> from a thread with a generated
+manifest after a fixed latency, and records what was requested and how many
+requests were in flight at once. create_stub_erp_system() registers it as an
+ERP system whose endpoint maps the manifest fields one to one.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+
+from .models import ERPMapping, ERPSystem, IntegrationEndpoint
+
+STUB_MANIFEST_PATH = '/api/manifests'
+
+# Manifest fields the stub endpoint's mappings copy unchanged
+STUB_MAPPED_FIELDS = [
+    'customer_name', 'carrier_name', 'freight_type', 'origin_location', 'destination_location',
+    'special_instructions', 'weight_kg', 'dangerous_goods',
+]
+
+
+class StubERPServer:
+    """
+    HTTP server answering manifest requests on 127.0.0.1. References in
+    missing get a 404; every manifest lists dangerous_goods, a list of
+    {un_number, proper_shipping_name} dicts.
+    """
+
+    def __init__(self, latency: float = 0.0, missing: Sequence[str] = (),
+                 dangerous_goods: Optional[List[Dict[str, str]]] = None, path: str = STUB_MANIFEST_PATH):
+        self.latency = latency
+        self.missing = set(missing)
+        self.dangerous_goods = dangerous_goods or []
+        self.path = path.rstrip('/')
+        self.requested: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def manifest(self, reference: str) -> Dict[str, Any]:
+        number = sum(reference.encode())
+        return {
+            'reference': reference,
+            'customer_name': f'Stub Customer {number % 10}',
+            'carrier_name': f'Stub Carrier {number % 3}',
+            'freight_type': 'GENERAL',
+            'origin_location': 'Perth WA',
+            'destination_location': 'Port Hedland WA',
+            'special_instructions': f'Imported from stub ERP ({reference})',
+            'weight_kg': 1000 + number % 500,
+            'dangerous_goods': self.dangerous_goods,
+        }
+
+    def start(self) -> 'StubERPServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'StubERPServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _handle(self, path: str):
+        prefix = f'{self.path}/'
+        if not path.startswith(prefix):
+            return 404, {'error': 'not found'}
+        reference = path[len(prefix):]
+        with self._lock:
+            self.requested.append(reference)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if reference in self.missing:
+                return 404, {'error': f'Manifest {reference} not found'}
+            return 200, self.manifest(reference)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = stub._handle(self.path)
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def create_stub_erp_system(server: StubERPServer, company, user, name: str = 'Stub ERP') -> ERPSystem:
+    """An active ERP system pulling manifests from server"""
+    erp_system = ERPSystem.objects.create(
+        name=name,
+        system_type='custom',
+        connection_type='rest_api',
+        company=company,
+        base_url=server.base_url,
+        authentication_config={'type': 'api_key', 'api_key': 'stub-key'},
+        status='active',
+        created_by=user,
+    )
+    endpoint = IntegrationEndpoint.objects.create(
+        erp_system=erp_system,
+        name='Stub manifests',
+        endpoint_type='shipments',
+        path=server.path,
+        http_method='GET',
+        sync_direction='pull',
+    )
+    ERPMapping.objects.bulk_create([
+        ERPMapping(erp_system=erp_system, endpoint=endpoint, safeshipper_field=field, erp_field=field)
+        for field in STUB_MAPPED_FIELDS
+    ])
+    return erp_system
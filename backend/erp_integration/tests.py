@@ -0,0 +1,121 @@
+# erp_integration/tests.py
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from companies.models import Company
+from dangerous_goods.models import DangerousGood
+from manifests.models import Manifest, ManifestDangerousGoodMatch
+from shipments.models import Shipment
+from .models import DataSyncJob
+from .services import ERPManifestImportService, ERPRateLimiter
+from .stub_erp import StubERPServer, create_stub_erp_system
+
+User = get_user_model()
+
+
+@override_settings(ERP_IMPORT_CHUNK_SIZE=2, ERP_IMPORT_CONCURRENCY=4, ERP_IMPORT_REQUESTS_PER_SECOND=0)
+class BatchManifestImportTests(TestCase):
+    """Test pipelined, chunked and resumable batch manifest imports"""
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Import Carrier', company_type='CARRIER')
+        self.user = User.objects.create_user(
+            username='erp-import@test.com', email='erp-import@test.com', password='testpass123',
+            company=self.company
+        )
+        DangerousGood.objects.create(un_number='UN1090', proper_shipping_name='Acetone', hazard_class='3')
+        self.server = StubERPServer(dangerous_goods=[
+            {'un_number': 'UN1090', 'proper_shipping_name': 'Acetone'},
+            {'proper_shipping_name': 'acetone', 'description': 'Acetone, drums'},
+            {'un_number': 'UN9999', 'proper_shipping_name': 'Unknown substance'},
+        ]).start()
+        self.addCleanup(self.server.stop)
+        self.erp_system = create_stub_erp_system(self.server, self.company, self.user)
+        self.service = ERPManifestImportService(self.erp_system)
+        self.references = [f'REF-{index}' for index in range(6)]
+
+    def test_batch_import_writes_manifests(self):
+        results = self.service.batch_import_manifests(self.references)
+
+        self.assertEqual(results['success_count'], 6)
+        self.assertEqual(results['error_count'], 0)
+        self.assertEqual(
+            set(Shipment.objects.values_list('reference_number', flat=True)), set(self.references)
+        )
+        self.assertEqual(Manifest.objects.count(), 6)
+        # Two of the three items match a dangerous good
+        self.assertEqual(ManifestDangerousGoodMatch.objects.count(), 12)
+        names = list(Company.objects.filter(name__startswith='Stub ').values_list('name', flat=True))
+        self.assertEqual(len(names), len(set(names)))
+
+        job = DataSyncJob.objects.get(id=results['sync_job_id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(set(job.response_data['completed']), set(self.references))
+        self.assertEqual(job.records_successful, 6)
+
+    def test_failed_references_are_retried_on_resume(self):
+        self.server.missing = {'REF-2'}
+        results = self.service.batch_import_manifests(self.references)
+
+        self.assertEqual(results['success_count'], 5)
+        self.assertEqual([failure['external_reference'] for failure in results['failed']], ['REF-2'])
+        job = DataSyncJob.objects.get(id=results['sync_job_id'])
+        self.assertEqual(job.status, 'partial')
+
+        self.server.missing = set()
+        self.server.requested = []
+        results = self.service.resume_batch_import(job)
+
+        self.assertEqual(self.server.requested, ['REF-2'])
+        self.assertEqual(results['skipped_count'], 5)
+        self.assertEqual(Shipment.objects.count(), 6)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.response_data['failed'], {})
+
+    def test_interrupted_batch_resumes_after_last_checkpoint(self):
+        import_chunk = ERPManifestImportService._import_manifest_chunk
+        chunks = []
+
+        def interrupted(service, *args, **kwargs):
+            if len(chunks) == 2:
+                raise RuntimeError('Worker lost')
+            chunks.append(args)
+            return import_chunk(service, *args, **kwargs)
+
+        with patch.object(ERPManifestImportService, '_import_manifest_chunk', autospec=True,
+                          side_effect=interrupted):
+            with self.assertRaises(RuntimeError):
+                self.service.batch_import_manifests(self.references)
+
+        job = DataSyncJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(set(job.response_data['completed']), set(self.references[:4]))
+
+        self.server.requested = []
+        self.service.resume_batch_import(job)
+
+        self.assertEqual(self.server.requested, self.references[4:])
+        self.assertEqual(Shipment.objects.count(), 6)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_fetches_run_concurrently_within_limit(self):
+        self.server.latency = 0.05
+        references = [f'SLOW-{index}' for index in range(12)]
+
+        results = self.service.batch_import_manifests(references)
+
+        self.assertEqual(results['success_count'], 12)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+
+    def test_rate_limiter_spaces_requests_after_burst(self):
+        limiter = ERPRateLimiter(50)
+        started = time.monotonic()
+        for _ in range(60):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
@@ -8,7 +8,7 @@ from companies.models import Company
 from shipments.models import Shipment
 from documents.models import Document
 from freight_types.models import FreightType 
-from simple_history.models import HistoricalRecords
+from shared.history import DeferredHistoricalRecords
 from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
@@ -48,7 +48,7 @@ class AssessmentTemplate(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     # History tracking
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         ordering = ['-created_at']
@@ -282,7 +282,7 @@ class HazardAssessment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     # History tracking
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
     
     class Meta:
         ordering = ['-created_at']
@@ -1,6 +1,9 @@
 """
 Google Maps API integration service for SafeShipper dangerous goods logistics.
 Provides geocoding, reverse geocoding, and route optimization services.
+
+Geocoding, reverse geocoding, directions and distance matrix results are
+cached persistently and shared between workers (see locations/maps_cache.py).
 """
 
 import logging
@@ -8,12 +11,16 @@ import requests
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.core.cache import cache
 # from django.contrib.gis.geos import Point  # Disabled for now - requires GDAL
 from decouple import config
 
+from . import maps_cache
+from .maps_cache import cache_key, cached_lookup, normalize_address, normalize_location, round_coordinate
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_API_BASE_URL = 'https://maps.googleapis.com/maps/api'
+
 
 class GoogleMapsService:
     """
@@ -21,9 +28,9 @@ class GoogleMapsService:
     Optimized for Australian dangerous goods transport requirements.
     """
     
-    def __init__(self):
-        self.api_key = config('GOOGLE_MAPS_API_KEY', default='')
-        self.base_url = 'https://maps.googleapis.com/maps/api'
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        self.api_key = api_key if api_key is not None else config('GOOGLE_MAPS_API_KEY', default='')
+        self.base_url = (base_url or getattr(settings, 'GOOGLE_MAPS_API_BASE_URL', DEFAULT_API_BASE_URL)).rstrip('/')
         self.session = requests.Session()
         
         if not self.api_key:
@@ -67,36 +74,30 @@ class GoogleMapsService:
         Returns:
             Dict with lat, lng, formatted_address, and place_id
         """
-        cache_key = f"geocode:{address}:{region}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            return cached_result
-        
-        params = {
-            'address': address,
-            'region': region,
-            'components': f'country:{region.upper()}'  # Restrict to Australia
-        }
-        
-        data = self._make_request('geocode/json', params)
-        if not data or not data.get('results'):
-            return None
-        
-        result = data['results'][0]
-        location = result['geometry']['location']
-        
-        geocoded = {
-            'lat': location['lat'],
-            'lng': location['lng'],
-            'formatted_address': result['formatted_address'],
-            'place_id': result['place_id'],
-            'address_components': result.get('address_components', []),
-            'geometry': result['geometry']
-        }
-        
-        # Cache for 24 hours
-        cache.set(cache_key, geocoded, 86400)
-        return geocoded
+        def fetch():
+            params = {
+                'address': address,
+                'region': region,
+                'components': f'country:{region.upper()}'  # Restrict to Australia
+            }
+            
+            data = self._make_request('geocode/json', params)
+            if not data or not data.get('results'):
+                return None
+            
+            result = data['results'][0]
+            location = result['geometry']['location']
+            
+            return {
+                'lat': location['lat'],
+                'lng': location['lng'],
+                'formatted_address': result['formatted_address'],
+                'place_id': result['place_id'],
+                'address_components': result.get('address_components', []),
+                'geometry': result['geometry']
+            }
+        
+        return cached_lookup('geocode', {'address': normalize_address(address), 'region': region.lower()}, fetch)
     
     def reverse_geocode(self, lat: float, lng: float) -> Optional[Dict]:
         """
@@ -109,32 +110,29 @@ class GoogleMapsService:
         Returns:
             Dict with formatted_address and address components
         """
-        cache_key = f"reverse_geocode:{lat:.6f}:{lng:.6f}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            return cached_result
-        
-        params = {
-            'latlng': f"{lat},{lng}",
-            'result_type': 'street_address|route|locality|administrative_area_level_1'
-        }
-        
-        data = self._make_request('geocode/json', params)
-        if not data or not data.get('results'):
-            return None
-        
-        result = data['results'][0]
-        
-        reverse_geocoded = {
-            'formatted_address': result['formatted_address'],
-            'address_components': result.get('address_components', []),
-            'place_id': result['place_id'],
-            'geometry': result['geometry']
-        }
-        
-        # Cache for 24 hours
-        cache.set(cache_key, reverse_geocoded, 86400)
-        return reverse_geocoded
+        # Nearby points share a cache entry, so look up the rounded point itself
+        lat, lng = round_coordinate(lat), round_coordinate(lng)
+        
+        def fetch():
+            params = {
+                'latlng': f"{lat},{lng}",
+                'result_type': 'street_address|route|locality|administrative_area_level_1'
+            }
+            
+            data = self._make_request('geocode/json', params)
+            if not data or not data.get('results'):
+                return None
+            
+            result = data['results'][0]
+            
+            return {
+                'formatted_address': result['formatted_address'],
+                'address_components': result.get('address_components', []),
+                'place_id': result['place_id'],
+                'geometry': result['geometry']
+            }
+        
+        return cached_lookup('reverse_geocode', {'lat': lat, 'lng': lng}, fetch)
     
     def get_directions(self, origin: str, destination: str, 
                       waypoints: Optional[List[str]] = None,
@@ -151,46 +149,58 @@ class GoogleMapsService:
         Returns:
             Dict with route information including duration, distance, steps
         """
-        params = {
-            'origin': origin,
-            'destination': destination,
-            'mode': 'driving',
-            'units': 'metric',
-            'region': 'au',
-            'alternatives': 'true'
-        }
-        
-        if waypoints:
-            params['waypoints'] = '|'.join(waypoints)
-        
-        if avoid_restrictions:
-            # Avoid toll roads and highways that may have dangerous goods restrictions
-            params['avoid'] = 'tolls'
-        
-        data = self._make_request('directions/json', params)
-        if not data or not data.get('routes'):
-            return None
-        
-        route = data['routes'][0]  # Primary route
-        leg = route['legs'][0]
-        
-        return {
-            'duration': leg['duration'],
-            'distance': leg['distance'],
-            'start_address': leg['start_address'],
-            'end_address': leg['end_address'],
-            'steps': leg['steps'],
-            'overview_polyline': route['overview_polyline']['points'],
-            'bounds': route['bounds'],
-            'warnings': route.get('warnings', []),
-            'alternative_routes': data['routes'][1:] if len(data['routes']) > 1 else []
+        def fetch():
+            params = {
+                'origin': origin,
+                'destination': destination,
+                'mode': 'driving',
+                'units': 'metric',
+                'region': 'au',
+                'alternatives': 'true'
+            }
+            
+            if waypoints:
+                params['waypoints'] = '|'.join(waypoints)
+            
+            if avoid_restrictions:
+                # Avoid toll roads and highways that may have dangerous goods restrictions
+                params['avoid'] = 'tolls'
+            
+            data = self._make_request('directions/json', params)
+            if not data or not data.get('routes'):
+                return None
+            
+            route = data['routes'][0]  # Primary route
+            leg = route['legs'][0]
+            
+            return {
+                'duration': leg['duration'],
+                'distance': leg['distance'],
+                'start_address': leg['start_address'],
+                'end_address': leg['end_address'],
+                'steps': leg['steps'],
+                'overview_polyline': route['overview_polyline']['points'],
+                'bounds': route['bounds'],
+                'warnings': route.get('warnings', []),
+                'alternative_routes': data['routes'][1:] if len(data['routes']) > 1 else []
+            }
+        
+        request = {
+            'origin': normalize_location(origin),
+            'destination': normalize_location(destination),
+            'waypoints': [normalize_location(waypoint) for waypoint in waypoints or []],
+            'avoid_restrictions': avoid_restrictions
         }
+        return cached_lookup('directions', request, fetch)
     
     def calculate_distance_matrix(self, origins: List[str], 
                                 destinations: List[str]) -> Optional[Dict]:
         """
         Calculate travel times and distances between multiple origins and destinations.
         
+        Elements are cached per origin/destination pair. Only pairs not cached
+        are requested, each once, in as few requests as the API's limits allow.
+        
         Args:
             origins: List of origin addresses
             destinations: List of destination addresses
@@ -198,24 +208,104 @@ class GoogleMapsService:
         Returns:
             Distance matrix with durations and distances
         """
-        params = {
-            'origins': '|'.join(origins),
-            'destinations': '|'.join(destinations),
-            'mode': 'driving',
-            'units': 'metric',
-            'avoid': 'tolls'  # Avoid toll roads for dangerous goods
+        if not origins or not destinations:
+            return None
+        
+        # The first spelling of each normalized location is the one sent to the API
+        spellings = {}
+        for location in list(origins) + list(destinations):
+            spellings.setdefault(normalize_location(location), location)
+        origin_keys = [normalize_location(origin) for origin in origins]
+        destination_keys = [normalize_location(destination) for destination in destinations]
+        
+        element_keys = {
+            (origin, destination): cache_key('distance_matrix', self._matrix_element_request(origin, destination))
+            for origin in dict.fromkeys(origin_keys)
+            for destination in dict.fromkeys(destination_keys)
         }
+        elements = maps_cache.get_many('distance_matrix', element_keys.values())
         
-        data = self._make_request('distancematrix/json', params)
-        if not data:
-            return None
+        missing = {}
+        for (origin, destination), key in element_keys.items():
+            if key not in elements:
+                missing.setdefault(origin, []).append(destination)
         
+        for request_origins, request_destinations in maps_cache.plan_matrix_requests(missing):
+            fetched = self._fetch_matrix_elements(request_origins, request_destinations, spellings)
+            if fetched is None:
+                return None
+            elements.update(fetched)
+        
+        rows = [
+            [elements[element_keys[(origin, destination)]] for destination in destination_keys]
+            for origin in origin_keys
+        ]
         return {
-            'origin_addresses': data.get('origin_addresses', []),
-            'destination_addresses': data.get('destination_addresses', []),
-            'rows': data.get('rows', [])
+            'origin_addresses': [row[0]['origin_address'] for row in rows],
+            'destination_addresses': [element['destination_address'] for element in rows[0]],
+            'rows': [{'elements': [element['element'] for element in row]} for row in rows]
         }
     
+    @staticmethod
+    def _matrix_element_request(origin: str, destination: str) -> Dict[str, str]:
+        return {'origin': origin, 'destination': destination, 'mode': 'driving', 'avoid': 'tolls'}
+    
+    def _fetch_matrix_elements(self, origins: List[str], destinations: List[str],
+                               spellings: Dict[str, str]) -> Optional[Dict[str, Dict]]:
+        """
+        Request the elements for every origin/destination pair and cache
+        them. Workers requesting the same pairs at once share one request.
+        """
+        requests_by_key = {}
+        for origin in origins:
+            for destination in destinations:
+                request = self._matrix_element_request(origin, destination)
+                requests_by_key[cache_key('distance_matrix', request)] = (origin, destination, request)
+        
+        def lookup():
+            found = maps_cache.get_many('distance_matrix', requests_by_key)
+            return found if len(found) == len(requests_by_key) else None
+        
+        def compute():
+            params = {
+                'origins': '|'.join(spellings[origin] for origin in origins),
+                'destinations': '|'.join(spellings[destination] for destination in destinations),
+                'mode': 'driving',
+                'units': 'metric',
+                'avoid': 'tolls'  # Avoid toll roads for dangerous goods
+            }
+            
+            data = self._make_request('distancematrix/json', params)
+            if not data:
+                return None
+            
+            try:
+                origin_addresses = data.get('origin_addresses', [])
+                destination_addresses = data.get('destination_addresses', [])
+                entries = {}
+                for key, (origin, destination, request) in requests_by_key.items():
+                    i, j = origins.index(origin), destinations.index(destination)
+                    entries[key] = (request, {
+                        'element': data['rows'][i]['elements'][j],
+                        'origin_address': origin_addresses[i] if i < len(origin_addresses) else spellings[origin],
+                        'destination_address': (
+                            destination_addresses[j] if j < len(destination_addresses) else spellings[destination]
+                        )
+                    })
+            except (KeyError, IndexError, TypeError) as e:
+                logger.error(f"Unexpected distance matrix response: {e}")
+                return None
+            
+            # NOT_FOUND, ZERO_RESULTS etc. may be transient or fixed upstream, so they are
+            # only kept briefly; waiters and repeats still read them instead of calling again
+            ok = {key: entry for key, entry in entries.items() if entry[1]['element'].get('status') == 'OK'}
+            maps_cache.put_many('distance_matrix', ok)
+            maps_cache.put_negative({key: value for key, (_, value) in entries.items() if key not in ok})
+            return {key: value for key, (_, value) in entries.items()}
+        
+        request_key = cache_key('distance_matrix_request', sorted(requests_by_key))
+        return maps_cache.maps_flight.coalesce(request_key, compute, lookup)
+    
     def find_places_nearby(self, lat: float, lng: float, 
                           place_type: str = 'gas_station',
                           radius: int = 5000) -> Optional[List[Dict]]:
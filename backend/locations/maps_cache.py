@@ -0,0 +1,217 @@
+"""
+Persistent, coalesced cache for Google Maps API results.
+
+The same depots and customer sites are geocoded and routed many times a
+day. Results are kept in two tiers so each lookup reaches the API once per
+TTL:
+
+- the shared cache, through SingleFlight, so concurrent identical lookups
+  in any worker wait for one API call instead of making their own
+- MapsApiCacheEntry rows, which outlive cache flushes and restarts
+
+Keys are built from normalized requests: addresses are case-folded with
+runs of whitespace and commas collapsed, and coordinates are rounded to
+GOOGLE_MAPS_COORDINATE_PRECISION decimal places. Each endpoint has its own
+TTL (GOOGLE_MAPS_CACHE_TTLS). Failed lookups are not cached, except
+distance matrix elements without status OK: they are kept in the shared
+cache only, for GOOGLE_MAPS_NEGATIVE_CACHE_TTL, so concurrent and repeated
+requests for a bad address still share one API call without the failure
+being stored for the full TTL.
+
+Distance matrices are cached per origin/destination element, so requests
+sharing pairs reuse them; the missing pairs are tiled into requests within
+the API's per-request limits by plan_matrix_requests().
+"""
+
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from shared.single_flight import SingleFlight
+from .models import MapsApiCacheEntry
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+DEFAULT_TTLS = {
+    'geocode': 30 * DAY,
+    'reverse_geocode': 30 * DAY,
+    'directions': DAY,
+    'distance_matrix': DAY,
+}
+DEFAULT_COORDINATE_PRECISION = 5  # about 1 m
+# Values stay in the shared cache at most this long; the database keeps them for the full TTL
+SHARED_CACHE_MAX_TTL = DAY
+# Failed distance matrix elements stay in the shared cache this long, and never in the database
+DEFAULT_NEGATIVE_TTL = 300
+
+# Distance Matrix API limits per request
+MAX_MATRIX_ORIGINS = 25
+MAX_MATRIX_DESTINATIONS = 25
+MAX_MATRIX_ELEMENTS = 100
+
+maps_flight = SingleFlight('google_maps', wait_timeout=15.0)
+
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+_SEPARATORS = re.compile(r'\s*,[\s,]*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class _NoResult(Exception):
+    """The API returned nothing; leave the key uncached"""
+
+
+def endpoint_ttl(endpoint: str) -> int:
+    ttls = getattr(settings, 'GOOGLE_MAPS_CACHE_TTLS', {})
+    return ttls.get(endpoint, DEFAULT_TTLS[endpoint])
+
+
+def round_coordinate(value: float) -> str:
+    precision = getattr(settings, 'GOOGLE_MAPS_COORDINATE_PRECISION', DEFAULT_COORDINATE_PRECISION)
+    rounded = f"{float(value):.{precision}f}"
+    return '0' if float(rounded) == 0 else rounded.rstrip('0').rstrip('.')
+
+
+def normalize_address(address: str) -> str:
+    """Case, spacing and comma variants of an address normalize to the same string"""
+    address = unicodedata.normalize('NFKC', address).casefold()
+    address = _SEPARATORS.sub(', ', address)
+    return _WHITESPACE.sub(' ', address).strip(' ,')
+
+
+def normalize_location(location: str) -> str:
+    """An address, or "lat,lng" with the coordinates rounded"""
+    match = _COORDINATES.match(location)
+    if match:
+        return f"{round_coordinate(match.group(1))},{round_coordinate(match.group(2))}"
+    return normalize_address(location)
+
+
+def cache_key(endpoint: str, request: Any) -> str:
+    payload = json.dumps([endpoint, request], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def read_persistent(keys: Iterable[str]) -> Dict[str, Any]:
+    """Unexpired stored responses by key"""
+    keys = list(keys)
+    if not keys:
+        return {}
+    try:
+        return dict(MapsApiCacheEntry.objects.filter(
+            key__in=keys, expires_at__gt=timezone.now()
+        ).values_list('key', 'response'))
+    except Exception as e:
+        logger.warning(f"Maps cache read failed: {e}")
+        return {}
+
+
+def write_persistent(endpoint: str, entries: Dict[str, Tuple[Dict[str, Any], Any]]):
+    """Store {key: (request, response)}, replacing existing entries"""
+    if not entries:
+        return
+    expires_at = timezone.now() + timedelta(seconds=endpoint_ttl(endpoint))
+    try:
+        MapsApiCacheEntry.objects.bulk_create(
+            [
+                MapsApiCacheEntry(endpoint=endpoint, key=key, request=request, response=response,
+                                  expires_at=expires_at)
+                for key, (request, response) in entries.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['request', 'response', 'expires_at'],
+        )
+    except Exception as e:
+        logger.warning(f"Maps cache write failed: {e}")
+
+
+def _shared_ttl(endpoint: str) -> int:
+    return min(endpoint_ttl(endpoint), SHARED_CACHE_MAX_TTL)
+
+
+def cached_lookup(endpoint: str, request: Dict[str, Any], fetch: Callable[[], Optional[Any]]) -> Optional[Any]:
+    """
+    The response for a normalized request: from the shared cache, else the
+    database, else fetch(), whose result is stored in both. Concurrent
+    callers for the same request share one fetch. None is not cached.
+    """
+    key = cache_key(endpoint, request)
+
+    def compute():
+        stored = read_persistent([key]).get(key)
+        if stored is not None:
+            return stored
+        response = fetch()
+        if response is None:
+            raise _NoResult()
+        write_persistent(endpoint, {key: (request, response)})
+        return response
+
+    try:
+        return maps_flight.get_or_compute(key, compute, ttl=_shared_ttl(endpoint))
+    except _NoResult:
+        return None
+
+
+def get_many(endpoint: str, keys: Iterable[str]) -> Dict[str, Any]:
+    """Cached responses for many keys: one shared cache round trip, one query for the rest"""
+    keys = list(keys)
+    found = maps_flight.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    stored = read_persistent(missing)
+    for key, response in stored.items():
+        maps_flight.put(key, response, ttl=_shared_ttl(endpoint))
+    found.update(stored)
+    return found
+
+
+def put_many(endpoint: str, entries: Dict[str, Tuple[Dict[str, Any], Any]]):
+    """Store {key: (request, response)} in both tiers"""
+    write_persistent(endpoint, entries)
+    for key, (_, response) in entries.items():
+        maps_flight.put(key, response, ttl=_shared_ttl(endpoint))
+
+
+def put_negative(entries: Dict[str, Any]):
+    """Store {key: response} for failed results in the shared cache only, briefly"""
+    ttl = getattr(settings, 'GOOGLE_MAPS_NEGATIVE_CACHE_TTL', DEFAULT_NEGATIVE_TTL)
+    for key, response in entries.items():
+        maps_flight.put(key, response, ttl=ttl, stale_ttl=0)
+
+
+def plan_matrix_requests(missing: Dict[str, Sequence[str]]) -> List[Tuple[List[str], List[str]]]:
+    """
+    Requests covering every missing (origin, destination) pair within the
+    API's origin, destination and element limits. Origins missing the same
+    destinations share requests, so no pair is requested twice.
+    """
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for origin, destinations in missing.items():
+        if destinations:
+            groups.setdefault(tuple(sorted(set(destinations))), []).append(origin)
+
+    requests = []
+    for destinations, origins in groups.items():
+        destinations_per_request = min(len(destinations), MAX_MATRIX_DESTINATIONS, MAX_MATRIX_ELEMENTS)
+        origins_per_request = min(MAX_MATRIX_ORIGINS, max(1, MAX_MATRIX_ELEMENTS // destinations_per_request))
+        for o in range(0, len(origins), origins_per_request):
+            for d in range(0, len(destinations), destinations_per_request):
+                requests.append((
+                    origins[o:o + origins_per_request],
+                    list(destinations[d:d + destinations_per_request]),
+                ))
+    return requests
+
+
+def purge_expired() -> int:
+    """Delete stored responses past their TTL"""
+    deleted, _ = MapsApiCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
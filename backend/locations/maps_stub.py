@@ -0,0 +1,163 @@
+"""
+Local stand-in for the Google Maps web services used by GoogleMapsService,
+for testing and benchmarking its caching without calling Google.
+
+StubMapsServer answers geocode, directions and distance matrix requests from
+a thread with deterministic made-up results, enforces the Distance Matrix
+per-request limits, and counts the requests and elements it served:
+
+    with StubMapsServer() as server:
+        service = GoogleMapsService(api_key='test', base_url=server.base_url)
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .maps_cache import MAX_MATRIX_DESTINATIONS, MAX_MATRIX_ELEMENTS, MAX_MATRIX_ORIGINS
+
+
+def _number(text: str, modulo: int) -> int:
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16) % modulo
+
+
+class StubMapsServer:
+    """HTTP server on 127.0.0.1 imitating the Maps geocode, directions and distance matrix APIs"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: Counter = Counter()
+        self.matrix_elements = 0
+        self.matrix_requests: List[Dict[str, int]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StubMapsServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'StubMapsServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _geocode(self, params: Dict[str, str]) -> Dict[str, Any]:
+        if 'latlng' in params:
+            lat, lng = (float(value) for value in params['latlng'].split(','))
+            formatted = f"{_number(params['latlng'], 200) + 1} Stub Street, {lat:.3f} {lng:.3f}"
+        else:
+            address = params.get('address', '')
+            if 'nowhere' in address.lower():
+                return {'status': 'ZERO_RESULTS', 'results': []}
+            lat = -35 + _number(address, 10000) / 1000
+            lng = 115 + _number(address[::-1], 10000) / 1000
+            formatted = f"{address.title()}, Australia"
+        return {
+            'status': 'OK',
+            'results': [{
+                'formatted_address': formatted,
+                'place_id': f"stub-{_number(formatted, 10 ** 8)}",
+                'address_components': [],
+                'geometry': {'location': {'lat': lat, 'lng': lng}, 'location_type': 'ROOFTOP'},
+            }],
+        }
+
+    def _leg(self, origin: str, destination: str) -> Dict[str, Any]:
+        metres = 1000 + _number(f"{origin}|{destination}", 500000)
+        return {
+            'distance': {'text': f"{metres / 1000:.1f} km", 'value': metres},
+            'duration': {'text': f"{metres // 1000} mins", 'value': metres * 60 // 1000},
+        }
+
+    def _matrix_element(self, origin: str, destination: str) -> Dict[str, Any]:
+        if 'nowhere' in destination.lower():
+            return {'status': 'NOT_FOUND'}
+        return dict(self._leg(origin, destination), status='OK')
+
+    def _directions(self, params: Dict[str, str]) -> Dict[str, Any]:
+        leg = self._leg(params['origin'], params['destination'])
+        return {
+            'status': 'OK',
+            'routes': [{
+                'legs': [dict(leg, start_address=params['origin'], end_address=params['destination'], steps=[])],
+                'overview_polyline': {'points': 'stub'},
+                'bounds': {},
+                'warnings': [],
+            }],
+        }
+
+    def _distance_matrix(self, params: Dict[str, str]) -> Dict[str, Any]:
+        origins = params['origins'].split('|')
+        destinations = params['destinations'].split('|')
+        if len(origins) > MAX_MATRIX_ORIGINS or len(destinations) > MAX_MATRIX_DESTINATIONS:
+            return {'status': 'MAX_DIMENSIONS_EXCEEDED', 'rows': []}
+        if len(origins) * len(destinations) > MAX_MATRIX_ELEMENTS:
+            return {'status': 'MAX_ELEMENTS_EXCEEDED', 'rows': []}
+        with self._lock:
+            self.matrix_elements += len(origins) * len(destinations)
+            self.matrix_requests.append({'origins': len(origins), 'destinations': len(destinations)})
+        return {
+            'status': 'OK',
+            'origin_addresses': [f"{origin}, Australia" for origin in origins],
+            'destination_addresses': [f"{destination}, Australia" for destination in destinations],
+            'rows': [
+                {'elements': [self._matrix_element(origin, destination) for destination in destinations]}
+                for origin in origins
+            ],
+        }
+
+    def _handle(self, url: str):
+        parsed = urlparse(url)
+        params = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+        endpoint = parsed.path.strip('/')
+        with self._lock:
+            self.requests[endpoint] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if endpoint.endswith('geocode/json'):
+            return 200, self._geocode(params)
+        if endpoint.endswith('directions/json'):
+            return 200, self._directions(params)
+        if endpoint.endswith('distancematrix/json'):
+            return 200, self._distance_matrix(params)
+        return 404, {'status': 'NOT_FOUND'}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = stub._handle(self.path)
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
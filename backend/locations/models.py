@@ -257,3 +257,28 @@ class GeoLocation(models.Model):
             logger = logging.getLogger(__name__)
             logger.error(f"Error checking point in geofence: {str(e)}", exc_info=True)
             return False
+
+
+class MapsApiCacheEntry(models.Model):
+    """
+    A Google Maps API result kept across cache restarts, by endpoint and
+    normalized request (see locations/maps_cache.py).
+    """
+    endpoint = models.CharField(_("Endpoint"), max_length=32, db_index=True)
+    key = models.CharField(
+        _("Cache Key"),
+        max_length=64,
+        unique=True,
+        help_text=_("SHA-256 of the endpoint and normalized request.")
+    )
+    request = models.JSONField(_("Normalized Request"), default=dict)
+    response = models.JSONField(_("Response"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires At"), db_index=True)
+
+    class Meta:
+        verbose_name = _("Maps API Cache Entry")
+        verbose_name_plural = _("Maps API Cache Entries")
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key[:12]}"
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+from .maps_cache import purge_expired
+
+
+@shared_task
+def purge_expired_maps_cache():
+    """Delete cached Google Maps results past their TTL"""
+    return {
+        'status': 'success',
+        'entries_deleted': purge_expired()
+    }
@@ -1,3 +1,179 @@
-from django.test import TestCase
+"""
+Tests for the persistent Google Maps result cache, run against the local
+stub server so no request reaches Google.
+"""
 
-# Create your tests here.
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .google_maps_service import GoogleMapsService
+from .maps_cache import (
+    MAX_MATRIX_DESTINATIONS, MAX_MATRIX_ELEMENTS, MAX_MATRIX_ORIGINS,
+    normalize_address, normalize_location, plan_matrix_requests, purge_expired
+)
+from .maps_stub import StubMapsServer
+from .models import MapsApiCacheEntry
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TestNormalization(TestCase):
+    """Test that equivalent requests share a cache key"""
+
+    def test_address_variants_normalize_alike(self):
+        self.assertEqual(
+            normalize_address('  12 Depot Rd,,  Perth  WA '),
+            normalize_address('12 depot rd, perth wa')
+        )
+
+    def test_coordinates_are_rounded(self):
+        self.assertEqual(normalize_location('-31.9505269, 115.8604572'), '-31.95053,115.86046')
+        self.assertEqual(normalize_location('-31.950531,115.860459'), '-31.95053,115.86046')
+
+
+class TestPlanMatrixRequests(TestCase):
+    """Test tiling of missing distance matrix pairs into API-sized requests"""
+
+    def test_requests_stay_within_limits_and_cover_each_pair_once(self):
+        destinations = [f"d{i}" for i in range(40)]
+        missing = {f"o{i}": destinations for i in range(30)}
+        missing['partial'] = destinations[:3]
+
+        pairs = []
+        for origins, request_destinations in plan_matrix_requests(missing):
+            self.assertLessEqual(len(origins), MAX_MATRIX_ORIGINS)
+            self.assertLessEqual(len(request_destinations), MAX_MATRIX_DESTINATIONS)
+            self.assertLessEqual(len(origins) * len(request_destinations), MAX_MATRIX_ELEMENTS)
+            pairs.extend((o, d) for o in origins for d in request_destinations)
+
+        expected = [(o, d) for o, ds in missing.items() for d in ds]
+        self.assertEqual(sorted(pairs), sorted(expected))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestGoogleMapsServiceCaching(TestCase):
+    """Test GoogleMapsService against the stub server"""
+
+    def setUp(self):
+        cache.clear()
+        self.server = StubMapsServer().start()
+        self.service = GoogleMapsService(api_key='test', base_url=self.server.base_url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_geocode_is_cached_across_address_variants(self):
+        first = self.service.geocode_address('12 Depot Rd, Perth WA')
+        second = self.service.geocode_address('  12 depot rd,, perth wa ')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.requests['geocode/json'], 1)
+
+    def test_geocode_survives_shared_cache_flush(self):
+        self.service.geocode_address('12 Depot Rd, Perth WA')
+        cache.clear()
+        self.service.geocode_address('12 Depot Rd, Perth WA')
+
+        self.assertEqual(self.server.requests['geocode/json'], 1)
+        self.assertEqual(MapsApiCacheEntry.objects.filter(endpoint='geocode').count(), 1)
+
+    def test_failed_lookups_are_not_cached(self):
+        self.assertIsNone(self.service.geocode_address('Nowhere'))
+        self.assertIsNone(self.service.geocode_address('Nowhere'))
+
+        self.assertEqual(self.server.requests['geocode/json'], 2)
+        self.assertFalse(MapsApiCacheEntry.objects.exists())
+
+    def test_reverse_geocode_shares_entry_for_nearby_points(self):
+        self.service.reverse_geocode(-31.9505269, 115.8604572)
+        self.service.reverse_geocode(-31.9505310, 115.8604590)
+
+        self.assertEqual(self.server.requests['geocode/json'], 1)
+
+    def test_directions_are_cached(self):
+        self.service.get_directions('Perth WA', 'Fremantle WA')
+        route = self.service.get_directions('perth wa', 'fremantle  wa')
+
+        self.assertEqual(route['start_address'], 'Perth WA')
+        self.assertEqual(self.server.requests['directions/json'], 1)
+
+    def test_concurrent_identical_lookups_are_coalesced(self):
+        self.server.latency = 0.2
+        results = []
+
+        def lookup():
+            results.append(self.service.geocode_address('1 Harbour St, Fremantle WA'))
+
+        threads = [threading.Thread(target=lookup) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(self.server.requests['geocode/json'], 1)
+
+    def test_distance_matrix_deduplicates_and_batches_elements(self):
+        origins = [f"Depot {i}, Perth WA" for i in range(12)] + ['depot 0,  perth wa']
+        destinations = [f"Site {i}, Perth WA" for i in range(10)]
+
+        matrix = self.service.calculate_distance_matrix(origins, destinations)
+
+        self.assertEqual(len(matrix['rows']), 13)
+        self.assertEqual(matrix['rows'][0], matrix['rows'][12])
+        self.assertTrue(all(len(row['elements']) == 10 for row in matrix['rows']))
+        self.assertEqual(self.server.matrix_elements, 120)
+        self.assertEqual(len(self.server.matrix_requests), 2)
+
+    def test_distance_matrix_only_requests_missing_elements(self):
+        destinations = ['Site A, Perth WA', 'Site B, Perth WA']
+        self.service.calculate_distance_matrix(['Depot 1, Perth WA'], destinations)
+        matrix = self.service.calculate_distance_matrix(['Depot 1, Perth WA', 'Depot 2, Perth WA'], destinations)
+
+        self.assertEqual(len(matrix['rows']), 2)
+        self.assertEqual(self.server.matrix_elements, 4)
+
+    def test_distance_matrix_keeps_failed_elements_briefly(self):
+        destinations = ['Site A, Perth WA', 'Nowhere']
+        self.service.calculate_distance_matrix(['Depot 1, Perth WA'], destinations)
+        matrix = self.service.calculate_distance_matrix(['Depot 1, Perth WA'], destinations)
+
+        self.assertEqual(matrix['rows'][0]['elements'][1]['status'], 'NOT_FOUND')
+        self.assertEqual(self.server.matrix_elements, 2)
+        self.assertEqual(MapsApiCacheEntry.objects.filter(endpoint='distance_matrix').count(), 1)
+
+        # Once the short-lived shared entry is gone only the failed element is requested again
+        cache.clear()
+        self.service.calculate_distance_matrix(['Depot 1, Perth WA'], destinations)
+        self.assertEqual(self.server.matrix_elements, 3)
+
+    def test_concurrent_matrices_with_failed_element_are_coalesced(self):
+        self.server.latency = 0.2
+        results = []
+
+        def lookup():
+            results.append(self.service.calculate_distance_matrix(['Depot 1, Perth WA'], ['Site A, Perth WA', 'Nowhere']))
+
+        threads = [threading.Thread(target=lookup) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(self.server.matrix_requests), 1)
+
+    def test_purge_expired_removes_only_expired_entries(self):
+        self.service.geocode_address('12 Depot Rd, Perth WA')
+        self.service.geocode_address('1 Harbour St, Fremantle WA')
+        entry = MapsApiCacheEntry.objects.first()
+        entry.expires_at = entry.created_at
+        entry.save()
+
+        self.assertEqual(purge_expired(), 1)
+        self.assertEqual(MapsApiCacheEntry.objects.count(), 1)
@@ -19,6 +19,8 @@ from .tasks import process_manifest_with_enhanced_ocr, get_processing_status, ba
 from .ocr_service import ocr_service
 from .table_extraction_service import table_extractor
 from dangerous_goods.ai_detection_service import enhanced_dg_detection
+from shared.nlp_models import default_model_name
+from shared import nlp_worker
 from dangerous_goods.search_service import enhanced_search_service
 
 logger = logging.getLogger(__name__)
@@ -208,10 +210,11 @@ def extract_tables_from_document(request, document_id):
         if page_numbers:
             page_numbers = [int(p) for p in page_numbers if str(p).isdigit()]
         
-        # Extract tables
+        # Extract tables in this process; a pool per request would fork on every web worker
         table_results = table_extractor.extract_tables_from_pdf(
             document.file.path,
-            page_numbers=page_numbers
+            page_numbers=page_numbers,
+            workers=1
         )
         
         # Format results
@@ -403,8 +406,9 @@ def get_ai_services_status(request):
                 'stats': enhanced_search_service.get_search_analytics()
             },
             'nlp_service': {
-                'available': enhanced_dg_detection.phrase_matcher is not None,
-                'spacy_model': 'en_core_web_sm'
+                'available': enhanced_dg_detection.nlp_available(),
+                'spacy_model': default_model_name(),
+                'mode': 'worker' if nlp_worker.remote_enabled() else 'in_process'
             },
             'table_extraction': {
                 'available': True,
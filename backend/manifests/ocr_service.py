@@ -11,8 +11,11 @@ import io
 import base64
 import json
 
-import fitz  # PyMuPDF - already in requirements
-import pytesseract  # Already in requirements
+from shared.lazy_init import lazy_import, lazy_service
+
+# PyMuPDF and pytesseract load on first use rather than at Django startup
+fitz = lazy_import('fitz')  # PyMuPDF - already in requirements
+pytesseract = lazy_import('pytesseract')  # Already in requirements
 from PIL import Image, ImageEnhance, ImageFilter  # Pillow - already in requirements
 import requests
 from django.conf import settings
@@ -379,5 +382,5 @@ class EnhancedOCRService:
             'cache_hit_rate': cache.get('ocr:stats:cache_hits', 0.0)
         }
 
-# Service instance
-ocr_service = EnhancedOCRService()
\ No newline at end of file
+# Service instance, built on first use
+ocr_service = lazy_service('manifests.ocr_service', EnhancedOCRService)
\ No newline at end of file
@@ -1,9 +1,10 @@
 # services.py for manifests app
 
 from typing import Dict, List, Set, Optional, Tuple
-import fitz  # PyMuPDF
+from shared.lazy_init import lazy_import
 import re
 import logging
+from django.db import transaction
 from django.utils import timezone
 from documents.models import Document, DocumentStatus
 from documents.services import analyze_manifest
@@ -12,6 +13,8 @@ from dangerous_goods.models import DangerousGood
 from django.utils.translation import gettext_lazy as _
 from .models import Manifest, ManifestDangerousGoodMatch, ManifestStatus, ManifestType
 
+fitz = lazy_import('fitz')  # PyMuPDF, loaded on first use
+
 logger = logging.getLogger(__name__)
 
 def extract_text_from_pdf(document: Document) -> str:
@@ -158,38 +161,87 @@ def run_enhanced_manifest_analysis(document: Document) -> Dict:
         
         raise Exception(f"Enhanced analysis failed: {str(e)}")
 
+MATCH_UPDATE_FIELDS = ['match_type', 'confidence_score', 'page_number', 'position_data']
+
+
 def create_manifest_dg_matches(manifest: Manifest, potential_dgs: List[Dict]):
     """
-    Create ManifestDangerousGoodMatch records from analysis results.
+    Sync ManifestDangerousGoodMatch records with analysis results.
+    
+    Matches are identified by dangerous good and found text. Existing rows
+    are updated in place, keeping their confirmation state, so re-analysing
+    a corrected upload does not discard confirmations for unchanged items;
+    new matches are created and matches no longer found are deleted.
+    Several entries share a UN number (e.g. per packing group), so each
+    match is tied to the dangerous good the analysis matched, by id; results
+    stored before ids were recorded fall back to the UN number.
     
     Args:
         manifest: Manifest instance
         potential_dgs: List of potential dangerous goods from analysis
     """
-    # Clear existing matches
-    manifest.dg_matches.all().delete()
+    dg_ids = {dg_data['dangerous_good_id'] for dg_data in potential_dgs if dg_data.get('dangerous_good_id')}
+    un_numbers = {dg_data['un_number'] for dg_data in potential_dgs if not dg_data.get('dangerous_good_id')}
+    dangerous_goods = {str(dg.pk): dg for dg in DangerousGood.objects.filter(pk__in=dg_ids)}
+    if un_numbers:
+        for dg in DangerousGood.objects.filter(un_number__in=un_numbers).order_by('pk'):
+            dangerous_goods.setdefault(dg.un_number, dg)
     
+    # Desired rows keyed like the (manifest, dangerous_good, found_text) unique constraint
+    desired = {}
     for dg_data in potential_dgs:
-        try:
-            # Get the dangerous good from database
-            dangerous_good = DangerousGood.objects.get(un_number=dg_data['un_number'])
-            
-            # Create match record
-            ManifestDangerousGoodMatch.objects.create(
-                manifest=manifest,
-                dangerous_good=dangerous_good,
-                found_text=dg_data.get('found_text', ''),
-                match_type=dg_data.get('match_type', 'UNKNOWN'),
-                confidence_score=dg_data.get('confidence_score', 0.0),
-                page_number=dg_data.get('page_number'),
-                position_data=dg_data.get('position_data'),
-                is_confirmed=False
-            )
-            
-        except DangerousGood.DoesNotExist:
-            logger.warning(f"DangerousGood with UN number {dg_data['un_number']} not found")
-        except Exception as e:
-            logger.error(f"Failed to create DG match for {dg_data.get('un_number', 'unknown')}: {str(e)}")
+        dg_key = dg_data.get('dangerous_good_id') or dg_data['un_number']
+        dangerous_good = dangerous_goods.get(dg_key)
+        if dangerous_good is None:
+            logger.warning(f"DangerousGood {dg_key} not found")
+            continue
+        found_text = dg_data.get('found_text', '')[:ManifestDangerousGoodMatch._meta.get_field('found_text').max_length]
+        # potential_dgs is sorted by confidence, so the first occurrence wins
+        desired.setdefault((dangerous_good.pk, found_text), (dangerous_good, {
+            'match_type': dg_data.get('match_type', 'UNKNOWN'),
+            'confidence_score': dg_data.get('confidence_score', 0.0),
+            'page_number': dg_data.get('page_number'),
+            'position_data': dg_data.get('position_data'),
+        }))
+    
+    with transaction.atomic():
+        existing = {
+            (match.dangerous_good_id, match.found_text): match
+            for match in manifest.dg_matches.select_for_update()
+        }
+        
+        to_update = []
+        to_create = []
+        for key, (dangerous_good, values) in desired.items():
+            match = existing.pop(key, None)
+            if match is None:
+                to_create.append(ManifestDangerousGoodMatch(
+                    manifest=manifest,
+                    dangerous_good=dangerous_good,
+                    found_text=key[1],
+                    is_confirmed=False,
+                    **values
+                ))
+            elif any(getattr(match, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(match, field, value)
+                to_update.append(match)
+        
+        if existing:
+            manifest.dg_matches.filter(pk__in=[match.pk for match in existing.values()]).delete()
+        if to_update:
+            # bulk_update skips auto_now, so set it explicitly
+            now = timezone.now()
+            for match in to_update:
+                match.updated_at = now
+            ManifestDangerousGoodMatch.objects.bulk_update(to_update, MATCH_UPDATE_FIELDS + ['updated_at'])
+        if to_create:
+            ManifestDangerousGoodMatch.objects.bulk_create(to_create)
+    
+    logger.info(
+        f"Synced DG matches for manifest {manifest.id}: {len(to_create)} created, "
+        f"{len(to_update)} updated, {len(existing)} removed"
+    )
 
 def confirm_manifest_dangerous_goods(manifest: Manifest, confirmed_un_numbers: List[str], user) -> Dict:
     """
@@ -2,19 +2,37 @@
 # Leverages existing PyMuPDF infrastructure for structured data extraction
 
 import logging
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Optional, Tuple, Any, Set
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple, Any, Set
 from dataclasses import dataclass
 from pathlib import Path
 import json
 
-import fitz  # PyMuPDF - already in requirements
-import numpy as np
-from django.core.cache import cache
+from shared.lazy_init import lazy_import, lazy_service
+
+# PyMuPDF and numpy load on first use rather than at Django startup
+fitz = lazy_import('fitz')  # PyMuPDF - already in requirements
+np = lazy_import('numpy')
+from django.conf import settings
 from django.utils import timezone
 
+from documents.manifest_pages import PageStageCache, page_fingerprint
+
 logger = logging.getLogger(__name__)
 
+# Stop trying further extraction methods on a page once a table scores this
+DEFAULT_CONFIDENCE_THRESHOLD = 0.8
+
+# Side of the grid squares (PDF points) used to find tables that may overlap
+DEDUP_GRID_SIZE = 72.0
+
+# Upper bound on the default pool when TABLE_EXTRACTION_WORKERS is 0 (one per CPU)
+MAX_DEFAULT_WORKERS = 4
+
 @dataclass
 class TableCell:
     """Individual table cell with content and position"""
@@ -52,8 +70,12 @@ class AdvancedTableExtractor:
     Uses multiple strategies for robust table detection and extraction
     """
     
-    def __init__(self):
-        self.cache_timeout = 1800  # 30 minutes
+    def __init__(self, confidence_threshold: Optional[float] = None):
+        if confidence_threshold is None:
+            confidence_threshold = getattr(
+                settings, 'TABLE_EXTRACTION_CONFIDENCE_THRESHOLD', DEFAULT_CONFIDENCE_THRESHOLD
+            )
+        self.confidence_threshold = confidence_threshold
         
         # Table detection patterns
         self.manifest_headers = [
@@ -79,53 +101,38 @@ class AdvancedTableExtractor:
         self,
         pdf_file: str,
         page_numbers: Optional[List[int]] = None,
-        use_cache: bool = True
+        use_cache: bool = True,
+        workers: Optional[int] = None
     ) -> DocumentTableResult:
         """
         Extract all tables from PDF document
         
+        Tables are cached per page content fingerprint, so after a corrected
+        re-upload only the pages that changed are extracted again.
+        
         Args:
             pdf_file: Path to PDF file
             page_numbers: Specific pages to process (None for all)
             use_cache: Whether to use caching
+            workers: Extraction processes (None for TABLE_EXTRACTION_WORKERS)
             
         Returns:
             DocumentTableResult with extracted tables and metadata
         """
         start_time = timezone.now()
-        
-        # Cache key
-        cache_key = None
-        if use_cache:
-            cache_key = f"table_extract:{hash(pdf_file)}:{hash(str(page_numbers))}"
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                logger.info("Table extraction cache hit")
-                return DocumentTableResult(**cached_result)
 
         try:
-            # Open PDF
-            doc = fitz.open(pdf_file)
+            tables_by_page = dict(self.iter_page_tables(pdf_file, page_numbers, use_cache, workers))
+            
             all_tables = []
             extraction_methods = set()
-            
-            # Process specified pages or all pages
-            pages_to_process = page_numbers or range(doc.page_count)
-            
-            for page_num in pages_to_process:
-                if page_num >= doc.page_count:
-                    continue
-                    
-                page = doc[page_num]
-                page_tables = self._extract_page_tables(page, page_num)
-                all_tables.extend(page_tables)
+            for page_num in sorted(tables_by_page):
+                all_tables.extend(tables_by_page[page_num])
                 
                 # Track extraction methods used
-                for table in page_tables:
+                for table in tables_by_page[page_num]:
                     extraction_methods.add(table.extraction_method)
             
-            doc.close()
-            
             # Calculate quality metrics
             quality_score = self._calculate_quality_score(all_tables)
             processing_time = (timezone.now() - start_time).total_seconds()
@@ -138,53 +145,142 @@ class AdvancedTableExtractor:
                 quality_score=quality_score
             )
             
-            # Cache result
-            if use_cache and cache_key:
-                cache.set(cache_key, {
-                    'tables': [self._serialize_table(table) for table in result.tables],
-                    'total_tables': result.total_tables,
-                    'processing_time': result.processing_time,
-                    'extraction_methods': result.extraction_methods,
-                    'quality_score': result.quality_score
-                }, self.cache_timeout)
-            
             return result
             
         except Exception as e:
             logger.error(f"Table extraction failed: {e}")
             raise
 
-    def _extract_page_tables(self, page: fitz.Page, page_num: int) -> List[ExtractedTable]:
-        """Extract tables from a single page using multiple methods"""
-        tables = []
+    def iter_page_tables(
+        self,
+        pdf_file: str,
+        page_numbers: Optional[List[int]] = None,
+        use_cache: bool = True,
+        workers: Optional[int] = None
+    ) -> Iterator[Tuple[int, List[ExtractedTable]]]:
+        """
+        Yield (page number, tables) for each page as soon as it is available
         
-        # Method 1: PyMuPDF built-in table detection
+        Cached pages come first, then extracted pages in completion order, so
+        callers can start matching dangerous goods before the whole document
+        is done. Pages are extracted in a process pool that opens the document
+        once per worker; with a single worker, or inside a daemonic process
+        such as a Celery worker, they are extracted in this process.
+        """
+        doc = fitz.open(pdf_file)
         try:
-            pymupdf_tables = self._extract_with_pymupdf_tables(page, page_num)
-            tables.extend(pymupdf_tables)
-        except Exception as e:
-            logger.warning(f"PyMuPDF table extraction failed on page {page_num}: {e}")
-        
-        # Method 2: Text analysis with geometric detection
+            pages_to_process = [
+                page_num for page_num in (page_numbers or range(doc.page_count))
+                if page_num < doc.page_count
+            ]
+            
+            if not use_cache:
+                pending = {page_num: [page_num] for page_num in pages_to_process}
+                page_cache = None
+            else:
+                fingerprints = {page_num: page_fingerprint(doc[page_num]) for page_num in pages_to_process}
+                page_cache = PageStageCache('tables', variant=f"cascade{self.confidence_threshold}")
+                cached = page_cache.get_many(fingerprints.values())
+                cached_pages = sum(1 for page_num in pages_to_process if fingerprints[page_num] in cached)
+                logger.info(f"Table extraction: {cached_pages} of {len(pages_to_process)} pages from cache")
+                
+                # Identical pages are extracted once
+                pending = {}
+                for page_num in pages_to_process:
+                    fingerprint = fingerprints[page_num]
+                    if fingerprint in cached:
+                        # A cached page may have moved; tables take the current page number
+                        yield page_num, [self._deserialize_table(table, page_num) for table in cached[fingerprint]]
+                    else:
+                        pending.setdefault(fingerprint, []).append(page_num)
+            
+            workers = self._pool_size(workers, len(pending))
+            if workers <= 1:
+                results = (
+                    (key, self._extract_serialized_tables(doc[page_nums[0]], page_nums[0]))
+                    for key, page_nums in pending.items()
+                )
+            else:
+                # Workers open their own copy; nothing more is read from this one
+                doc.close()
+                results = self._extract_in_pool(pdf_file, pending, workers)
+            
+            for key, serialized_tables in results:
+                if page_cache is not None:
+                    page_cache.set_many({key: serialized_tables})
+                for page_num in pending[key]:
+                    yield page_num, [self._deserialize_table(table, page_num) for table in serialized_tables]
+        finally:
+            if not doc.is_closed:
+                doc.close()
+
+    def _pool_size(self, workers: Optional[int], page_count: int) -> int:
+        """Processes to extract page_count pages with; 1 means in this process"""
+        if workers is None:
+            workers = getattr(settings, 'TABLE_EXTRACTION_WORKERS', 0) or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+        # Daemonic processes (Celery prefork workers) cannot have children
+        if multiprocessing.current_process().daemon:
+            return 1
+        return max(1, min(workers, page_count))
+
+    def _extract_in_pool(
+        self,
+        pdf_file: str,
+        pending: Dict[Any, List[int]],
+        workers: int
+    ) -> Iterator[Tuple[Any, List[Dict[str, Any]]]]:
+        """Extract the first page of each pending entry in a process pool, yielding as pages finish"""
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_page_worker,
+            initargs=(pdf_file, self.confidence_threshold)
+        )
         try:
-            geometric_tables = self._extract_with_geometric_analysis(page, page_num)
-            tables.extend(geometric_tables)
-        except Exception as e:
-            logger.warning(f"Geometric table extraction failed on page {page_num}: {e}")
+            futures = {
+                executor.submit(_extract_page_in_worker, page_nums[0]): key
+                for key, page_nums in pending.items()
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Also reached when the caller stops consuming early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _extract_serialized_tables(self, page: 'fitz.Page', page_num: int) -> List[Dict[str, Any]]:
+        return [self._serialize_table(table) for table in self._extract_page_tables(page, page_num)]
+
+    def _extract_page_tables(self, page: 'fitz.Page', page_num: int) -> List[ExtractedTable]:
+        """
+        Extract tables from a single page, trying methods from most to least
+        precise and stopping once one finds a table at or above the
+        confidence threshold
+        """
+        tables = []
+        strategies = [
+            # Method 1: PyMuPDF built-in table detection
+            ('PyMuPDF table extraction', self._extract_with_pymupdf_tables),
+            # Method 2: Text analysis with geometric detection
+            ('Geometric table extraction', self._extract_with_geometric_analysis),
+            # Method 3: Pattern-based extraction for known manifest formats
+            ('Pattern-based extraction', self._extract_with_pattern_matching),
+        ]
         
-        # Method 3: Pattern-based extraction for known manifest formats
-        try:
-            pattern_tables = self._extract_with_pattern_matching(page, page_num)
-            tables.extend(pattern_tables)
-        except Exception as e:
-            logger.warning(f"Pattern-based extraction failed on page {page_num}: {e}")
+        for name, extract in strategies:
+            try:
+                found = extract(page, page_num)
+            except Exception as e:
+                logger.warning(f"{name} failed on page {page_num}: {e}")
+                continue
+            tables.extend(found)
+            if any(table.confidence >= self.confidence_threshold for table in found):
+                break
         
         # Deduplicate and merge overlapping tables
         deduplicated_tables = self._deduplicate_tables(tables)
         
         return deduplicated_tables
 
-    def _extract_with_pymupdf_tables(self, page: fitz.Page, page_num: int) -> List[ExtractedTable]:
+    def _extract_with_pymupdf_tables(self, page: 'fitz.Page', page_num: int) -> List[ExtractedTable]:
         """Extract tables using PyMuPDF's built-in table detection"""
         tables = []
         
@@ -259,7 +355,7 @@ class AdvancedTableExtractor:
             
         return tables
 
-    def _extract_with_geometric_analysis(self, page: fitz.Page, page_num: int) -> List[ExtractedTable]:
+    def _extract_with_geometric_analysis(self, page: 'fitz.Page', page_num: int) -> List[ExtractedTable]:
         """Extract tables by analyzing text positions and geometric layout"""
         tables = []
         
@@ -292,7 +388,7 @@ class AdvancedTableExtractor:
             
         return tables
 
-    def _extract_with_pattern_matching(self, page: fitz.Page, page_num: int) -> List[ExtractedTable]:
+    def _extract_with_pattern_matching(self, page: 'fitz.Page', page_num: int) -> List[ExtractedTable]:
         """Extract tables using pattern matching for known manifest formats"""
         tables = []
         
@@ -630,7 +726,14 @@ class AdvancedTableExtractor:
         return min(1.0, score)
 
     def _deduplicate_tables(self, tables: List[ExtractedTable]) -> List[ExtractedTable]:
-        """Remove duplicate tables and merge overlapping ones"""
+        """
+        Remove duplicate tables and merge overlapping ones
+        
+        Tables are bucketed by the grid squares their bounding box covers,
+        and only compared with kept tables sharing a square. Tables without
+        a position (pattern matching) are compared with every kept table on
+        their page, and every table is compared with them.
+        """
         if len(tables) <= 1:
             return tables
         
@@ -638,20 +741,45 @@ class AdvancedTableExtractor:
         sorted_tables = sorted(tables, key=lambda t: t.confidence, reverse=True)
         
         unique_tables = []
+        buckets = defaultdict(list)
+        unplaced = defaultdict(list)
         for table in sorted_tables:
-            is_duplicate = False
+            squares = self._grid_squares(table.bbox)
+            if squares is None:
+                candidates = [existing for existing in unique_tables if existing.page_number == table.page_number]
+            else:
+                candidates = list(unplaced[table.page_number])
+                seen = set()
+                for square in squares:
+                    for existing in buckets[(table.page_number, square)]:
+                        if id(existing) not in seen:
+                            seen.add(id(existing))
+                            candidates.append(existing)
             
-            for existing in unique_tables:
-                # Check for overlap or similarity
-                if self._tables_overlap(table, existing):
-                    is_duplicate = True
-                    break
+            # Check for overlap or similarity
+            if any(self._tables_overlap(table, existing) for existing in candidates):
+                continue
             
-            if not is_duplicate:
-                unique_tables.append(table)
+            unique_tables.append(table)
+            if squares is None:
+                unplaced[table.page_number].append(table)
+            else:
+                for square in squares:
+                    buckets[(table.page_number, square)].append(table)
         
         return unique_tables
 
+    def _grid_squares(self, bbox: Tuple[float, float, float, float]) -> Optional[Set[Tuple[int, int]]]:
+        """Grid squares covered by bbox, or None when the table has no position"""
+        x0, y0, x1, y1 = bbox
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return {
+            (column, row)
+            for column in range(int(x0 // DEDUP_GRID_SIZE), int(x1 // DEDUP_GRID_SIZE) + 1)
+            for row in range(int(y0 // DEDUP_GRID_SIZE), int(y1 // DEDUP_GRID_SIZE) + 1)
+        }
+
     def _tables_overlap(self, table1: ExtractedTable, table2: ExtractedTable) -> bool:
         """Check if two tables overlap significantly"""
         if table1.page_number != table2.page_number:
@@ -717,5 +845,33 @@ class AdvancedTableExtractor:
             'extraction_method': table.extraction_method
         }
 
-# Service instance
-table_extractor = AdvancedTableExtractor()
\ No newline at end of file
+    def _deserialize_table(self, data: Dict[str, Any], page_number: int) -> ExtractedTable:
+        """Rebuild a table serialized by _serialize_table"""
+        return ExtractedTable(
+            cells=[[TableCell(**cell) for cell in row] for row in data['cells']],
+            headers=data['headers'],
+            rows=data['rows'],
+            bbox=data['bbox'],
+            page_number=page_number,
+            table_type=data['table_type'],
+            confidence=data['confidence'],
+            extraction_method=data['extraction_method']
+        )
+
+# Page extraction in pool processes: each worker opens the document once
+_worker_document = None
+_worker_extractor = None
+
+
+def _init_page_worker(pdf_file: str, confidence_threshold: float):
+    global _worker_document, _worker_extractor
+    _worker_document = fitz.open(pdf_file)
+    _worker_extractor = AdvancedTableExtractor(confidence_threshold)
+
+
+def _extract_page_in_worker(page_num: int) -> List[Dict[str, Any]]:
+    return _worker_extractor._extract_serialized_tables(_worker_document[page_num], page_num)
+
+
+# Service instance, built on first use
+table_extractor = lazy_service('manifests.table_extractor', AdvancedTableExtractor)
\ No newline at end of file
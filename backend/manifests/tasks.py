@@ -1,5 +1,6 @@
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.cache import cache
 from django.utils import timezone
@@ -9,10 +10,16 @@ from documents.models import Document
 from .services import run_manifest_validation, create_manifest_from_document, run_enhanced_manifest_analysis
 from .models import ManifestType
 from .ocr_service import ocr_service
+from dangerous_goods.ai_detection_service import enhanced_dg_detection
 from dangerous_goods.services import find_dgs_by_text_search
 
 logger = get_task_logger(__name__)
 
+# Documents per process_manifest_batch task (settings.MANIFEST_BATCH_CHUNK_SIZE)
+DEFAULT_BATCH_CHUNK_SIZE = 20
+# Hard time limit per document, as for process_manifest_with_enhanced_ocr
+DOCUMENT_TIME_LIMIT = 300
+
 @shared_task(
     bind=True,
     max_retries=3,
@@ -109,6 +116,148 @@ def process_manifest_validation(self, document_id: str):
         raise self.retry(exc=exc)
 
 
+def _set_processing_status(document_id, task_id, **status):
+    """Real-time processing status for get_processing_status"""
+    cache.set(f"manifest_processing:{document_id}", {'task_id': task_id, **status}, timeout=3600)
+
+
+def _extract_manifest_text(document, use_ocr: bool, engines: Optional[list]):
+    """
+    Text of a manifest document, via OCR or direct PDF extraction.
+    
+    Returns:
+        Tuple of (extracted_text, ocr_confidence, processing_method)
+    """
+    if use_ocr:
+        logger.info(f"Starting OCR processing for document {document.id}")
+        ocr_result = ocr_service.extract_text_with_ocr(
+            document.file.path,
+            engines=engines or ['tesseract']
+        )
+        
+        # Combine text from all pages
+        extracted_text = "\n".join([page.text for page in ocr_result.pages])
+        ocr_confidence = ocr_result.total_confidence
+        processing_method = f"ocr_{'+'.join(ocr_result.engines_used)}"
+        
+        logger.info(f"OCR completed with confidence: {ocr_confidence:.2f}")
+        return extracted_text, ocr_confidence, processing_method
+    
+    # Use existing direct PDF text extraction
+    from .services import extract_text_from_pdf
+    extracted_text = extract_text_from_pdf(document)
+    return extracted_text, 1.0, "direct_pdf"  # Direct extraction assumed 100% accurate
+
+
+def _complete_manifest_processing(document, task_id, processing_start, extracted_text: str,
+                                  ocr_confidence: float, processing_method: str,
+                                  dangerous_goods_matches: list) -> Dict[str, Any]:
+    """
+    Run manifest analysis for a document whose text and dangerous goods
+    matches are known, and store the comprehensive results on it.
+    """
+    document_id = document.id
+    
+    # Stage 3: Enhanced Analysis
+    _set_processing_status(document_id, task_id, status='processing', stage='analysis', progress=75)
+    
+    # Create manifest record if it doesn't exist
+    if not hasattr(document, 'manifest'):
+        create_manifest_from_document(document, ManifestType.DG_MANIFEST)
+    
+    # Run enhanced analysis with the extracted text
+    enhanced_results = run_enhanced_manifest_analysis(document)
+    
+    # Stage 4: Finalization
+    _set_processing_status(document_id, task_id, status='processing', stage='finalizing', progress=90)
+    
+    # Compile comprehensive results
+    processing_time = (timezone.now() - processing_start).total_seconds()
+    
+    comprehensive_results = {
+        'processing_method': processing_method,
+        'ocr_confidence': ocr_confidence,
+        'text_length': len(extracted_text),
+        'dangerous_goods_detected': len(dangerous_goods_matches),
+        'dangerous_goods_matches': [
+            {
+                'dangerous_good': {
+                    'id': str(match['dangerous_good'].id),
+                    'un_number': match['dangerous_good'].un_number,
+                    'proper_shipping_name': match['dangerous_good'].proper_shipping_name,
+                    'hazard_class': match['dangerous_good'].hazard_class,
+                    'packing_group': match['dangerous_good'].packing_group
+                },
+                'matched_term': match['matched_term'],
+                'confidence': match['confidence'],
+                'match_type': match['match_type']
+            }
+            for match in dangerous_goods_matches
+        ],
+        'enhanced_results': enhanced_results,
+        'processing_time': processing_time,
+        'timestamp': timezone.now().isoformat()
+    }
+    
+    # Update document with comprehensive results
+    document.validation_results = comprehensive_results
+    
+    # Determine final status
+    has_dgs = len(dangerous_goods_matches) > 0
+    high_confidence = ocr_confidence >= 0.8
+    
+    if has_dgs and high_confidence:
+        document.status = Document.DocumentStatus.VALIDATED_WITH_ERRORS  # Requires confirmation
+    elif has_dgs:
+        document.status = Document.DocumentStatus.AWAITING_CONFIRMATION  # Low confidence, needs review
+    else:
+        document.status = Document.DocumentStatus.VALIDATED_OK
+    
+    document.save(update_fields=['status', 'validation_results'])
+    
+    # Update cache with completion
+    _set_processing_status(
+        document_id, task_id,
+        status='completed',
+        stage='complete',
+        progress=100,
+        results={
+            'dangerous_goods_count': len(dangerous_goods_matches),
+            'ocr_confidence': ocr_confidence,
+            'processing_time': processing_time
+        }
+    )
+    
+    logger.info(
+        f"Enhanced manifest processing completed for document {document_id}. "
+        f"Found {len(dangerous_goods_matches)} dangerous goods with {ocr_confidence:.2f} OCR confidence"
+    )
+    
+    return comprehensive_results
+
+
+def _fail_manifest_processing(document_id, task_id, exc: Exception):
+    """Record a processing failure in the status cache and on the document"""
+    error_msg = f"Error processing manifest {document_id}: {str(exc)}"
+    logger.error(error_msg)
+    
+    # Update cache with error
+    _set_processing_status(document_id, task_id, status='failed', error=error_msg)
+    
+    # Update document status
+    try:
+        document = Document.objects.get(id=document_id)
+        document.status = Document.DocumentStatus.PROCESSING_FAILED
+        document.validation_results = {
+            'error': str(exc),
+            'processing_method': 'failed',
+            'timestamp': timezone.now().isoformat()
+        }
+        document.save(update_fields=['status', 'validation_results'])
+    except Exception as save_error:
+        logger.error(f"Failed to update document status: {save_error}")
+
+
 @shared_task(
     bind=True,
     max_retries=2,
@@ -132,14 +281,13 @@ def process_manifest_with_enhanced_ocr(self, document_id: str, use_ocr: bool = T
     task_id = self.request.id
     
     # Set task status in cache for real-time updates
-    cache_key = f"manifest_processing:{document_id}"
-    cache.set(cache_key, {
-        'status': 'processing',
-        'stage': 'initializing',
-        'progress': 0,
-        'task_id': task_id,
-        'started_at': processing_start.isoformat()
-    }, timeout=3600)
+    _set_processing_status(
+        document_id, task_id,
+        status='processing',
+        stage='initializing',
+        progress=0,
+        started_at=processing_start.isoformat()
+    )
     
     try:
         # Get the document
@@ -150,168 +298,29 @@ def process_manifest_with_enhanced_ocr(self, document_id: str, use_ocr: bool = T
         document.save(update_fields=['status'])
         
         # Stage 1: Text Extraction (OCR or direct)
-        cache.set(cache_key, {
-            'status': 'processing',
-            'stage': 'text_extraction',
-            'progress': 20,
-            'task_id': task_id
-        }, timeout=3600)
-        
-        extracted_text = ""
-        ocr_confidence = 0.0
-        processing_method = "direct"
-        
-        if use_ocr:
-            logger.info(f"Starting OCR processing for document {document_id}")
-            ocr_result = ocr_service.extract_text_with_ocr(
-                document.file.path,
-                engines=engines or ['tesseract']
-            )
-            
-            # Combine text from all pages
-            extracted_text = "\n".join([page.text for page in ocr_result.pages])
-            ocr_confidence = ocr_result.total_confidence
-            processing_method = f"ocr_{'+'.join(ocr_result.engines_used)}"
-            
-            logger.info(f"OCR completed with confidence: {ocr_confidence:.2f}")
-        else:
-            # Use existing direct PDF text extraction
-            from .services import extract_text_from_pdf
-            extracted_text = extract_text_from_pdf(document)
-            ocr_confidence = 1.0  # Direct extraction assumed 100% accurate
-            processing_method = "direct_pdf"
+        _set_processing_status(document_id, task_id, status='processing', stage='text_extraction', progress=20)
+        extracted_text, ocr_confidence, processing_method = _extract_manifest_text(document, use_ocr, engines)
         
         # Stage 2: Dangerous Goods Detection
-        cache.set(cache_key, {
-            'status': 'processing',
-            'stage': 'dg_detection',
-            'progress': 50,
-            'task_id': task_id
-        }, timeout=3600)
+        _set_processing_status(document_id, task_id, status='processing', stage='dg_detection', progress=50)
         
         logger.info(f"Starting dangerous goods detection for document {document_id}")
         dangerous_goods_matches = find_dgs_by_text_search(extracted_text)
         
-        # Stage 3: Enhanced Analysis
-        cache.set(cache_key, {
-            'status': 'processing', 
-            'stage': 'analysis',
-            'progress': 75,
-            'task_id': task_id
-        }, timeout=3600)
-        
-        # Create manifest record if it doesn't exist
-        if not hasattr(document, 'manifest'):
-            create_manifest_from_document(document, ManifestType.DG_MANIFEST)
-        
-        # Run enhanced analysis with the extracted text
-        enhanced_results = run_enhanced_manifest_analysis(document)
-        
-        # Stage 4: Finalization
-        cache.set(cache_key, {
-            'status': 'processing',
-            'stage': 'finalizing', 
-            'progress': 90,
-            'task_id': task_id
-        }, timeout=3600)
-        
-        # Compile comprehensive results
-        processing_time = (timezone.now() - processing_start).total_seconds()
-        
-        comprehensive_results = {
-            'processing_method': processing_method,
-            'ocr_confidence': ocr_confidence,
-            'text_length': len(extracted_text),
-            'dangerous_goods_detected': len(dangerous_goods_matches),
-            'dangerous_goods_matches': [
-                {
-                    'dangerous_good': {
-                        'id': str(match['dangerous_good'].id),
-                        'un_number': match['dangerous_good'].un_number,
-                        'proper_shipping_name': match['dangerous_good'].proper_shipping_name,
-                        'hazard_class': match['dangerous_good'].hazard_class,
-                        'packing_group': match['dangerous_good'].packing_group
-                    },
-                    'matched_term': match['matched_term'],
-                    'confidence': match['confidence'],
-                    'match_type': match['match_type']
-                }
-                for match in dangerous_goods_matches
-            ],
-            'enhanced_results': enhanced_results,
-            'processing_time': processing_time,
-            'timestamp': timezone.now().isoformat()
-        }
-        
-        # Update document with comprehensive results
-        document.validation_results = comprehensive_results
-        
-        # Determine final status
-        has_dgs = len(dangerous_goods_matches) > 0
-        high_confidence = ocr_confidence >= 0.8
-        
-        if has_dgs and high_confidence:
-            document.status = Document.DocumentStatus.VALIDATED_WITH_ERRORS  # Requires confirmation
-        elif has_dgs:
-            document.status = Document.DocumentStatus.AWAITING_CONFIRMATION  # Low confidence, needs review
-        else:
-            document.status = Document.DocumentStatus.VALIDATED_OK
-        
-        document.save(update_fields=['status', 'validation_results'])
-        
-        # Update cache with completion
-        cache.set(cache_key, {
-            'status': 'completed',
-            'stage': 'complete',
-            'progress': 100,
-            'task_id': task_id,
-            'results': {
-                'dangerous_goods_count': len(dangerous_goods_matches),
-                'ocr_confidence': ocr_confidence,
-                'processing_time': processing_time
-            }
-        }, timeout=3600)
-        
-        logger.info(
-            f"Enhanced manifest processing completed for document {document_id}. "
-            f"Found {len(dangerous_goods_matches)} dangerous goods with {ocr_confidence:.2f} OCR confidence"
+        return _complete_manifest_processing(
+            document, task_id, processing_start,
+            extracted_text, ocr_confidence, processing_method,
+            dangerous_goods_matches
         )
         
-        return comprehensive_results
-        
     except Document.DoesNotExist:
         error_msg = f"Document {document_id} not found"
         logger.error(error_msg)
-        cache.set(cache_key, {
-            'status': 'failed',
-            'error': error_msg,
-            'task_id': task_id
-        }, timeout=3600)
+        _set_processing_status(document_id, task_id, status='failed', error=error_msg)
         raise
         
     except Exception as exc:
-        error_msg = f"Error processing manifest {document_id}: {str(exc)}"
-        logger.error(error_msg)
-        
-        # Update cache with error
-        cache.set(cache_key, {
-            'status': 'failed',
-            'error': error_msg,
-            'task_id': task_id
-        }, timeout=3600)
-        
-        # Update document status
-        try:
-            document = Document.objects.get(id=document_id)
-            document.status = Document.DocumentStatus.PROCESSING_FAILED
-            document.validation_results = {
-                'error': str(exc),
-                'processing_method': 'failed',
-                'timestamp': timezone.now().isoformat()
-            }
-            document.save(update_fields=['status', 'validation_results'])
-        except Exception as save_error:
-            logger.error(f"Failed to update document status: {save_error}")
+        _fail_manifest_processing(document_id, task_id, exc)
         
         # Retry the task
         raise self.retry(exc=exc)
@@ -326,12 +335,17 @@ def batch_process_manifests(self, document_ids: list, processing_options: Option
     """
     Process multiple manifests in batch with queue management
     
+    Documents are split into chunks of MANIFEST_BATCH_CHUNK_SIZE, each handled
+    by one process_manifest_batch task so that dangerous goods detection runs
+    once per chunk instead of once per document.
+    
     Args:
         document_ids: List of document IDs to process
         processing_options: Dict with options like use_ocr, engines, etc.
     """
     options = processing_options or {}
     batch_id = f"batch_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{self.request.id[:8]}"
+    chunk_size = max(getattr(settings, 'MANIFEST_BATCH_CHUNK_SIZE', DEFAULT_BATCH_CHUNK_SIZE), 1)
     
     # Initialize batch tracking
     batch_cache_key = f"batch_processing:{batch_id}"
@@ -347,16 +361,14 @@ def batch_process_manifests(self, document_ids: list, processing_options: Option
     try:
         logger.info(f"Starting batch processing of {len(document_ids)} documents")
         
-        # Queue individual processing tasks
+        # Queue one task per chunk of documents
         task_results = []
-        for doc_id in document_ids:
-            # Use the enhanced processing task
-            task = process_manifest_with_enhanced_ocr.delay(
-                doc_id,
-                use_ocr=options.get('use_ocr', True),
-                engines=options.get('engines', ['tesseract'])
+        for start in range(0, len(document_ids), chunk_size):
+            chunk = document_ids[start:start + chunk_size]
+            task = process_manifest_batch.apply_async(
+                args=[batch_id, chunk, options], time_limit=DOCUMENT_TIME_LIMIT * len(chunk)
             )
-            task_results.append({'document_id': doc_id, 'task_id': task.id})
+            task_results.append({'document_ids': chunk, 'task_id': task.id})
         
         # Update batch status
         cache.set(batch_cache_key, {
@@ -369,7 +381,7 @@ def batch_process_manifests(self, document_ids: list, processing_options: Option
             'started_at': timezone.now().isoformat()
         }, timeout=7200)
         
-        logger.info(f"Queued {len(task_results)} processing tasks for batch {batch_id}")
+        logger.info(f"Queued {len(task_results)} chunk tasks for batch {batch_id}")
         
         return {
             'batch_id': batch_id,
@@ -388,6 +400,146 @@ def batch_process_manifests(self, document_ids: list, processing_options: Option
         raise
 
 
+def _record_batch_progress(batch_id: str, completed: int, failed: int):
+    """Add a chunk's outcome to the batch status"""
+    batch_cache_key = f"batch_processing:{batch_id}"
+    counters = {}
+    for name, count in (('completed', completed), ('failed', failed)):
+        counter_key = f"{batch_cache_key}:{name}"
+        # incr is atomic on Redis, so concurrent chunks do not lose updates
+        cache.add(counter_key, 0, timeout=7200)
+        counters[name] = cache.incr(counter_key, count) if count else cache.get(counter_key, 0)
+    
+    batch_status = cache.get(batch_cache_key)
+    if batch_status:
+        total = batch_status.get('total_documents', 0)
+        batch_status.update(counters)
+        batch_status['in_progress'] = max(total - counters['completed'] - counters['failed'], 0)
+        if not batch_status['in_progress']:
+            batch_status['status'] = 'completed'
+            batch_status['completed_at'] = timezone.now().isoformat()
+        cache.set(batch_cache_key, batch_status, timeout=7200)
+
+
+@shared_task(
+    bind=True,
+    max_retries=2,
+    default_retry_delay=120,  # 2 minutes
+    rate_limit='5/m',  # Max 5 OCR chunks per minute
+    time_limit=DOCUMENT_TIME_LIMIT * DEFAULT_BATCH_CHUNK_SIZE  # Callers pass a per-chunk limit
+)
+def process_manifest_batch(self, batch_id: str, document_ids: list, processing_options: Optional[Dict] = None):
+    """
+    Process one chunk of a manifest batch.
+    
+    Text is extracted per document, then dangerous goods are detected for
+    the whole chunk with a single analyze_documents() call (one nlp.pipe
+    stream and one catalog load) before each manifest is completed.
+    Documents that fail are retried in a chunk of their own; they only
+    count as failed in the batch status once retries are exhausted.
+    
+    Args:
+        batch_id: Batch this chunk belongs to
+        document_ids: Document IDs in this chunk
+        processing_options: Dict with options like use_ocr, engines, advanced_features
+    """
+    options = processing_options or {}
+    task_id = self.request.id
+    completed = failed = 0
+    retry_ids = []
+    
+    documents = {str(document.id): document for document in Document.objects.filter(id__in=document_ids)}
+    
+    # Stage 1: Text extraction, per document
+    extracted = []
+    for document_id in document_ids:
+        processing_start = timezone.now()
+        _set_processing_status(
+            document_id, task_id,
+            status='processing',
+            stage='text_extraction',
+            progress=20,
+            batch_id=batch_id,
+            started_at=processing_start.isoformat()
+        )
+        document = documents.get(str(document_id))
+        if document is None:
+            error_msg = f"Document {document_id} not found"
+            logger.error(error_msg)
+            _set_processing_status(document_id, task_id, status='failed', error=error_msg)
+            failed += 1
+            continue
+        try:
+            document.status = Document.DocumentStatus.PROCESSING
+            document.save(update_fields=['status'])
+            text, ocr_confidence, processing_method = _extract_manifest_text(
+                document, options.get('use_ocr', True), options.get('engines', ['tesseract'])
+            )
+            extracted.append((document, processing_start, text, ocr_confidence, processing_method))
+        except Exception as exc:
+            _fail_manifest_processing(document_id, task_id, exc)
+            retry_ids.append(document_id)
+    
+    # Stage 2: Dangerous goods detection for the whole chunk
+    analyses = []
+    if extracted:
+        for document, *_rest in extracted:
+            _set_processing_status(document.id, task_id, status='processing', stage='dg_detection', progress=50)
+        try:
+            analyses = enhanced_dg_detection.analyze_documents(
+                [text for _document, _start, text, _confidence, _method in extracted],
+                advanced_features=options.get('advanced_features', True)
+            )
+        except Exception as exc:
+            for document, *_rest in extracted:
+                _fail_manifest_processing(document.id, task_id, exc)
+                retry_ids.append(str(document.id))
+            extracted = []
+    
+    # Stages 3 and 4: Manifest analysis and results, per document
+    for (document, processing_start, text, ocr_confidence, processing_method), analysis in zip(extracted, analyses):
+        dangerous_goods_matches = sorted(
+            (
+                {
+                    'dangerous_good': item.dangerous_good,
+                    'matched_term': item.matched_term,
+                    'confidence': item.confidence,
+                    'match_type': item.match_type
+                }
+                for item in analysis.detected_items
+            ),
+            key=lambda match: match['confidence'],
+            reverse=True
+        )
+        try:
+            _complete_manifest_processing(
+                document, task_id, processing_start,
+                text, ocr_confidence, processing_method,
+                dangerous_goods_matches
+            )
+            completed += 1
+        except Exception as exc:
+            _fail_manifest_processing(document.id, task_id, exc)
+            retry_ids.append(str(document.id))
+    
+    if retry_ids and self.request.retries < self.max_retries:
+        _record_batch_progress(batch_id, completed, failed)
+        raise self.retry(
+            args=[batch_id, retry_ids, options],
+            time_limit=DOCUMENT_TIME_LIMIT * len(retry_ids)
+        )
+    failed += len(retry_ids)
+    
+    _record_batch_progress(batch_id, completed, failed)
+    logger.info(f"Batch {batch_id}: chunk of {len(document_ids)} documents finished, {completed} completed, {failed} failed")
+    
+    return {
+        'batch_id': batch_id,
+        'completed': completed,
+        'failed': failed
+    }
+
+
 @shared_task(
     bind=True,
     rate_limit='10/m'
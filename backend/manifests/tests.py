@@ -1,3 +1,163 @@
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from companies.models import Company
+from dangerous_goods.models import DangerousGood
+from documents.models import Document
+from freight_types.models import FreightType
+from shipments.models import Shipment
+from .models import Manifest, ManifestType
+from .services import create_manifest_dg_matches
+
+from .table_extraction_service import AdvancedTableExtractor, ExtractedTable
+
+
+class TableExtractionTestCase(TestCase):
+    """Test page-parallel, cascading table extraction"""
+
+    def setUp(self):
+        self.extractor = AdvancedTableExtractor(confidence_threshold=0.8)
+
+    def _table(self, bbox, headers, confidence, page_number=0):
+        return ExtractedTable(
+            cells=[],
+            headers=headers,
+            rows=[{headers[0]: 'UN1090'}],
+            bbox=bbox,
+            page_number=page_number,
+            table_type='dg_manifest',
+            confidence=confidence,
+            extraction_method='test'
+        )
+
+    def _write_pdf(self, page_count):
+        import fitz
+        path = os.path.join(tempfile.mkdtemp(), 'manifest.pdf')
+        self.addCleanup(os.remove, path)
+        pdf = fitz.open()
+        for page_num in range(page_count):
+            page = pdf.new_page()
+            page.insert_text((50, 72), "UN      Proper Shipping Name      Class     Packing Group    Quantity")
+            for row in range(4):
+                page.insert_text((50, 86 + row * 14), f"UN1090  ACETONE      3     II     {page_num * 10 + row} kg")
+        pdf.save(path)
+        pdf.close()
+        return path
+
+    def test_deduplicates_within_grid_squares(self):
+        tables = [
+            self._table((0, 0, 100, 100), ['UN', 'Class'], 0.9),
+            self._table((10, 10, 90, 90), ['UN', 'Class'], 0.8),
+            self._table((400, 400, 500, 500), ['UN', 'Class'], 0.7),
+            self._table((0, 0, 0, 0), ['UN', 'Class'], 0.6),
+            self._table((0, 0, 100, 100), ['UN', 'Class'], 0.5, page_number=1),
+        ]
+        unique = self.extractor._deduplicate_tables(tables)
+        # Same place, or no position, on the same page: duplicates of the best table
+        self.assertEqual([table.confidence for table in unique], [0.9, 0.7, 0.5])
+
+    def test_stops_after_confident_method(self):
+        confident = self._table((0, 0, 100, 100), ['UN', 'Class'], 0.95)
+        with patch.object(self.extractor, '_extract_with_pymupdf_tables', return_value=[confident]), \
+                patch.object(self.extractor, '_extract_with_geometric_analysis') as geometric, \
+                patch.object(self.extractor, '_extract_with_pattern_matching') as pattern:
+            tables = self.extractor._extract_page_tables(MagicMock(), 0)
+        self.assertEqual(tables, [confident])
+        geometric.assert_not_called()
+        pattern.assert_not_called()
+
+    def test_falls_through_below_threshold(self):
+        weak = self._table((0, 0, 100, 100), ['Item'], 0.4)
+        with patch.object(self.extractor, '_extract_with_pymupdf_tables', return_value=[weak]), \
+                patch.object(self.extractor, '_extract_with_geometric_analysis', return_value=[]) as geometric, \
+                patch.object(self.extractor, '_extract_with_pattern_matching', return_value=[]) as pattern:
+            self.extractor._extract_page_tables(MagicMock(), 0)
+        geometric.assert_called_once()
+        pattern.assert_called_once()
+
+    def test_parallel_matches_sequential(self):
+        path = self._write_pdf(4)
+
+        def summary(result):
+            return [(table.page_number, table.headers, table.rows) for table in result.tables]
+
+        sequential = self.extractor.extract_tables_from_pdf(path, use_cache=False, workers=1)
+        parallel = self.extractor.extract_tables_from_pdf(path, use_cache=False, workers=2)
+
+        self.assertEqual(sequential.total_tables, 4)
+        self.assertEqual(summary(parallel), summary(sequential))
+
+    def test_streams_pages(self):
+        path = self._write_pdf(3)
+        pages = self.extractor.iter_page_tables(path, page_numbers=[0, 2], use_cache=False, workers=1)
+        self.assertEqual(next(pages)[0], 0)
+        self.assertEqual([page_num for page_num, _ in pages], [2])
+
+
+class ManifestDGMatchSyncTestCase(TestCase):
+    """Test that re-analysis syncs DG matches in place"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username='manifest-user@test.com', email='manifest-user@test.com', password='testpass123'
+        )
+        carrier = Company.objects.create(name='Manifest Carrier', company_type='CARRIER')
+        customer = Company.objects.create(name='Manifest Customer', company_type='CUSTOMER')
+        freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        shipment = Shipment.objects.create(
+            customer=customer, carrier=carrier, freight_type=freight_type,
+            origin_location='Perth', destination_location='Broome'
+        )
+        document = Document.objects.create(
+            document_type='DG_MANIFEST', file='documents/manifest.pdf', original_filename='manifest.pdf',
+            mime_type='application/pdf', file_size=1024, shipment=shipment, uploaded_by=user
+        )
+        self.manifest = Manifest.objects.create(
+            document=document, shipment=shipment, manifest_type=ManifestType.DG_MANIFEST
+        )
+        self.paint_ii = DangerousGood.objects.create(
+            un_number='UN1263', proper_shipping_name='Paint', hazard_class='3', packing_group='II'
+        )
+        self.paint_iii = DangerousGood.objects.create(
+            un_number='UN1263', proper_shipping_name='Paint', hazard_class='3', packing_group='III'
+        )
+        self.acetone = DangerousGood.objects.create(
+            un_number='UN1090', proper_shipping_name='Acetone', hazard_class='3', packing_group='II'
+        )
+
+    def _result(self, dg, found_text, confidence=0.9):
+        return {
+            'dangerous_good_id': str(dg.pk),
+            'un_number': dg.un_number,
+            'found_text': found_text,
+            'match_type': 'UN_NUMBER',
+            'confidence_score': confidence,
+            'page_number': 1,
+        }
+
+    def test_matches_the_analysed_entry_of_a_shared_un_number(self):
+        create_manifest_dg_matches(self.manifest, [self._result(self.paint_iii, 'UN1263 Paint PG III')])
+
+        self.assertEqual(
+            list(self.manifest.dg_matches.values_list('dangerous_good_id', flat=True)), [self.paint_iii.pk]
+        )
+
+    def test_reanalysis_keeps_confirmation_and_removes_vanished_matches(self):
+        create_manifest_dg_matches(self.manifest, [
+            self._result(self.paint_ii, 'UN1263 Paint'),
+            self._result(self.acetone, 'UN1090 Acetone'),
+        ])
+        self.manifest.dg_matches.filter(dangerous_good=self.paint_ii).update(is_confirmed=True)
+
+        create_manifest_dg_matches(self.manifest, [self._result(self.paint_ii, 'UN1263 Paint', confidence=0.95)])
+
+        match = self.manifest.dg_matches.get()
+        self.assertEqual(match.dangerous_good, self.paint_ii)
+        self.assertTrue(match.is_confirmed)
+        self.assertEqual(match.confidence_score, 0.95)
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class MobileApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mobile_api'
-    verbose_name = 'Mobile API Foundation'
\ No newline at end of file
+    verbose_name = 'Mobile API Foundation'
+
+    def ready(self):
+        import mobile_api.signals  # noqa
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""
+Offline dangerous goods bundle for the mobile app.
+
+Drivers look up dangerous goods, segregation rules and emergency procedures
+where there is no signal, so the app keeps a local copy of that reference
+data instead of querying the API per keystroke. The copy is a bundle:
+
+- gzip-compressed JSON with one ``{fields, rows}`` table per dataset
+  (dangerous goods, synonyms, segregation groups and rules, active EPG
+  summaries); the first field of every table is the row's id
+- versioned by a hash of its content, so identical data always has the
+  same version and a rebuild with no changes is a no-op
+- built once per dataset change by the build_dangerous_goods_bundle task,
+  queued from signals, and stored in default storage; requests only read
+  the stored files
+
+With every new version, diffs from the previous retained versions are
+stored too. A diff holds, per table, the rows added or changed
+(``upserts``) and the ids removed (``deletes``), so an app that is one or
+two versions behind downloads a few rows rather than the whole bundle.
+A diff is only offered when the table layouts match; otherwise the app
+downloads the full bundle.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+
+from dangerous_goods.models import DangerousGood, DGProductSynonym, SegregationGroup, SegregationRule
+from epg.models import EmergencyProcedureGuide, EPGStatus
+from .models import DangerousGoodsBundle
+
+logger = logging.getLogger(__name__)
+
+# Bump when the bundle layout changes in a way older apps cannot read
+BUNDLE_FORMAT = 1
+BUNDLE_DIR = 'mobile/dg-bundles'
+
+DEFAULT_KEEP_VERSIONS = 5
+DEFAULT_REBUILD_DELAY = 60  # seconds
+
+REBUILD_SCHEDULED_KEY = 'mobile_dg_bundle:rebuild_scheduled'
+
+DANGEROUS_GOOD_FIELDS = [
+    'id', 'un_number', 'proper_shipping_name', 'simplified_name', 'hazard_class', 'subsidiary_risks',
+    'packing_group', 'hazard_labels_required', 'erg_guide_number', 'special_provisions',
+    'is_marine_pollutant', 'is_environmentally_hazardous', 'is_fire_risk', 'is_bulk_transport_allowed',
+    'physical_form',
+]
+SYNONYM_FIELDS = ['id', 'dangerous_good_id', 'synonym']
+SEGREGATION_GROUP_FIELDS = ['id', 'code', 'name']
+SEGREGATION_RULE_FIELDS = [
+    'id', 'rule_type', 'primary_hazard_class', 'secondary_hazard_class', 'primary_segregation_group_id',
+    'secondary_segregation_group_id', 'compatibility_status', 'condition_type', 'condition_value', 'notes',
+]
+EPG_FIELDS = [
+    'id', 'epg_number', 'title', 'dangerous_good_id', 'hazard_class', 'subsidiary_risks', 'emergency_types',
+    'severity_level', 'immediate_actions', 'personal_protection', 'fire_procedures', 'spill_procedures',
+    'medical_procedures', 'isolation_distances', 'version',
+]
+
+
+def _canonical_json(data) -> bytes:
+    return json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _compress(data) -> bytes:
+    # mtime=0 so the same content always compresses to the same bytes
+    return gzip.compress(_canonical_json(data), compresslevel=9, mtime=0)
+
+
+def _table(fields, rows) -> Dict:
+    return {'fields': fields, 'rows': [list(row) for row in rows]}
+
+
+def build_tables() -> Dict[str, Dict]:
+    """Current reference data as bundle tables, in JSON types"""
+    members = {}
+    for group_id, dangerous_good_id in SegregationGroup.dangerous_goods.through.objects.order_by(
+        'segregationgroup_id', 'dangerousgood_id'
+    ).values_list('segregationgroup_id', 'dangerousgood_id'):
+        members.setdefault(group_id, []).append(dangerous_good_id)
+
+    tables = {
+        'dangerous_goods': _table(
+            DANGEROUS_GOOD_FIELDS, DangerousGood.objects.order_by('pk').values_list(*DANGEROUS_GOOD_FIELDS)
+        ),
+        'synonyms': _table(
+            SYNONYM_FIELDS, DGProductSynonym.objects.order_by('pk').values_list(*SYNONYM_FIELDS)
+        ),
+        'segregation_groups': _table(
+            SEGREGATION_GROUP_FIELDS + ['dangerous_good_ids'],
+            (
+                row + (members.get(row[0], []),)
+                for row in SegregationGroup.objects.order_by('pk').values_list(*SEGREGATION_GROUP_FIELDS)
+            )
+        ),
+        'segregation_rules': _table(
+            SEGREGATION_RULE_FIELDS, SegregationRule.objects.order_by('pk').values_list(*SEGREGATION_RULE_FIELDS)
+        ),
+        'epgs': _table(
+            EPG_FIELDS,
+            EmergencyProcedureGuide.objects.filter(status=EPGStatus.ACTIVE).order_by('pk').values_list(*EPG_FIELDS)
+        ),
+    }
+    # Round trip so ids compare equal to those read back from stored bundles
+    return json.loads(_canonical_json(tables))
+
+
+def tables_version(tables: Dict[str, Dict]) -> str:
+    return hashlib.sha256(_canonical_json({'format': BUNDLE_FORMAT, 'tables': tables})).hexdigest()[:16]
+
+
+def diff_tables(old: Dict[str, Dict], new: Dict[str, Dict]) -> Optional[Dict[str, Dict]]:
+    """Per-table upserts and deletes turning old into new; None if the layouts differ"""
+    if set(old) != set(new) or any(old[name]['fields'] != new[name]['fields'] for name in new):
+        return None
+    diff = {}
+    for name, table in new.items():
+        old_rows = {row[0]: row for row in old[name]['rows']}
+        new_ids = {row[0] for row in table['rows']}
+        diff[name] = {
+            'fields': table['fields'],
+            'upserts': [row for row in table['rows'] if old_rows.get(row[0]) != row],
+            'deletes': [row_id for row_id in old_rows if row_id not in new_ids],
+        }
+    return diff
+
+
+def apply_diff(tables: Dict[str, Dict], diff: Dict[str, Dict]) -> Dict[str, Dict]:
+    """What the app does with a diff; the result equals the newer bundle's tables"""
+    result = {}
+    for name, table in tables.items():
+        rows = {row[0]: row for row in table['rows']}
+        for row_id in diff[name]['deletes']:
+            rows.pop(row_id, None)
+        for row in diff[name]['upserts']:
+            rows[row[0]] = row
+        # Bundles list rows in id order
+        result[name] = {'fields': diff[name]['fields'], 'rows': sorted(rows.values(), key=lambda row: row[0])}
+    return result
+
+
+def _save_file(name: str, content: bytes) -> str:
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, io.BytesIO(content))
+
+
+def read_file(name: str) -> bytes:
+    with default_storage.open(name, 'rb') as bundle_file:
+        return bundle_file.read()
+
+
+def load_tables(bundle: DangerousGoodsBundle) -> Dict[str, Dict]:
+    return json.loads(gzip.decompress(read_file(bundle.file_name)))['tables']
+
+
+def latest_bundle() -> Optional[DangerousGoodsBundle]:
+    return DangerousGoodsBundle.objects.first()
+
+
+def build_bundle() -> Tuple[DangerousGoodsBundle, bool]:
+    """
+    Store a bundle of the current reference data, with diffs to it from the
+    retained versions. Returns the bundle and whether it is new.
+    """
+    tables = build_tables()
+    version = tables_version(tables)
+    existing = DangerousGoodsBundle.objects.filter(version=version).first()
+    if existing:
+        if existing == latest_bundle():
+            return existing, False
+        # The data went back to an earlier version; publish it again as the latest
+        _delete_bundle(existing)
+
+    content = _compress({'format': BUNDLE_FORMAT, 'version': version, 'tables': tables})
+    file_name = _save_file(f"{BUNDLE_DIR}/{version}.json.gz", content)
+
+    keep = getattr(settings, 'MOBILE_DG_BUNDLE_KEEP_VERSIONS', DEFAULT_KEEP_VERSIONS)
+    diffs = {}
+    for previous in DangerousGoodsBundle.objects.all()[:max(keep - 1, 0)]:
+        try:
+            diff = diff_tables(load_tables(previous), tables)
+        except Exception as e:
+            logger.warning(f"Could not diff DG bundle {previous.version} to {version}: {e}")
+            continue
+        if diff is None:
+            continue
+        diff_content = _compress({
+            'format': BUNDLE_FORMAT, 'from': previous.version, 'version': version, 'tables': diff
+        })
+        diffs[previous.version] = {
+            'file_name': _save_file(f"{BUNDLE_DIR}/{previous.version}-{version}.diff.json.gz", diff_content),
+            'size': len(diff_content),
+        }
+
+    try:
+        bundle = DangerousGoodsBundle.objects.create(
+            version=version,
+            file_name=file_name,
+            size=len(content),
+            sha256=hashlib.sha256(content).hexdigest(),
+            record_counts={name: len(table['rows']) for name, table in tables.items()},
+            diffs=diffs,
+        )
+    except IntegrityError:
+        # Built concurrently; the files written are identical
+        return DangerousGoodsBundle.objects.get(version=version), False
+
+    logger.info(f"Built DG bundle {version} ({len(content)} bytes, {len(diffs)} diffs)")
+    prune_bundles(keep)
+    return bundle, True
+
+
+def prune_bundles(keep: Optional[int] = None) -> int:
+    """Delete all but the newest keep bundles, with their files"""
+    keep = keep or getattr(settings, 'MOBILE_DG_BUNDLE_KEEP_VERSIONS', DEFAULT_KEEP_VERSIONS)
+    stale = list(DangerousGoodsBundle.objects.all()[keep:])
+    for bundle in stale:
+        _delete_bundle(bundle)
+    return len(stale)
+
+
+def _delete_bundle(bundle: DangerousGoodsBundle):
+    for name in [bundle.file_name] + [diff['file_name'] for diff in bundle.diffs.values()]:
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete DG bundle file {name}: {e}")
+    bundle.delete()
+
+
+def schedule_rebuild():
+    """
+    Queue a bundle build after the current transaction. Changes arriving
+    within MOBILE_DG_BUNDLE_REBUILD_DELAY of each other share one build.
+    """
+    delay = getattr(settings, 'MOBILE_DG_BUNDLE_REBUILD_DELAY', DEFAULT_REBUILD_DELAY)
+
+    def queue():
+        if not cache.add(REBUILD_SCHEDULED_KEY, True, delay):
+            return
+        from .tasks import build_dangerous_goods_bundle
+        try:
+            build_dangerous_goods_bundle.apply_async(countdown=delay)
+        except Exception as e:
+            cache.delete(REBUILD_SCHEDULED_KEY)
+            logger.warning(f"Could not queue DG bundle build: {e}")
+
+    transaction.on_commit(queue)
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class MobileSyncChange(models.Model):
+    """
+    Append-only log of changes to what a driver's device holds. Delta sync
+    reads a driver's rows after their cursor (the last seq they received),
+    so its cost follows the number of changes rather than the number of
+    shipments assigned to the driver. Written from signals (see signals.py).
+    """
+
+    class Entity(models.TextChoices):
+        SHIPMENT = "shipment", _("Shipment")
+        ITEM = "item", _("Consignment Item")
+        POD = "pod", _("Proof of Delivery")
+
+    class Operation(models.TextChoices):
+        UPSERT = "upsert", _("Created or Updated")
+        DELETE = "delete", _("Removed")
+
+    seq = models.BigAutoField(primary_key=True)
+    driver = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mobile_sync_changes'
+    )
+    entity = models.CharField(max_length=10, choices=Entity.choices)
+    object_id = models.UUIDField()
+    operation = models.CharField(max_length=10, choices=Operation.choices)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = _("Mobile Sync Change")
+        verbose_name_plural = _("Mobile Sync Changes")
+        indexes = [
+            models.Index(fields=['driver', 'seq']),
+        ]
+
+    def __str__(self):
+        return f"{self.seq}: {self.operation} {self.entity} {self.object_id} for {self.driver_id}"
+
+
+class DangerousGoodsBundle(models.Model):
+    """
+    A built version of the offline dangerous goods bundle (see dg_bundle.py).
+    The bundle and the diffs to it from earlier versions are files in
+    default storage; this row records where they are.
+    """
+
+    version = models.CharField(max_length=64, unique=True)
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    record_counts = models.JSONField(default=dict)
+    # {from_version: {'file_name': ..., 'size': ...}} for each diff to this version
+    diffs = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = _("Dangerous Goods Bundle")
+        verbose_name_plural = _("Dangerous Goods Bundles")
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return f"DG bundle {self.version} ({self.created_at:%Y-%m-%d %H:%M})"
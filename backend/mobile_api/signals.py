@@ -0,0 +1,107 @@
+"""
+Record changes to drivers' shipments in the mobile sync log (see sync.py).
+Log rows are written in the same transaction as the change.
+
+Changes to dangerous goods reference data queue a rebuild of the offline
+bundle (see dg_bundle.py).
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from dangerous_goods.models import DangerousGood, DGProductSynonym, SegregationGroup, SegregationRule
+from epg.models import EmergencyProcedureGuide
+from shipments.models import ConsignmentItem, ProofOfDelivery, Shipment
+from .dg_bundle import schedule_rebuild
+from .models import MobileSyncChange
+from .sync import record_changes
+
+UPSERT = MobileSyncChange.Operation.UPSERT
+DELETE = MobileSyncChange.Operation.DELETE
+
+_UNKNOWN = object()
+
+
+def _shipment_driver_id(shipment_id):
+    return Shipment.objects.filter(pk=shipment_id).values_list('assigned_driver_id', flat=True).first()
+
+
+@receiver(post_init, sender=Shipment)
+def remember_assigned_driver(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred field is not loaded for every shipment
+    instance._sync_driver_id = instance.__dict__.get('assigned_driver_id', _UNKNOWN)
+
+
+@receiver(post_save, sender=Shipment)
+def shipment_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_sync_driver_id', _UNKNOWN)
+    current = instance.assigned_driver_id
+    instance._sync_driver_id = current
+
+    if previous is not _UNKNOWN and previous and previous != current:
+        # Reassigned or unassigned: remove the shipment, its items and POD from the old device
+        record_changes(previous, MobileSyncChange.Entity.SHIPMENT, [instance.pk], DELETE)
+        record_changes(
+            previous, MobileSyncChange.Entity.ITEM,
+            ConsignmentItem.objects.filter(shipment=instance).values_list('pk', flat=True), DELETE
+        )
+        record_changes(
+            previous, MobileSyncChange.Entity.POD,
+            ProofOfDelivery.objects.filter(shipment=instance).values_list('pk', flat=True), DELETE
+        )
+    if not current:
+        return
+    record_changes(current, MobileSyncChange.Entity.SHIPMENT, [instance.pk], UPSERT)
+    if not created and previous != current:
+        # Newly assigned: the driver's device needs the items and POD too
+        record_changes(
+            current, MobileSyncChange.Entity.ITEM,
+            ConsignmentItem.objects.filter(shipment=instance).values_list('pk', flat=True), UPSERT
+        )
+        record_changes(
+            current, MobileSyncChange.Entity.POD,
+            ProofOfDelivery.objects.filter(shipment=instance).values_list('pk', flat=True), UPSERT
+        )
+
+
+@receiver(post_delete, sender=Shipment)
+def shipment_deleted(sender, instance, **kwargs):
+    record_changes(instance.assigned_driver_id, MobileSyncChange.Entity.SHIPMENT, [instance.pk], DELETE)
+
+
+@receiver(post_save, sender=ConsignmentItem)
+def item_saved(sender, instance, **kwargs):
+    record_changes(_shipment_driver_id(instance.shipment_id), MobileSyncChange.Entity.ITEM, [instance.pk], UPSERT)
+
+
+@receiver(post_delete, sender=ConsignmentItem)
+def item_deleted(sender, instance, **kwargs):
+    record_changes(_shipment_driver_id(instance.shipment_id), MobileSyncChange.Entity.ITEM, [instance.pk], DELETE)
+
+
+@receiver(post_save, sender=ProofOfDelivery)
+def pod_saved(sender, instance, **kwargs):
+    record_changes(_shipment_driver_id(instance.shipment_id), MobileSyncChange.Entity.POD, [instance.pk], UPSERT)
+
+
+@receiver(post_delete, sender=ProofOfDelivery)
+def pod_deleted(sender, instance, **kwargs):
+    record_changes(_shipment_driver_id(instance.shipment_id), MobileSyncChange.Entity.POD, [instance.pk], DELETE)
+
+
+BUNDLED_MODELS = [DangerousGood, DGProductSynonym, SegregationGroup, SegregationRule, EmergencyProcedureGuide]
+
+
+def reference_data_changed(sender, **kwargs):
+    schedule_rebuild()
+
+
+for model in BUNDLED_MODELS:
+    post_save.connect(reference_data_changed, sender=model, dispatch_uid=f'dg_bundle_save_{model.__name__}')
+    post_delete.connect(reference_data_changed, sender=model, dispatch_uid=f'dg_bundle_delete_{model.__name__}')
+
+
+@receiver(m2m_changed, sender=SegregationGroup.dangerous_goods.through)
+def segregation_members_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_rebuild()
@@ -0,0 +1,193 @@
+"""
+Delta sync of a driver's shipments for the mobile app.
+
+Devices keep a local copy of the shipments assigned to the driver, with
+their consignment items and proof of delivery, plus an opaque cursor. Each
+sync returns only what changed since that cursor, read from the
+MobileSyncChange log:
+
+- upserts as rows of flat values under a shared field list per entity,
+  with the companies they reference listed once rather than nested in
+  every shipment
+- tombstones (ids under ``deleted``) for removed rows and for shipments
+  reassigned to another driver
+- ``has_more`` when the change limit was reached; call again with the
+  returned cursor
+
+Without a cursor, or with one older than the retained log, the response is
+a full snapshot with ``reset: true``, and the device replaces its copy.
+Applying a response is idempotent, so changes repeated across responses are
+harmless.
+
+Changes are only served once they are MOBILE_SYNC_SETTLE_SECONDS old. Log
+sequence numbers are assigned on insert, not on commit. Waiting lets a
+slower transaction commit its earlier numbers before a cursor moves past
+them.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from companies.models import Company
+from shipments.models import ConsignmentItem, ProofOfDelivery, Shipment
+from .models import MobileSyncChange
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CHANGES = 500
+DEFAULT_SETTLE_SECONDS = 5
+DEFAULT_RETENTION_DAYS = 30
+
+SHIPMENT_FIELDS = [
+    'id', 'tracking_number', 'reference_number', 'status', 'customer_id', 'carrier_id',
+    'origin_location', 'destination_location', 'estimated_pickup_date', 'estimated_delivery_date',
+    'actual_pickup_date', 'actual_delivery_date', 'instructions', 'updated_at',
+]
+ITEM_FIELDS = [
+    'id', 'shipment_id', 'description', 'quantity', 'weight_kg', 'is_dangerous_good',
+    'dangerous_good_entry_id', 'dg_quantity_type', 'updated_at',
+]
+POD_FIELDS = ['id', 'shipment_id', 'delivered_at', 'recipient_name', 'delivery_notes', 'updated_at']
+COMPANY_FIELDS = ['id', 'name']
+
+# Response key, model and fields of each entity
+ENTITIES = {
+    MobileSyncChange.Entity.SHIPMENT: ('shipments', Shipment, SHIPMENT_FIELDS),
+    MobileSyncChange.Entity.ITEM: ('items', ConsignmentItem, ITEM_FIELDS),
+    MobileSyncChange.Entity.POD: ('pods', ProofOfDelivery, POD_FIELDS),
+}
+
+
+def record_changes(driver_id, entity: str, object_ids: Iterable, operation: str):
+    """Log changes to objects on a driver's device"""
+    if not driver_id:
+        return
+    MobileSyncChange.objects.bulk_create([
+        MobileSyncChange(driver_id=driver_id, entity=entity, object_id=object_id, operation=operation)
+        for object_id in object_ids
+    ])
+
+
+def _settled_before():
+    return timezone.now() - timedelta(
+        seconds=getattr(settings, 'MOBILE_SYNC_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    )
+
+
+def driver_head(driver) -> int:
+    """Sequence number of the driver's latest servable change, 0 if none"""
+    return MobileSyncChange.objects.filter(
+        driver=driver, created_at__lte=_settled_before()
+    ).order_by('-seq').values_list('seq', flat=True).first() or 0
+
+
+def sync_etag(driver, cursor: Optional[str], limit: int) -> str:
+    """Changes whenever the response for this cursor would"""
+    return f'W/"sync-{driver.pk}-{cursor or "snapshot"}-{limit}-{driver_head(driver)}"'
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Cursor as a sequence number, None when missing, invalid or too old to resume from"""
+    try:
+        seq = int(cursor)
+    except (TypeError, ValueError):
+        return None
+    # Changes after the cursor may have been pruned
+    oldest = MobileSyncChange.objects.order_by('seq').values_list('seq', flat=True).first()
+    if seq < 0 or (oldest is not None and seq < oldest - 1):
+        return None
+    return seq
+
+
+def _table(fields: List[str], rows) -> Dict:
+    return {'fields': fields, 'rows': [list(row) for row in rows]}
+
+
+def _companies(shipment_rows: List) -> Dict:
+    customer = SHIPMENT_FIELDS.index('customer_id')
+    carrier = SHIPMENT_FIELDS.index('carrier_id')
+    company_ids = {row[customer] for row in shipment_rows} | {row[carrier] for row in shipment_rows}
+    company_ids.discard(None)
+    return _table(COMPANY_FIELDS, Company.objects.filter(pk__in=company_ids).values_list(*COMPANY_FIELDS))
+
+
+def _snapshot(driver) -> Dict:
+    # Taken before reading, so anything changed meanwhile is sent again next time
+    cursor = MobileSyncChange.objects.filter(
+        created_at__lte=_settled_before()
+    ).order_by('-seq').values_list('seq', flat=True).first() or 0
+
+    shipments = list(Shipment.objects.filter(assigned_driver=driver).values_list(*SHIPMENT_FIELDS))
+    return {
+        'cursor': str(cursor),
+        'reset': True,
+        'has_more': False,
+        'shipments': _table(SHIPMENT_FIELDS, shipments),
+        'items': _table(
+            ITEM_FIELDS,
+            ConsignmentItem.objects.filter(shipment__assigned_driver=driver).values_list(*ITEM_FIELDS)
+        ),
+        'pods': _table(
+            POD_FIELDS,
+            ProofOfDelivery.objects.filter(shipment__assigned_driver=driver).values_list(*POD_FIELDS)
+        ),
+        'companies': _companies(shipments),
+        'deleted': {key: [] for key, _, _ in ENTITIES.values()},
+    }
+
+
+def build_sync_payload(driver, cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+    """Changes to the driver's shipments after cursor, or a snapshot (see module docstring)"""
+    limit = limit or getattr(settings, 'MOBILE_SYNC_MAX_CHANGES', DEFAULT_MAX_CHANGES)
+    seq = _parse_cursor(cursor)
+    if seq is None:
+        return _snapshot(driver)
+
+    changes = list(
+        MobileSyncChange.objects.filter(
+            driver=driver, seq__gt=seq, created_at__lte=_settled_before()
+        ).order_by('seq').values_list('seq', 'entity', 'object_id', 'operation')[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # The latest change to each object wins
+    latest = {}
+    for _, entity, object_id, operation in changes:
+        latest[(entity, object_id)] = operation
+
+    payload = {
+        'cursor': str(changes[-1][0] if changes else seq),
+        'reset': False,
+        'has_more': has_more,
+        'deleted': {},
+    }
+    visible = {
+        MobileSyncChange.Entity.SHIPMENT: {'assigned_driver': driver},
+        MobileSyncChange.Entity.ITEM: {'shipment__assigned_driver': driver},
+        MobileSyncChange.Entity.POD: {'shipment__assigned_driver': driver},
+    }
+    for entity, (key, model, fields) in ENTITIES.items():
+        upserted = [object_id for (kind, object_id), op in latest.items()
+                    if kind == entity and op == MobileSyncChange.Operation.UPSERT]
+        deleted = {object_id for (kind, object_id), op in latest.items()
+                   if kind == entity and op == MobileSyncChange.Operation.DELETE}
+        rows = list(model.objects.filter(pk__in=upserted, **visible[entity]).values_list(*fields)) if upserted else []
+        # Upserted but no longer the driver's, e.g. reassigned since: remove from the device
+        deleted.update(set(upserted) - {row[0] for row in rows})
+        payload[key] = _table(fields, rows)
+        payload['deleted'][key] = sorted(str(object_id) for object_id in deleted)
+
+    payload['companies'] = _companies(payload['shipments']['rows'])
+    return payload
+
+
+def prune_changes(days: Optional[int] = None) -> int:
+    """Delete log entries older than the retention period; devices behind it resync from a snapshot"""
+    days = days or getattr(settings, 'MOBILE_SYNC_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    deleted, _ = MobileSyncChange.objects.filter(created_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
@@ -0,0 +1,29 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .dg_bundle import REBUILD_SCHEDULED_KEY, build_bundle
+from .sync import prune_changes
+
+
+@shared_task
+def prune_mobile_sync_changes(days: int = None):
+    """Delete mobile sync log entries past the retention period"""
+    return {
+        'status': 'success',
+        'changes_deleted': prune_changes(days)
+    }
+
+
+@shared_task
+def build_dangerous_goods_bundle():
+    """Build the offline dangerous goods bundle if the reference data changed"""
+    # Changes from here on queue another build
+    cache.delete(REBUILD_SCHEDULED_KEY)
+    bundle, created = build_bundle()
+    return {
+        'status': 'success',
+        'version': bundle.version,
+        'created': created,
+        'size': bundle.size,
+        'diffs': len(bundle.diffs),
+    }
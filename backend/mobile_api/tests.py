@@ -0,0 +1,227 @@
+import gzip
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from dangerous_goods.models import DangerousGood
+from freight_types.models import FreightType
+from shipments.models import ConsignmentItem, Shipment, ShipmentStatus
+from shipments.services import update_shipment_details
+from .dg_bundle import apply_diff, build_bundle, build_tables, latest_bundle, load_tables, read_file
+
+User = get_user_model()
+
+SYNC_URL = '/api/v1/mobile/shipments/sync/'
+BUNDLE_URL = '/api/v1/mobile/dangerous-goods/bundle/'
+
+
+@override_settings(MOBILE_SYNC_SETTLE_SECONDS=0)
+class MobileSyncTests(APITestCase):
+    """Test delta sync of a driver's shipments"""
+
+    def setUp(self):
+        self.carrier = Company.objects.create(name='Sync Carrier', company_type='CARRIER')
+        self.customer = Company.objects.create(name='Sync Customer', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.driver = User.objects.create_user(
+            username='sync-driver@test.com', email='sync-driver@test.com', password='testpass123',
+            role='DRIVER', company=self.carrier
+        )
+        self.other_driver = User.objects.create_user(
+            username='sync-other@test.com', email='sync-other@test.com', password='testpass123',
+            role='DRIVER', company=self.carrier
+        )
+        self.shipment = self._shipment()
+        self.item = ConsignmentItem.objects.create(shipment=self.shipment, description='Acetone drums')
+        self.client.force_authenticate(self.driver)
+
+    def _shipment(self):
+        return Shipment.objects.create(
+            customer=self.customer,
+            carrier=self.carrier,
+            origin_location='Perth',
+            destination_location='Broome',
+            freight_type=self.freight_type,
+            assigned_driver=self.driver,
+        )
+
+    def _sync(self, cursor=None, **headers):
+        params = {'cursor': cursor} if cursor is not None else {}
+        return self.client.get(SYNC_URL, params, **headers)
+
+    def _ids(self, table):
+        return [str(row[0]) for row in table['rows']]
+
+    def test_snapshot_then_deltas(self):
+        snapshot = self._sync()
+        self.assertEqual(snapshot.status_code, 200)
+        self.assertTrue(snapshot.data['reset'])
+        self.assertEqual(self._ids(snapshot.data['shipments']), [str(self.shipment.id)])
+        self.assertEqual(self._ids(snapshot.data['items']), [str(self.item.id)])
+        self.assertEqual(len(snapshot.data['companies']['rows']), 2)
+
+        self.shipment.status = ShipmentStatus.IN_TRANSIT
+        self.shipment.save()
+        delta = self._sync(snapshot.data['cursor'])
+        self.assertFalse(delta.data['reset'])
+        self.assertEqual(self._ids(delta.data['shipments']), [str(self.shipment.id)])
+        status_index = delta.data['shipments']['fields'].index('status')
+        self.assertEqual(delta.data['shipments']['rows'][0][status_index], ShipmentStatus.IN_TRANSIT)
+        self.assertEqual(delta.data['items']['rows'], [])
+
+    def test_tombstones(self):
+        second = self._shipment()
+        cursor = self._sync().data['cursor']
+
+        self.item.delete()
+        second.assigned_driver = self.other_driver
+        second.save()
+
+        delta = self._sync(cursor)
+        self.assertEqual(delta.data['deleted']['items'], [str(self.item.id)])
+        self.assertEqual(delta.data['deleted']['shipments'], [str(second.id)])
+        self.assertEqual(delta.data['shipments']['rows'], [])
+
+    def test_unassigned_shipment_removes_items(self):
+        cursor = self._sync().data['cursor']
+
+        self.shipment.assigned_driver = None
+        self.shipment.save()
+
+        delta = self._sync(cursor)
+        self.assertEqual(delta.data['deleted']['shipments'], [str(self.shipment.id)])
+        self.assertEqual(delta.data['deleted']['items'], [str(self.item.id)])
+
+    def test_replaced_items_arrive_after_shipment_update(self):
+        dispatcher = User.objects.create_user(
+            username='sync-dispatcher@test.com', email='sync-dispatcher@test.com', password='testpass123',
+            role='DISPATCHER', company=self.carrier
+        )
+        cursor = self._sync().data['cursor']
+
+        update_shipment_details(
+            self.shipment, {}, dispatcher,
+            items_data=[{'description': 'Paint tins'}, {'description': 'Thinners'}]
+        )
+
+        delta = self._sync(cursor)
+        new_ids = [str(pk) for pk in self.shipment.items.values_list('pk', flat=True)]
+        self.assertEqual(delta.data['deleted']['items'], [str(self.item.id)])
+        self.assertCountEqual(self._ids(delta.data['items']), new_ids)
+        self.assertEqual(len(new_ids), 2)
+
+    def test_reassigned_shipment_arrives_with_items(self):
+        other = self._shipment()
+        other.assigned_driver = self.other_driver
+        other.save()
+        item = ConsignmentItem.objects.create(shipment=other, description='Paint')
+        cursor = self._sync().data['cursor']
+
+        other.assigned_driver = self.driver
+        other.save()
+        delta = self._sync(cursor)
+        self.assertEqual(self._ids(delta.data['shipments']), [str(other.id)])
+        self.assertEqual(self._ids(delta.data['items']), [str(item.id)])
+
+    def test_not_modified(self):
+        first = self._sync()
+        cursor = first.data['cursor']
+        response = self._sync(cursor)
+        self.assertEqual(self._sync(cursor, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.shipment.save()
+        self.assertEqual(self._sync(cursor, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class DangerousGoodsBundleTests(APITestCase):
+    """Test the offline dangerous goods bundle and its diffs"""
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        storage_settings = override_settings(STORAGES={
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': self.storage_dir},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        self.addCleanup(shutil.rmtree, self.storage_dir, ignore_errors=True)
+
+        self.acetone = DangerousGood.objects.create(
+            un_number='UN1090', proper_shipping_name='Acetone', hazard_class='3', packing_group='II'
+        )
+        self.chlorine = DangerousGood.objects.create(
+            un_number='UN1017', proper_shipping_name='Chlorine', hazard_class='2.3'
+        )
+        self.chlorine_id = self.chlorine.pk
+        self.user = User.objects.create_user(
+            username='bundle-driver@test.com', email='bundle-driver@test.com', password='testpass123', role='DRIVER'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _change_data(self):
+        self.acetone.proper_shipping_name = 'Acetone solution'
+        self.acetone.save()
+        self.chlorine.delete()
+        DangerousGood.objects.create(un_number='UN1203', proper_shipping_name='Gasoline', hazard_class='3')
+
+    def test_built_once_per_change(self):
+        first, created = build_bundle()
+        self.assertTrue(created)
+        self.assertEqual(first.record_counts['dangerous_goods'], 2)
+        self.assertEqual(build_bundle(), (first, False))
+
+        self._change_data()
+        second, created = build_bundle()
+        self.assertTrue(created)
+        self.assertEqual(latest_bundle(), second)
+
+        diff = json.loads(gzip.decompress(read_file(second.diffs[first.version]['file_name'])))
+        self.assertEqual(len(diff['tables']['dangerous_goods']['upserts']), 2)
+        self.assertEqual(diff['tables']['dangerous_goods']['deletes'], [self.chlorine_id])
+        self.assertEqual(apply_diff(load_tables(first), diff['tables']), build_tables())
+
+    def test_reverted_data_is_latest_again(self):
+        first, _ = build_bundle()
+        name = self.acetone.proper_shipping_name
+        self.acetone.proper_shipping_name = 'Acetone solution'
+        self.acetone.save()
+        build_bundle()
+
+        self.acetone.proper_shipping_name = name
+        self.acetone.save()
+        reverted, created = build_bundle()
+        self.assertTrue(created)
+        self.assertEqual(reverted.version, first.version)
+        self.assertEqual(latest_bundle(), reverted)
+
+    def test_download_full_and_diff(self):
+        first, _ = build_bundle()
+        self._change_data()
+        second, _ = build_bundle()
+
+        response = self.client.get(BUNDLE_URL, {'since': first.version})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], second.version)
+        self.assertFalse(response.data['up_to_date'])
+        self.assertEqual(self.client.get(BUNDLE_URL, {'since': first.version}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        full = self.client.get(response.data['bundle']['url'])
+        self.assertEqual(full['Content-Type'], 'application/gzip')
+        self.assertEqual(json.loads(gzip.decompress(full.content))['tables'], build_tables())
+
+        diff = self.client.get(response.data['diff']['url'])
+        self.assertEqual(json.loads(gzip.decompress(diff.content))['from'], first.version)
+        self.assertEqual(self.client.get(response.data['diff']['url'], HTTP_IF_NONE_MATCH=diff['ETag']).status_code, 304)
+
+        self.assertIsNone(self.client.get(BUNDLE_URL, {'since': 'unknown'}).data['diff'])
+        self.assertTrue(self.client.get(BUNDLE_URL, {'since': second.version}).data['up_to_date'])
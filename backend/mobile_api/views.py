@@ -2,13 +2,21 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from shipments.models import Shipment
 from dangerous_goods.models import DangerousGood
+from .dg_bundle import BUNDLE_FORMAT, build_bundle, latest_bundle, read_file
+from .models import DangerousGoodsBundle
 from .serializers import (
     MobileShipmentSerializer, MobileDangerousGoodSerializer,
     LocationUpdateSerializer, ProofOfDeliverySerializer
 )
+from .sync import build_sync_payload, sync_etag
+
+
+def _not_modified(request, etag):
+    return etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
 
 
 class MobileShipmentViewSet(viewsets.ReadOnlyModelViewSet):
@@ -24,6 +32,28 @@ class MobileShipmentViewSet(viewsets.ReadOnlyModelViewSet):
             return user.assigned_shipments.select_related('customer', 'carrier')
         return Shipment.objects.select_related('customer', 'carrier')
     
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Changes to the driver's shipments, items and PODs since ?cursor=
+        (omit for a full snapshot). Send the previous ETag as If-None-Match
+        to get 304 Not Modified when nothing changed.
+        """
+        cursor = request.query_params.get('cursor')
+        try:
+            limit = int(request.query_params['limit']) if 'limit' in request.query_params else None
+        except ValueError:
+            return Response({'limit': 'Must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit is not None:
+            limit = max(1, min(limit, 2000))
+        
+        etag = sync_etag(request.user, cursor, limit or 0)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        return Response(build_sync_payload(request.user, cursor, limit), headers=headers)
+    
     @action(detail=True, methods=['post'])
     def update_location(self, request, pk=None):
         """Update shipment location from mobile device"""
@@ -68,4 +98,69 @@ class MobileDangerousGoodsViewSet(viewsets.ReadOnlyModelViewSet):
                 proper_shipping_name__icontains=search
             )
         
-        return queryset[:50]  # Limit for mobile performance
\ No newline at end of file
+        return queryset[:50]  # Limit for mobile performance
+    
+    @action(detail=False, methods=['get'])
+    def bundle(self, request):
+        """
+        Latest version of the offline dangerous goods bundle, with links to
+        download it and, given ?since=<version the app holds>, the diff from
+        that version when one is available
+        """
+        bundle = latest_bundle()
+        if bundle is None:
+            # First request after deployment; later versions are built by the task
+            bundle, _ = build_bundle()
+        
+        since = request.query_params.get('since') or ''
+        etag = f'W/"dg-bundle-{bundle.version}-{since}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        diff = bundle.diffs.get(since)
+        return Response({
+            'format': BUNDLE_FORMAT,
+            'version': bundle.version,
+            'created_at': bundle.created_at,
+            'record_counts': bundle.record_counts,
+            'up_to_date': since == bundle.version,
+            # Relative to this endpoint: bundle/<version>/
+            'bundle': {
+                'url': request.build_absolute_uri(f'{bundle.version}/'),
+                'size': bundle.size,
+                'sha256': bundle.sha256,
+            },
+            'diff': {
+                'from': since,
+                'url': request.build_absolute_uri(f'{bundle.version}/?since={since}'),
+                'size': diff['size'],
+            } if diff else None,
+        }, headers=headers)
+    
+    @action(detail=False, methods=['get'], url_path=r'bundle/(?P<version>[0-9a-f]+)', url_name='bundle-file')
+    def bundle_file(self, request, version=None):
+        """
+        Gzipped JSON of a bundle version, or with ?since= the diff to it.
+        Versions never change, so responses can be cached indefinitely.
+        """
+        bundle = get_object_or_404(DangerousGoodsBundle, version=version)
+        since = request.query_params.get('since')
+        if since:
+            if since not in bundle.diffs:
+                raise Http404('No diff to this version from the given one')
+            file_name = bundle.diffs[since]['file_name']
+            download_name = f'dg-bundle-{since}-{version}.diff.json.gz'
+            etag = f'"{since}-{version}"'
+        else:
+            file_name = bundle.file_name
+            download_name = f'dg-bundle-{version}.json.gz'
+            etag = f'"{version}"'
+        
+        headers = {'ETag': etag, 'Cache-Control': 'private, max-age=31536000, immutable'}
+        if _not_modified(request, etag):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        response = HttpResponse(read_file(file_name), content_type='application/gzip', headers=headers)
+        response['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
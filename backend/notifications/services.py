@@ -136,9 +136,17 @@ class PushNotificationService:
                     'failed_count': 0
                 }
             
-            # Filter devices by notification preferences
+            # Filter devices by notification preferences and quiet hours,
+            # resolving quiet hours for all users in one query
+            from communications.dispatcher import users_in_feedback_quiet_hours
+            quiet_user_ids = users_in_feedback_quiet_hours(
+                user_ids, is_emergency=notification_type == 'emergency_alerts'
+            )
+            
             eligible_devices = []
             for device in devices:
+                if device.user_id in quiet_user_ids:
+                    continue
                 if device.should_receive_notification(notification_type):
                     eligible_devices.append(device)
             
@@ -301,11 +309,12 @@ class PushNotificationService:
             messages.append(message)
             device_map[i] = device
         
-        # Send in batches
+        # Send in batches, writing each batch's log entries with one insert
         batch_start = 0
         while batch_start < len(messages):
             batch_end = min(batch_start + self.batch_size, len(messages))
             batch_messages = messages[batch_start:batch_end]
+            log_entries = []
             
             try:
                 response = self._send_to_expo(batch_messages)
@@ -315,26 +324,20 @@ class PushNotificationService:
                     batch_data = response.get('data', [])
                     
                     for i, result in enumerate(batch_data):
-                        device_index = batch_start + i
-                        device = device_map[device_index]
-                        
-                        # Create log entry
-                        log_entry = PushNotificationLog.objects.create(
-                            device=device,
-                            title=title,
-                            body=body,
-                            data=data or {},
-                            notification_type=notification_type,
-                            related_object_id=related_object_id,
-                            status='pending'
-                        )
+                        device = device_map[batch_start + i]
                         
                         if result.get('status') == 'ok':
-                            log_entry.mark_sent(result.get('id'))
+                            log_entries.append(self._build_log_entry(
+                                device, title, body, data, notification_type, related_object_id,
+                                status='sent', sent_at=timezone.now(), expo_ticket_id=result.get('id')
+                            ))
                             sent_count += 1
                         else:
                             error_msg = result.get('message', 'Unknown error')
-                            log_entry.mark_failed(error_msg)
+                            log_entries.append(self._build_log_entry(
+                                device, title, body, data, notification_type, related_object_id,
+                                status='failed', error_message=error_msg
+                            ))
                             failed_count += 1
                             errors.append(f"Device {device.device_identifier}: {error_msg}")
                 
@@ -343,19 +346,10 @@ class PushNotificationService:
                     error_msg = response.get('error', 'Batch send failed')
                     
                     for i in range(len(batch_messages)):
-                        device_index = batch_start + i
-                        device = device_map[device_index]
-                        
-                        log_entry = PushNotificationLog.objects.create(
-                            device=device,
-                            title=title,
-                            body=body,
-                            data=data or {},
-                            notification_type=notification_type,
-                            related_object_id=related_object_id,
-                            status='failed',
-                            error_message=error_msg
-                        )
+                        log_entries.append(self._build_log_entry(
+                            device_map[batch_start + i], title, body, data, notification_type,
+                            related_object_id, status='failed', error_message=error_msg
+                        ))
                         failed_count += 1
                     
                     errors.append(f"Batch {batch_start}-{batch_end}: {error_msg}")
@@ -363,26 +357,19 @@ class PushNotificationService:
             except Exception as e:
                 # Handle batch exception
                 error_msg = str(e)
-                
-                for i in range(len(batch_messages)):
-                    device_index = batch_start + i
-                    device = device_map[device_index]
-                    
-                    log_entry = PushNotificationLog.objects.create(
-                        device=device,
-                        title=title,
-                        body=body,
-                        data=data or {},
-                        notification_type=notification_type,
-                        related_object_id=related_object_id,
-                        status='failed',
-                        error_message=error_msg
+                log_entries = [
+                    self._build_log_entry(
+                        device_map[batch_start + i], title, body, data, notification_type,
+                        related_object_id, status='failed', error_message=error_msg
                     )
-                    failed_count += 1
+                    for i in range(len(batch_messages))
+                ]
+                failed_count += len(batch_messages)
                 
                 errors.append(f"Batch {batch_start}-{batch_end}: {error_msg}")
                 logger.error(f"Error sending notification batch: {error_msg}")
             
+            PushNotificationLog.objects.bulk_create(log_entries)
             batch_start = batch_end
         
         return {
@@ -393,6 +380,27 @@ class PushNotificationService:
             'errors': errors if errors else None
         }
     
+    @staticmethod
+    def _build_log_entry(
+        device: PushNotificationDevice,
+        title: str,
+        body: str,
+        data: Dict[str, Any],
+        notification_type: str,
+        related_object_id: str,
+        **fields
+    ) -> PushNotificationLog:
+        """Build an unsaved log entry for bulk insertion."""
+        return PushNotificationLog(
+            device=device,
+            title=title,
+            body=body,
+            data=data or {},
+            notification_type=notification_type,
+            related_object_id=related_object_id,
+            **fields
+        )
+    
     def _send_to_expo(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Send messages to Expo push service."""
         try:
@@ -3,6 +3,7 @@ from pathlib import Path
 from decouple import config, Csv
 import os
 from datetime import timedelta
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -81,6 +82,7 @@ INSTALLED_APPS = [
     'routes',  # Re-enabled with GIS dependencies
     'emergency_procedures',  # Re-enabled with GIS dependencies
     'search',  # Re-enabled with GIS dependencies
+    'analytics',
 ]
 
 # Middleware
@@ -305,6 +307,39 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.health_check',
         'schedule': config('CELERY_HEALTH_CHECK_INTERVAL', default=60.0, cast=float),  # 1 minute
     },
+    'prune-mobile-sync-changes': {
+        'task': 'mobile_api.tasks.prune_mobile_sync_changes',
+        'schedule': 24 * 3600.0,  # daily
+    },
+    # Catches reference data changed without signals, e.g. bulk imports
+    'build-dangerous-goods-bundle': {
+        'task': 'mobile_api.tasks.build_dangerous_goods_bundle',
+        'schedule': 6 * 3600.0,  # every 6 hours
+    },
+    'purge-expired-maps-cache': {
+        'task': 'locations.tasks.purge_expired_maps_cache',
+        'schedule': 24 * 3600.0,  # daily
+    },
+    # Driver qualification index used for dispatch matching
+    'driver-qualification-sweep': {
+        'task': 'training.tasks.sweep_driver_qualification_index',
+        'schedule': crontab(hour=0, minute=30),  # Daily at 12:30 AM
+    },
+    # Feedback daily aggregates used by dashboards and weekly reports
+    'feedback-aggregate-rebuild': {
+        'task': 'shipments.tasks.rebuild_feedback_daily_aggregates',
+        'schedule': crontab(hour=1, minute=15),  # Daily at 1:15 AM
+    },
+    # Time-bucketed analytics rollups read by the unified analytics engine
+    'analytics-rollup-refresh': {
+        'task': 'analytics.tasks.refresh_analytics_rollups',
+        'schedule': crontab(minute='5,20,35,50'),  # Every 15 minutes, after the hour closes
+    },
+    'analytics-rollup-rebuild': {
+        'task': 'analytics.tasks.refresh_analytics_rollups',
+        'schedule': crontab(hour=1, minute=45),  # Daily at 1:45 AM
+        'kwargs': {'rebuild_days': 3},
+    },
 }
 
 # Celery Task Routes
@@ -321,10 +356,17 @@ CELERY_TASK_ROUTES = {
     # Email and notification tasks
     'communications.tasks.send_email': {'queue': 'emails'},
     'communications.tasks.send_notification': {'queue': 'notifications'},
+    'communications.tasks.send_bulk_notifications': {'queue': 'notifications'},
+    'communications.tasks.send_emergency_alert': {'queue': 'notifications_emergency'},
     
     # Background maintenance tasks
     'core.tasks.cleanup_old_files': {'queue': 'maintenance'},
     'core.tasks.update_search_indexes': {'queue': 'maintenance'},
+    'training.tasks.refresh_driver_qualification_index': {'queue': 'maintenance'},
+    'training.tasks.sweep_driver_qualification_index': {'queue': 'maintenance'},
+    'shipments.tasks.rebuild_feedback_daily_aggregates': {'queue': 'maintenance'},
+    'analytics.tasks.refresh_analytics_rollups': {'queue': 'maintenance'},
+    'shared.tasks.run_export_job': {'queue': 'maintenance'},
 }
 
 # Queue Configuration
@@ -359,6 +401,17 @@ CELERY_TASK_QUEUES = {
         'routing_key': 'notifications',
         'queue_arguments': {'x-max-priority': 2},
     },
+    # Priority lanes used by communications.dispatcher
+    'notifications_emergency': {
+        'exchange': 'notifications_emergency',
+        'routing_key': 'notifications_emergency',
+        'queue_arguments': {'x-max-priority': 10},
+    },
+    'notifications_digest': {
+        'exchange': 'notifications_digest',
+        'routing_key': 'notifications_digest',
+        'queue_arguments': {'x-max-priority': 1},
+    },
     'maintenance': {
         'exchange': 'maintenance',
         'routing_key': 'maintenance',
@@ -399,6 +452,63 @@ ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = config(
     default='django_elasticsearch_dsl.signals.RealTimeSignalProcessor'
 )
 
+# NLP (spaCy) configuration
+# Models load lazily on first use; set NLP_WORKER_ADDRESS (socket path or host:port)
+# to send inference to `manage.py nlp_worker` instead of loading models in-process
+NLP_DEFAULT_MODEL = config('NLP_DEFAULT_MODEL', default='en_core_web_sm')
+NLP_PATTERN_CACHE_DIR = config('NLP_PATTERN_CACHE_DIR', default=os.path.join(BASE_DIR, 'tmp', 'nlp_patterns'))
+NLP_WORKER_ADDRESS = config('NLP_WORKER_ADDRESS', default='')
+NLP_WORKER_TIMEOUT = config('NLP_WORKER_TIMEOUT', default=30, cast=int)
+NLP_WORKER_FALLBACK_LOCAL = config('NLP_WORKER_FALLBACK_LOCAL', default=False, cast=bool)
+# Batched analysis (nlp.pipe): documents per batch and processes per pipe
+NLP_PIPE_BATCH_SIZE = config('NLP_PIPE_BATCH_SIZE', default=32, cast=int)
+NLP_PIPE_PROCESSES = config('NLP_PIPE_PROCESSES', default=1, cast=int)
+
+# Buffer simple_history rows until commit and write them in bulk (shared/history.py)
+SIMPLE_HISTORY_DEFERRED = config('SIMPLE_HISTORY_DEFERRED', default=True, cast=bool)
+
+# Mobile delta sync: changes per response, seconds a change waits before it is served
+# (so slower transactions can commit first), and days of change log kept for resuming
+MOBILE_SYNC_MAX_CHANGES = config('MOBILE_SYNC_MAX_CHANGES', default=500, cast=int)
+MOBILE_SYNC_SETTLE_SECONDS = config('MOBILE_SYNC_SETTLE_SECONDS', default=5, cast=int)
+MOBILE_SYNC_RETENTION_DAYS = config('MOBILE_SYNC_RETENTION_DAYS', default=30, cast=int)
+
+# Offline dangerous goods bundle: versions kept (diffs are offered from each),
+# and seconds to wait after a reference data change before rebuilding
+MOBILE_DG_BUNDLE_KEEP_VERSIONS = config('MOBILE_DG_BUNDLE_KEEP_VERSIONS', default=5, cast=int)
+MOBILE_DG_BUNDLE_REBUILD_DELAY = config('MOBILE_DG_BUNDLE_REBUILD_DELAY', default=60, cast=int)
+
+# Manifest table extraction: page-parallel processes per document for background jobs
+# (0: one per CPU, at most 4; API requests extract in-process), and the table confidence
+# at which the remaining extraction methods for a page are skipped
+TABLE_EXTRACTION_WORKERS = config('TABLE_EXTRACTION_WORKERS', default=0, cast=int)
+TABLE_EXTRACTION_CONFIDENCE_THRESHOLD = config('TABLE_EXTRACTION_CONFIDENCE_THRESHOLD', default=0.8, cast=float)
+
+# ERP batch manifest import: concurrent fetches and requests per second per ERP system
+# (ERPConfiguration manifest_import_concurrency / manifest_import_requests_per_second
+# override these; 0 requests per second means unlimited), and manifests per write transaction
+ERP_IMPORT_CONCURRENCY = config('ERP_IMPORT_CONCURRENCY', default=8, cast=int)
+ERP_IMPORT_REQUESTS_PER_SECOND = config('ERP_IMPORT_REQUESTS_PER_SECOND', default=10.0, cast=float)
+ERP_IMPORT_CHUNK_SIZE = config('ERP_IMPORT_CHUNK_SIZE', default=50, cast=int)
+
+# GPS ping side effects (tracking/gps_side_effects.py): vehicle location updates, map
+# cache invalidation and geofence checks are applied once per vehicle per window of
+# this many seconds; 0 applies them after every ping
+GPS_SIDE_EFFECT_WINDOW_SECONDS = config('GPS_SIDE_EFFECT_WINDOW_SECONDS', default=10, cast=int)
+
+# Google Maps result cache (locations/maps_cache.py): seconds each endpoint's results are
+# kept, seconds failed distance matrix elements are kept in the shared cache, and decimal
+# places coordinates are rounded to in cache keys (5: about 1 m)
+GOOGLE_MAPS_API_BASE_URL = config('GOOGLE_MAPS_API_BASE_URL', default='https://maps.googleapis.com/maps/api')
+GOOGLE_MAPS_CACHE_TTLS = {
+    'geocode': config('GOOGLE_MAPS_GEOCODE_TTL', default=30 * 24 * 3600, cast=int),
+    'reverse_geocode': config('GOOGLE_MAPS_REVERSE_GEOCODE_TTL', default=30 * 24 * 3600, cast=int),
+    'directions': config('GOOGLE_MAPS_DIRECTIONS_TTL', default=24 * 3600, cast=int),
+    'distance_matrix': config('GOOGLE_MAPS_DISTANCE_MATRIX_TTL', default=24 * 3600, cast=int),
+}
+GOOGLE_MAPS_NEGATIVE_CACHE_TTL = config('GOOGLE_MAPS_NEGATIVE_CACHE_TTL', default=300, cast=int)
+GOOGLE_MAPS_COORDINATE_PRECISION = config('GOOGLE_MAPS_COORDINATE_PRECISION', default=5, cast=int)
+
 # Enhanced File Storage Configuration
 # Intelligent storage backend selection (S3 -> MinIO -> Local)
 DEFAULT_FILE_STORAGE = config('DEFAULT_FILE_STORAGE', default='safeshipper_core.storage_backends.SafeShipperLocalStorage')
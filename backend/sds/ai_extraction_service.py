@@ -9,8 +9,6 @@ from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
-import fitz  # PyMuPDF for PDF processing
-import spacy
 from dataclasses import dataclass
 from django.conf import settings
 from django.core.files.storage import default_storage
@@ -25,15 +23,12 @@ from .enhanced_models import EnhancedSafetyDataSheet, SDSQualityCheck
 from .openai_service import enhanced_openai_service
 from dangerous_goods.models import DangerousGood
 from documents.models import Document
+from shared.lazy_init import lazy_import
+from shared.nlp_models import nlp_models
 
-logger = logging.getLogger(__name__)
+fitz = lazy_import('fitz')  # PyMuPDF for PDF processing, loaded on first use
 
-# Load spaCy model for named entity recognition
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    logger.warning("spaCy English model not found. Install with: python -m spacy download en_core_web_sm")
-    nlp = None
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -654,7 +649,7 @@ class SDSAIExtractor:
     
     def _detect_language(self, text: str) -> str:
         """Detect the language of the SDS document"""
-        if nlp is None:
+        if not nlp_models.is_available():
             return 'EN'  # Default to English if spaCy not available
         
         # Sample first 1000 characters for language detection
@@ -12,6 +12,8 @@ from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
+from shared.lazy_init import lazy_service
+
 logger = logging.getLogger(__name__)
 
 # Import OpenAI with fallback
@@ -608,5 +610,5 @@ Be thorough in identifying compliance gaps and provide actionable recommendation
             'average_processing_time': cache.get('openai:stats:avg_processing_time', 0.0)
         }
 
-# Service instance
-enhanced_openai_service = EnhancedOpenAIService()
\ No newline at end of file
+# Service instance, built on first use (creates the OpenAI client)
+enhanced_openai_service = lazy_service('sds.openai_service', EnhancedOpenAIService)
\ No newline at end of file
@@ -5,11 +5,14 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 
-import fitz  # PyMuPDF
 from django.utils import timezone
 
+from shared.lazy_init import lazy_import
+
 from .models import SafetyDataSheet
 
+fitz = lazy_import('fitz')  # PyMuPDF, loaded on first use
+
 logger = logging.getLogger(__name__)
 
 class SDSDocumentProcessor:
@@ -411,3 +411,25 @@ class SystemHealthViewSet(viewsets.ViewSet):
             recommendations.append('High number of cache keys - consider cleanup')
         
         return recommendations
+
+
+class ExportJobViewSet(viewsets.ViewSet):
+    """
+    Status and download links for background exports.
+    Jobs are visible to the user who started them and to superusers.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def retrieve(self, request, pk=None):
+        """
+        Get progress and part download URLs of an export job.
+        """
+        from .streaming_export import BackgroundExport
+        
+        manifest = BackgroundExport.load(pk)
+        if manifest is None or (
+            manifest['user_id'] != str(request.user.pk) and not request.user.is_superuser
+        ):
+            return Response({'error': 'Export job not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response(BackgroundExport.describe(manifest))
@@ -0,0 +1,158 @@
+# shared/async_db.py
+"""
+Bounded execution of blocking database work from async code.
+
+Django's ORM and cursors are synchronous. Calling them inside ``async def``
+blocks the event loop, and ``sync_to_async`` (thread-sensitive by default)
+funnels every call through one shared thread. AsyncDatabaseExecutor runs the
+work on a dedicated thread pool instead, caps how many calls run at once per
+process, and cancels the running statement when the awaiting task is
+cancelled (e.g. the ASGI client disconnected).
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCancelled(Exception):
+    """Raised in the worker when its call was cancelled before it started."""
+
+
+class _CallHandle:
+    """Links an awaiting task to the worker thread running its call."""
+
+    def __init__(self, using: str):
+        self.using = using
+        self.cancelled = False
+        self.connection = None
+        self._lock = threading.Lock()
+
+    def attach(self):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self.connection = connections[self.using]
+
+    def detach(self):
+        with self._lock:
+            self.connection = None
+
+    def cancel(self) -> bool:
+        """Cancel the in-flight statement on backends that support it (PostgreSQL)."""
+        with self._lock:
+            self.cancelled = True
+            wrapper = self.connection
+            if wrapper is None or wrapper.vendor != 'postgresql' or wrapper.connection is None:
+                return False
+            try:
+                # psycopg cancel() is safe to call from another thread
+                wrapper.connection.cancel()
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to cancel running query: {e}")
+                return False
+
+
+class AsyncDatabaseExecutor:
+    """
+    Thread pool plus per-event-loop concurrency limit for blocking DB calls.
+
+    max_concurrency bounds the calls in flight (queued callers wait on the
+    limiter, not in the pool); it should not exceed what the database
+    connection budget of one process allows.
+    """
+
+    def __init__(self, name: str, max_workers: int = 8, max_concurrency: Optional[int] = None, using: str = 'default'):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.using = using
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._limiters: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+        self._stats_lock = threading.Lock()
+        self._stats = {'calls': 0, 'in_flight': 0, 'queued': 0, 'cancelled': 0, 'errors': 0}
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"{self.name}-db"
+                    )
+        return self._pool
+
+    def _limiter(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        limiter = self._limiters.get(loop)
+        if limiter is None:
+            limiter = self._limiters[loop] = asyncio.Semaphore(self.max_concurrency)
+        return limiter
+
+    def _count(self, name: str, delta: int = 1):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def _call(self, handle: _CallHandle, func: Callable, args, kwargs):
+        handle.attach()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            handle.detach()
+            # Pool threads are long-lived; honour CONN_MAX_AGE and drop broken connections
+            close_old_connections()
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the pool once a concurrency slot is free."""
+        limiter = self._limiter()
+        self._count('queued')
+        try:
+            await limiter.acquire()
+        finally:
+            self._count('queued', -1)
+
+        handle = _CallHandle(self.using)
+        self._count('calls')
+        self._count('in_flight')
+        future = asyncio.get_running_loop().run_in_executor(self.pool, self._call, handle, func, args, kwargs)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self._count('cancelled')
+            handle.cancel()
+            # Keep the slot until the worker has actually stopped
+            try:
+                await future
+            except Exception:
+                pass
+            raise
+        except Exception:
+            self._count('errors')
+            raise
+        finally:
+            self._count('in_flight', -1)
+            limiter.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                **self._stats,
+                'max_workers': self.max_workers,
+                'max_concurrency': self.max_concurrency,
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
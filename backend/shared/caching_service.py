@@ -8,12 +8,13 @@ import json
 import hashlib
 import logging
 from datetime import timedelta
-from django.core.cache import cache
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
 from typing import Optional, Dict, List, Any
 import redis
 
+from .tiered_cache import TieredCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,6 +62,34 @@ class SafeShipperCacheService:
         
         return f"safeshipper:{cls.CACHE_PREFIXES.get(prefix, prefix)}:{key_hash}"
     
+    # Per-process memory tier size for each cache type
+    MEMORY_MAXSIZE = 500
+    MEMORY_TTL = 300
+    
+    _tiers: Dict[str, TieredCache] = {}
+    
+    @classmethod
+    def namespaces(cls) -> List[str]:
+        """Tiered cache namespace of every known cache type."""
+        return [f"safeshipper:{prefix}" for prefix in cls.CACHE_PREFIXES.values()]
+    
+    @classmethod
+    def _tier(cls, cache_type: str) -> TieredCache:
+        """
+        Tiered cache for a cache type. Each type is its own namespace so it
+        can be cleared with a single generation bump.
+        """
+        tier = cls._tiers.get(cache_type)
+        if tier is None:
+            tier = TieredCache(
+                namespace=f"safeshipper:{cls.CACHE_PREFIXES.get(cache_type, cache_type)}",
+                memory_maxsize=cls.MEMORY_MAXSIZE,
+                memory_ttl=cls.MEMORY_TTL,
+                default_timeout=cls.CACHE_TIMEOUTS.get(cache_type, 3600),
+            )
+            cls._tiers[cache_type] = tier
+        return tier
+    
     @classmethod
     def get(cls, cache_type: str, *args, **kwargs) -> Optional[Any]:
         """
@@ -68,7 +97,7 @@ class SafeShipperCacheService:
         """
         try:
             cache_key = cls._generate_cache_key(cache_type, *args, **kwargs)
-            data = cache.get(cache_key)
+            data = cls._tier(cache_type).get(cache_key)
             
             if data is not None:
                 logger.debug(f"Cache hit for {cache_type}: {cache_key}")
@@ -90,7 +119,7 @@ class SafeShipperCacheService:
             cache_key = cls._generate_cache_key(cache_type, *args, **kwargs)
             cache_timeout = timeout or cls.CACHE_TIMEOUTS.get(cache_type, 3600)
             
-            cache.set(cache_key, data, cache_timeout)
+            cls._tier(cache_type).set(cache_key, data, timeout=cache_timeout)
             logger.debug(f"Cache set for {cache_type}: {cache_key} (timeout: {cache_timeout}s)")
             
             return True
@@ -106,7 +135,7 @@ class SafeShipperCacheService:
         """
         try:
             cache_key = cls._generate_cache_key(cache_type, *args, **kwargs)
-            cache.delete(cache_key)
+            cls._tier(cache_type).delete(cache_key)
             logger.debug(f"Cache delete for {cache_type}: {cache_key}")
             
             return True
@@ -118,30 +147,23 @@ class SafeShipperCacheService:
     @classmethod
     def clear_pattern(cls, cache_type: str) -> bool:
         """
-        Clear all cached data for a specific type.
+        Clear all cached data for a specific type by bumping its namespace
+        generation; no key scan and no full cache flush.
         """
         try:
-            if hasattr(settings, 'CACHES') and 'default' in settings.CACHES:
-                # Use Redis pattern deletion if available
-                try:
-                    r = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
-                    pattern = f"safeshipper:{cls.CACHE_PREFIXES.get(cache_type, cache_type)}:*"
-                    keys = r.keys(pattern)
-                    if keys:
-                        r.delete(*keys)
-                        logger.info(f"Cleared {len(keys)} cache entries for {cache_type}")
-                    return True
-                except Exception as redis_error:
-                    logger.warning(f"Redis pattern delete failed, using fallback: {redis_error}")
-            
-            # Fallback: clear entire cache (not ideal but safe)
-            cache.clear()
-            logger.warning(f"Cleared entire cache due to pattern delete limitation")
+            cls._tier(cache_type).clear()
+            logger.info(f"Cleared cache entries for {cache_type}")
             return True
             
         except Exception as e:
             logger.error(f"Cache clear error for {cache_type}: {str(e)}")
             return False
+    
+    @classmethod
+    def clear_all(cls) -> int:
+        """Clear every cache type. Returns the number of namespaces cleared."""
+        cache_types = set(cls.CACHE_PREFIXES) | set(cls._tiers)
+        return sum(1 for cache_type in cache_types if cls.clear_pattern(cache_type))
 
 
 class DangerousGoodsCacheService:
@@ -300,6 +322,13 @@ class CacheStatisticsService:
     Service for monitoring cache performance and statistics.
     """
     
+    # Keys fetched per SCAN round trip
+    SCAN_COUNT = 1000
+    
+    @classmethod
+    def _count_keys(cls, r, pattern: str) -> int:
+        return sum(1 for _ in r.scan_iter(match=pattern, count=cls.SCAN_COUNT))
+    
     @classmethod
     def get_cache_stats(cls) -> Dict:
         """
@@ -311,12 +340,9 @@ class CacheStatisticsService:
                     r = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
                     info = r.info()
                     
-                    # Get SafeShipper specific keys
-                    pattern = "safeshipper:*"
-                    keys = r.keys(pattern)
-                    
+                    # Count SafeShipper specific keys with SCAN rather than a blocking KEYS
                     stats = {
-                        'total_keys': len(keys),
+                        'total_keys': cls._count_keys(r, "safeshipper:*"),
                         'memory_usage_mb': info.get('used_memory', 0) / (1024 * 1024),
                         'hit_rate': info.get('keyspace_hit_rate', 0),
                         'connected_clients': info.get('connected_clients', 0),
@@ -325,10 +351,9 @@ class CacheStatisticsService:
                     
                     # Count keys by type
                     for cache_type, prefix in SafeShipperCacheService.CACHE_PREFIXES.items():
-                        type_pattern = f"safeshipper:{prefix}:*"
-                        type_keys = r.keys(type_pattern)
-                        stats['cache_types'][cache_type] = len(type_keys)
+                        stats['cache_types'][cache_type] = cls._count_keys(r, f"safeshipper:{prefix}:*")
                     
+                    stats['tiers'] = TieredCache.all_stats()
                     return stats
                     
                 except Exception as redis_error:
@@ -345,29 +370,37 @@ class CacheStatisticsService:
     def clear_all_safeshipper_cache(cls) -> Dict:
         """
         Clear all SafeShipper cache entries (admin function).
+        
+        Namespace generations are bumped first so every process drops its
+        memory tier entries; the key delete below only reclaims Redis memory.
         """
         try:
+            cleared_namespaces = SafeShipperCacheService.clear_all()
+            
             if hasattr(settings, 'CACHES') and 'default' in settings.CACHES:
                 try:
                     r = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
-                    pattern = "safeshipper:*"
-                    keys = r.keys(pattern)
+                    cleared = 0
+                    batch = []
+                    for key in r.scan_iter(match="safeshipper:*", count=cls.SCAN_COUNT):
+                        batch.append(key)
+                        if len(batch) >= cls.SCAN_COUNT:
+                            cleared += r.delete(*batch)
+                            batch = []
+                    if batch:
+                        cleared += r.delete(*batch)
                     
-                    if keys:
-                        r.delete(*keys)
-                        logger.info(f"Cleared {len(keys)} SafeShipper cache entries")
-                        return {'success': True, 'cleared_keys': len(keys)}
+                    if cleared:
+                        logger.info(f"Cleared {cleared} SafeShipper cache entries")
+                        return {'success': True, 'cleared_keys': cleared}
                     else:
                         return {'success': True, 'cleared_keys': 0, 'message': 'No keys to clear'}
                         
                 except Exception as redis_error:
                     logger.error(f"Redis clear error: {redis_error}")
-                    # Fallback to Django cache clear
-                    cache.clear()
-                    return {'success': True, 'method': 'fallback_clear_all'}
+                    return {'success': True, 'method': 'namespace_generation', 'cleared_namespaces': cleared_namespaces}
             
-            cache.clear()
-            return {'success': True, 'method': 'django_cache_clear'}
+            return {'success': True, 'method': 'namespace_generation', 'cleared_namespaces': cleared_namespaces}
             
         except Exception as e:
             logger.error(f"Cache clear error: {str(e)}")
@@ -0,0 +1,235 @@
+# shared/history.py
+"""
+Deferred, batched history recording for django-simple-history.
+
+``HistoricalRecords`` saves one historical row per save or delete, inside
+the request and while the model's row locks are held, so bulk work such as
+status sweeps and imports doubles its writes. ``DeferredHistoricalRecords``
+builds the historical row at the same moment, so the user, change reason
+and field values are those of the save, but only buffers it while a
+transaction is open. When the transaction commits the buffered rows are
+written with one ``bulk_create`` per history table.
+
+* Outside a transaction (autocommit) rows are written immediately, as
+  before.
+* Rows buffered inside a savepoint that is rolled back are discarded, like
+  the changes they describe. Each savepoint gets a no-op on_commit marker;
+  Django drops the marker on rollback, and rows whose marker is gone are not
+  written.
+* ``pre_create_historical_record`` is sent when the row is built and
+  ``post_create_historical_record`` once it is written.
+* Set SIMPLE_HISTORY_DEFERRED = False to record synchronously again.
+* Rows are written after the commit, so a failed write cannot roll back
+  the change it describes. The flush is a robust on_commit callback: a
+  failure is logged with the model and primary keys whose history was
+  lost, and other history tables and later on_commit callbacks still run.
+  Writing before the commit would bring back the extra work inside the
+  transaction that this module exists to avoid.
+
+``QuerySet.update()`` sends no signals, so it records no history at all;
+``update_with_history`` runs the update and records a change row for every
+updated object through the same buffer.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.signals import post_create_historical_record, pre_create_historical_record
+
+logger = logging.getLogger(__name__)
+
+_batches = Local()
+# HistoricalRecords of each model, for recording history outside signals
+_records_by_model: Dict[type, 'DeferredHistoricalRecords'] = {}
+
+
+class _SavepointMarker:
+    """
+    on_commit callback registered once per savepoint that buffered rows.
+    It only runs if the savepoint was not rolled back.
+    """
+
+    def __init__(self, batch: '_HistoryBatch'):
+        self.batch = batch
+        self.written = False
+
+    def __call__(self):
+        # Normally the batch flush has already written this savepoint's rows
+        if not self.written:
+            self.batch.write([entry for entry in self.batch.entries if entry[0] is self])
+            self.written = True
+
+
+class _HistoryBatch:
+    """Historical rows buffered in one transaction on one database"""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        # (marker or None, history instance, write alias, instance, signal kwargs)
+        self.entries: List[tuple] = []
+        self.marker: Optional[_SavepointMarker] = None
+        self.marker_savepoints: Optional[tuple] = None
+        connection = connections[alias]
+        # Registered outside any savepoint, so only a full rollback drops it
+        connection.run_on_commit.append((set(), self.flush, True))
+        self.hooks = connection.run_on_commit
+
+    def is_current(self) -> bool:
+        """Whether the flush is still due, i.e. this transaction is still open"""
+        connection = connections[self.alias]
+        if connection.run_on_commit is self.hooks:
+            return True
+        # The list is replaced on savepoint rollback, commit and full rollback
+        if any(func == self.flush for _, func, _ in connection.run_on_commit):
+            self.hooks = connection.run_on_commit
+            return True
+        return False
+
+    def add(self, history_instance, write_alias, instance, signal_kwargs):
+        savepoints = tuple(connections[self.alias].savepoint_ids)
+        marker = None
+        if savepoints:
+            if savepoints != self.marker_savepoints:
+                self.marker = _SavepointMarker(self)
+                self.marker_savepoints = savepoints
+                transaction.on_commit(self.marker, using=self.alias, robust=True)
+            marker = self.marker
+        self.entries.append((marker, history_instance, write_alias, instance, signal_kwargs))
+
+    def flush(self):
+        if getattr(_batches, 'by_alias', {}).get(self.alias) is self:
+            del _batches.by_alias[self.alias]
+
+        remaining = {func for _, func, _ in self.hooks if isinstance(func, _SavepointMarker)}
+        if any(func == self.flush for _, func, _ in self.hooks):
+            # Django is not running this list, i.e. a savepoint was rolled back
+            # after the last buffered row. Rows outside savepoints are
+            # committed; the markers that still run write their own.
+            self.write([entry for entry in self.entries if entry[0] is None])
+            return
+
+        # The markers still to run are those of savepoints that were not rolled back
+        for marker in remaining:
+            marker.written = True
+        self.write([entry for entry in self.entries if entry[0] is None or entry[0] in remaining])
+
+    def write(self, entries: List[tuple]):
+        groups: Dict[tuple, List[tuple]] = {}
+        for entry in entries:
+            history_instance, write_alias = entry[1], entry[2]
+            groups.setdefault((type(history_instance), write_alias), []).append(entry)
+
+        for (history_model, write_alias), group in groups.items():
+            try:
+                with transaction.atomic(using=write_alias):
+                    history_model.objects.db_manager(write_alias).bulk_create([entry[1] for entry in group])
+            except Exception:
+                logger.exception(
+                    f"Failed to write {len(group)} {history_model._meta.label} rows for "
+                    f"pks {[entry[3].pk for entry in group]}"
+                )
+                continue
+            for _, history_instance, _, instance, signal_kwargs in group:
+                post_create_historical_record.send(
+                    sender=history_model,
+                    instance=instance,
+                    history_instance=history_instance,
+                    **signal_kwargs
+                )
+
+
+def _current_batch(alias: str) -> _HistoryBatch:
+    by_alias = getattr(_batches, 'by_alias', None)
+    if by_alias is None:
+        by_alias = _batches.by_alias = {}
+    batch = by_alias.get(alias)
+    if batch is None or not batch.is_current():
+        batch = by_alias[alias] = _HistoryBatch(alias)
+    return batch
+
+
+def history_deferred() -> bool:
+    return getattr(settings, 'SIMPLE_HISTORY_DEFERRED', True)
+
+
+class DeferredHistoricalRecords(HistoricalRecords):
+    """HistoricalRecords writing its rows in bulk when the transaction commits"""
+
+    def contribute_to_class(self, cls, name):
+        super().contribute_to_class(cls, name)
+        _records_by_model[cls] = self
+
+    def create_historical_record(self, instance, history_type, using=None):
+        alias = using or router.db_for_write(instance.__class__, instance=instance) or DEFAULT_DB_ALIAS
+        # Many-to-many history is written from the saved row; leave it to simple_history
+        if (not history_deferred() or getattr(self, 'm2m_fields', None)
+                or not connections[alias].in_atomic_block):
+            return super().create_historical_record(instance, history_type, using=using)
+
+        write_alias = using if self.use_base_model_db else None
+        history_instance, signal_kwargs = self.build_historical_record(instance, history_type, write_alias)
+        if write_alias is None:
+            write_alias = router.db_for_write(type(history_instance), instance=history_instance)
+        _current_batch(alias).add(history_instance, write_alias, instance, signal_kwargs)
+
+    def build_historical_record(self, instance, history_type, using=None):
+        """The unsaved historical row for instance as it is now, as simple_history builds it"""
+        history_date = getattr(instance, '_history_date', None) or timezone.now()
+        history_user = self.get_history_user(instance)
+        history_change_reason = self.get_change_reason_for_object(instance, history_type, using)
+        manager = getattr(instance, self.manager_name)
+
+        attrs = {field.attname: getattr(instance, field.attname) for field in self.fields_included(instance)}
+        if getattr(manager.model, 'history_relation', None) is not None:
+            attrs['history_relation'] = instance
+
+        history_instance = manager.model(
+            history_date=history_date,
+            history_type=history_type,
+            history_user=history_user,
+            history_change_reason=history_change_reason,
+            **attrs
+        )
+        signal_kwargs = {
+            'history_date': history_date,
+            'history_user': history_user,
+            'history_change_reason': history_change_reason,
+            'using': using,
+        }
+        pre_create_historical_record.send(
+            sender=manager.model,
+            instance=instance,
+            history_instance=history_instance,
+            **signal_kwargs
+        )
+        return history_instance, signal_kwargs
+
+
+def update_with_history(queryset, change_reason: Optional[str] = None, user: Any = None, **values) -> int:
+    """
+    queryset.update(**values), recording a change row for every updated
+    object. History is written in bulk when the surrounding transaction, or
+    the one opened here, commits. Returns the number of rows updated.
+    """
+    model = queryset.model
+    records = _records_by_model.get(model)
+    if records is None:
+        return queryset.update(**values)
+
+    with transaction.atomic(using=queryset.db):
+        pks = list(queryset.values_list('pk', flat=True))
+        if not pks:
+            return 0
+        updated = model._default_manager.db_manager(queryset.db).filter(pk__in=pks).update(**values)
+        for instance in model._default_manager.db_manager(queryset.db).filter(pk__in=pks):
+            if change_reason:
+                instance._change_reason = change_reason
+            if user is not None:
+                instance._history_user = user
+            records.create_historical_record(instance, '~', using=queryset.db)
+    return updated
@@ -0,0 +1,86 @@
+# shared/lazy_init.py
+"""
+Deferred initialization of heavy modules and service singletons.
+
+Module-level ``import fitz`` or ``service = HeavyService()`` runs in every
+process that imports the module, which for Django means every web worker,
+Celery worker and management command at boot. lazy_import() defers a module
+import until an attribute is first accessed; lazy_service() defers building a
+singleton until it is first used and records when that happened, which
+``manage.py startup_profile`` reports.
+"""
+
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+_services: Dict[str, Dict[str, Any]] = {}
+_services_lock = threading.Lock()
+
+
+def lazy_import(name: str):
+    """
+    Module object for name that is executed on first attribute access.
+
+    Raises ModuleNotFoundError immediately if the module is not installed, so
+    optional-dependency checks behave as with a normal import.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def lazy_service(name: str, factory: Callable[[], Any]) -> Any:
+    """
+    Proxy that builds factory() on first attribute access.
+
+    The proxy behaves like the service (attribute access, isinstance checks);
+    construction happens once per process, thread-safely.
+    """
+    state = {'initialized': False, 'init_ms': None, 'initialized_at': None}
+    lock = threading.Lock()
+    instance = []
+
+    def setup():
+        with lock:
+            if not instance:
+                started = time.perf_counter()
+                instance.append(factory())
+                state['init_ms'] = round((time.perf_counter() - started) * 1000, 2)
+                state['initialized_at'] = time.time()
+                state['initialized'] = True
+                logger.debug(f"Initialized {name} in {state['init_ms']}ms")
+        return instance[0]
+
+    with _services_lock:
+        _services[name] = state
+    return SimpleLazyObject(setup)
+
+
+def service_states() -> Dict[str, Dict[str, Any]]:
+    """Initialization state of every registered lazy service in this process"""
+    with _services_lock:
+        return {name: dict(state) for name, state in _services.items()}
+
+
+def pending_imports() -> List[str]:
+    """Modules registered with lazy_import() that have not been executed yet"""
+    return sorted(
+        name for name, module in list(sys.modules.items())
+        if isinstance(module, importlib.util._LazyModule)
+    )
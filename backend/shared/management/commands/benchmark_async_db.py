@@ -0,0 +1,129 @@
+# shared/management/commands/benchmark_async_db.py
+"""
+Benchmark database work issued from async request handlers.
+
+Each simulated request is an ASGI HTTP call handled on one event loop, as an
+ASGI server worker would run it. The handler executes a query either inline
+(blocking the loop, as the analytics engine used to), through sync_to_async,
+or through AsyncDatabaseExecutor. Reports requests/sec, latency percentiles
+and the worst event-loop stall seen by a heartbeat task.
+"""
+
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shared.async_db import AsyncDatabaseExecutor
+
+MODES = ['inline', 'sync_to_async', 'executor']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark requests/sec of async handlers running DB queries inline, via sync_to_async or the bounded executor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Total requests per mode')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--workers', type=int, default=8, help='Executor threads / concurrency limit')
+        parser.add_argument(
+            '--query-seconds',
+            type=float,
+            default=0.05,
+            help='Simulated query time (pg_sleep on PostgreSQL; ignored elsewhere)'
+        )
+        parser.add_argument('--sql', help='Custom SQL to run per request instead of the simulated query')
+        parser.add_argument('--mode', choices=MODES, action='append', help='Mode(s) to run (default: all)')
+
+    def handle(self, *args, **options):
+        sql, params = self.build_query(options)
+        self.stdout.write(f"Query: {sql} {params or ''}")
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}, {options['workers']} workers"
+        )
+        self.stdout.write(f"{'mode':<15}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max stall ms':>15}")
+
+        for mode in options['mode'] or MODES:
+            executor = AsyncDatabaseExecutor('benchmark', max_workers=options['workers'])
+            try:
+                result = asyncio.run(self.run_mode(mode, executor, sql, params, options))
+            finally:
+                executor.shutdown()
+            self.stdout.write(
+                f"{mode:<15}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p95']:>10.1f}{result['stall']:>15.1f}"
+            )
+
+    def build_query(self, options):
+        if options['sql']:
+            return options['sql'], None
+        if connection.vendor == 'postgresql':
+            return 'SELECT pg_sleep(%s)', [options['query_seconds']]
+        return 'SELECT 1', None
+
+    @staticmethod
+    def execute(sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def make_app(self, mode, executor, sql, params):
+        """Minimal ASGI application issuing one query per HTTP request."""
+        run_async = sync_to_async(self.execute)
+
+        async def app(scope, receive, send):
+            if mode == 'inline':
+                self.execute(sql, params)
+            elif mode == 'sync_to_async':
+                await run_async(sql, params)
+            else:
+                await executor.run(self.execute, sql, params)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'ok'})
+
+        return app
+
+    async def run_mode(self, mode, executor, sql, params, options):
+        app = self.make_app(mode, executor, sql, params)
+        limiter = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+        max_stall = 0.0
+        running = True
+
+        async def heartbeat(interval=0.005):
+            nonlocal max_stall
+            while running:
+                before = time.perf_counter()
+                await asyncio.sleep(interval)
+                max_stall = max(max_stall, time.perf_counter() - before - interval)
+
+        async def request():
+            scope = {'type': 'http', 'method': 'GET', 'path': '/benchmark/', 'headers': []}
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                pass
+
+            async with limiter:
+                started = time.perf_counter()
+                await app(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+
+        monitor = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        running = False
+        await monitor
+
+        latencies.sort()
+        return {
+            'rps': len(latencies) / elapsed if elapsed else 0,
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'stall': max_stall * 1000,
+        }
@@ -0,0 +1,136 @@
+# shared/management/commands/benchmark_export.py
+"""
+Benchmark peak RSS of streaming exports against building the export in memory.
+
+Each format/mode runs in a forked child so its peak resident set size is
+measured in isolation. Rows are synthetic (feedback-shaped) by default; with
+--source sql on PostgreSQL they come from generate_series through a
+server-side cursor, exercising the same path as database-backed exports.
+"""
+
+import csv
+import io
+import json
+import multiprocessing
+import resource
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+
+from shared.streaming_export import (
+    DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, PYARROW_AVAILABLE, COLUMNAR_FORMATS, SQLRows, StreamingExport
+)
+
+COLUMNS = [
+    'Tracking Number', 'Customer Name', 'Delivery Score', 'On Time',
+    'Complete & Undamaged', 'Professional Driver', 'Feedback Notes',
+    'Submitted At', 'Has Manager Response', 'Response Date'
+]
+
+SQL = """
+    SELECT 'SS' || lpad(n::text, 8, '0') AS tracking_number,
+           'Customer ' || (n %% 500) AS customer_name,
+           (n %% 101)::numeric AS delivery_score,
+           n %% 3 <> 0 AS on_time,
+           n %% 7 <> 0 AS complete_and_undamaged,
+           n %% 11 <> 0 AS professional_driver,
+           repeat('note ', n %% 20) AS feedback_notes,
+           now() - (n || ' minutes')::interval AS submitted_at,
+           n %% 4 = 0 AS has_manager_response,
+           NULL::timestamptz AS response_date
+    FROM generate_series(1, %s) AS n
+"""
+
+
+def synthetic_rows(count):
+    start = datetime(2025, 1, 1)
+    for n in range(count):
+        yield [
+            f"SS{n:08d}",
+            f"Customer {n % 500}",
+            n % 101,
+            n % 3 != 0,
+            n % 7 != 0,
+            n % 11 != 0,
+            'note ' * (n % 20),
+            start + timedelta(minutes=n),
+            n % 4 == 0,
+            None,
+        ]
+
+
+def _measure(target, queue):
+    started = time.perf_counter()
+    size = target()
+    queue.put({
+        'seconds': time.perf_counter() - started,
+        'bytes': size,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+class Command(BaseCommand):
+    help = 'Benchmark peak RSS and throughput of streaming exports (default 1M rows)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Rows to export')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per fetch/encode batch')
+        parser.add_argument('--source', choices=['synthetic', 'sql'], default='synthetic', help='Row source')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), action='append', help='Format(s) to run (default: all available)')
+        parser.add_argument('--skip-buffered', action='store_true', help='Skip the in-memory baseline')
+
+    def handle(self, *args, **options):
+        if options['source'] == 'sql' and connection.vendor != 'postgresql':
+            raise CommandError('--source sql requires PostgreSQL (generate_series)')
+
+        formats = options['format'] or [
+            name for name in EXPORT_FORMATS if PYARROW_AVAILABLE or name not in COLUMNAR_FORMATS
+        ]
+        self.options = options
+        self.stdout.write(f"{options['rows']} rows from {options['source']} source, chunk size {options['chunk_size']}")
+        self.stdout.write(f"{'format':<10}{'mode':<12}{'seconds':>10}{'MB out':>10}{'peak RSS MB':>14}")
+
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        for export_format in formats:
+            modes = ['streaming'] if options['skip_buffered'] or export_format not in ('csv', 'ndjson') else ['streaming', 'buffered']
+            for mode in modes:
+                queue = context.Queue()
+                target = getattr(self, f'run_{mode}')
+                process = context.Process(target=_measure, args=(lambda: target(export_format), queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                self.stdout.write(
+                    f"{export_format:<10}{mode:<12}{result['seconds']:>10.1f}"
+                    f"{result['bytes'] / 1048576:>10.1f}{result['peak_rss_mb']:>14.1f}"
+                )
+
+    def rows(self):
+        if self.options['source'] == 'sql':
+            return SQLRows(SQL, [self.options['rows']], chunk_size=self.options['chunk_size'])
+        return synthetic_rows(self.options['rows'])
+
+    def run_streaming(self, export_format):
+        columns = None if self.options['source'] == 'sql' else COLUMNS
+        export = StreamingExport(columns, self.rows(), batch_size=self.options['chunk_size'])
+        return sum(len(chunk) for chunk in export.chunks(export_format))
+
+    def run_buffered(self, export_format):
+        """Previous behaviour: materialise every row, then encode the whole response body"""
+        rows = self.rows()
+        rows_list = list(rows)
+        columns = list(rows.columns) if isinstance(rows, SQLRows) else COLUMNS
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            writer.writerows(rows_list)
+            body = buffer.getvalue().encode('utf-8')
+        else:
+            body = json.dumps({'data': [dict(zip(columns, row)) for row in rows_list]}, cls=DjangoJSONEncoder).encode('utf-8')
+        return len(body)
@@ -0,0 +1,92 @@
+# shared/management/commands/benchmark_startup.py
+"""
+Cold-start benchmark for CI.
+
+Boots each entry point (WSGI, ASGI, Celery) several times in fresh
+interpreters and reports min/median/max wall time and peak RSS. With
+--baseline, compares medians against a previous --output file and fails if
+any target regressed by more than --max-regression percent.
+"""
+
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.startup_profiler import run_startup
+
+DEFAULT_TARGETS = ['wsgi', 'asgi', 'celery']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark cold-start time and memory of the WSGI, ASGI and Celery entry points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=DEFAULT_TARGETS + ['setup'], action='append', help='Target(s) to run (default: wsgi, asgi, celery)'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts per target')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results from a previous run to compare against')
+        parser.add_argument(
+            '--max-regression', type=float, default=20.0, help='Allowed median slowdown vs baseline, in percent'
+        )
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        results = {}
+
+        self.stdout.write(f"{'target':<10} {'min':>9} {'median':>9} {'max':>9} {'boot':>9} {'rss':>8}")
+        for target in options['target'] or DEFAULT_TARGETS:
+            runs = []
+            for _ in range(repeat):
+                try:
+                    runs.append(run_startup(target))
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+
+            wall = [run['wall_ms'] for run in runs]
+            results[target] = {
+                'min_ms': min(wall),
+                'median_ms': round(statistics.median(wall), 2),
+                'max_ms': max(wall),
+                'boot_median_ms': round(statistics.median(run['total_ms'] for run in runs), 2),
+                'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+                'runs': repeat,
+            }
+            result = results[target]
+            self.stdout.write(
+                f"{target:<10} {result['min_ms']:>8.0f}ms {result['median_ms']:>8.0f}ms {result['max_ms']:>8.0f}ms "
+                f"{result['boot_median_ms']:>8.0f}ms {result['peak_rss_mb']:>6.1f}MB"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['max_regression'])
+
+    def _compare(self, results, baseline_path, max_regression):
+        try:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {baseline_path}: {e}")
+
+        regressions = []
+        for target, result in results.items():
+            if target not in baseline:
+                continue
+            previous = baseline[target]['median_ms']
+            change = (result['median_ms'] - previous) / previous * 100 if previous else 0.0
+            self.stdout.write(f"{target}: median {previous:.0f}ms -> {result['median_ms']:.0f}ms ({change:+.1f}%)")
+            if change > max_regression:
+                regressions.append(f"{target} {change:+.1f}%")
+
+        if regressions:
+            raise CommandError(
+                f"Startup time regressed by more than {max_regression}%: {', '.join(regressions)}"
+            )
+        self.stdout.write(self.style.SUCCESS('No startup regressions against baseline'))
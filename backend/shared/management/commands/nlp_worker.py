@@ -0,0 +1,36 @@
+# shared/management/commands/nlp_worker.py
+"""
+Run the local NLP inference worker.
+
+Loads spaCy models and matchers once, then serves NLP operations over a Unix
+socket (or TCP on localhost) to web and Celery workers configured with
+NLP_WORKER_ADDRESS, so those processes never load models themselves.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shared import nlp_worker
+
+
+class Command(BaseCommand):
+    help = 'Serve spaCy NLP operations to other processes over a local socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            help='Unix socket path or host:port (default: settings.NLP_WORKER_ADDRESS)'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Serving processes forked after the models are loaded'
+        )
+
+    def handle(self, *args, **options):
+        address = nlp_worker.parse_address(options['address']) or nlp_worker.worker_address()
+        if address is None:
+            raise CommandError('Pass --address or set NLP_WORKER_ADDRESS')
+
+        self.stdout.write(f"Starting NLP worker on {address} with {options['processes']} process(es)")
+        nlp_worker.serve_forever(address, processes=options['processes'])
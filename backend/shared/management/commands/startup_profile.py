@@ -0,0 +1,75 @@
+# shared/management/commands/startup_profile.py
+"""
+Show where Django, ASGI and Celery startup time goes.
+
+Boots the chosen entry point in a fresh interpreter and prints per-phase and
+per-app timings (app module import, models import, ready()), the heaviest
+top-level imports, peak RSS, and which lazily initialized services and
+modules boot did not need.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.startup_profiler import TARGETS, run_startup
+
+
+class Command(BaseCommand):
+    help = 'Profile cold-start import and initialization cost per app for the WSGI, ASGI or Celery entry point'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=TARGETS, default='wsgi', help='Entry point to boot')
+        parser.add_argument('--top', type=int, default=15, help='Number of apps and imports to list')
+        parser.add_argument('--no-importtime', action='store_true', help='Skip -X importtime module breakdown')
+        parser.add_argument('--json', action='store_true', help='Print the raw profile as JSON')
+
+    def handle(self, *args, **options):
+        top = options['top']
+        try:
+            profile = run_startup(options['target'], importtime=not options['no_importtime'], top=top)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(profile, indent=2, default=str))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{profile['target']}: {profile['total_ms']:.0f}ms in Django boot, "
+            f"{profile['wall_ms']:.0f}ms wall, peak RSS {profile['peak_rss_mb']}MB, "
+            f"{profile['modules_loaded']} modules loaded"
+        ))
+
+        self.stdout.write('\nPhases:')
+        for phase, value in profile['phases'].items():
+            unit = '' if phase == 'registered_tasks' else 'ms'
+            self.stdout.write(f"  {phase:<24} {value:>10}{unit}")
+
+        apps = sorted(
+            profile['apps'].values(),
+            key=lambda app: app['import_ms'] + app['models_ms'] + app['ready_ms'],
+            reverse=True,
+        )
+        self.stdout.write(f"\nSlowest apps (top {top}):")
+        self.stdout.write(f"  {'app':<36} {'import':>9} {'models':>9} {'ready':>9} {'total':>9}")
+        for app in apps[:top]:
+            total = app['import_ms'] + app['models_ms'] + app['ready_ms']
+            self.stdout.write(
+                f"  {app['name']:<36} {app['import_ms']:>9.1f} {app['models_ms']:>9.1f} "
+                f"{app['ready_ms']:>9.1f} {total:>9.1f}"
+            )
+
+        if profile.get('imports'):
+            self.stdout.write(f"\nHeaviest top-level imports (cumulative, top {top}):")
+            for module in profile['imports']:
+                self.stdout.write(f"  {module['module']:<48} {module['cumulative_ms']:>9.1f}ms")
+
+        services = profile['lazy_services']
+        if services:
+            self.stdout.write('\nLazy services:')
+            for name, state in sorted(services.items()):
+                status = f"initialized ({state['init_ms']}ms)" if state['initialized'] else 'deferred'
+                self.stdout.write(f"  {name:<36} {status}")
+        if profile['pending_imports']:
+            self.stdout.write(f"\nDeferred imports: {', '.join(profile['pending_imports'])}")
@@ -0,0 +1,138 @@
+# shared/nlp_models.py
+"""
+Process-wide registry of lazily loaded spaCy pipelines.
+
+Models are loaded on first use rather than at import, and every caller in a
+process shares the same loaded pipeline, so web workers, Celery workers and
+management commands that never analyse text never pay for the model.
+Phrase-matcher pattern docs are tokenized in bulk and cached on disk keyed by
+model version and term list, so rebuilding a matcher after a restart skips
+re-tokenizing thousands of terms.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# spaCy is only imported when a model is first loaded; the import alone takes about a second
+SPACY_AVAILABLE = importlib.util.find_spec('spacy') is not None
+if not SPACY_AVAILABLE:
+    logger.warning("spaCy not installed. Install with: pip install spacy")
+
+DEFAULT_MODEL = 'en_core_web_sm'
+
+
+def default_model_name() -> str:
+    return getattr(settings, 'NLP_DEFAULT_MODEL', DEFAULT_MODEL)
+
+
+class NLPModelRegistry:
+    """Loads each spaCy model at most once per process, on first request"""
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._missing = set()
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str] = None):
+        """Loaded pipeline for name, or None if spaCy or the model is unavailable"""
+        name = name or default_model_name()
+        model = self._models.get(name)
+        if model is not None or name in self._missing or not SPACY_AVAILABLE:
+            return model
+
+        with self._lock:
+            if name in self._models or name in self._missing:
+                return self._models.get(name)
+            import spacy
+            try:
+                model = spacy.load(name)
+            except OSError:
+                logger.warning(f"spaCy model {name} not found. Install with: python -m spacy download {name}")
+                self._missing.add(name)
+                return None
+            self._models[name] = model
+            logger.info(f"Loaded spaCy model {name} (pid {os.getpid()})")
+            return model
+
+    def is_available(self, name: Optional[str] = None) -> bool:
+        """Whether name can be loaded, without loading it"""
+        name = name or default_model_name()
+        if name in self._models:
+            return True
+        if not SPACY_AVAILABLE or name in self._missing:
+            return False
+        return importlib.util.find_spec(name) is not None or os.path.isdir(name)
+
+    def loaded_models(self) -> List[str]:
+        return list(self._models)
+
+    def unload(self, name: Optional[str] = None):
+        """Drop a loaded pipeline (or all of them); mainly for tests"""
+        with self._lock:
+            if name is None:
+                self._models.clear()
+                self._missing.clear()
+            else:
+                self._models.pop(name, None)
+                self._missing.discard(name)
+
+    @staticmethod
+    def _pattern_cache_dir() -> str:
+        return getattr(
+            settings, 'NLP_PATTERN_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'safeshipper-nlp-patterns')
+        )
+
+    def phrase_patterns(self, terms: Iterable[str], name: Optional[str] = None) -> list:
+        """
+        Pattern docs for a PhraseMatcher, tokenized with nlp.tokenizer.pipe.
+
+        Only the tokenizer runs (PhraseMatcher on LOWER/ORTH needs nothing
+        else). Results are cached on disk as a DocBin; the key covers the
+        model name and version and the sorted term list, so the cache is
+        invalidated whenever either changes.
+        """
+        nlp = self.get(name)
+        if nlp is None:
+            return []
+        import spacy
+        from spacy.tokens import DocBin
+
+        terms = sorted(set(terms))
+        digest = hashlib.sha256()
+        digest.update(f"{nlp.meta.get('name')}:{nlp.meta.get('version')}:{spacy.__version__}".encode('utf-8'))
+        for term in terms:
+            digest.update(term.encode('utf-8'))
+            digest.update(b'\0')
+        path = os.path.join(self._pattern_cache_dir(), f"{digest.hexdigest()}.spacy")
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as cache_file:
+                    return list(DocBin().from_bytes(cache_file.read()).get_docs(nlp.vocab))
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable NLP pattern cache {path}: {e}")
+
+        patterns = list(nlp.tokenizer.pipe(terms, batch_size=1000))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent processes never read a partial file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as cache_file:
+                cache_file.write(DocBin(docs=patterns).to_bytes())
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write NLP pattern cache {path}: {e}")
+        return patterns
+
+
+# Shared registry instance
+nlp_models = NLPModelRegistry()
@@ -0,0 +1,195 @@
+# shared/nlp_worker.py
+"""
+Optional out-of-process NLP inference.
+
+When settings.NLP_WORKER_ADDRESS is set (a Unix socket path or "host:port"),
+NLP operations are sent to a local worker started with
+``manage.py nlp_worker`` instead of running in the calling process, so web
+workers never load spaCy models. The worker loads models once, then forks
+its serving processes so they share the loaded pipeline copy-on-write.
+
+Operations are plain functions registered with @nlp_operation; arguments
+and results must be picklable and should be plain data (no model objects).
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import signal
+import sys
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPERATION_MODULES = ['dangerous_goods.nlp_matching']
+
+_operations: Dict[str, Callable[..., Any]] = {}
+_warm_operations: List[str] = []
+
+
+class NLPWorkerError(Exception):
+    """Raised when the NLP worker is unreachable or an operation failed remotely."""
+
+
+def nlp_operation(name: str, warm: bool = False):
+    """
+    Register a function as an operation the NLP worker can serve.
+
+    warm=True operations take no arguments and are called once at worker
+    startup, before forking, to load models and build matchers.
+    """
+    def decorator(func):
+        _operations[name] = func
+        if warm and name not in _warm_operations:
+            _warm_operations.append(name)
+        return func
+    return decorator
+
+
+def load_operations():
+    """Import the modules that register operations (settings.NLP_WORKER_OPERATION_MODULES)"""
+    for module in getattr(settings, 'NLP_WORKER_OPERATION_MODULES', DEFAULT_OPERATION_MODULES):
+        importlib.import_module(module)
+    return dict(_operations)
+
+
+def parse_address(address: Optional[str]):
+    """Unix socket path or "host:port" as accepted by multiprocessing.connection"""
+    if not address:
+        return None
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return (host, int(port))
+    return address
+
+
+def worker_address():
+    """Configured worker address, or None when NLP runs in-process"""
+    return parse_address(getattr(settings, 'NLP_WORKER_ADDRESS', None))
+
+
+def _authkey() -> bytes:
+    secret = getattr(settings, 'NLP_WORKER_AUTHKEY', None) or f"nlp-worker:{settings.SECRET_KEY}"
+    return hashlib.sha256(secret.encode('utf-8')).digest()
+
+
+def remote_enabled() -> bool:
+    return worker_address() is not None
+
+
+def call(operation: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """Run an operation on the NLP worker and return its result"""
+    address = worker_address()
+    if address is None:
+        raise NLPWorkerError('NLP_WORKER_ADDRESS is not configured')
+    timeout = timeout or getattr(settings, 'NLP_WORKER_TIMEOUT', 30)
+
+    try:
+        with Client(address, authkey=_authkey()) as connection:
+            connection.send((operation, args, kwargs))
+            if not connection.poll(timeout):
+                raise NLPWorkerError(f"NLP worker did not answer '{operation}' within {timeout}s")
+            ok, payload = connection.recv()
+    except (OSError, EOFError) as e:
+        raise NLPWorkerError(f"NLP worker unreachable at {address}: {e}")
+
+    if not ok:
+        raise NLPWorkerError(f"NLP worker operation '{operation}' failed: {payload}")
+    return payload
+
+
+def run(operation: str, *args, **kwargs) -> Any:
+    """
+    Run an operation on the worker if one is configured, otherwise in-process.
+
+    With NLP_WORKER_FALLBACK_LOCAL enabled, an unreachable worker falls back
+    to in-process execution (loading the model here) instead of failing.
+    """
+    if remote_enabled():
+        try:
+            return call(operation, *args, **kwargs)
+        except NLPWorkerError as e:
+            if not getattr(settings, 'NLP_WORKER_FALLBACK_LOCAL', False):
+                raise
+            logger.warning(f"{e}; running '{operation}' in-process")
+
+    if operation not in _operations:
+        load_operations()
+    return _operations[operation](*args, **kwargs)
+
+
+def _handle_connection(connection, operations, lock):
+    with connection:
+        try:
+            operation, args, kwargs = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            with lock:
+                result = (True, operations[operation](*args, **kwargs))
+        except Exception as e:
+            logger.exception(f"NLP operation '{operation}' failed")
+            result = (False, f"{type(e).__name__}: {e}")
+        try:
+            connection.send(result)
+        except OSError:
+            pass
+
+
+def _serve(listener, operations):
+    # spaCy pipelines are not guaranteed thread-safe; one inference at a time per process
+    lock = threading.Lock()
+    while True:
+        try:
+            connection = listener.accept()
+        except Exception as e:
+            logger.warning(f"NLP worker rejected a connection: {e}")
+            continue
+        threading.Thread(
+            target=_handle_connection, args=(connection, operations, lock), daemon=True
+        ).start()
+
+
+def serve_forever(address, processes: int = 1):
+    """
+    Listen on address and serve registered operations.
+
+    Warm operations run before forking so loaded models and matchers are
+    shared copy-on-write by all serving processes.
+    """
+    operations = load_operations()
+    for name in _warm_operations:
+        logger.info(f"Warming NLP operation {name}: {operations[name]()}")
+    # Forked children must not share the parent's database connections
+    connections.close_all()
+
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, authkey=_authkey())
+
+    children = []
+    for _ in range(max(processes, 1) - 1):
+        pid = os.fork()
+        if pid == 0:
+            _serve(listener, operations)
+            os._exit(0)
+        children.append(pid)
+
+    # Turn SIGTERM into SystemExit so the children are stopped with the parent
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"NLP worker serving {sorted(operations)} on {address} with {len(children) + 1} processes")
+    try:
+        _serve(listener, operations)
+    finally:
+        listener.close()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
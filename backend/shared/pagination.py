@@ -0,0 +1,203 @@
+# shared/pagination.py
+"""
+Keyset (cursor) pagination for high-volume list endpoints.
+
+Page-number pagination counts the whole result set on every page and makes
+the database skip ``OFFSET`` rows, so deep pages get slower and slower.
+Keyset pagination instead remembers the ordering values of the last row
+served and asks for the rows after it, which uses the ordering index no
+matter how deep the client is.
+
+``KeysetPagination`` keeps the page-number behaviour for requests without a
+``cursor`` parameter, so existing clients are unaffected. Integrations opt
+in by sending ``?cursor=`` (empty for the first page) and then following the
+``next``/``previous`` links:
+
+- cursors are signed and opaque; they hold the ordering values of a row, so
+  rows inserted while paging never shift or repeat what a client sees
+- the ordering is the view's ``keyset_ordering``, else the queryset's
+  ordering; the primary key is appended when missing so it is always total
+- there is no count unless ``?count=estimate`` is sent, which returns the
+  query planner's row estimate (PostgreSQL only; ``null`` elsewhere)
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import uuid
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SALT = 'shared.pagination.keyset'
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """Planner row estimate for queryset, without running it"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Row estimate failed: {e}")
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _cursor_value(value: Any) -> Any:
+    """JSON form of an ordering value; full precision, parsed back by the field on filtering"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    return value
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination, or keyset pagination when the request has a
+    cursor parameter (see module docstring)
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # Fallback for views without keyset_ordering, e.g. ('-created_at', '-id')
+    keyset_ordering = None
+    # False to always paginate by keyset
+    allow_page_numbers = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = not self.allow_page_numbers or self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.ordering = self.get_keyset_ordering(queryset, view)
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'estimate':
+            self.count = estimate_count(queryset)
+
+        values, reverse = self.decode_cursor(request)
+        ordering = [(field, descending != reverse) for field, descending in self.ordering]
+        if values is not None:
+            queryset = queryset.filter(self._rows_after(ordering, values))
+        queryset = queryset.order_by(*[f"-{field}" if descending else field for field, descending in ordering])
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and reverse) or (values is not None and not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_keyset_ordering(self, queryset, view) -> List[Tuple[str, bool]]:
+        """(field, descending) pairs, ending with the primary key"""
+        ordering = (
+            getattr(view, 'keyset_ordering', None) or self.keyset_ordering
+            or queryset.query.order_by or queryset.model._meta.ordering
+        )
+        pk_names = {'pk', queryset.model._meta.pk.name}
+        fields = []
+        for field in ordering:
+            # Expressions and random ordering cannot be resumed from a row
+            if not isinstance(field, str) or field.lstrip('-') == '?':
+                continue
+            fields.append((field.lstrip('-'), field.startswith('-')))
+            # Fields after a unique one never decide the order
+            if fields[-1][0] in pk_names:
+                return fields
+        fields.append(('pk', fields[-1][1] if fields else False))
+        return fields
+
+    def _rows_after(self, ordering: Sequence[Tuple[str, bool]], values: Sequence[Any]) -> Q:
+        """Rows strictly after values in ordering: (a > x) OR (a = x AND b > y) OR ..."""
+        condition = Q()
+        for index, (field, descending) in enumerate(ordering):
+            clause = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[index]})
+            for (previous_field, _), value in zip(ordering[:index], values):
+                clause &= Q(**{previous_field: value})
+            condition |= clause
+        return condition
+
+    def _row_value(self, row, field: str) -> Any:
+        value = row
+        for attribute in field.split('__'):
+            value = getattr(value, attribute)
+        return _cursor_value(value)
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        payload = {
+            'o': [f"-{field}" if descending else field for field, descending in self.ordering],
+            'v': [self._row_value(row, field) for field, _ in self.ordering],
+            'r': reverse,
+        }
+        return signing.dumps(payload, salt=CURSOR_SALT, compress=True)
+
+    def decode_cursor(self, request) -> Tuple[Optional[list], bool]:
+        """Ordering values and direction of the request's cursor; (None, False) for the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = signing.loads(encoded, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            raise NotFound('Invalid cursor')
+        expected = [f"-{field}" if descending else field for field, descending in self.ordering]
+        # A cursor is only meaningful for the ordering it was made with
+        if payload.get('o') != expected or len(payload.get('v', [])) != len(expected):
+            raise NotFound('Invalid cursor')
+        return payload['v'], bool(payload.get('r'))
+
+    def _link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.request.query_params.get(self.count_query_param) == 'estimate':
+            response['count'] = self.count
+            response['count_estimated'] = True
+        return Response(response)
@@ -0,0 +1,56 @@
+# shared/query_plans.py
+"""
+Query plans declared next to the serializers that need them.
+
+A serializer that reads related objects or counts per row causes one query
+per row, unless the view's queryset already loaded them. ``QueryPlanMixin``
+lets the serializer declare what it reads:
+
+- ``select_related`` and ``prefetch_related``: relations it follows
+- ``get_annotations()``: values it would otherwise compute per row, e.g.
+  counts; the serializer reads the annotation and falls back to a query
+  for instances that did not come from a prepared queryset
+
+Views then pass their queryset through ``prepare_queryset``, using the
+serializer class of the current action, so a page costs the same number
+of queries however many rows it has::
+
+    def get_queryset(self):
+        queryset = Shipment.objects.filter(...)
+        return self.get_serializer_class().prepare_queryset(queryset)
+
+Nested serializers are not followed; list their relations with the parent's
+lookup prefix, or pass a ``Prefetch`` that prepares the nested queryset.
+"""
+
+from typing import Any, Dict, Sequence
+
+from django.db.models import Prefetch
+
+
+class QueryPlanMixin:
+    """Serializer mixin declaring the related data and annotations it reads"""
+    select_related: Sequence[str] = ()
+    prefetch_related: Sequence[Any] = ()
+
+    @classmethod
+    def get_annotations(cls) -> Dict[str, Any]:
+        """Annotations the serializer reads, by attribute name"""
+        return {}
+
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """queryset with everything this serializer reads loaded up front"""
+        if cls.select_related:
+            queryset = queryset.select_related(*cls.select_related)
+        if cls.prefetch_related:
+            queryset = queryset.prefetch_related(*cls.prefetch_related)
+        annotations = cls.get_annotations()
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+
+def prepared_prefetch(lookup: str, serializer_class, queryset) -> Prefetch:
+    """Prefetch of lookup whose queryset is prepared for serializer_class"""
+    return Prefetch(lookup, queryset=serializer_class.prepare_queryset(queryset))
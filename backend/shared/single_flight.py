@@ -0,0 +1,372 @@
+# shared/single_flight.py
+"""
+Single-flight cache fills for expensive, hot computations.
+
+When a popular key expires every request that misses would otherwise
+recompute it at the same time (a cache stampede). SingleFlight lets one
+caller recompute while the others wait for its result or keep serving the
+previous value:
+
+* A lock taken with ``cache.add`` (an atomic SET NX on Redis) elects the
+  recomputing worker across processes. Inside a process, callers for the same
+  key are queued on a local lock first so they do not poll the shared cache.
+* Values are stored with a soft expiry. After it, the previous value is still
+  served for ``stale_ttl`` seconds while the lock holder revalidates.
+* Before the soft expiry callers refresh early with a probability that grows
+  as expiry approaches and with the cost of the last computation (XFetch),
+  so hot keys are usually recomputed before anyone misses.
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .tiered_cache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 200
+
+
+class SingleFlight:
+    """
+    Dogpile protection for one namespace of cached computations.
+
+    ``get_or_compute`` owns storage of the value. ``coalesce`` and
+    ``acoalesce`` only elect the computing caller and leave storage to the
+    caller's own cache, for results that are invalidated by other means.
+    """
+
+    _registry: Dict[str, 'SingleFlight'] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        namespace: str,
+        stale_ttl: int = 300,
+        lock_timeout: int = 30,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        beta: float = 1.0,
+        cache_alias: str = 'default',
+    ):
+        self.namespace = namespace
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.beta = beta
+        self.cache_alias = cache_alias
+        self._backend = None
+        self._local_locks: Dict[str, list] = {}
+        self._local_locks_guard = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics = {
+            'hits': 0,
+            'stale_hits': 0,
+            'early_refreshes': 0,
+            'computations': 0,
+            'waits': 0,
+            'wait_timeouts': 0,
+            'errors': 0,
+        }
+
+        with self._registry_lock:
+            self._registry[namespace] = self
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_shared_cache(self.cache_alias)
+        return self._backend
+
+    def _key(self, kind: str, key: str) -> str:
+        full_key = f"singleflight:{self.namespace}:{kind}:{key}"
+        if len(full_key) > MAX_KEY_LENGTH:
+            digest = hashlib.md5(key.encode()).hexdigest()
+            full_key = f"singleflight:{self.namespace}:{kind}:h:{digest}"
+        return full_key
+
+    @contextmanager
+    def _local_lock(self, key: str):
+        """Per-key process lock, dropped once no thread holds or waits on it."""
+        with self._local_locks_guard:
+            entry = self._local_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._local_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._local_locks[key]
+
+    # ------------------------------------------------------------------
+    # Distributed lock
+    # ------------------------------------------------------------------
+
+    def _acquire(self, key: str) -> Optional[str]:
+        """Return a lock token if this caller should compute, or None if another caller holds the lock."""
+        token = uuid.uuid4().hex
+        try:
+            if self.backend.add(self._key('lock', key), token, self.lock_timeout):
+                return token
+            return None
+        except Exception as e:
+            # Without a shared cache there is nothing to coordinate on; compute locally
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight lock failed for {self.namespace}:{key}: {e}")
+            return token
+
+    def _release(self, key: str, token: str) -> None:
+        lock_key = self._key('lock', key)
+        try:
+            # Not atomic, but lock_timeout bounds the damage if the lock expired and was re-taken
+            if self.backend.get(lock_key) == token:
+                self.backend.delete(lock_key)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight unlock failed for {self.namespace}:{key}: {e}")
+
+    def _is_locked(self, key: str) -> bool:
+        try:
+            return self.backend.get(self._key('lock', key)) is not None
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------------
+    # Coalescing with caller-owned storage
+    # ------------------------------------------------------------------
+
+    def coalesce(self, key: str, compute: Callable[[], Any], lookup: Callable[[], Any]) -> Any:
+        """
+        Return lookup() if it has a value, otherwise run compute() in exactly
+        one caller while the others wait for lookup() to succeed. compute()
+        must store its result where lookup() reads it.
+        """
+        with self._local_lock(key):
+            value = lookup()
+            if value is not None:
+                self.metrics['hits'] += 1
+                return value
+
+            token = self._acquire(key)
+            if token is None:
+                value = self._wait(key, lookup)
+                if value is not None:
+                    return value
+
+            try:
+                self.metrics['computations'] += 1
+                return compute()
+            finally:
+                if token is not None:
+                    self._release(key, token)
+
+    def _wait(self, key: str, lookup: Callable[[], Any]) -> Any:
+        """Poll for the lock holder's result. None means compute it ourselves."""
+        self.metrics['waits'] += 1
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = lookup()
+            if value is not None:
+                return value
+            if not self._is_locked(key):
+                # The holder finished without storing a value (e.g. it failed)
+                return lookup()
+        self.metrics['wait_timeouts'] += 1
+        logger.warning(f"Timed out waiting for {self.namespace}:{key}; computing in this worker")
+        return None
+
+    async def acoalesce(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        lookup: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Async coalesce(); callers on the same event loop share one in-flight future."""
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.metrics['waits'] += 1
+            return await asyncio.shield(inflight)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._acoalesce(key, compute, lookup)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged a second time
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _acoalesce(self, key, compute, lookup) -> Any:
+        value = await lookup()
+        if value is not None:
+            self.metrics['hits'] += 1
+            return value
+
+        token = await asyncio.to_thread(self._acquire, key)
+        if token is None:
+            self.metrics['waits'] += 1
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                value = await lookup()
+                if value is not None:
+                    return value
+                if not await asyncio.to_thread(self._is_locked, key):
+                    value = await lookup()
+                    if value is not None:
+                        return value
+                    break
+            else:
+                self.metrics['wait_timeouts'] += 1
+                logger.warning(f"Timed out waiting for {self.namespace}:{key}; computing in this worker")
+
+        try:
+            self.metrics['computations'] += 1
+            return await compute()
+        finally:
+            if token is not None:
+                await asyncio.to_thread(self._release, key, token)
+
+    # ------------------------------------------------------------------
+    # Owned storage with early refresh and stale-while-revalidate
+    # ------------------------------------------------------------------
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.backend.get(self._key('value', key))
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight read failed for {self.namespace}:{key}: {e}")
+            return None
+
+    def _store(self, key: str, value: Any, ttl: int, stale_ttl: int, delta: float) -> Dict[str, Any]:
+        envelope = {'value': value, 'expires_at': time.time() + ttl, 'delta': delta}
+        try:
+            self.backend.set(self._key('value', key), envelope, ttl + stale_ttl)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight write failed for {self.namespace}:{key}: {e}")
+        return envelope
+
+    def _should_refresh(self, envelope: Dict[str, Any], now: float) -> bool:
+        """True once expired; before that, XFetch: refresh early with probability rising toward expiry."""
+        if now >= envelope['expires_at']:
+            return True
+        delta = envelope.get('delta') or 0
+        if delta <= 0 or self.beta <= 0:
+            return False
+        return now - delta * self.beta * math.log(1.0 - random.random()) >= envelope['expires_at']
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+    ) -> Any:
+        """
+        Return the cached value for key, computing it in at most one caller.
+
+        Fresh values are returned directly. Expired values up to stale_ttl old
+        are returned to every caller except the one that wins the lock and
+        recomputes. A computation that fails during revalidation serves the
+        stale value instead of raising.
+        """
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+
+        def compute_and_store():
+            started = time.monotonic()
+            value = compute()
+            return self._store(key, value, ttl, stale_ttl, time.monotonic() - started)
+
+        envelope = self._read(key)
+        if envelope is not None:
+            now = time.time()
+            fresh = now < envelope['expires_at']
+            if not self._should_refresh(envelope, now):
+                self.metrics['hits'] += 1
+                return envelope['value']
+
+            token = self._acquire(key)
+            if token is None:
+                self.metrics['hits' if fresh else 'stale_hits'] += 1
+                return envelope['value']
+
+            if fresh:
+                self.metrics['early_refreshes'] += 1
+            try:
+                self.metrics['computations'] += 1
+                return compute_and_store()['value']
+            except Exception as e:
+                self.metrics['errors'] += 1
+                logger.warning(f"Revalidation of {self.namespace}:{key} failed, serving previous value: {e}")
+                return envelope['value']
+            finally:
+                self._release(key, token)
+
+        return self.coalesce(key, compute_and_store, lambda: self._read(key))['value']
+
+    def get_many(self, keys) -> Dict[str, Any]:
+        """
+        Fresh values for keys in one cache round trip, for batch callers that
+        compute the missing keys together and store them with put(). Missing
+        and expired keys are left out.
+        """
+        full_keys = {self._key('value', key): key for key in keys}
+        try:
+            envelopes = self.backend.get_many(list(full_keys))
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight batch read failed for {self.namespace}: {e}")
+            return {}
+
+        now = time.time()
+        values = {
+            full_keys[full_key]: envelope['value']
+            for full_key, envelope in envelopes.items()
+            if envelope is not None and now < envelope['expires_at']
+        }
+        self.metrics['hits'] += len(values)
+        return values
+
+    def put(self, key: str, value: Any, ttl: int, stale_ttl: Optional[int] = None) -> None:
+        """Store a value computed outside get_or_compute"""
+        self.metrics['computations'] += 1
+        self._store(key, value, ttl, self.stale_ttl if stale_ttl is None else stale_ttl, 0.0)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._key('value', key))
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Single-flight delete failed for {self.namespace}:{key}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.metrics)
+
+    @classmethod
+    def all_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Metrics for every single-flight namespace created in this process."""
+        with cls._registry_lock:
+            registry = dict(cls._registry)
+        return {namespace: flight.stats() for namespace, flight in registry.items()}
@@ -0,0 +1,207 @@
+# shared/startup_profiler.py
+"""
+Cold-start profiling of the Django, ASGI and Celery entry points.
+
+Each profile runs in a fresh interpreter (``python -m shared.startup_profiler
+<target>``) so nothing is already imported. The child instruments the app
+registry before Django is set up and reports, as JSON on stdout:
+
+- phase timings (settings, app registry, entry point import, URLconf, Celery
+  task discovery),
+- per-app cost of importing the app module, its models and running ready(),
+- the heaviest top-level imports when run with ``-X importtime``,
+- peak RSS, and which lazy services/imports were never needed during boot.
+
+Only the standard library is imported at module level so that profiling
+itself does not skew the numbers.
+"""
+
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TARGETS = ['setup', 'wsgi', 'asgi', 'celery']
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULT_MARKER = 'STARTUP_PROFILE:'
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _instrument_app_registry(app_stats: Dict[str, Dict]):
+    """Time AppConfig.create (app module import), import_models and ready() per app"""
+    from django.apps.config import AppConfig
+
+    def stats_for(app_config):
+        return app_stats.setdefault(app_config.label, {
+            'name': app_config.name, 'import_ms': 0.0, 'models_ms': 0.0, 'ready_ms': 0.0,
+        })
+
+    original_create = AppConfig.create.__func__
+    original_import_models = AppConfig.import_models
+
+    def create(cls, entry):
+        started = time.perf_counter()
+        app_config = original_create(cls, entry)
+        stats_for(app_config)['import_ms'] += _elapsed_ms(started)
+
+        # ready() is overridden per app, so wrap it on the instance
+        original_ready = app_config.ready
+
+        def ready():
+            ready_started = time.perf_counter()
+            try:
+                original_ready()
+            finally:
+                stats_for(app_config)['ready_ms'] += _elapsed_ms(ready_started)
+
+        app_config.ready = ready
+        return app_config
+
+    def import_models(self):
+        started = time.perf_counter()
+        try:
+            original_import_models(self)
+        finally:
+            stats_for(self)['models_ms'] += _elapsed_ms(started)
+
+    AppConfig.create = classmethod(create)
+    AppConfig.import_models = import_models
+
+
+def profile_current_process(target: str) -> Dict:
+    """Boot target in this (fresh) process and return the measurements"""
+    if target not in TARGETS:
+        raise ValueError(f"Unknown startup target '{target}'; expected one of {', '.join(TARGETS)}")
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safeshipper_core.settings')
+    phases = {}
+    app_stats: Dict[str, Dict] = {}
+    boot_started = time.perf_counter()
+
+    started = time.perf_counter()
+    import django
+    from django.conf import settings
+    # Importing settings also imports the project package and its Celery app
+    settings.INSTALLED_APPS
+    phases['settings'] = _elapsed_ms(started)
+
+    _instrument_app_registry(app_stats)
+    started = time.perf_counter()
+    django.setup()
+    phases['apps'] = _elapsed_ms(started)
+
+    if target in ('wsgi', 'asgi'):
+        started = time.perf_counter()
+        if target == 'wsgi':
+            import safeshipper_core.wsgi  # noqa: F401
+        else:
+            import safeshipper_core.asgi  # noqa: F401
+        phases[f'{target}_application'] = _elapsed_ms(started)
+
+        # The first request resolves the URLconf, importing every view module
+        from django.urls import get_resolver
+        started = time.perf_counter()
+        get_resolver().url_patterns
+        phases['urlconf'] = _elapsed_ms(started)
+
+    elif target == 'celery':
+        from safeshipper_core import celery_app
+        started = time.perf_counter()
+        celery_app.loader.import_default_modules()
+        celery_app.finalize()
+        phases['task_discovery'] = _elapsed_ms(started)
+        phases['registered_tasks'] = len(celery_app.tasks)
+
+    total_ms = _elapsed_ms(boot_started)
+
+    from shared.lazy_init import pending_imports, service_states
+    return {
+        'target': target,
+        'pid': os.getpid(),
+        'total_ms': total_ms,
+        'phases': phases,
+        'apps': app_stats,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'modules_loaded': len(sys.modules),
+        'lazy_services': service_states(),
+        'pending_imports': pending_imports(),
+    }
+
+
+def parse_importtime(stderr: str, top: int = 25) -> List[Dict]:
+    """
+    Heaviest top-level imports from ``-X importtime`` output.
+
+    Only modules imported directly (not as dependencies of another import in
+    the same statement) are listed; their cumulative time includes everything
+    they pulled in, so the cost of a shared dependency is attributed to
+    whichever module imported it first.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        if len(indent) > 1:
+            continue
+        modules.append({
+            'module': name,
+            'self_ms': round(int(self_us) / 1000, 2),
+            'cumulative_ms': round(int(cumulative_us) / 1000, 2),
+        })
+    modules.sort(key=lambda module: module['cumulative_ms'], reverse=True)
+    return modules[:top]
+
+
+def run_startup(target: str, importtime: bool = False, top: int = 25,
+                python: Optional[str] = None, timeout: int = 300) -> Dict:
+    """Profile target in a fresh interpreter and return its measurements"""
+    command = [python or sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-m', 'shared.startup_profiler', target]
+
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'safeshipper_core.settings')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get('PYTHONPATH')]))
+
+    started = time.perf_counter()
+    completed = subprocess.run(
+        command, cwd=str(BACKEND_DIR), env=env, capture_output=True, text=True, timeout=timeout
+    )
+    wall_ms = _elapsed_ms(started)
+
+    result = None
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER):])
+    if completed.returncode != 0 or result is None:
+        error_lines = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(
+            f"Startup profile of '{target}' failed (exit {completed.returncode}): " + '\n'.join(error_lines[-20:])
+        )
+
+    # Includes interpreter startup, which the in-process total does not
+    result['wall_ms'] = wall_ms
+    if importtime:
+        result['imports'] = parse_importtime(completed.stderr, top=top)
+    return result
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or sys.argv[1] not in TARGETS:
+        sys.exit(f"usage: python -m shared.startup_profiler {{{'|'.join(TARGETS)}}}")
+    print(RESULT_MARKER + json.dumps(profile_current_process(sys.argv[1]), default=str))
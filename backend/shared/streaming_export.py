@@ -0,0 +1,462 @@
+# shared/streaming_export.py
+"""
+Constant-memory exports for large querysets and raw SQL results.
+
+Rows are pulled from the database in chunks (queryset.iterator(chunk_size=...)
+or a server-side cursor) and encoded batch by batch as CSV, NDJSON, Apache
+Arrow IPC stream or Parquet, so memory use depends on the chunk size rather
+than the row count. StreamingExport feeds StreamingHttpResponse directly;
+BackgroundExport writes the same stream to default_storage in resumable parts
+from a Celery task.
+"""
+
+import base64
+import csv
+import datetime
+import io
+import json
+import logging
+import pickle
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from django.apps import apps
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Apache Arrow / Parquet support is optional
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    logger.warning("pyarrow not installed; Arrow and Parquet exports are disabled. Install with: pip install pyarrow")
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CHUNK_SIZE = 2000
+BACKGROUND_PART_ROWS = 250000
+EXPORT_STORAGE_PREFIX = 'exports'
+
+EXPORT_FORMATS = {
+    'csv': {'content_type': 'text/csv', 'extension': 'csv'},
+    'ndjson': {'content_type': 'application/x-ndjson', 'extension': 'ndjson'},
+    'arrow': {'content_type': 'application/vnd.apache.arrow.stream', 'extension': 'arrow'},
+    'parquet': {'content_type': 'application/vnd.apache.parquet', 'extension': 'parquet'},
+}
+COLUMNAR_FORMATS = ('arrow', 'parquet')
+
+
+class ExportFormatError(ValueError):
+    """Raised for unknown formats or formats whose optional dependency is missing."""
+
+
+def validate_export_format(export_format: str) -> str:
+    """Normalise an export format name, raising ExportFormatError if it cannot be produced."""
+    export_format = (export_format or '').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ExportFormatError(
+            f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    if export_format in COLUMNAR_FORMATS and not PYARROW_AVAILABLE:
+        raise ExportFormatError(f"Export format '{export_format}' requires pyarrow, which is not installed")
+    return export_format
+
+
+def _scalar(value: Any) -> Any:
+    """Convert values Arrow cannot infer into portable scalars"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _text(value: Any) -> Any:
+    """CSV cell value"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands written bytes back to the caller.
+
+    tell() reports the total bytes written so Parquet footer offsets stay
+    correct even though the buffer is drained after every row group.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _IteratorFile(io.RawIOBase):
+    """Readable file over an iterator of byte strings, for streaming uploads to storage"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class SQLRows:
+    """
+    Rows of a raw SQL query read through a server-side cursor.
+
+    The query runs when iteration starts, on the iterating thread, so the
+    cursor never crosses threads. columns is available once iteration began.
+    """
+
+    def __init__(self, sql: str, params: Optional[Any] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, using: str = 'default'):
+        self.sql = sql
+        self.params = params
+        self.chunk_size = chunk_size
+        self.using = using
+        self.columns: Optional[List[str]] = None
+
+    def __iter__(self) -> Iterator[Sequence[Any]]:
+        cursor = connections[self.using].chunked_cursor()
+        cursor.execute(self.sql, self.params)
+        self.columns = [col[0] for col in cursor.description]
+        return self._fetch(cursor)
+
+    def _fetch(self, cursor):
+        try:
+            while True:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
+class StreamingExport:
+    """
+    Encodes an iterable of row tuples batch by batch.
+
+    columns may be omitted when rows is an SQLRows (they come from the cursor).
+    """
+
+    def __init__(self, columns: Optional[Sequence[str]], rows: Iterable[Sequence[Any]], batch_size: int = DEFAULT_CHUNK_SIZE):
+        self.columns = list(columns) if columns is not None else None
+        self.rows = rows
+        self.batch_size = batch_size
+        self.row_count = 0
+
+    def _open(self):
+        iterator = iter(self.rows)
+        columns = self.columns if self.columns is not None else list(self.rows.columns)
+        return columns, iterator
+
+    def _batches(self, iterator) -> Iterator[List[Sequence[Any]]]:
+        batch = []
+        for row in iterator:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.row_count += len(batch)
+                yield batch
+                batch = []
+        if batch:
+            self.row_count += len(batch)
+            yield batch
+
+    def chunks(self, export_format: str) -> Iterator[bytes]:
+        """Encoded output for export_format as an iterator of byte strings"""
+        export_format = validate_export_format(export_format)
+        return getattr(self, f'_{export_format}')()
+
+    def _csv(self) -> Iterator[bytes]:
+        columns, iterator = self._open()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in self._batches(iterator):
+            writer.writerows([_text(value) for value in row] for row in batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _ndjson(self) -> Iterator[bytes]:
+        columns, iterator = self._open()
+        for batch in self._batches(iterator):
+            lines = [json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) for row in batch]
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def _record_batches(self):
+        columns, iterator = self._open()
+        schema = None
+        for batch in self._batches(iterator):
+            arrays = [[_scalar(value) for value in column] for column in zip(*batch)]
+            if schema is None:
+                inferred = pyarrow.record_batch(arrays, names=columns).schema
+                # All-null columns in the first batch would lock the schema to null
+                schema = pyarrow.schema([
+                    field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field
+                    for field in inferred
+                ])
+            yield schema, pyarrow.record_batch(arrays, schema=schema)
+        if schema is None:
+            schema = pyarrow.schema([(name, pyarrow.string()) for name in columns])
+            yield schema, None
+
+    def _arrow(self) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        writer = None
+        for schema, record_batch in self._record_batches():
+            if writer is None:
+                writer = pyarrow.ipc.new_stream(pyarrow.PythonFile(sink, mode='w'), schema)
+            if record_batch is not None:
+                writer.write_batch(record_batch)
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+            yield sink.drain()
+
+    def _parquet(self) -> Iterator[bytes]:
+        sink = _ChunkSink()
+        writer = None
+        for schema, record_batch in self._record_batches():
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema)
+            if record_batch is not None:
+                # One row group per batch, flushed immediately
+                writer.write_table(pyarrow.Table.from_batches([record_batch]))
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+            yield sink.drain()
+
+
+def export_filename(prefix: str, export_format: str) -> str:
+    extension = EXPORT_FORMATS[export_format]['extension']
+    return f"{prefix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def streaming_response(export: StreamingExport, export_format: str, filename_prefix: str) -> StreamingHttpResponse:
+    """StreamingHttpResponse serving export as an attachment"""
+    export_format = validate_export_format(export_format)
+    response = StreamingHttpResponse(
+        export.chunks(export_format),
+        content_type=EXPORT_FORMATS[export_format]['content_type']
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(filename_prefix, export_format)}"'
+    return response
+
+
+class ExportSource:
+    """
+    Column layout and row mapping for one exportable model.
+
+    Subclasses set columns, implement row(obj) and may override prepare() to
+    add select_related/annotations the row mapping relies on. Instances are
+    referenced by dotted path from background export jobs.
+    """
+
+    columns: Sequence[str] = ()
+
+    def prepare(self, queryset):
+        return queryset
+
+    def row(self, obj) -> Sequence[Any]:
+        raise NotImplementedError
+
+    def rows(self, queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Sequence[Any]]:
+        for obj in self.prepare(queryset).iterator(chunk_size=chunk_size):
+            yield self.row(obj)
+
+    def export(self, queryset, chunk_size: int = DEFAULT_CHUNK_SIZE) -> StreamingExport:
+        return StreamingExport(self.columns, self.rows(queryset, chunk_size), batch_size=chunk_size)
+
+
+class BackgroundExport:
+    """
+    Resumable export of a queryset to default_storage (S3 in production).
+
+    The job is split into parts of part_rows rows taken in primary-key order.
+    Each finished part is checkpointed in a JSON manifest next to the data,
+    so a retried or restarted task continues after the last completed part
+    instead of starting over. Parts are standalone files in the requested
+    format (a Parquet/Arrow dataset, or CSV/NDJSON files to concatenate).
+    """
+
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    FAILED = 'FAILED'
+
+    _signer = signing.Signer(salt='shared.streaming_export.query')
+
+    @staticmethod
+    def _manifest_name(job_id: str) -> str:
+        return f"{EXPORT_STORAGE_PREFIX}/{job_id}/manifest.json"
+
+    @classmethod
+    def _save_manifest(cls, manifest: Dict[str, Any]):
+        manifest['updated_at'] = timezone.now().isoformat()
+        name = cls._manifest_name(manifest['job_id'])
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, io.BytesIO(json.dumps(manifest, cls=DjangoJSONEncoder).encode('utf-8')))
+
+    @classmethod
+    def load(cls, job_id: str) -> Optional[Dict[str, Any]]:
+        name = cls._manifest_name(job_id)
+        if not default_storage.exists(name):
+            return None
+        with default_storage.open(name, 'rb') as manifest_file:
+            return json.loads(manifest_file.read())
+
+    @classmethod
+    def start(cls, source_path: str, queryset, export_format: str, user) -> str:
+        """Record a new export job and queue it once the current transaction commits"""
+        from .tasks import run_export_job
+
+        export_format = validate_export_format(export_format)
+        job_id = str(uuid.uuid4())
+        # Querysets are recreated from their pickled Query (signed, since it is unpickled later)
+        query = base64.b64encode(pickle.dumps(queryset.query)).decode('ascii')
+        cls._save_manifest({
+            'job_id': job_id,
+            'source': source_path,
+            'model': queryset.model._meta.label,
+            'query': cls._signer.sign(query),
+            'format': export_format,
+            'user_id': str(user.pk),
+            'status': cls.PENDING,
+            'rows': 0,
+            'last_pk': None,
+            'parts': [],
+            'error': None,
+            'created_at': timezone.now().isoformat(),
+        })
+        transaction.on_commit(lambda: run_export_job.delay(job_id))
+        logger.info(f"Queued background {export_format} export {job_id} from {source_path}")
+        return job_id
+
+    @classmethod
+    def _queryset(cls, manifest: Dict[str, Any]):
+        model = apps.get_model(manifest['model'])
+        queryset = model._default_manager.all()
+        queryset.query = pickle.loads(base64.b64decode(cls._signer.unsign(manifest['query'])))
+        return queryset
+
+    @classmethod
+    def run(cls, job_id: str, part_rows: int = BACKGROUND_PART_ROWS, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Write the remaining parts of job_id, resuming after the last checkpoint"""
+        manifest = cls.load(job_id)
+        if manifest is None:
+            raise ValueError(f"Export job {job_id} not found")
+        if manifest['status'] == cls.COMPLETED:
+            return manifest
+
+        source = import_string(manifest['source'])
+        queryset = source.prepare(cls._queryset(manifest)).order_by('pk')
+        extension = EXPORT_FORMATS[manifest['format']]['extension']
+        manifest['status'] = cls.RUNNING
+        manifest['error'] = None
+        cls._save_manifest(manifest)
+
+        try:
+            while True:
+                page = queryset
+                if manifest['last_pk'] is not None:
+                    page = page.filter(pk__gt=manifest['last_pk'])
+                progress = {'rows': 0, 'last_pk': None}
+
+                def rows(page=page[:part_rows], progress=progress):
+                    for obj in page.iterator(chunk_size=chunk_size):
+                        progress['rows'] += 1
+                        progress['last_pk'] = obj.pk
+                        yield source.row(obj)
+
+                index = len(manifest['parts'])
+                name = f"{EXPORT_STORAGE_PREFIX}/{job_id}/part-{index:05d}.{extension}"
+                # Overwrite a part left behind by an interrupted attempt
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                export = StreamingExport(source.columns, rows(), batch_size=chunk_size)
+                saved_name = default_storage.save(name, _IteratorFile(export.chunks(manifest['format'])))
+
+                if progress['rows'] == 0 and manifest['parts']:
+                    default_storage.delete(saved_name)
+                    break
+
+                last_pk = progress['last_pk']
+                manifest['parts'].append({'name': saved_name, 'rows': progress['rows']})
+                manifest['rows'] += progress['rows']
+                manifest['last_pk'] = last_pk if isinstance(last_pk, int) or last_pk is None else str(last_pk)
+                cls._save_manifest(manifest)
+
+                if progress['rows'] < part_rows:
+                    break
+        except Exception as e:
+            manifest['status'] = cls.FAILED
+            manifest['error'] = str(e)
+            cls._save_manifest(manifest)
+            raise
+
+        manifest['status'] = cls.COMPLETED
+        cls._save_manifest(manifest)
+        logger.info(f"Background export {job_id} completed: {manifest['rows']} rows in {len(manifest['parts'])} parts")
+        return manifest
+
+    @classmethod
+    def describe(cls, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a job manifest with download URLs for finished parts"""
+        return {
+            'job_id': manifest['job_id'],
+            'status': manifest['status'],
+            'format': manifest['format'],
+            'rows': manifest['rows'],
+            'error': manifest['error'],
+            'created_at': manifest['created_at'],
+            'updated_at': manifest.get('updated_at'),
+            'parts': [
+                {'rows': part['rows'], 'url': default_storage.url(part['name'])}
+                for part in manifest['parts']
+            ],
+        }
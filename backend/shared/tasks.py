@@ -480,4 +480,20 @@ Critical Issues:
         logger.info(f"DG data alert sent to {len(recipients)} recipients")
         
     except Exception as e:
-        logger.error(f"Failed to send DG data alert: {str(e)}")
\ No newline at end of file
+        logger.error(f"Failed to send DG data alert: {str(e)}")
+
+@shared_task(bind=True, max_retries=5, acks_late=True)
+def run_export_job(self, job_id: str):
+    """
+    Write a background export to object storage.
+
+    Retries resume from the last checkpointed part rather than starting over.
+    """
+    from .streaming_export import BackgroundExport
+
+    try:
+        manifest = BackgroundExport.run(job_id)
+        return {'job_id': job_id, 'status': manifest['status'], 'rows': manifest['rows']}
+    except Exception as exc:
+        logger.error(f"Background export {job_id} failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
@@ -0,0 +1,88 @@
+# shared/test_async_db.py
+"""
+Tests for the bounded async database executor.
+"""
+
+import asyncio
+import threading
+import time
+from django.test import TestCase
+
+from .async_db import AsyncDatabaseExecutor
+
+
+class TestAsyncDatabaseExecutor(TestCase):
+    """Test concurrency limits, event-loop responsiveness and cancellation"""
+
+    def setUp(self):
+        self.executor = AsyncDatabaseExecutor('test', max_workers=4, max_concurrency=2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_concurrency_is_bounded(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+            return 'done'
+
+        async def run():
+            return await asyncio.gather(*[self.executor.run(work) for _ in range(10)])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results, ['done'] * 10)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(self.executor.stats()['calls'], 10)
+        self.assertEqual(self.executor.stats()['in_flight'], 0)
+
+    def test_event_loop_not_blocked(self):
+        ticks = []
+
+        async def heartbeat():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(self.executor.run(time.sleep, 0.2), heartbeat())
+
+        asyncio.run(run())
+
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(ticks[-1] - ticks[0], 0.15)
+
+    def test_cancellation_waits_for_worker_and_releases_slot(self):
+        finished = threading.Event()
+
+        def slow():
+            time.sleep(0.1)
+            finished.set()
+
+        async def run():
+            task = asyncio.create_task(self.executor.run(slow))
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await self.executor.run(lambda: 'next')
+
+        self.assertEqual(asyncio.run(run()), 'next')
+        self.assertTrue(finished.is_set())
+        self.assertEqual(self.executor.stats()['cancelled'], 1)
+
+    def test_errors_propagate(self):
+        def failing():
+            raise ValueError('bad query')
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.executor.run(failing))
+        self.assertEqual(self.executor.stats()['errors'], 1)
@@ -0,0 +1,109 @@
+# shared/test_history.py
+"""
+Tests for deferred, batched history recording.
+"""
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from dangerous_goods.models import DangerousGood
+from .history import update_with_history
+
+User = get_user_model()
+
+
+class TestDeferredHistory(TestCase):
+    """Test that history rows are buffered per transaction and written in bulk"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='historian', email='historian@example.com', password='x')
+
+    def _history_inserts(self, queries):
+        table = DangerousGood.history.model._meta.db_table
+        return [q for q in queries if q['sql'].startswith('INSERT') and table in q['sql']]
+
+    def test_rows_written_in_one_insert_on_commit(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for index in range(10):
+                        DangerousGood.objects.create(
+                            un_number=f'UN{1000 + index}', proper_shipping_name=f'Substance {index}', hazard_class='3'
+                        )
+                    self.assertEqual(DangerousGood.history.count(), 0)
+
+        self.assertEqual(len(self._history_inserts(queries.captured_queries)), 1)
+        self.assertEqual(DangerousGood.history.filter(history_type='+').count(), 10)
+
+    def test_user_and_reason_are_those_of_the_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                good = DangerousGood(un_number='UN1090', proper_shipping_name='Acetone', hazard_class='3')
+                good._history_user = self.user
+                good._change_reason = 'Catalog import'
+                good.save()
+                good.proper_shipping_name = 'Acetone solution'
+                good._change_reason = 'Name corrected'
+                good.save()
+
+        records = list(good.history.order_by('history_date', 'history_id'))
+        self.assertEqual([record.proper_shipping_name for record in records], ['Acetone', 'Acetone solution'])
+        self.assertEqual([record.history_change_reason for record in records], ['Catalog import', 'Name corrected'])
+        self.assertTrue(all(record.history_user == self.user for record in records))
+
+    def test_rolled_back_savepoint_records_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                good = DangerousGood.objects.create(
+                    un_number='UN1203', proper_shipping_name='Gasoline', hazard_class='3'
+                )
+                try:
+                    with transaction.atomic():
+                        good.hazard_class = '8'
+                        good.save()
+                        raise IntegrityError('rolled back')
+                except IntegrityError:
+                    pass
+
+        self.assertEqual(list(good.history.values_list('history_type', 'hazard_class')), [('+', '3')])
+
+    def test_failed_flush_is_logged_and_later_callbacks_run(self):
+        later = mock.Mock()
+        manager_class = type(DangerousGood.history.model.objects)
+
+        with mock.patch.object(manager_class, 'bulk_create', side_effect=DatabaseError('history table locked')):
+            with self.assertLogs('shared.history', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    with transaction.atomic():
+                        good = DangerousGood.objects.create(
+                            un_number='UN1830', proper_shipping_name='Sulphuric acid', hazard_class='8'
+                        )
+                        transaction.on_commit(later)
+
+        later.assert_called_once()
+        self.assertTrue(DangerousGood.objects.filter(pk=good.pk).exists())
+        self.assertEqual(good.history.count(), 0)
+
+    def test_update_with_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for index in range(3):
+                    DangerousGood.objects.create(
+                        un_number=f'UN20{index}0', proper_shipping_name=f'Oxidizer {index}', hazard_class='5.1'
+                    )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = update_with_history(
+                DangerousGood.objects.filter(hazard_class='5.1'),
+                change_reason='Reclassified', user=self.user, hazard_class='5.2'
+            )
+
+        self.assertEqual(updated, 3)
+        changes = DangerousGood.history.filter(history_type='~')
+        self.assertEqual(changes.count(), 3)
+        self.assertEqual(set(changes.values_list('hazard_class', 'history_change_reason', 'history_user')),
+                         {('5.2', 'Reclassified', self.user.pk)})
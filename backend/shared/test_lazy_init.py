@@ -0,0 +1,76 @@
+# shared/test_lazy_init.py
+"""
+Tests for deferred module imports and service singletons.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from django.test import SimpleTestCase
+
+from .lazy_init import lazy_import, lazy_service, pending_imports, service_states
+from .startup_profiler import parse_importtime
+
+
+class TestLazyImport(SimpleTestCase):
+    """Test that lazily imported modules execute on first attribute access"""
+
+    def setUp(self):
+        self.module_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.module_dir, ignore_errors=True)
+        with open(os.path.join(self.module_dir, 'lazy_init_probe.py'), 'w') as module_file:
+            module_file.write("import os\nos.environ['LAZY_INIT_PROBE'] = 'loaded'\nVALUE = 42\n")
+        sys.path.insert(0, self.module_dir)
+        self.addCleanup(sys.path.remove, self.module_dir)
+        self.addCleanup(sys.modules.pop, 'lazy_init_probe', None)
+        self.addCleanup(os.environ.pop, 'LAZY_INIT_PROBE', None)
+
+    def test_module_executes_on_first_access(self):
+        module = lazy_import('lazy_init_probe')
+        self.assertNotIn('LAZY_INIT_PROBE', os.environ)
+        self.assertIn('lazy_init_probe', pending_imports())
+
+        self.assertEqual(module.VALUE, 42)
+        self.assertEqual(os.environ['LAZY_INIT_PROBE'], 'loaded')
+        self.assertNotIn('lazy_init_probe', pending_imports())
+
+    def test_missing_module_raises_immediately(self):
+        with self.assertRaises(ModuleNotFoundError):
+            lazy_import('lazy_init_missing_module')
+
+
+class TestLazyService(SimpleTestCase):
+    """Test deferred construction of service singletons"""
+
+    def test_built_once_on_first_use(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return {'ready': True}
+
+        service = lazy_service('tests.lazy_service', factory)
+        self.assertEqual(calls, [])
+        self.assertFalse(service_states()['tests.lazy_service']['initialized'])
+
+        self.assertTrue(service['ready'])
+        self.assertTrue(service['ready'])
+        self.assertEqual(calls, [1])
+        self.assertTrue(service_states()['tests.lazy_service']['initialized'])
+
+
+class TestParseImporttime(SimpleTestCase):
+    """Test -X importtime parsing"""
+
+    def test_top_level_imports_sorted_by_cumulative_time(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   encodings.aliases\n"
+            "import time:       500 |       2000 | fitz\n"
+            "import time:       300 |       9000 | weasyprint\n"
+            "unrelated log line\n"
+        )
+        modules = parse_importtime(stderr)
+        self.assertEqual([module['module'] for module in modules], ['weasyprint', 'fitz'])
+        self.assertEqual(modules[0]['cumulative_ms'], 9.0)
@@ -0,0 +1,77 @@
+# shared/test_nlp_models.py
+"""
+Tests for lazy NLP model loading and the NLP worker client.
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+from django.test import TestCase, override_settings
+
+from . import nlp_worker
+from .nlp_models import NLPModelRegistry, SPACY_AVAILABLE, nlp_models
+
+
+@nlp_worker.nlp_operation('test_upper')
+def upper(text):
+    return text.upper()
+
+
+class TestNLPModelRegistry(TestCase):
+    """Test lazy, shared model loading"""
+
+    def setUp(self):
+        self.registry = NLPModelRegistry()
+
+    @skipUnless(SPACY_AVAILABLE, 'spaCy not installed')
+    def test_model_loaded_once_on_first_use(self):
+        with mock.patch('spacy.load', return_value=mock.Mock(name='nlp')) as load:
+            self.assertEqual(self.registry.loaded_models(), [])
+            first = self.registry.get('en_test_model')
+            second = self.registry.get('en_test_model')
+
+        self.assertIs(first, second)
+        load.assert_called_once_with('en_test_model')
+
+    @skipUnless(SPACY_AVAILABLE, 'spaCy not installed')
+    def test_missing_model_is_remembered(self):
+        with mock.patch('spacy.load', side_effect=OSError('not found')) as load:
+            self.assertIsNone(self.registry.get('en_missing_model'))
+            self.assertIsNone(self.registry.get('en_missing_model'))
+
+        load.assert_called_once()
+        self.assertFalse(self.registry.is_available('en_missing_model'))
+
+    @skipUnless(nlp_models.is_available(), 'spaCy model not installed')
+    def test_phrase_patterns_cached_on_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+
+        with override_settings(NLP_PATTERN_CACHE_DIR=cache_dir):
+            patterns = nlp_models.phrase_patterns(['acetone', 'sulfuric acid'])
+            cache_files = os.listdir(cache_dir)
+            self.assertEqual(len(cache_files), 1)
+            written_at = os.path.getmtime(os.path.join(cache_dir, cache_files[0]))
+
+            cached = nlp_models.phrase_patterns(['sulfuric acid', 'acetone'])
+            self.assertEqual(os.listdir(cache_dir), cache_files)
+            self.assertEqual(os.path.getmtime(os.path.join(cache_dir, cache_files[0])), written_at)
+
+        self.assertEqual([doc.text for doc in cached], [doc.text for doc in patterns])
+
+
+class TestNLPWorkerClient(TestCase):
+    """Test in-process execution and worker failure handling"""
+
+    def test_runs_in_process_without_worker(self):
+        self.assertEqual(nlp_worker.run('test_upper', 'un1090'), 'UN1090')
+
+    @override_settings(NLP_WORKER_ADDRESS='/nonexistent/nlp-worker.sock')
+    def test_unreachable_worker_raises(self):
+        with self.assertRaises(nlp_worker.NLPWorkerError):
+            nlp_worker.run('test_upper', 'un1090')
+
+    @override_settings(NLP_WORKER_ADDRESS='/nonexistent/nlp-worker.sock', NLP_WORKER_FALLBACK_LOCAL=True)
+    def test_unreachable_worker_falls_back_when_enabled(self):
+        self.assertEqual(nlp_worker.run('test_upper', 'un1090'), 'UN1090')
@@ -0,0 +1,84 @@
+# shared/test_pagination.py
+"""
+Tests for keyset pagination.
+"""
+
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from audits.models import AuditLog, AuditActionType
+from .pagination import KeysetPagination
+
+
+class AuditLogKeysetPagination(KeysetPagination):
+    page_size = 3
+    keyset_ordering = ['-timestamp', '-id']
+
+
+class TestKeysetPagination(TestCase):
+    """Test cursor paging over a composite ordering"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        now = timezone.now()
+        # Three rows share a timestamp, so the id decides their order
+        timestamps = [now - timedelta(minutes=minutes) for minutes in (0, 1, 1, 1, 2, 3, 4)]
+        for timestamp in timestamps:
+            AuditLog.objects.create(
+                action_type=AuditActionType.ACCESS_GRANTED,
+                action_description='Viewed audit logs',
+                timestamp=timestamp
+            )
+        self.expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def _page(self, url):
+        paginator = AuditLogKeysetPagination()
+        request = Request(self.factory.get(url))
+        rows = paginator.paginate_queryset(AuditLog.objects.all(), request)
+        return [row.id for row in rows], paginator.get_paginated_response([]).data
+
+    def test_walks_forward_and_back(self):
+        ids, data = self._page('/logs/?cursor=')
+        pages = [ids]
+        self.assertIsNone(data['previous'])
+        self.assertNotIn('count', data)
+        while data['next']:
+            ids, data = self._page(data['next'])
+            pages.append(ids)
+        self.assertEqual([row_id for page in pages for row_id in page], self.expected)
+
+        # Back from the last page
+        ids, data = self._page(data['previous'])
+        self.assertEqual(ids, pages[-2])
+        ids, data = self._page(data['previous'])
+        self.assertEqual(ids, pages[0])
+        self.assertIsNone(data['previous'])
+
+    def test_inserts_do_not_shift_pages(self):
+        first, data = self._page('/logs/?cursor=')
+        AuditLog.objects.create(
+            action_type=AuditActionType.ACCESS_GRANTED,
+            action_description='Newer entry',
+            timestamp=timezone.now() + timedelta(minutes=5)
+        )
+        second, _ = self._page(data['next'])
+        self.assertEqual(first + second, self.expected[:6])
+
+    def test_rejects_tampered_cursor(self):
+        _, data = self._page('/logs/?cursor=')
+        with self.assertRaises(NotFound):
+            self._page(data['next'][:-2] + 'xx')
+
+    def test_estimated_count_is_optional(self):
+        _, data = self._page('/logs/?cursor=&count=estimate')
+        self.assertIn('count', data)
+        self.assertTrue(data['count_estimated'])
+
+    def test_page_numbers_without_cursor(self):
+        ids, data = self._page('/logs/?page=2')
+        self.assertEqual(data['count'], len(self.expected))
+        self.assertEqual(len(ids), 3)
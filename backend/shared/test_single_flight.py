@@ -0,0 +1,135 @@
+# shared/test_single_flight.py
+"""
+Tests for single-flight cache fills.
+"""
+
+import asyncio
+import threading
+import time
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .single_flight import SingleFlight
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class CountingCompute:
+    """Slow computation that records how many times it ran"""
+
+    def __init__(self, value='fresh', delay=0.2):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestSingleFlight(TestCase):
+    """Test stampede protection, early refresh and stale serving"""
+
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight('test-flight', poll_interval=0.01, beta=0)
+
+    def run_parallel(self, target, count=100):
+        barrier = threading.Barrier(count)
+        results = []
+        errors = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(target())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        return results
+
+    def test_parallel_misses_compute_once(self):
+        compute = CountingCompute()
+
+        results = self.run_parallel(lambda: self.flight.get_or_compute('fleet', compute, ttl=60))
+
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(results, ['fresh'] * 100)
+
+    def test_waits_for_lock_held_by_another_process(self):
+        lock_key = self.flight._key('lock', 'fleet')
+        cache.add(lock_key, 'other-worker', 30)
+        compute = CountingCompute()
+
+        def other_worker_finishes():
+            time.sleep(0.1)
+            self.flight._store('fleet', 'from-other', ttl=60, stale_ttl=60, delta=0.1)
+            cache.delete(lock_key)
+
+        threading.Thread(target=other_worker_finishes).start()
+        value = self.flight.get_or_compute('fleet', compute, ttl=60)
+
+        self.assertEqual(value, 'from-other')
+        self.assertEqual(compute.calls, 0)
+
+    def test_stale_value_served_while_revalidating(self):
+        self.flight._store('fleet', 'stale', ttl=-1, stale_ttl=60, delta=0.1)
+        compute = CountingCompute(delay=0.3)
+
+        results = self.run_parallel(lambda: self.flight.get_or_compute('fleet', compute, ttl=60), count=20)
+
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(results.count('fresh'), 1)
+        self.assertEqual(results.count('stale'), 19)
+        self.assertEqual(self.flight.get_or_compute('fleet', compute, ttl=60), 'fresh')
+
+    def test_failed_revalidation_serves_stale_value(self):
+        self.flight._store('fleet', 'stale', ttl=-1, stale_ttl=60, delta=0.1)
+
+        def failing():
+            raise RuntimeError('database unavailable')
+
+        self.assertEqual(self.flight.get_or_compute('fleet', failing, ttl=60), 'stale')
+
+    def test_expensive_values_refresh_early(self):
+        eager = SingleFlight('test-eager', beta=1000)
+        eager._store('fleet', 'old', ttl=60, stale_ttl=60, delta=1.0)
+        compute = CountingCompute(delay=0)
+
+        self.assertEqual(eager.get_or_compute('fleet', compute, ttl=60), 'fresh')
+        self.assertEqual(eager.stats()['early_refreshes'], 1)
+
+    def test_async_coalesce_computes_once(self):
+        store = {}
+        calls = []
+
+        async def lookup():
+            return store.get('result')
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            store['result'] = 'computed'
+            return 'computed'
+
+        async def run():
+            return await asyncio.gather(*[
+                self.flight.acoalesce('analytics', compute, lookup) for _ in range(100)
+            ])
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['computed'] * 100)
@@ -0,0 +1,143 @@
+# shared/test_streaming_export.py
+"""
+Tests for streaming and background exports.
+"""
+
+import csv
+import io
+import json
+import shutil
+import tempfile
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from .streaming_export import (
+    BackgroundExport, ExportFormatError, ExportSource, StreamingExport, PYARROW_AVAILABLE
+)
+
+User = get_user_model()
+
+
+class UserExportSource(ExportSource):
+    """Minimal source used by background export tests"""
+
+    columns = ['Username', 'Email']
+    fail_after = None
+
+    def row(self, user):
+        if self.fail_after is not None:
+            self.fail_after -= 1
+            if self.fail_after < 0:
+                raise RuntimeError('worker lost')
+        return [user.username, user.email]
+
+
+USER_EXPORT = UserExportSource()
+
+
+class TestStreamingExport(TestCase):
+    """Test batch encoding of export formats"""
+
+    def setUp(self):
+        self.rows = [[i, f'row {i}', None] for i in range(5)]
+
+    def test_csv_streams_in_batches(self):
+        export = StreamingExport(['id', 'name', 'note'], iter(self.rows), batch_size=2)
+        chunks = list(export.chunks('csv'))
+
+        self.assertEqual(len(chunks), 3)
+        parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(parsed[0], ['id', 'name', 'note'])
+        self.assertEqual(parsed[1], ['0', 'row 0', ''])
+        self.assertEqual(export.row_count, 5)
+
+    def test_ndjson_one_object_per_line(self):
+        export = StreamingExport(['id', 'name', 'note'], iter(self.rows), batch_size=2)
+        lines = b''.join(export.chunks('ndjson')).decode('utf-8').splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[4]), {'id': 4, 'name': 'row 4', 'note': None})
+
+    def test_unknown_format_rejected(self):
+        export = StreamingExport(['id'], iter([]))
+        with self.assertRaises(ExportFormatError):
+            export.chunks('xml')
+
+    def test_parquet_row_groups(self):
+        if not PYARROW_AVAILABLE:
+            self.skipTest('pyarrow not installed')
+        import pyarrow
+        import pyarrow.parquet
+
+        export = StreamingExport(['id', 'name', 'note'], iter(self.rows), batch_size=2)
+        data = b''.join(export.chunks('parquet'))
+        parquet_file = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(data))
+
+        self.assertEqual(parquet_file.metadata.num_rows, 5)
+        self.assertEqual(parquet_file.num_row_groups, 3)
+
+
+class TestBackgroundExport(TestCase):
+    """Test resumable exports written to storage"""
+
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        storage_settings = override_settings(STORAGES={
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': self.storage_dir},
+            },
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+        self.addCleanup(shutil.rmtree, self.storage_dir, ignore_errors=True)
+
+        self.owner = User.objects.create_user(username='exporter', email='exporter@example.com', password='x')
+        for index in range(4):
+            User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com', password='x')
+        USER_EXPORT.fail_after = None
+
+    def start_job(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            return BackgroundExport.start(
+                'shared.test_streaming_export.USER_EXPORT', User.objects.all(), 'csv', self.owner
+            )
+
+    def read_usernames(self, manifest):
+        usernames = []
+        for part in manifest['parts']:
+            with default_storage.open(part['name'], 'rb') as part_file:
+                rows = list(csv.reader(io.StringIO(part_file.read().decode('utf-8'))))
+            usernames.extend(row[0] for row in rows[1:])
+        return usernames
+
+    def test_export_written_in_parts(self):
+        job_id = self.start_job()
+
+        manifest = BackgroundExport.run(job_id, part_rows=2, chunk_size=2)
+
+        self.assertEqual(manifest['status'], BackgroundExport.COMPLETED)
+        self.assertEqual(manifest['rows'], 5)
+        self.assertEqual([part['rows'] for part in manifest['parts']], [2, 2, 1])
+        self.assertEqual(sorted(self.read_usernames(manifest)), sorted(User.objects.values_list('username', flat=True)))
+
+    def test_failed_export_resumes_from_checkpoint(self):
+        job_id = self.start_job()
+        USER_EXPORT.fail_after = 3
+
+        with self.assertRaises(RuntimeError):
+            BackgroundExport.run(job_id, part_rows=2, chunk_size=2)
+
+        failed = BackgroundExport.load(job_id)
+        self.assertEqual(failed['status'], BackgroundExport.FAILED)
+        self.assertEqual(failed['rows'], 2)
+
+        USER_EXPORT.fail_after = None
+        manifest = BackgroundExport.run(job_id, part_rows=2, chunk_size=2)
+
+        self.assertEqual(manifest['status'], BackgroundExport.COMPLETED)
+        usernames = self.read_usernames(manifest)
+        self.assertEqual(len(usernames), 5)
+        self.assertEqual(len(set(usernames)), 5)
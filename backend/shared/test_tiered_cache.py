@@ -0,0 +1,124 @@
+# shared/test_tiered_cache.py
+"""
+Tests for the bounded, tag-invalidated tiered cache.
+"""
+
+import time
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .tiered_cache import BoundedLRUCache, TieredCache
+from .caching_service import SafeShipperCacheService, DangerousGoodsCacheService
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class TestBoundedLRUCache(TestCase):
+    """Test the in-memory tier"""
+
+    def test_evicts_least_recently_used(self):
+        lru = BoundedLRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertEqual(lru.keys(), ['a', 'c'])
+        self.assertEqual(lru.evictions, 1)
+
+    def test_entry_ttl_is_capped_by_tier_ttl(self):
+        lru = BoundedLRUCache(maxsize=10, ttl=1)
+        lru.set('short', 'value', ttl=3600)
+        time.sleep(1.1)
+
+        self.assertIsNone(lru.get('short'))
+        self.assertEqual(lru.expirations, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestTieredCache(TestCase):
+    """Test tag invalidation and metrics"""
+
+    def setUp(self):
+        cache.clear()
+        self.tier = TieredCache('test-tier', memory_maxsize=10)
+
+    def test_memory_then_shared_hits(self):
+        self.tier.set('key', {'value': 1}, tags=['company:1'])
+        self.assertEqual(self.tier.get_with_level('key', ['company:1']), ({'value': 1}, 'memory'))
+
+        self.tier.memory.clear()
+        self.assertEqual(self.tier.get_with_level('key', ['company:1']), ({'value': 1}, 'shared'))
+
+        stats = self.tier.stats()
+        self.assertEqual(stats['memory_hits'], 1)
+        self.assertEqual(stats['shared_hits'], 1)
+
+    def test_tag_invalidation_is_scoped(self):
+        self.tier.set('one', 'a', tags=['company:1'])
+        self.tier.set('two', 'b', tags=['company:2'])
+
+        self.tier.invalidate('company:1')
+
+        self.assertIsNone(self.tier.get('one', ['company:1']))
+        self.assertEqual(self.tier.get('two', ['company:2']), 'b')
+
+    def test_invalidation_seen_by_other_process(self):
+        other = TieredCache('test-tier', memory_maxsize=10)
+        other.generations.local_ttl = 0
+        other.set('key', 'value', tags=['user:7'])
+
+        self.tier.invalidate('user:7')
+
+        self.assertIsNone(other.get('key', ['user:7']))
+
+    def test_clear_bumps_namespace(self):
+        self.tier.set('key', 'value')
+        self.tier.clear()
+
+        self.assertIsNone(self.tier.get('key'))
+        self.assertEqual(self.tier.stats()['memory_size'], 0)
+
+    def test_clear_namespace_by_name_without_instance(self):
+        other = TieredCache('other-process-tier', memory_maxsize=10)
+        other.generations.local_ttl = 0
+        other.set('key', 'value')
+        TieredCache._registry.pop('other-process-tier')
+
+        self.assertEqual(TieredCache.clear_namespaces(['other-process-tier']), 1)
+
+        other.memory.clear()
+        self.assertIsNone(other.get('key'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestTieredConsumers(TestCase):
+    """Test the services built on the tiered cache"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_clear_pattern_is_scoped_to_type(self):
+        DangerousGoodsCacheService.cache_dangerous_good_by_un('UN1203', {'un_number': 'UN1203'})
+        SafeShipperCacheService.set('sds', {'ph': 7}, dg_id='1')
+
+        self.assertTrue(DangerousGoodsCacheService.invalidate_dangerous_goods_cache())
+
+        self.assertIsNone(DangerousGoodsCacheService.get_dangerous_good_by_un('UN1203'))
+        self.assertEqual(SafeShipperCacheService.get('sds', dg_id='1'), {'ph': 7})
+
+    def test_analytics_invalidation_by_company(self):
+        from analytics.caching import AnalyticsCacheManager
+
+        manager = AnalyticsCacheManager()
+        own = manager.generate_cache_key('fleet', None, 1, {}, '7d', 'day')
+        other = manager.generate_cache_key('fleet', None, 2, {}, '7d', 'day')
+        async_to_sync(manager.cache_result)(own, {'total': 1})
+        async_to_sync(manager.cache_result)(other, {'total': 2})
+
+        async_to_sync(manager.invalidate_cache)(analytics_type='fleet', company_id=1)
+
+        self.assertIsNone(async_to_sync(manager.get_cached_analytics)(own))
+        self.assertEqual(async_to_sync(manager.get_cached_analytics)(other).data, {'total': 2})
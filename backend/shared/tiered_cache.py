@@ -0,0 +1,367 @@
+# shared/tiered_cache.py
+"""
+Two-tier cache with tag-based invalidation for SafeShipper.
+
+Tier 1 is a per-process LRU bounded by entry count and per-entry TTL.
+Tier 2 is a shared Django cache (Redis in deployed environments).
+
+Entries are never found by scanning keys. Every key embeds the current
+generation of each tag it carries (its namespace, company, type, user...).
+Invalidating a tag increments its generation counter, which orphans every
+key built with the old value in O(1); orphaned entries simply age out.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# How long a process trusts its local copy of a tag generation before
+# re-reading it from the shared cache. Bumps made by this process are
+# visible immediately; bumps made elsewhere within this window.
+GENERATION_LOCAL_TTL = 2
+
+MAX_KEY_LENGTH = 200
+
+
+def get_shared_cache(alias: str = 'default'):
+    """
+    Proxy to the named Django cache, falling back to the default cache. The
+    proxy resolves the connection on each use, like ``django.core.cache.cache``.
+    """
+    if alias not in getattr(settings, 'CACHES', {}):
+        alias = 'default'
+    return ConnectionProxy(caches, alias)
+
+
+class BoundedLRUCache:
+    """
+    Thread-safe in-memory LRU bounded by entry count, with per-entry expiry.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: int = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._data.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TagGenerations:
+    """
+    Generation counters for cache tags, kept in a shared cache.
+
+    Counters are seeded from the current time in milliseconds, so a counter
+    that is evicted and re-created never repeats an earlier generation.
+    """
+
+    def __init__(self, namespace: str, backend, local_ttl: float = GENERATION_LOCAL_TTL):
+        self.namespace = namespace
+        self.backend = backend
+        self.local_ttl = local_ttl
+        self._local: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, tag: str) -> str:
+        return f"tiercache:gen:{self.namespace}:{tag}"
+
+    @staticmethod
+    def _seed() -> int:
+        return int(time.time() * 1000)
+
+    def current(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Return the generation of each tag, reading the shared cache once for stale ones."""
+        now = time.monotonic()
+        generations = {}
+        stale = []
+        with self._lock:
+            for tag in tags:
+                local = self._local.get(tag)
+                if local and local[0] > now:
+                    generations[tag] = local[1]
+                else:
+                    stale.append(tag)
+
+        if stale:
+            keys = {self._key(tag): tag for tag in stale}
+            try:
+                found = self.backend.get_many(list(keys))
+                missing = [key for key in keys if key not in found]
+                if missing:
+                    seed = self._seed()
+                    for key in missing:
+                        self.backend.add(key, seed, None)
+                    found.update(self.backend.get_many(missing))
+            except Exception as e:
+                logger.warning(f"Tag generation lookup failed for {self.namespace}: {e}")
+                found = {}
+
+            with self._lock:
+                for key, tag in keys.items():
+                    value = found.get(key, 0)
+                    generations[tag] = value
+                    self._local[tag] = (now + self.local_ttl, value)
+
+        return generations
+
+    def bump(self, tags: Iterable[str]) -> int:
+        """Advance each tag's generation. Returns the number of tags bumped."""
+        bumped = 0
+        for tag in tags:
+            key = self._key(tag)
+            try:
+                try:
+                    self.backend.incr(key)
+                except ValueError:
+                    self.backend.set(key, self._seed(), None)
+                bumped += 1
+            except Exception as e:
+                logger.warning(f"Failed to bump cache tag {self.namespace}:{tag}: {e}")
+            with self._lock:
+                self._local.pop(tag, None)
+        return bumped
+
+    def token(self, tags: List[str]) -> str:
+        generations = self.current(tags)
+        return '.'.join(str(generations[tag]) for tag in tags)
+
+
+class TieredCache:
+    """
+    Memory + shared cache with tag invalidation and hit/miss/eviction metrics.
+
+    Every entry carries the implicit namespace tag, so clear() is a single
+    generation bump rather than a key scan or a full cache flush.
+    """
+
+    NAMESPACE_TAG = '*'
+
+    _registry: Dict[str, 'TieredCache'] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self,
+        namespace: str,
+        memory_maxsize: int = 1000,
+        memory_ttl: int = 60,
+        default_timeout: int = 300,
+        cache_alias: str = 'default',
+    ):
+        self.namespace = namespace
+        self.default_timeout = default_timeout
+        self.cache_alias = cache_alias
+        self.memory = BoundedLRUCache(maxsize=memory_maxsize, ttl=memory_ttl)
+        self._backend = None
+        self._generations = None
+        self.metrics = {
+            'memory_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'invalidations': 0,
+            'errors': 0,
+        }
+
+        with self._registry_lock:
+            self._registry[namespace] = self
+
+    # Resolved on first use so module-level instances do not read settings at import
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_shared_cache(self.cache_alias)
+        return self._backend
+
+    @property
+    def generations(self) -> TagGenerations:
+        if self._generations is None:
+            self._generations = TagGenerations(self.namespace, self.backend)
+        return self._generations
+
+    def _all_tags(self, tags: Iterable[str]) -> List[str]:
+        return [self.NAMESPACE_TAG] + sorted(set(tags))
+
+    def make_key(self, key: str, tags: Iterable[str] = ()) -> str:
+        """Versioned storage key for a logical key and its tags."""
+        versioned = f"{self.namespace}:{key}:v{self.generations.token(self._all_tags(tags))}"
+        if len(versioned) > MAX_KEY_LENGTH:
+            digest = hashlib.md5(versioned.encode()).hexdigest()
+            versioned = f"{self.namespace}:h:{digest}"
+        return versioned
+
+    def get_with_level(self, key: str, tags: Iterable[str] = ()) -> Tuple[Any, Optional[str]]:
+        """Return (value, 'memory' | 'shared') on a hit or (None, None) on a miss."""
+        storage_key = self.make_key(key, tags)
+
+        value = self.memory.get(storage_key, _MISSING)
+        if value is not _MISSING:
+            self.metrics['memory_hits'] += 1
+            return value, 'memory'
+
+        try:
+            value = self.backend.get(storage_key)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Shared cache get failed for {storage_key}: {e}")
+            value = None
+
+        if value is not None:
+            self.metrics['shared_hits'] += 1
+            self.memory.set(storage_key, value)
+            return value, 'shared'
+
+        self.metrics['misses'] += 1
+        return None, None
+
+    def get(self, key: str, tags: Iterable[str] = (), default: Any = None) -> Any:
+        value, level = self.get_with_level(key, tags)
+        return default if level is None else value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        tags: Iterable[str] = (),
+        timeout: Optional[int] = None,
+        memory: bool = True,
+        shared: bool = True,
+    ) -> bool:
+        """Store a value in the selected tiers. None values are not cached."""
+        if value is None:
+            return False
+
+        storage_key = self.make_key(key, tags)
+        timeout = timeout or self.default_timeout
+        self.metrics['sets'] += 1
+
+        if memory:
+            self.memory.set(storage_key, value, timeout)
+        if shared:
+            try:
+                self.backend.set(storage_key, value, timeout)
+            except Exception as e:
+                self.metrics['errors'] += 1
+                logger.warning(f"Shared cache set failed for {storage_key}: {e}")
+                return False
+        return True
+
+    def delete(self, key: str, tags: Iterable[str] = ()) -> bool:
+        storage_key = self.make_key(key, tags)
+        self.memory.delete(storage_key)
+        try:
+            self.backend.delete(storage_key)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            logger.warning(f"Shared cache delete failed for {storage_key}: {e}")
+            return False
+        return True
+
+    def invalidate(self, *tags: str) -> int:
+        """Invalidate every entry carrying any of the given tags."""
+        bumped = self.generations.bump(tags)
+        self.metrics['invalidations'] += bumped
+        logger.debug(f"Invalidated {self.namespace} tags: {', '.join(tags)}")
+        return bumped
+
+    def clear(self) -> int:
+        """Invalidate the whole namespace in every process and drop the local tier."""
+        self.memory.clear()
+        return self.invalidate(self.NAMESPACE_TAG)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics['memory_hits'] + self.metrics['shared_hits'] + self.metrics['misses']
+        hits = lookups - self.metrics['misses']
+        return {
+            **self.metrics,
+            'lookups': lookups,
+            'hit_rate': round(hits / lookups * 100, 1) if lookups else 0,
+            'memory_size': len(self.memory),
+            'memory_maxsize': self.memory.maxsize,
+            'memory_evictions': self.memory.evictions,
+            'memory_expirations': self.memory.expirations,
+        }
+
+    @classmethod
+    def all_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Metrics for every tiered cache created in this process."""
+        with cls._registry_lock:
+            registry = dict(cls._registry)
+        return {namespace: tier.stats() for namespace, tier in registry.items()}
+
+    @classmethod
+    def get_instance(cls, namespace: str) -> Optional['TieredCache']:
+        with cls._registry_lock:
+            return cls._registry.get(namespace)
+
+    @classmethod
+    def clear_namespaces(cls, namespaces: Iterable[str], cache_alias: str = 'default') -> int:
+        """
+        Clear namespaces by name, including ones this process never created
+        (e.g. from a Celery worker). Returns namespaces cleared.
+        """
+        backend = get_shared_cache(cache_alias)
+        cleared = 0
+        for namespace in namespaces:
+            tier = cls.get_instance(namespace)
+            if tier is not None:
+                tier.memory.clear()
+            cleared += TagGenerations(namespace, backend).bump([cls.NAMESPACE_TAG])
+        return cleared
+
+    @classmethod
+    def clear_all(cls) -> int:
+        """Clear every tiered cache created in this process. Returns namespaces cleared."""
+        with cls._registry_lock:
+            registry = list(cls._registry.values())
+        return sum(tier.clear() for tier in registry)
@@ -14,7 +14,7 @@ from .views import (
     DetailedHealthView,
     ServiceHealthView
 )
-from .api_views import DataRetentionViewSet, SystemHealthViewSet
+from .api_views import DataRetentionViewSet, SystemHealthViewSet, ExportJobViewSet
 from .production_health import ProductionHealthView, ProductionReadinessView, ProductionLivenessView
 
 app_name = 'shared'
@@ -23,6 +23,7 @@ app_name = 'shared'
 router = DefaultRouter()
 router.register(r'data-retention', DataRetentionViewSet, basename='data-retention')
 router.register(r'system-health', SystemHealthViewSet, basename='system-health-api')
+router.register(r'exports', ExportJobViewSet, basename='export-job')
 
 urlpatterns = [
     # DRF API endpoints
@@ -2,14 +2,15 @@
 from django.contrib import admin
 from .models import Shipment, ConsignmentItem, ShipmentStatus # ShipmentStatus is used by model
 from simple_history.admin import SimpleHistoryAdmin
+from shared.history import update_with_history
 
 @admin.action(description="Mark selected shipments as IN_TRANSIT")
 def mark_in_transit(modeladmin, request, queryset):
-    queryset.update(status=Shipment.ShipmentStatus.IN_TRANSIT)
+    update_with_history(queryset, change_reason="Admin: marked in transit", user=request.user, status=ShipmentStatus.IN_TRANSIT)
 
 @admin.action(description="Mark selected shipments as DELIVERED")
 def mark_delivered(modeladmin, request, queryset):
-    queryset.update(status=Shipment.ShipmentStatus.DELIVERED)
+    update_with_history(queryset, change_reason="Admin: marked delivered", user=request.user, status=ShipmentStatus.DELIVERED)
 
 class ConsignmentItemInline(admin.TabularInline):
     model = ConsignmentItem
@@ -6,11 +6,12 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from django.core.exceptions import ValidationError, PermissionDenied
+from django.db.models import Q
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
-from .models import Shipment, ConsignmentItem, ShipmentFeedback
+from .models import Shipment, ConsignmentItem, ShipmentFeedback, ProofOfDelivery
 from .serializers import (
     ShipmentSerializer, ShipmentListSerializer, ConsignmentItemSerializer,
     ShipmentFeedbackSerializer, ShipmentFeedbackListSerializer, ManagerResponseSerializer,
@@ -28,6 +29,7 @@ from .services import (
     update_shipment_status_service,
     search_shipments
 )
+from .search import ShipmentSearchFilter
 from .incident_service import create_incident_for_feedback, update_incident_for_feedback_response
 from notifications.feedback_notification_service import (
     notify_feedback_received, notify_manager_response, notify_incident_created, notify_driver_feedback
@@ -36,7 +38,13 @@ from erp_integration.feedback_webhook_service import (
     send_feedback_webhook, send_incident_webhook
 )
 from .safety_validation import ShipmentSafetyValidator, ShipmentPreValidationService
+from .feedback_metrics_service import FeedbackMetricsService
+from shared.pagination import KeysetPagination
 from shared.rate_limiting import ShipmentCreationRateThrottle, DangerousGoodsRateThrottle
+from shared.streaming_export import (
+    BackgroundExport, ExportFormatError, DEFAULT_CHUNK_SIZE, streaming_response
+)
+from .exports import FEEDBACK_EXPORT, POD_EXPORT
 
 
 class ShipmentViewSet(viewsets.ModelViewSet):
@@ -46,7 +54,11 @@ class ShipmentViewSet(viewsets.ModelViewSet):
     """
     permission_classes = [permissions.IsAuthenticated, CanModifyShipment]
     throttle_classes = [ShipmentCreationRateThrottle]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Search runs last so its ranking replaces the default ordering
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ShipmentSearchFilter]
+    # ?cursor= pages by (created_at, id) instead of page number; ordering is then ignored
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-created_at', '-id']
     
     filterset_fields = {
         'status': ['exact', 'in'],
@@ -60,15 +72,8 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         'freight_type': ['exact'],
         'contract_type': ['exact'],
     }
-    search_fields = [
-        'tracking_number', 
-        'reference_number', 
-        'origin_location', 
-        'destination_location',
-        'customer__name',
-        'carrier__name',
-        'items__description'
-    ]
+    # ?search= matches tracking and reference numbers, customer, carrier,
+    # locations and item descriptions through ShipmentSearchDocument
     ordering_fields = [
         'created_at', 
         'status', 
@@ -87,9 +92,8 @@ class ShipmentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Return role-based filtered shipments with optimized queries."""
-        return get_shipments_for_user(self.request.user).prefetch_related(
-            'items__dangerous_good_entry'
-        )
+        # Loads what the action's serializer reads (see shared/query_plans.py)
+        return self.get_serializer_class().prepare_queryset(get_shipments_for_user(self.request.user))
 
     def perform_create(self, serializer):
         """Enhanced shipment creation with role-based and DG compatibility validation."""
@@ -687,11 +691,9 @@ class ShipmentViewSet(viewsets.ModelViewSet):
                 'total_qualified': len(qualified_drivers),
                 'validation_summary': {
                     'has_dangerous_goods': shipment.items.filter(is_dangerous_good=True).exists(),
-                    'dangerous_goods_classes': [
-                        item.dangerous_good_entry.hazard_class.split('.')[0]
-                        for item in shipment.items.filter(is_dangerous_good=True)
-                        if item.dangerous_good_entry and item.dangerous_good_entry.hazard_class
-                    ]
+                    'dangerous_goods_classes': ShipmentDriverQualificationService._extract_dg_classes_from_shipment(
+                        shipment
+                    )
                 }
             })
             
@@ -1359,17 +1361,16 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         Query parameters:
         - status: Filter vehicles by status (default: AVAILABLE)
         - depot: Filter vehicles by depot
+        - include_legacy: Also run the legacy per-vehicle validator (default: false)
         """
         shipment = self.get_object()
         
         try:
             from vehicles.models import Vehicle
-            from .vehicle_compatibility_service import VehicleDGCompatibilityService
+            from .fleet_matching_service import FleetCompatibilityMatcher
             
             # Get available vehicles with optional filtering
-            vehicles_qs = Vehicle.objects.select_related('owning_company').prefetch_related(
-                'safety_equipment__equipment_type'
-            )
+            vehicles_qs = Vehicle.objects.all()
             
             vehicle_status = request.query_params.get('status', ['AVAILABLE', 'MAINTENANCE'])
             if isinstance(vehicle_status, str):
@@ -1383,31 +1384,30 @@ class ShipmentViewSet(viewsets.ModelViewSet):
             # Query parameters for compatibility checking
             include_warnings = request.query_params.get('include_warnings', 'true').lower() == 'true'
             sort_by_score = request.query_params.get('sort_by_score', 'true').lower() == 'true'
+            include_legacy = request.query_params.get('include_legacy', 'false').lower() == 'true'
             
-            # Enhanced compatibility checking with new service
-            compatible_vehicles = VehicleDGCompatibilityService.get_compatible_vehicles_for_shipment(
-                shipment, vehicles_qs, include_warnings=include_warnings
-            )
-            
-            # Legacy compatibility check for comparison
-            legacy_compliant = ShipmentSafetyValidator.get_compliant_vehicles_for_shipment(
-                shipment, vehicles_qs
+            # Batch compatibility matching: fleet capabilities are loaded once
+            matcher = FleetCompatibilityMatcher(vehicles=vehicles_qs)
+            requirement = matcher.build_requirements([shipment])[0]
+            compatible_vehicles = matcher.rank_vehicles_for_requirement(
+                requirement, include_warnings=include_warnings
             )
             
-            # Add dangerous goods analysis for context
-            dangerous_items = shipment.items.filter(is_dangerous_good=True)
-            dg_analysis = {}
-            if dangerous_items.exists():
-                dg_analysis = VehicleDGCompatibilityService._analyze_dangerous_goods(dangerous_items)
+            # Legacy compatibility check for comparison (validates one vehicle at a time)
+            legacy_compliant = []
+            if include_legacy:
+                legacy_compliant = ShipmentSafetyValidator.get_compliant_vehicles_for_shipment(
+                    shipment, vehicles_qs
+                )
             
             return Response({
                 'shipment_id': str(shipment.id),
                 'tracking_number': shipment.tracking_number,
-                'dangerous_goods_analysis': dg_analysis,
+                'dangerous_goods_analysis': requirement.dg_analysis,
                 'compatibility_results': {
                     'enhanced_compatible_vehicles': compatible_vehicles,
                     'legacy_compliant_vehicles': legacy_compliant,
-                    'total_vehicles_checked': vehicles_qs.count(),
+                    'total_vehicles_checked': len(matcher.capabilities),
                     'enhanced_compatible_count': len(compatible_vehicles),
                     'legacy_compliant_count': len(legacy_compliant)
                 },
@@ -1415,7 +1415,8 @@ class ShipmentViewSet(viewsets.ModelViewSet):
                     'status_filter': vehicle_status,
                     'depot_filter': depot,
                     'include_warnings': include_warnings,
-                    'sort_by_score': sort_by_score
+                    'sort_by_score': sort_by_score,
+                    'include_legacy': include_legacy
                 }
             })
             
@@ -2370,14 +2371,7 @@ class ShipmentFeedbackViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         # Company-based filtering for multi-tenant isolation
-        queryset = ShipmentFeedback.objects.select_related(
-            'shipment__customer',
-            'shipment__carrier', 
-            'shipment__assigned_driver',
-            'responded_by'
-        ).prefetch_related(
-            'shipment__freight_type'
-        )
+        queryset = self.get_serializer_class().prepare_queryset(ShipmentFeedback.objects.all())
         
         # Filter based on user role and company
         if user.role in ['ADMIN', 'MANAGER']:
@@ -2518,8 +2512,9 @@ class ShipmentFeedbackViewSet(viewsets.ModelViewSet):
         # Filter by date range
         period_feedback = queryset.filter(submitted_at__gte=start_date)
         
-        # Calculate metrics
-        total_count = period_feedback.count()
+        # Calculate metrics in one aggregate query
+        counters = FeedbackMetricsService.aggregate_queryset(period_feedback)
+        total_count = counters['feedback_count']
         if total_count == 0:
             return Response({
                 "period": period,
@@ -2530,34 +2525,26 @@ class ShipmentFeedbackViewSet(viewsets.ModelViewSet):
                 "requires_response_count": 0,
             })
         
-        # Calculate scores and rates
-        feedback_list = list(period_feedback)
-        total_score = sum(f.delivery_success_score for f in feedback_list)
-        average_score = total_score / total_count
-        
-        difot_count = sum(1 for f in feedback_list if f.difot_score)
-        difot_rate = (difot_count / total_count) * 100
-        
-        poor_count = sum(1 for f in feedback_list if f.delivery_success_score < 70)
-        needs_response_count = sum(1 for f in feedback_list if not f.has_manager_response and f.delivery_success_score < 70)
+        rates = FeedbackMetricsService.rates(counters)
         
         return Response({
             "period": period,
             "total_feedback_count": total_count,
-            "average_delivery_score": round(average_score, 1),
-            "difot_rate": round(difot_rate, 1),
-            "poor_feedback_count": poor_count,
-            "requires_response_count": needs_response_count,
-            "on_time_rate": round(sum(1 for f in feedback_list if f.was_on_time) / total_count * 100, 1),
-            "complete_rate": round(sum(1 for f in feedback_list if f.was_complete_and_undamaged) / total_count * 100, 1),
-            "professional_rate": round(sum(1 for f in feedback_list if f.was_driver_professional) / total_count * 100, 1),
+            "average_delivery_score": rates['average_score'],
+            "difot_rate": rates['difot_rate'],
+            "poor_feedback_count": rates['poor_feedback_count'],
+            "requires_response_count": rates['needs_response_count'],
+            "on_time_rate": rates['on_time_rate'],
+            "complete_rate": rates['complete_rate'],
+            "professional_rate": rates['professional_rate'],
         })
 
     @action(detail=False, methods=['get'])
     def export_data(self, request):
         """
         Export feedback data in various formats.
-        Supports CSV, JSON formats with filtering.
+        Supports CSV, JSON, NDJSON, Arrow and Parquet with filtering. Output is
+        streamed in chunks; pass background=true to write it to storage instead.
         """
         # Check export permissions
         if not request.user.has_perm('shipments.analytics.export'):
@@ -2569,15 +2556,17 @@ class ShipmentFeedbackViewSet(viewsets.ModelViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         export_format = request.GET.get('format', 'csv').lower()
         
-        if export_format == 'csv':
-            return self._export_csv(queryset)
-        elif export_format == 'json':
+        if export_format == 'json':
             return self._export_json(queryset)
-        else:
-            return Response(
-                {"error": "Unsupported export format. Use 'csv' or 'json'"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        
+        try:
+            if request.GET.get('background', '').lower() in ('1', 'true', 'yes'):
+                job_id = BackgroundExport.start('shipments.exports.FEEDBACK_EXPORT', queryset, export_format, request.user)
+                return Response({"job_id": job_id, "status": BackgroundExport.PENDING}, status=status.HTTP_202_ACCEPTED)
+            
+            return streaming_response(FEEDBACK_EXPORT.export(queryset), export_format, 'feedback_export')
+        except ExportFormatError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     def _create_incident_for_poor_feedback(self, feedback):
         """Create automatic incident for poor feedback scores using incident service"""
@@ -2592,48 +2581,22 @@ class ShipmentFeedbackViewSet(viewsets.ModelViewSet):
         except Exception as e:
             logger.error(f"Failed to create incident for feedback {feedback.id}: {str(e)}")
 
-    def _export_csv(self, queryset):
-        """Export feedback data as CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="feedback_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Tracking Number', 'Customer Name', 'Delivery Score', 'On Time', 
-            'Complete & Undamaged', 'Professional Driver', 'Feedback Notes',
-            'Submitted At', 'Has Manager Response', 'Response Date'
-        ])
-        
-        for feedback in queryset:
-            writer.writerow([
-                feedback.shipment.tracking_number,
-                feedback.shipment.customer.name,
-                feedback.delivery_success_score,
-                'Yes' if feedback.was_on_time else 'No',
-                'Yes' if feedback.was_complete_and_undamaged else 'No', 
-                'Yes' if feedback.was_driver_professional else 'No',
-                feedback.feedback_notes,
-                feedback.submitted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'Yes' if feedback.has_manager_response else 'No',
-                feedback.responded_at.strftime('%Y-%m-%d %H:%M:%S') if feedback.responded_at else '',
-            ])
-        
-        return response
-
     def _export_json(self, queryset):
-        """Export feedback data as JSON"""
-        from django.http import JsonResponse
+        """Stream feedback data as a JSON document"""
+        import json
+        from django.core.serializers.json import DjangoJSONEncoder
+        from django.http import StreamingHttpResponse
         
-        serializer = ShipmentFeedbackSerializer(queryset, many=True)
+        def chunks():
+            yield '{"export_date": %s, "total_records": %d, "data": [' % (
+                json.dumps(timezone.now().isoformat()), queryset.count()
+            )
+            for index, feedback in enumerate(queryset.iterator(chunk_size=DEFAULT_CHUNK_SIZE)):
+                data = json.dumps(ShipmentFeedbackSerializer(feedback).data, cls=DjangoJSONEncoder)
+                yield data if index == 0 else ',' + data
+            yield ']}'
         
-        response = JsonResponse({
-            'export_date': timezone.now().isoformat(),
-            'total_records': queryset.count(),
-            'data': serializer.data
-        })
+        response = StreamingHttpResponse(chunks(), content_type='application/json')
         response['Content-Disposition'] = f'attachment; filename="feedback_export_{timezone.now().strftime("%Y%m%d_%H%M%S")}.json"'
         
         return response
@@ -2704,64 +2667,57 @@ class FeedbackAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get driver-specific performance analytics.
         """
-        queryset = self.get_queryset()
-        period_queryset = self._apply_time_filter(queryset, request.GET.get('period', '30d'))
-        
-        # Group by driver
-        driver_stats = {}
-        for feedback in period_queryset.select_related('shipment__assigned_driver'):
-            if not feedback.shipment.assigned_driver:
-                continue
-                
-            driver = feedback.shipment.assigned_driver
-            driver_key = str(driver.id)
-            
-            if driver_key not in driver_stats:
-                driver_stats[driver_key] = {
-                    'driver_name': driver.get_full_name(),
-                    'total_deliveries': 0,
-                    'scores': [],
-                    'on_time_count': 0,
-                    'complete_count': 0,
-                    'professional_count': 0,
-                    'poor_feedback_count': 0,
-                }
-            
-            stats = driver_stats[driver_key]
-            stats['total_deliveries'] += 1
-            stats['scores'].append(feedback.delivery_success_score)
-            
-            if feedback.was_on_time:
-                stats['on_time_count'] += 1
-            if feedback.was_complete_and_undamaged:
-                stats['complete_count'] += 1  
-            if feedback.was_driver_professional:
-                stats['professional_count'] += 1
-            if feedback.delivery_success_score < 70:
-                stats['poor_feedback_count'] += 1
+        period = request.GET.get('period', '30d')
+        company = self._aggregate_company()
+        
+        if company is not None:
+            # Carrier users read the pre-aggregated daily driver buckets
+            start_day, end_day = FeedbackMetricsService.day_range(self._get_period_start(period))
+            driver_rows = [
+                dict(row, driver_name=f"{row['driver__first_name']} {row['driver__last_name']}".strip())
+                for row in FeedbackMetricsService.driver_counters(company, start_day, end_day)
+            ]
+        else:
+            period_queryset = self._apply_time_filter(self.get_queryset(), period).filter(
+                shipment__assigned_driver__isnull=False
+            )
+            driver_rows = [
+                dict(
+                    row,
+                    driver_id=row['shipment__assigned_driver_id'],
+                    driver_name=f"{row['shipment__assigned_driver__first_name']} "
+                                f"{row['shipment__assigned_driver__last_name']}".strip()
+                )
+                for row in FeedbackMetricsService.grouped_queryset_counters(
+                    period_queryset,
+                    'shipment__assigned_driver_id',
+                    'shipment__assigned_driver__first_name',
+                    'shipment__assigned_driver__last_name'
+                )
+            ]
         
         # Calculate driver analytics
         driver_analytics = []
-        for driver_id, stats in driver_stats.items():
-            if stats['total_deliveries'] > 0:
-                avg_score = sum(stats['scores']) / len(stats['scores'])
+        for row in driver_rows:
+            if row['feedback_count'] > 0:
+                rates = FeedbackMetricsService.rates(row)
                 driver_analytics.append({
-                    'driver_id': driver_id,
-                    'driver_name': stats['driver_name'],
-                    'total_deliveries': stats['total_deliveries'],
-                    'average_score': round(avg_score, 1),
-                    'on_time_rate': round((stats['on_time_count'] / stats['total_deliveries']) * 100, 1),
-                    'complete_rate': round((stats['complete_count'] / stats['total_deliveries']) * 100, 1),
-                    'professional_rate': round((stats['professional_count'] / stats['total_deliveries']) * 100, 1),
-                    'poor_feedback_rate': round((stats['poor_feedback_count'] / stats['total_deliveries']) * 100, 1),
-                    'needs_training': avg_score < 85,  # Flag for training
+                    'driver_id': str(row['driver_id']),
+                    'driver_name': row['driver_name'],
+                    'total_deliveries': row['feedback_count'],
+                    'average_score': rates['average_score'],
+                    'on_time_rate': rates['on_time_rate'],
+                    'complete_rate': rates['complete_rate'],
+                    'professional_rate': rates['professional_rate'],
+                    'poor_feedback_rate': rates['poor_feedback_rate'],
+                    'needs_training': rates['average_score'] < 85,  # Flag for training
                 })
         
         # Sort by average score descending
         driver_analytics.sort(key=lambda x: x['average_score'], reverse=True)
         
         return Response({
-            'period': request.GET.get('period', '30d'),
+            'period': period,
             'total_drivers': len(driver_analytics),
             'drivers_needing_training': sum(1 for d in driver_analytics if d['needs_training']),
             'driver_performance': driver_analytics
@@ -2772,52 +2728,58 @@ class FeedbackAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get route-based performance analytics.
         """
-        queryset = self.get_queryset()
-        period_queryset = self._apply_time_filter(queryset, request.GET.get('period', '30d'))
+        period = request.GET.get('period', '30d')
+        company = self._aggregate_company()
         
-        # Group by route (origin -> destination)
-        route_stats = {}
-        for feedback in period_queryset:
-            route_key = f"{feedback.shipment.origin_location} -> {feedback.shipment.destination_location}"
-            
-            if route_key not in route_stats:
-                route_stats[route_key] = {
-                    'total_shipments': 0,
-                    'scores': [],
-                    'difot_count': 0,
-                }
-            
-            stats = route_stats[route_key]
-            stats['total_shipments'] += 1
-            stats['scores'].append(feedback.delivery_success_score)
-            
-            if feedback.difot_score:
-                stats['difot_count'] += 1
+        if company is not None:
+            # Carrier users read the pre-aggregated daily route buckets
+            start_day, end_day = FeedbackMetricsService.day_range(self._get_period_start(period))
+            route_rows = FeedbackMetricsService.route_counters(company, start_day, end_day)
+        else:
+            period_queryset = self._apply_time_filter(self.get_queryset(), period)
+            route_rows = [
+                dict(
+                    row,
+                    origin_location=row['shipment__origin_location'],
+                    destination_location=row['shipment__destination_location']
+                )
+                for row in FeedbackMetricsService.grouped_queryset_counters(
+                    period_queryset, 'shipment__origin_location', 'shipment__destination_location'
+                )
+            ]
         
         # Calculate route analytics
         route_analytics = []
-        for route, stats in route_stats.items():
-            if stats['total_shipments'] > 0:
-                avg_score = sum(stats['scores']) / len(stats['scores'])
-                difot_rate = (stats['difot_count'] / stats['total_shipments']) * 100
-                
+        for row in route_rows:
+            if row['feedback_count'] > 0:
+                rates = FeedbackMetricsService.rates(row)
                 route_analytics.append({
-                    'route': route,
-                    'total_shipments': stats['total_shipments'],
-                    'average_score': round(avg_score, 1),
-                    'difot_rate': round(difot_rate, 1),
-                    'performance_category': self._get_performance_category(avg_score),
+                    'route': f"{row['origin_location']} -> {row['destination_location']}",
+                    'total_shipments': row['feedback_count'],
+                    'average_score': rates['average_score'],
+                    'difot_rate': rates['difot_rate'],
+                    'performance_category': self._get_performance_category(rates['average_score']),
                 })
         
         # Sort by average score descending
         route_analytics.sort(key=lambda x: x['average_score'], reverse=True)
         
         return Response({
-            'period': request.GET.get('period', '30d'),
+            'period': period,
             'total_routes': len(route_analytics),
             'route_performance': route_analytics
         })
 
+    def _aggregate_company(self):
+        """
+        Carrier company whose daily aggregates can answer this request, or
+        None when the user's view is not carrier-scoped (e.g. customers).
+        """
+        user = self.request.user
+        if user.role == 'CUSTOMER' or not user.company_id:
+            return None
+        return user.company
+
     def _build_analytics_filters(self, query_params):
         """Build Django ORM filters from query parameters"""
         filters = {}
@@ -2841,6 +2803,10 @@ class FeedbackAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
 
     def _apply_time_filter(self, queryset, period):
         """Apply time period filter to queryset"""
+        return queryset.filter(submitted_at__gte=self._get_period_start(period))
+
+    def _get_period_start(self, period):
+        """Start of the reporting period"""
         from datetime import timedelta
         from django.utils import timezone
         
@@ -2855,43 +2821,29 @@ class FeedbackAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
         else:  # default 30d
             start_date = timezone.now() - timedelta(days=30)
         
-        return queryset.filter(submitted_at__gte=start_date)
+        return start_date
 
     def _calculate_comprehensive_analytics(self, queryset):
         """Calculate comprehensive analytics metrics"""
-        feedback_list = list(queryset)
-        total_count = len(feedback_list)
+        counters = FeedbackMetricsService.aggregate_queryset(queryset)
+        total_count = counters['feedback_count']
         
         if total_count == 0:
             return self._empty_analytics_response()
         
-        # Basic metrics
-        total_score = sum(f.delivery_success_score for f in feedback_list)
-        average_score = total_score / total_count
-        
-        # Rate calculations
-        on_time_count = sum(1 for f in feedback_list if f.was_on_time)
-        complete_count = sum(1 for f in feedback_list if f.was_complete_and_undamaged)
-        professional_count = sum(1 for f in feedback_list if f.was_driver_professional)
-        difot_count = sum(1 for f in feedback_list if f.difot_score)
-        
-        # Performance category breakdown
-        excellent_count = sum(1 for f in feedback_list if f.performance_category == 'EXCELLENT')
-        good_count = sum(1 for f in feedback_list if f.performance_category == 'GOOD')
-        needs_improvement_count = sum(1 for f in feedback_list if f.performance_category == 'NEEDS_IMPROVEMENT')
-        poor_count = sum(1 for f in feedback_list if f.performance_category == 'POOR')
+        rates = FeedbackMetricsService.rates(counters)
         
         return {
             'total_feedback_count': total_count,
-            'average_delivery_score': round(average_score, 1),
-            'difot_rate': round((difot_count / total_count) * 100, 1),
-            'on_time_rate': round((on_time_count / total_count) * 100, 1),
-            'complete_rate': round((complete_count / total_count) * 100, 1),
-            'professional_rate': round((professional_count / total_count) * 100, 1),
-            'excellent_count': excellent_count,
-            'good_count': good_count,
-            'needs_improvement_count': needs_improvement_count,
-            'poor_count': poor_count,
+            'average_delivery_score': rates['average_score'],
+            'difot_rate': rates['difot_rate'],
+            'on_time_rate': rates['on_time_rate'],
+            'complete_rate': rates['complete_rate'],
+            'professional_rate': rates['professional_rate'],
+            'excellent_count': rates['excellent_count'],
+            'good_count': rates['good_count'],
+            'needs_improvement_count': rates['needs_improvement_count'],
+            'poor_count': rates['poor_count'],
         }
 
     def _calculate_trend_data(self, queryset, period):
@@ -2928,18 +2880,13 @@ class FeedbackAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
                 submitted_at__lt=period_end
             )
             
-            count = period_feedback.count()
-            if count > 0:
-                avg_score = sum(f.delivery_success_score for f in period_feedback) / count
-                difot_rate = sum(1 for f in period_feedback if f.difot_score) / count * 100
-            else:
-                avg_score = 0
-                difot_rate = 0
+            rates = FeedbackMetricsService.rates(FeedbackMetricsService.aggregate_queryset(period_feedback))
+            count = rates['total_feedback_count']
             
             trend_data.append({
                 'date': period_start.strftime('%Y-%m-%d'),
-                'average_score': round(avg_score, 1),
-                'difot_rate': round(difot_rate, 1),
+                'average_score': rates['average_score'],
+                'difot_rate': rates['difot_rate'],
                 'feedback_count': count,
             })
         
@@ -3053,12 +3000,12 @@ class DeliverySuccessStatsView(APIView):
         end_date = timezone.now() - timedelta(days=days * periods_ago)
         start_date = end_date - timedelta(days=days)
         
-        period_feedback = list(queryset.filter(
+        counters = FeedbackMetricsService.aggregate_queryset(queryset.filter(
             submitted_at__gte=start_date,
             submitted_at__lt=end_date
         ))
         
-        total_count = len(period_feedback)
+        total_count = counters['feedback_count']
         if total_count == 0:
             return {
                 'average_score': 0,
@@ -3069,22 +3016,15 @@ class DeliverySuccessStatsView(APIView):
                 'satisfaction_rate': 0,
             }
         
-        # Calculate metrics
-        total_score = sum(f.delivery_success_score for f in period_feedback)
-        average_score = total_score / total_count
-        
-        poor_count = sum(1 for f in period_feedback if f.delivery_success_score < 70)
-        needs_response_count = sum(1 for f in period_feedback if not f.has_manager_response and f.delivery_success_score < 70)
-        difot_count = sum(1 for f in period_feedback if f.difot_score)
-        satisfied_count = sum(1 for f in period_feedback if f.delivery_success_score >= 85)
+        rates = FeedbackMetricsService.rates(counters)
         
         return {
-            'average_score': round(average_score, 1),
+            'average_score': rates['average_score'],
             'total_count': total_count,
-            'poor_count': poor_count,
-            'needs_response_count': needs_response_count,
-            'difot_rate': round((difot_count / total_count) * 100, 1),
-            'satisfaction_rate': round((satisfied_count / total_count) * 100, 1),
+            'poor_count': rates['poor_feedback_count'],
+            'needs_response_count': rates['needs_response_count'],
+            'difot_rate': rates['difot_rate'],
+            'satisfaction_rate': rates['satisfaction_rate'],
         }
 
 
@@ -3118,15 +3058,12 @@ class ProofOfDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """Return company-filtered PODs with optimized queries."""
-        from .proof_of_delivery import ProofOfDelivery
-        
-        queryset = ProofOfDelivery.objects.select_related(
-            'shipment', 'delivered_by', 'shipment__customer', 'shipment__carrier'
-        ).prefetch_related('photos')
+        queryset = ProofOfDeliverySerializer.prepare_queryset(ProofOfDelivery.objects.all())
         
         # Filter by company for multi-tenancy
         if hasattr(self.request.user, 'company') and self.request.user.company:
-            queryset = queryset.filter(shipment__company=self.request.user.company)
+            company = self.request.user.company
+            queryset = queryset.filter(Q(shipment__customer=company) | Q(shipment__carrier=company))
         
         return queryset
 
@@ -3241,42 +3178,23 @@ class ProofOfDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='export')
     def export_pods(self, request):
-        """Export POD data for reporting and compliance."""
+        """
+        Export POD data for reporting and compliance.
+        Streams CSV by default (format=ndjson|arrow|parquet also supported);
+        pass background=true to write the export to storage instead.
+        """
         try:
-            from django.http import HttpResponse
-            import csv
-            from datetime import datetime
-            
-            # Get filtered queryset
             queryset = self.filter_queryset(self.get_queryset())
+            export_format = request.GET.get('format', 'csv')
             
-            # Prepare CSV response
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="pod_export_{datetime.now().strftime("%Y%m%d_%H%M")}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'POD ID', 'Shipment Tracking', 'Customer', 'Recipient Name',
-                'Delivered By', 'Delivered At', 'Delivery Location',
-                'Photo Count', 'Has Signature', 'Delivery Notes'
-            ])
-            
-            for pod in queryset:
-                writer.writerow([
-                    str(pod.id),
-                    pod.shipment.tracking_number,
-                    pod.shipment.customer.name if pod.shipment.customer else '',
-                    pod.recipient_name,
-                    pod.delivered_by.get_full_name(),
-                    pod.delivered_at.strftime('%Y-%m-%d %H:%M:%S'),
-                    pod.delivery_location or '',
-                    pod.photo_count,
-                    'Yes' if pod.recipient_signature_url else 'No',
-                    pod.delivery_notes or ''
-                ])
+            if request.GET.get('background', '').lower() in ('1', 'true', 'yes'):
+                job_id = BackgroundExport.start('shipments.exports.POD_EXPORT', queryset, export_format, request.user)
+                return Response({'job_id': job_id, 'status': BackgroundExport.PENDING}, status=status.HTTP_202_ACCEPTED)
             
-            return response
+            return streaming_response(POD_EXPORT.export(queryset), export_format, 'pod_export')
             
+        except ExportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error exporting POD data: {str(e)}")
             return Response(
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 import logging
 
 class ShipmentsConfig(AppConfig):
@@ -8,4 +9,10 @@ class ShipmentsConfig(AppConfig):
     def ready(self):
         # Put one-time startup logic here
         import shipments.signals  # noqa
+        post_migrate.connect(self._create_search_indexes, sender=self)
         logging.getLogger(__name__).info("Shipments app loaded.")
+
+    def _create_search_indexes(self, using='default', **kwargs):
+        """PostgreSQL-only search indexes, which the models cannot declare"""
+        from .search import ensure_search_indexes
+        ensure_search_indexes(using)
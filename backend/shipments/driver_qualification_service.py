@@ -5,7 +5,7 @@ from typing import Dict, List, Optional, Tuple
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from training.adg_driver_qualifications import DriverQualificationService
+from training.adg_driver_qualifications import DriverQualificationService, DriverQualificationIndexService
 from dangerous_goods.models import DangerousGood
 
 logger = logging.getLogger(__name__)
@@ -47,10 +47,15 @@ class ShipmentDriverQualificationService:
         """Extract unique dangerous goods classes from shipment items"""
         dangerous_goods_classes = []
         
-        for item in shipment.items.filter(is_dangerous_good=True):
-            if item.dangerous_good_entry and item.dangerous_good_entry.hazard_class:
+        hazard_classes = shipment.items.filter(
+            is_dangerous_good=True,
+            dangerous_good_entry__isnull=False
+        ).values_list('dangerous_good_entry__hazard_class', flat=True)
+        
+        for full_hazard_class in hazard_classes:
+            if full_hazard_class:
                 # Extract main hazard class (e.g., "3" from "3.1")
-                hazard_class = item.dangerous_good_entry.hazard_class.split('.')[0]
+                hazard_class = full_hazard_class.split('.')[0]
                 if hazard_class not in dangerous_goods_classes:
                     dangerous_goods_classes.append(hazard_class)
         
@@ -80,22 +85,14 @@ class ShipmentDriverQualificationService:
         }
         
         try:
-            # Check basic driver license requirements
-            from training.adg_driver_qualifications import DriverLicense
-            
-            active_licenses = driver.driver_licenses.filter(
-                status__in=[DriverLicense.LicenseStatus.VALID, DriverLicense.LicenseStatus.EXPIRING_SOON]
-            )
+            # Check basic driver license requirements from the qualification index
+            index_entry = DriverQualificationIndexService.get_entry(driver)
             
-            if active_licenses.exists():
+            if index_entry.has_valid_license:
                 validation_result['validation_details']['basic_requirements']['has_valid_license'] = True
                 
                 # Check if license class is appropriate for freight
-                freight_licenses = active_licenses.filter(
-                    license_class__in=['LR', 'MR', 'HR', 'HC', 'MC']  # Commercial license classes
-                )
-                
-                if freight_licenses.exists():
+                if index_entry.has_commercial_license:
                     validation_result['validation_details']['basic_requirements']['license_appropriate'] = True
                 else:
                     validation_result['warnings'].append(
@@ -103,14 +100,7 @@ class ShipmentDriverQualificationService:
                     )
                 
                 # Check for expiring licenses
-                expiring_licenses = active_licenses.filter(
-                    status=DriverLicense.LicenseStatus.EXPIRING_SOON
-                )
-                
-                for license in expiring_licenses:
-                    validation_result['warnings'].append(
-                        f"Driver license {license.license_number} expires on {license.expiry_date}"
-                    )
+                validation_result['warnings'].extend(index_entry.license_warnings)
             else:
                 validation_result['overall_qualified'] = False
                 validation_result['critical_issues'].append("No valid driver license found")
@@ -180,7 +170,7 @@ class ShipmentDriverQualificationService:
         """Get detailed dangerous goods information from shipment items"""
         dg_details = []
         
-        for item in shipment.items.filter(is_dangerous_good=True):
+        for item in shipment.items.filter(is_dangerous_good=True).select_related('dangerous_good_entry'):
             if item.dangerous_good_entry:
                 dg_details.append({
                     'item_id': item.id,
@@ -277,20 +267,12 @@ class ShipmentDriverQualificationService:
         """Get drivers qualified for non-dangerous goods shipments"""
         
         try:
-            from training.adg_driver_qualifications import DriverLicense
-            
             # Get drivers with valid licenses
-            drivers_with_licenses = User.objects.filter(
-                role='DRIVER',
-                is_active=True,
-                driver_licenses__status__in=[
-                    DriverLicense.LicenseStatus.VALID,
-                    DriverLicense.LicenseStatus.EXPIRING_SOON
-                ]
-            ).distinct()
+            licensed_entries = DriverQualificationIndexService.find_licensed_entries()
             
             result = []
-            for driver in drivers_with_licenses:
+            for entry in licensed_entries:
+                driver = entry.driver
                 result.append({
                     'driver_id': driver.id,
                     'driver_name': driver.get_full_name(),
@@ -0,0 +1,76 @@
+# shipments/exports.py
+"""
+Streaming export layouts for shipment feedback and proof of delivery data.
+Used by the export endpoints and by background export jobs (referenced by
+dotted path, e.g. 'shipments.exports.FEEDBACK_EXPORT').
+"""
+
+from django.db.models import Count
+
+from shared.streaming_export import ExportSource
+
+
+def _yes_no(value):
+    return 'Yes' if value else 'No'
+
+
+class FeedbackExportSource(ExportSource):
+    """Customer delivery feedback rows"""
+
+    columns = [
+        'Tracking Number', 'Customer Name', 'Delivery Score', 'On Time',
+        'Complete & Undamaged', 'Professional Driver', 'Feedback Notes',
+        'Submitted At', 'Has Manager Response', 'Response Date'
+    ]
+
+    def prepare(self, queryset):
+        # Only the columns below are needed; drop prefetches, which iterator() would run per chunk
+        return queryset.select_related('shipment__customer').prefetch_related(None)
+
+    def row(self, feedback):
+        return [
+            feedback.shipment.tracking_number,
+            feedback.shipment.customer.name,
+            feedback.delivery_success_score,
+            _yes_no(feedback.was_on_time),
+            _yes_no(feedback.was_complete_and_undamaged),
+            _yes_no(feedback.was_driver_professional),
+            feedback.feedback_notes,
+            feedback.submitted_at,
+            _yes_no(feedback.has_manager_response),
+            feedback.responded_at,
+        ]
+
+
+class ProofOfDeliveryExportSource(ExportSource):
+    """Proof of delivery rows for reporting and compliance"""
+
+    columns = [
+        'POD ID', 'Shipment Tracking', 'Customer', 'Recipient Name',
+        'Delivered By', 'Delivered At', 'Delivery Location',
+        'Photo Count', 'Has Signature', 'Delivery Notes'
+    ]
+
+    def prepare(self, queryset):
+        # Count photos in the same query instead of one COUNT per POD
+        return queryset.select_related(
+            'shipment__customer', 'delivered_by'
+        ).prefetch_related(None).annotate(export_photo_count=Count('photos'))
+
+    def row(self, pod):
+        return [
+            str(pod.id),
+            pod.shipment.tracking_number,
+            pod.shipment.customer.name if pod.shipment.customer else '',
+            pod.recipient_name,
+            pod.delivered_by.get_full_name(),
+            pod.delivered_at,
+            pod.delivery_location or '',
+            pod.export_photo_count,
+            _yes_no(pod.recipient_signature_url),
+            pod.delivery_notes or '',
+        ]
+
+
+FEEDBACK_EXPORT = FeedbackExportSource()
+POD_EXPORT = ProofOfDeliveryExportSource()
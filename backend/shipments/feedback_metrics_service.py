@@ -0,0 +1,270 @@
+# shipments/feedback_metrics_service.py
+"""
+Pre-aggregated feedback metrics.
+
+FeedbackDailyAggregate rows hold per-day counters for each carrier company,
+driver and route. Rows are recomputed for the buckets touched by a feedback
+save or delete, and rebuilt nightly for recent days to absorb changes that
+bypass signals (e.g. a shipment reassigned to another driver).
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ShipmentFeedback, FeedbackDailyAggregate
+
+logger = logging.getLogger(__name__)
+
+Scope = FeedbackDailyAggregate.Scope
+
+COUNTER_FIELDS = [
+    'feedback_count', 'score_total', 'on_time_count', 'complete_count', 'professional_count',
+    'difot_count', 'excellent_count', 'satisfied_count', 'poor_count', 'incident_count',
+    'responded_count', 'needs_response_count',
+]
+
+POOR_SCORE_THRESHOLD = 70
+INCIDENT_SCORE_THRESHOLD = 67
+SATISFIED_SCORE_THRESHOLD = 85
+EXCELLENT_SCORE_THRESHOLD = 95
+
+
+class FeedbackMetricsService:
+    """Maintain and read daily feedback aggregates."""
+
+    # ------------------------------------------------------------------
+    # Counter expressions
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def counter_aggregates() -> Dict[str, Any]:
+        """Aggregate expressions producing COUNTER_FIELDS over ShipmentFeedback."""
+        responded = (
+            Q(responded_at__isnull=False)
+            & Q(responded_by__isnull=False)
+            & ~Q(manager_response='')
+        )
+        poor = Q(delivery_success_score__lt=POOR_SCORE_THRESHOLD)
+
+        return {
+            'feedback_count': Count('id'),
+            'score_total': Coalesce(Sum('delivery_success_score'), Value(0.0), output_field=FloatField()),
+            'on_time_count': Count('id', filter=Q(was_on_time=True)),
+            'complete_count': Count('id', filter=Q(was_complete_and_undamaged=True)),
+            'professional_count': Count('id', filter=Q(was_driver_professional=True)),
+            'difot_count': Count('id', filter=Q(was_on_time=True, was_complete_and_undamaged=True)),
+            'excellent_count': Count('id', filter=Q(delivery_success_score__gt=EXCELLENT_SCORE_THRESHOLD)),
+            'satisfied_count': Count('id', filter=Q(delivery_success_score__gte=SATISFIED_SCORE_THRESHOLD)),
+            'poor_count': Count('id', filter=poor),
+            'incident_count': Count('id', filter=Q(delivery_success_score__lt=INCIDENT_SCORE_THRESHOLD)),
+            'responded_count': Count('id', filter=responded),
+            'needs_response_count': Count('id', filter=poor & ~responded),
+        }
+
+    @classmethod
+    def aggregate_queryset(cls, queryset) -> Dict[str, Any]:
+        """Compute counters for an arbitrary ShipmentFeedback queryset in one query."""
+        return queryset.aggregate(**cls.counter_aggregates())
+
+    @staticmethod
+    def rates(counters: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn raw counters into the averages and rates used by dashboards."""
+        total = counters.get('feedback_count') or 0
+
+        def pct(name):
+            return round((counters.get(name) or 0) / total * 100, 1) if total else 0
+
+        excellent = counters.get('excellent_count') or 0
+        satisfied = counters.get('satisfied_count') or 0
+        poor = counters.get('poor_count') or 0
+
+        return {
+            'total_feedback_count': total,
+            'average_score': round((counters.get('score_total') or 0) / total, 1) if total else 0,
+            'on_time_rate': pct('on_time_count'),
+            'complete_rate': pct('complete_count'),
+            'professional_rate': pct('professional_count'),
+            'difot_rate': pct('difot_count'),
+            'satisfaction_rate': pct('satisfied_count'),
+            'poor_feedback_count': poor,
+            'poor_feedback_rate': pct('poor_count'),
+            'incident_count': counters.get('incident_count') or 0,
+            'needs_response_count': counters.get('needs_response_count') or 0,
+            'excellent_count': excellent,
+            'good_count': satisfied - excellent,
+            'needs_improvement_count': total - satisfied - poor,
+            'poor_count': poor,
+        }
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def bucket_date(submitted_at: datetime) -> date:
+        """Day a feedback submission is counted under (current timezone, as __date lookups)."""
+        return timezone.localtime(submitted_at).date() if timezone.is_aware(submitted_at) else submitted_at.date()
+
+    @classmethod
+    def bucket_keys(cls, feedback: ShipmentFeedback) -> Optional[Dict[str, Any]]:
+        """Capture the buckets a feedback row contributes to."""
+        shipment = feedback.shipment
+        if not shipment.carrier_id or not feedback.submitted_at:
+            return None
+        return {
+            'company_id': shipment.carrier_id,
+            'day': cls.bucket_date(feedback.submitted_at),
+            'driver_id': shipment.assigned_driver_id,
+            'route': (shipment.origin_location or '', shipment.destination_location or ''),
+        }
+
+    @classmethod
+    def refresh_buckets(cls, company_id, day: date, driver_id=None, route: Optional[Tuple[str, str]] = None):
+        """Recompute the company bucket and the given driver/route buckets for one day."""
+        cls._refresh_bucket(Scope.COMPANY, company_id, day)
+        if driver_id:
+            cls._refresh_bucket(Scope.DRIVER, company_id, day, driver_id=driver_id)
+        if route:
+            cls._refresh_bucket(Scope.ROUTE, company_id, day, route=route)
+
+    @classmethod
+    def _refresh_bucket(cls, scope, company_id, day: date, driver_id=None, route=None):
+        filters = {'shipment__carrier_id': company_id, 'submitted_at__date': day}
+        lookup = {
+            'scope': scope,
+            'date': day,
+            'company_id': company_id,
+            'driver_id': None,
+            'origin_location': '',
+            'destination_location': '',
+        }
+        if scope == Scope.DRIVER:
+            filters['shipment__assigned_driver_id'] = driver_id
+            lookup['driver_id'] = driver_id
+        elif scope == Scope.ROUTE:
+            origin, destination = route
+            filters['shipment__origin_location'] = origin
+            filters['shipment__destination_location'] = destination
+            lookup['origin_location'] = origin
+            lookup['destination_location'] = destination
+
+        counters = cls.aggregate_queryset(ShipmentFeedback.objects.filter(**filters))
+        if counters['feedback_count']:
+            FeedbackDailyAggregate.objects.update_or_create(**lookup, defaults=counters)
+        else:
+            FeedbackDailyAggregate.objects.filter(**lookup).delete()
+
+    @classmethod
+    def rebuild(cls, start_day: date, end_day: date, company_id=None) -> int:
+        """
+        Rebuild all buckets for start_day..end_day (inclusive) with one
+        grouped query per scope. Returns the number of rows written.
+        """
+        feedback = ShipmentFeedback.objects.filter(
+            submitted_at__date__gte=start_day,
+            submitted_at__date__lte=end_day,
+            shipment__carrier__isnull=False
+        ).annotate(day=TruncDate('submitted_at'))
+        existing = FeedbackDailyAggregate.objects.filter(date__gte=start_day, date__lte=end_day)
+        if company_id:
+            feedback = feedback.filter(shipment__carrier_id=company_id)
+            existing = existing.filter(company_id=company_id)
+
+        groupings = [
+            (Scope.COMPANY, feedback, {}),
+            (Scope.DRIVER, feedback.filter(shipment__assigned_driver__isnull=False),
+             {'driver_id': 'shipment__assigned_driver_id'}),
+            (Scope.ROUTE, feedback, {
+                'origin_location': 'shipment__origin_location',
+                'destination_location': 'shipment__destination_location',
+            }),
+        ]
+
+        rows = []
+        for scope, queryset, dimensions in groupings:
+            grouped = queryset.values('day', 'shipment__carrier_id', *dimensions.values()).annotate(
+                **cls.counter_aggregates()
+            ).order_by()
+            for bucket in grouped:
+                row = FeedbackDailyAggregate(
+                    scope=scope,
+                    date=bucket['day'],
+                    company_id=bucket['shipment__carrier_id'],
+                    **{name: bucket[name] for name in COUNTER_FIELDS}
+                )
+                for name, source in dimensions.items():
+                    setattr(row, name, bucket[source])
+                rows.append(row)
+
+        with transaction.atomic():
+            existing.delete()
+            FeedbackDailyAggregate.objects.bulk_create(rows, batch_size=1000)
+
+        logger.info(f"Rebuilt {len(rows)} feedback aggregate rows for {start_day} to {end_day}")
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def day_range(start: datetime, end: Optional[datetime] = None) -> Tuple[date, date]:
+        """
+        Convert a datetime window to inclusive bucket days. An end at local
+        midnight excludes that day; any other end includes it.
+        """
+        end = end or timezone.now()
+        start_day = FeedbackMetricsService.bucket_date(start)
+        local_end = timezone.localtime(end) if timezone.is_aware(end) else end
+        end_day = local_end.date()
+        if local_end.time() == datetime.min.time():
+            end_day -= timedelta(days=1)
+        return start_day, end_day
+
+    @staticmethod
+    def _rows(scope, company, start_day: date, end_day: date):
+        return FeedbackDailyAggregate.objects.filter(
+            scope=scope, company=company, date__gte=start_day, date__lte=end_day
+        )
+
+    @classmethod
+    def _sum_counters(cls):
+        return {name: Sum(name) for name in COUNTER_FIELDS}
+
+    @classmethod
+    def company_counters(cls, company, start_day: date, end_day: date) -> Dict[str, Any]:
+        totals = cls._rows(Scope.COMPANY, company, start_day, end_day).aggregate(**cls._sum_counters())
+        return {name: totals[name] or 0 for name in COUNTER_FIELDS}
+
+    @classmethod
+    def company_daily_counters(cls, company, start_day: date, end_day: date) -> Dict[date, Dict[str, Any]]:
+        return {
+            row.date: {name: getattr(row, name) for name in COUNTER_FIELDS}
+            for row in cls._rows(Scope.COMPANY, company, start_day, end_day)
+        }
+
+    @classmethod
+    def driver_counters(cls, company, start_day: date, end_day: date) -> List[Dict[str, Any]]:
+        return list(
+            cls._rows(Scope.DRIVER, company, start_day, end_day).values(
+                'driver_id', 'driver__first_name', 'driver__last_name'
+            ).annotate(**cls._sum_counters()).order_by()
+        )
+
+    @classmethod
+    def route_counters(cls, company, start_day: date, end_day: date) -> List[Dict[str, Any]]:
+        return list(
+            cls._rows(Scope.ROUTE, company, start_day, end_day).values(
+                'origin_location', 'destination_location'
+            ).annotate(**cls._sum_counters()).order_by()
+        )
+
+    @classmethod
+    def grouped_queryset_counters(cls, queryset, *group_by: str) -> List[Dict[str, Any]]:
+        """Counters per group straight from a ShipmentFeedback queryset."""
+        return list(queryset.values(*group_by).annotate(**cls.counter_aggregates()).order_by())
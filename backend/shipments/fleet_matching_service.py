@@ -0,0 +1,550 @@
+# shipments/fleet_matching_service.py
+
+"""
+Batch vehicle/shipment compatibility matching.
+
+VehicleDGCompatibilityService validates one vehicle at a time, re-querying
+safety equipment, equipment type requirements and shipment items for every
+candidate. FleetCompatibilityMatcher loads a fleet's capabilities once and
+encodes each vehicle's safety equipment as bitmasks over the active
+SafetyEquipmentType catalogue. Each shipment is reduced to a requirement
+vector the same way, so ranking vehicles for a shipment (or shipments for a
+vehicle) is a bitwise filter-and-score pass with a fixed number of queries.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from django.db import models
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Shipment, ConsignmentItem, ShipmentStatus
+from .vehicle_compatibility_service import VehicleDGCompatibilityService
+from vehicles.models import Vehicle, VehicleSafetyEquipment, SafetyEquipmentType
+
+logger = logging.getLogger(__name__)
+
+
+# Shipments whose weight counts towards a vehicle's current load
+LOADED_SHIPMENT_STATUSES = [
+    ShipmentStatus.READY_FOR_DISPATCH,
+    ShipmentStatus.IN_TRANSIT,
+    ShipmentStatus.AT_HUB,
+    ShipmentStatus.OUT_FOR_DELIVERY,
+]
+
+# Shipments still waiting for a vehicle
+OPEN_SHIPMENT_STATUSES = [
+    ShipmentStatus.PENDING,
+    ShipmentStatus.AWAITING_VALIDATION,
+    ShipmentStatus.PLANNING,
+    ShipmentStatus.READY_FOR_DISPATCH,
+]
+
+
+def gvm_category(capacity_kg: Optional[float]) -> str:
+    """Classify a vehicle by the ADR 2025 weight bands used for fire extinguisher sizing"""
+    if not capacity_kg:
+        return 'UNKNOWN'
+    weight_tonnes = capacity_kg / 1000
+    if weight_tonnes <= 3.5:
+        return 'LIGHT'
+    elif weight_tonnes <= 7.5:
+        return 'MEDIUM'
+    return 'HEAVY'
+
+
+@dataclass
+class VehicleCapability:
+    """Precomputed capability vector for one vehicle"""
+    vehicle: Vehicle
+    installed_mask: int = 0
+    compliant_mask: int = 0
+    expired_mask: int = 0
+    overdue_mask: int = 0
+    active_equipment_count: int = 0
+    non_compliant_equipment_count: int = 0
+    current_load_kg: float = 0.0
+    equipment_by_bit: Dict[int, VehicleSafetyEquipment] = field(default_factory=dict)
+
+    @property
+    def capacity_kg(self) -> Optional[float]:
+        return self.vehicle.capacity_kg
+
+    @property
+    def available_capacity_kg(self) -> Optional[float]:
+        if not self.vehicle.capacity_kg:
+            return None
+        return max(0.0, self.vehicle.capacity_kg - self.current_load_kg)
+
+    @property
+    def gvm_category(self) -> str:
+        return gvm_category(self.vehicle.capacity_kg)
+
+
+@dataclass
+class ShipmentRequirement:
+    """Precomputed requirement vector for one shipment"""
+    shipment: Shipment
+    is_dangerous_goods: bool
+    dg_analysis: Dict
+    required_mask: int
+    internal_compatibility: Dict
+    total_weight_kg: float
+
+
+class FleetCompatibilityMatcher:
+    """
+    Loads a fleet's capabilities once and matches vehicles and shipments in bulk.
+
+    Results mirror VehicleDGCompatibilityService.validate_vehicle_for_shipment
+    (non-strict mode), extended with GVM category and current load.
+    """
+
+    def __init__(self, company=None, vehicles: Optional[models.QuerySet] = None):
+        """
+        Args:
+            company: Restrict the fleet to vehicles owned by this company
+            vehicles: Explicit vehicle queryset to load instead of the default fleet
+        """
+        if vehicles is None:
+            vehicles = Vehicle.objects.filter(
+                status__in=[Vehicle.Status.AVAILABLE, Vehicle.Status.MAINTENANCE]
+            )
+            if company is not None:
+                vehicles = vehicles.filter(owning_company=company)
+
+        self.company = company
+        self._load_equipment_catalogue()
+        self.capabilities = self._load_capabilities(vehicles)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load_equipment_catalogue(self):
+        """Assign one bit per active equipment type and index ADR class requirements"""
+        self.equipment_types = list(SafetyEquipmentType.objects.filter(is_active=True))
+        self.type_bits = {equipment_type.id: 1 << position
+                          for position, equipment_type in enumerate(self.equipment_types)}
+        self.types_by_bit = {self.type_bits[equipment_type.id]: equipment_type
+                             for equipment_type in self.equipment_types}
+
+        self.all_classes_mask = 0
+        self.adr_class_masks: Dict[str, int] = {}
+        for equipment_type in self.equipment_types:
+            bit = self.type_bits[equipment_type.id]
+            for adr_class in equipment_type.required_for_adr_classes or []:
+                if adr_class == 'ALL_CLASSES':
+                    self.all_classes_mask |= bit
+                else:
+                    self.adr_class_masks[adr_class] = self.adr_class_masks.get(adr_class, 0) | bit
+
+    def _load_capabilities(self, vehicles: models.QuerySet) -> List[VehicleCapability]:
+        """Build capability vectors for the fleet with a fixed number of queries"""
+        vehicles = list(vehicles.select_related('owning_company').prefetch_related(
+            models.Prefetch(
+                'safety_equipment',
+                queryset=VehicleSafetyEquipment.objects.filter(
+                    status=VehicleSafetyEquipment.Status.ACTIVE
+                ).order_by('-installation_date'),
+                to_attr='active_safety_equipment'
+            )
+        ))
+
+        current_loads = dict(
+            ConsignmentItem.objects.filter(
+                shipment__assigned_vehicle__in=[vehicle.id for vehicle in vehicles],
+                shipment__status__in=LOADED_SHIPMENT_STATUSES,
+                weight_kg__isnull=False
+            ).values('shipment__assigned_vehicle').annotate(
+                load_kg=Sum(F('weight_kg') * F('quantity'))
+            ).values_list('shipment__assigned_vehicle', 'load_kg')
+        ) if vehicles else {}
+
+        today = timezone.now().date()
+        capabilities = []
+
+        for vehicle in vehicles:
+            capability = VehicleCapability(
+                vehicle=vehicle,
+                current_load_kg=float(current_loads.get(vehicle.id) or 0)
+            )
+
+            for equipment in vehicle.active_safety_equipment:
+                capability.active_equipment_count += 1
+                expired = bool(equipment.expiry_date and equipment.expiry_date < today)
+                overdue = bool(equipment.next_inspection_date and equipment.next_inspection_date < today)
+                if expired or overdue:
+                    capability.non_compliant_equipment_count += 1
+
+                bit = self.type_bits.get(equipment.equipment_type_id)
+                if bit is None or capability.installed_mask & bit:
+                    # Only the most recently installed item of each type is assessed
+                    continue
+
+                capability.installed_mask |= bit
+                capability.equipment_by_bit[bit] = equipment
+                if expired:
+                    capability.expired_mask |= bit
+                elif overdue:
+                    capability.overdue_mask |= bit
+                else:
+                    capability.compliant_mask |= bit
+
+            capabilities.append(capability)
+
+        return capabilities
+
+    def _required_mask(self, adr_classes: Iterable[str]) -> int:
+        mask = self.all_classes_mask
+        for adr_class in adr_classes:
+            mask |= self.adr_class_masks.get(adr_class, 0)
+        return mask
+
+    def build_requirements(self, shipments: Iterable[Shipment]) -> List[ShipmentRequirement]:
+        """Reduce shipments to requirement vectors, loading all their items in one query"""
+        shipments = list(shipments)
+        items_by_shipment: Dict = {shipment.pk: [] for shipment in shipments}
+
+        saved_ids = [shipment.pk for shipment in shipments if not shipment._state.adding]
+        if saved_ids:
+            for item in ConsignmentItem.objects.filter(
+                shipment_id__in=saved_ids
+            ).select_related('dangerous_good_entry'):
+                items_by_shipment[item.shipment_id].append(item)
+
+        compatibility_cache: Dict = {}
+        requirements = []
+
+        for shipment in shipments:
+            items = items_by_shipment[shipment.pk]
+            dangerous_items = [item for item in items if item.is_dangerous_good]
+            total_weight = sum((item.weight_kg or 0) * item.quantity for item in items)
+
+            if dangerous_items:
+                dg_analysis = VehicleDGCompatibilityService._analyze_dangerous_goods(dangerous_items)
+
+                # Shipments with the same DG mix share one segregation check
+                compatibility_key = tuple(sorted(dg_analysis['un_numbers']))
+                if compatibility_key not in compatibility_cache:
+                    compatibility_cache[compatibility_key] = \
+                        VehicleDGCompatibilityService._validate_dg_internal_compatibility(
+                            dg_analysis['un_numbers']
+                        )
+
+                requirements.append(ShipmentRequirement(
+                    shipment=shipment,
+                    is_dangerous_goods=True,
+                    dg_analysis=dg_analysis,
+                    required_mask=self._required_mask(dg_analysis['adr_classes']),
+                    internal_compatibility=compatibility_cache[compatibility_key],
+                    total_weight_kg=float(total_weight)
+                ))
+            else:
+                requirements.append(ShipmentRequirement(
+                    shipment=shipment,
+                    is_dangerous_goods=False,
+                    dg_analysis={},
+                    required_mask=0,
+                    internal_compatibility={'is_compatible': True, 'issues': [], 'segregation_requirements': []},
+                    total_weight_kg=float(total_weight)
+                ))
+
+        return requirements
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    def _score(self, capability: VehicleCapability, requirement: ShipmentRequirement) -> Dict:
+        """Fast filter-and-score pass using only precomputed vectors"""
+        critical_issues = []
+        warnings = []
+        vehicle = capability.vehicle
+        required = requirement.required_mask
+        compliance_percentage = None
+
+        if requirement.is_dangerous_goods:
+            if not requirement.internal_compatibility['is_compatible']:
+                critical_issues.extend(requirement.internal_compatibility['issues'])
+
+            total_weight = requirement.dg_analysis['total_weight_kg']
+            available = capability.available_capacity_kg
+            if available is not None and total_weight and total_weight > available:
+                warnings.append(
+                    f"Vehicle capacity ({vehicle.capacity_kg or 'Unknown'}kg) "
+                    f"may be insufficient for total load ({total_weight}kg)"
+                )
+
+            restriction_check = VehicleDGCompatibilityService._check_dg_transport_restrictions(
+                vehicle, requirement.dg_analysis['hazard_classes']
+            )
+            if restriction_check['has_restrictions']:
+                critical_issues.extend(restriction_check['restrictions'])
+
+            total_required = required.bit_count()
+            compliant_count = (required & capability.compliant_mask).bit_count()
+            compliance_percentage = (compliant_count / total_required) * 100 if total_required else 100
+        else:
+            if capability.active_equipment_count == 0:
+                warnings.append('No safety equipment registered')
+            elif capability.non_compliant_equipment_count:
+                warnings.append(f'{capability.non_compliant_equipment_count} items need attention')
+
+            available = capability.available_capacity_kg
+            if available is not None and requirement.total_weight_kg and requirement.total_weight_kg > available:
+                warnings.append(
+                    f"Total weight ({requirement.total_weight_kg}kg) exceeds vehicle capacity "
+                    f"({vehicle.capacity_kg}kg)"
+                )
+
+        missing_count = (required & ~capability.installed_mask).bit_count()
+        expired_count = (required & capability.expired_mask).bit_count()
+
+        score = 100.0
+        score -= len(critical_issues) * 25
+        score -= len(warnings) * 5
+        score -= missing_count * 10
+        score -= expired_count * 15
+        if compliance_percentage is not None:
+            score += compliance_percentage * 0.2
+
+        return {
+            'critical_issues': critical_issues,
+            'warnings': warnings,
+            'compliance_percentage': compliance_percentage,
+            'score': max(0.0, min(100.0, score)),
+        }
+
+    def _capacity_analysis(self, capability: VehicleCapability, requirement: ShipmentRequirement) -> Dict:
+        total_weight = (requirement.dg_analysis['total_weight_kg']
+                        if requirement.is_dangerous_goods else requirement.total_weight_kg)
+        available = capability.available_capacity_kg
+        analysis = {
+            'vehicle_capacity_kg': capability.capacity_kg,
+            'current_load_kg': capability.current_load_kg,
+            'available_capacity_kg': available,
+            'gvm_category': capability.gvm_category,
+            'total_weight_kg': total_weight,
+            'sufficient_capacity': True,
+            'capacity_utilization': 0,
+            'warnings': []
+        }
+        if requirement.is_dangerous_goods:
+            analysis['total_volume_l'] = requirement.dg_analysis['total_volume_l']
+
+        if available and total_weight:
+            utilization = (total_weight / available) * 100
+            analysis['capacity_utilization'] = utilization
+            if utilization > 100:
+                analysis['sufficient_capacity'] = False
+                analysis['warnings'].append(f"Load exceeds vehicle capacity by {utilization - 100:.1f}%")
+            elif utilization > 90:
+                analysis['warnings'].append(f"High capacity utilization: {utilization:.1f}%")
+        elif available == 0 and total_weight:
+            analysis['sufficient_capacity'] = False
+
+        return analysis
+
+    def _equipment_details(self, capability: VehicleCapability, requirement: ShipmentRequirement) -> Dict:
+        details = {
+            'equipment_compliant': True,
+            'required_equipment': [],
+            'missing_equipment': [],
+            'expired_equipment': [],
+            'equipment_status': {},
+        }
+
+        for bit, equipment_type in self.types_by_bit.items():
+            if not requirement.required_mask & bit:
+                continue
+
+            details['required_equipment'].append({
+                'type_id': str(equipment_type.id),
+                'name': equipment_type.name,
+                'category': equipment_type.category,
+                'standard': equipment_type.certification_standard
+            })
+            equipment = capability.equipment_by_bit.get(bit)
+
+            if equipment is None:
+                details['missing_equipment'].append(equipment_type.name)
+                details['equipment_status'][equipment_type.name] = {
+                    'status': 'MISSING',
+                    'issue': 'Required equipment not installed'
+                }
+                details['equipment_compliant'] = False
+            elif capability.expired_mask & bit:
+                details['expired_equipment'].append({
+                    'name': equipment_type.name,
+                    'expiry_date': equipment.expiry_date.isoformat() if equipment.expiry_date else None,
+                    'serial_number': equipment.serial_number
+                })
+                details['equipment_status'][equipment_type.name] = {
+                    'status': 'EXPIRED',
+                    'issue': f'Equipment expired on {equipment.expiry_date}'
+                }
+                details['equipment_compliant'] = False
+            elif capability.overdue_mask & bit:
+                details['equipment_status'][equipment_type.name] = {
+                    'status': 'INSPECTION_OVERDUE',
+                    'issue': f'Inspection overdue since {equipment.next_inspection_date}'
+                }
+                details['equipment_compliant'] = False
+            else:
+                details['equipment_status'][equipment_type.name] = {
+                    'status': 'COMPLIANT',
+                    'serial_number': equipment.serial_number,
+                    'expiry_date': equipment.expiry_date.isoformat() if equipment.expiry_date else None
+                }
+
+        return details
+
+    def build_validation_result(self, capability: VehicleCapability, requirement: ShipmentRequirement,
+                                scored: Optional[Dict] = None) -> Dict:
+        """Expand a scored pair into the full validate_vehicle_for_shipment payload"""
+        scored = scored or self._score(capability, requirement)
+        vehicle = capability.vehicle
+        shipment = requirement.shipment
+
+        validation_result = {
+            'vehicle_id': str(vehicle.id),
+            'vehicle_registration': vehicle.registration_number,
+            'shipment_id': str(shipment.id),
+            'shipment_tracking': shipment.tracking_number,
+            'validated_at': timezone.now().isoformat(),
+            'is_compatible': not scored['critical_issues'],
+            'compatibility_level': 'FULL',
+            'validation_type': 'DANGEROUS_GOODS' if requirement.is_dangerous_goods else 'NON_DANGEROUS_GOODS',
+            'critical_issues': list(scored['critical_issues']),
+            'warnings': list(scored['warnings']),
+            'recommendations': [],
+            'required_equipment': [],
+            'missing_equipment': [],
+            'expired_equipment': [],
+            'equipment_status': {},
+            'dangerous_goods_analysis': requirement.dg_analysis,
+            'capacity_analysis': self._capacity_analysis(capability, requirement),
+            'segregation_requirements': requirement.internal_compatibility.get('segregation_requirements', [])
+        }
+
+        if requirement.is_dangerous_goods:
+            validation_result.update(self._equipment_details(capability, requirement))
+            validation_result['compliance_percentage'] = scored['compliance_percentage']
+
+        if validation_result['critical_issues']:
+            validation_result['compatibility_level'] = 'INCOMPATIBLE'
+        elif validation_result['warnings']:
+            validation_result['compatibility_level'] = 'COMPATIBLE_WITH_WARNINGS'
+
+        validation_result['recommendations'] = VehicleDGCompatibilityService._generate_compatibility_recommendations(
+            validation_result, vehicle, None
+        )
+        if requirement.is_dangerous_goods:
+            validation_result['recommendations'].append("Ensure driver has appropriate dangerous goods training")
+            validation_result['recommendations'].append("Verify emergency response procedures are in place")
+
+        return validation_result
+
+    def _vehicle_info(self, capability: VehicleCapability, validation_result: Dict, score: float) -> Dict:
+        vehicle = capability.vehicle
+        return {
+            'vehicle_id': str(vehicle.id),
+            'registration_number': vehicle.registration_number,
+            'vehicle_type': vehicle.vehicle_type,
+            'capacity_kg': vehicle.capacity_kg,
+            'gvm_category': capability.gvm_category,
+            'current_load_kg': capability.current_load_kg,
+            'status': vehicle.status,
+            'owning_company': vehicle.owning_company.name if vehicle.owning_company else None,
+            'compatibility_score': score,
+            'validation_summary': validation_result,
+            'can_assign': validation_result['is_compatible'],
+            'has_warnings': bool(validation_result['warnings']),
+            'warnings_count': len(validation_result['warnings']),
+            'critical_issues_count': len(validation_result['critical_issues'])
+        }
+
+    def rank_vehicles_for_requirement(self, requirement: ShipmentRequirement, include_warnings: bool = True,
+                                      limit: Optional[int] = None, include_details: bool = True) -> List[Dict]:
+        """Rank the loaded fleet for one shipment requirement, best match first"""
+        ranked = []
+        for capability in self.capabilities:
+            scored = self._score(capability, requirement)
+            if scored['critical_issues'] or (scored['warnings'] and not include_warnings):
+                continue
+            ranked.append((scored['score'], capability, scored))
+
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        if not include_details:
+            return [
+                {'vehicle_id': str(capability.vehicle.id), 'compatibility_score': score,
+                 'has_warnings': bool(scored['warnings'])}
+                for score, capability, scored in ranked
+            ]
+
+        return [
+            self._vehicle_info(capability, self.build_validation_result(capability, requirement, scored), score)
+            for score, capability, scored in ranked
+        ]
+
+    def rank_vehicles_for_shipment(self, shipment: Shipment, include_warnings: bool = True,
+                                   limit: Optional[int] = None) -> List[Dict]:
+        """Rank the loaded fleet for a shipment, best match first"""
+        requirement = self.build_requirements([shipment])[0]
+        return self.rank_vehicles_for_requirement(requirement, include_warnings=include_warnings, limit=limit)
+
+    def rank_shipments_for_vehicle(self, vehicle: Vehicle, shipments: Optional[Iterable[Shipment]] = None,
+                                   include_warnings: bool = True, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Rank shipments a loaded vehicle could take, best match first.
+
+        Defaults to the company's open, unassigned shipments.
+        """
+        capability = next((cap for cap in self.capabilities if cap.vehicle.pk == vehicle.pk), None)
+        if capability is None:
+            capability = self._load_capabilities(Vehicle.objects.filter(pk=vehicle.pk))[0]
+
+        if shipments is None:
+            shipments = self.open_shipments()
+
+        ranked = []
+        for requirement in self.build_requirements(shipments):
+            scored = self._score(capability, requirement)
+            if scored['critical_issues'] or (scored['warnings'] and not include_warnings):
+                continue
+            ranked.append((scored['score'], requirement, scored))
+
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        return [
+            {
+                'shipment_id': str(requirement.shipment.id),
+                'tracking_number': requirement.shipment.tracking_number,
+                'is_dangerous_goods': requirement.is_dangerous_goods,
+                'total_weight_kg': requirement.total_weight_kg,
+                'compatibility_score': score,
+                'can_assign': not scored['critical_issues'],
+                'has_warnings': bool(scored['warnings']),
+                'warnings': scored['warnings'],
+            }
+            for score, requirement, scored in ranked
+        ]
+
+    def open_shipments(self) -> models.QuerySet:
+        """Open shipments without a vehicle, scoped to the matcher's company"""
+        shipments = Shipment.objects.filter(
+            status__in=OPEN_SHIPMENT_STATUSES,
+            assigned_vehicle__isnull=True
+        )
+        if self.company is not None:
+            shipments = shipments.filter(carrier=self.company)
+        return shipments
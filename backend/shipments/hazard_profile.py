@@ -0,0 +1,164 @@
+# shipments/hazard_profile.py
+"""
+Shared hazard profile for a shipment's consignment items.
+
+Placard, emergency plan, vehicle compatibility and consolidated report
+services all need the same view of a shipment's dangerous goods. The profile
+loads items, their DG entries and LQ limits in at most two queries and is
+memoized in the cache under a hash of the item contents. A per-shipment
+pointer key records the current hash and is dropped whenever a
+ConsignmentItem changes, so the next reader rebuilds against fresh data.
+"""
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from django.core.cache import cache
+
+from .models import Shipment, ConsignmentItem
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'shipment_hazard_profile'
+# Bounds staleness from DangerousGood master data edits, which do not touch the pointer
+CACHE_TIMEOUT = 60 * 60
+
+ITEM_HASH_FIELDS = [
+    'id', 'description', 'quantity', 'weight_kg', 'volume_l', 'receptacle_type',
+    'receptacle_capacity_kg', 'receptacle_capacity_l', 'is_dangerous_good',
+    'dangerous_good_entry_id', 'dg_quantity_type', 'is_aerosol', 'is_fumigated_unit',
+]
+DG_HASH_FIELDS = [
+    'un_number', 'proper_shipping_name', 'hazard_class', 'subsidiary_risks',
+    'packing_group', 'erg_guide_number', 'physical_form',
+]
+
+
+@dataclass
+class ShipmentHazardProfile:
+    """Items and dangerous goods of one shipment version."""
+
+    shipment_id: str
+    content_hash: str
+    items: List[ConsignmentItem] = field(default_factory=list)
+    lq_limits: Dict[int, object] = field(default_factory=dict)
+
+    @property
+    def dangerous_items(self) -> List[ConsignmentItem]:
+        """Items flagged as dangerous goods, with or without a linked DG entry."""
+        return [item for item in self.items if item.is_dangerous_good]
+
+    @property
+    def classified_items(self) -> List[ConsignmentItem]:
+        """Dangerous goods items that have a linked DG entry."""
+        return [item for item in self.dangerous_items if item.dangerous_good_entry_id]
+
+    @property
+    def has_dangerous_goods(self) -> bool:
+        return bool(self.dangerous_items)
+
+    @property
+    def dangerous_goods(self) -> List:
+        """Distinct DangerousGood entries in item order, one per UN number."""
+        unique = []
+        seen = set()
+        for item in self.classified_items:
+            dg = item.dangerous_good_entry
+            if dg.un_number not in seen:
+                seen.add(dg.un_number)
+                unique.append(dg)
+        return unique
+
+    @property
+    def un_numbers(self) -> List[str]:
+        return sorted({dg.un_number for dg in self.dangerous_goods if dg.un_number})
+
+    @property
+    def hazard_classes(self) -> List[str]:
+        return sorted({dg.hazard_class for dg in self.dangerous_goods if dg.hazard_class})
+
+    @property
+    def erg_guides(self) -> List[str]:
+        return sorted({dg.erg_guide_number for dg in self.dangerous_goods if dg.erg_guide_number})
+
+    def items_by_hazard_class(self) -> Dict[str, List[ConsignmentItem]]:
+        grouped: Dict[str, List[ConsignmentItem]] = {}
+        for item in self.classified_items:
+            grouped.setdefault(item.dangerous_good_entry.hazard_class, []).append(item)
+        return grouped
+
+    # ------------------------------------------------------------------
+    # Loading and caching
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def pointer_key(shipment_id) -> str:
+        return f"{CACHE_PREFIX}:shipment:{shipment_id}"
+
+    @staticmethod
+    def profile_key(content_hash: str) -> str:
+        return f"{CACHE_PREFIX}:{content_hash}"
+
+    @staticmethod
+    def compute_hash(shipment_id, items: List[ConsignmentItem]) -> str:
+        """Hash of the item and DG fields the profile consumers read."""
+        digest = hashlib.sha256(str(shipment_id).encode('utf-8'))
+        for item in items:
+            values = [getattr(item, name) for name in ITEM_HASH_FIELDS]
+            dg = item.dangerous_good_entry
+            if dg is not None:
+                values.extend(getattr(dg, name, None) for name in DG_HASH_FIELDS)
+            digest.update(repr(values).encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def for_shipment(cls, shipment: Shipment, use_cache: bool = True) -> 'ShipmentHazardProfile':
+        """Return the cached profile for the shipment's current items, building it on a miss."""
+        pointer = cls.pointer_key(shipment.pk)
+        if use_cache:
+            content_hash = cache.get(pointer)
+            if content_hash:
+                profile = cache.get(cls.profile_key(content_hash))
+                if profile is not None:
+                    return profile
+
+        profile = cls.build(shipment)
+        if use_cache:
+            cache.set_many({
+                cls.profile_key(profile.content_hash): profile,
+                pointer: profile.content_hash,
+            }, CACHE_TIMEOUT)
+        return profile
+
+    @classmethod
+    def build(cls, shipment: Shipment) -> 'ShipmentHazardProfile':
+        """Load items with DG entries (one query) and their LQ limits (one query if any DG)."""
+        from dangerous_goods.limited_quantity_handler import LimitedQuantityLimit
+
+        items = list(
+            ConsignmentItem.objects.filter(shipment_id=shipment.pk)
+            .select_related('dangerous_good_entry')
+            .order_by('id')
+        )
+
+        dg_ids = {item.dangerous_good_entry_id for item in items if item.dangerous_good_entry_id}
+        lq_limits = {}
+        if dg_ids:
+            lq_limits = {
+                limit.dangerous_good_id: limit
+                for limit in LimitedQuantityLimit.objects.filter(dangerous_good_id__in=dg_ids)
+            }
+
+        return cls(
+            shipment_id=str(shipment.pk),
+            content_hash=cls.compute_hash(shipment.pk, items),
+            items=items,
+            lq_limits=lq_limits,
+        )
+
+    @classmethod
+    def invalidate(cls, shipment_id) -> None:
+        """Drop the shipment's pointer so the next read rebuilds from current items."""
+        cache.delete(cls.pointer_key(shipment_id))
+
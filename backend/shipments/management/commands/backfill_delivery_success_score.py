@@ -0,0 +1,30 @@
+# shipments/management/commands/backfill_delivery_success_score.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from shipments.feedback_metrics_service import FeedbackMetricsService
+from shipments.models import ShipmentFeedback
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored feedback delivery success scores and rebuild the daily aggregates they feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only feedback on shipments carried by this company')
+        parser.add_argument('--skip-aggregates', action='store_true', help='Do not rebuild daily aggregates')
+
+    def handle(self, *args, **options):
+        feedback = ShipmentFeedback.objects.all()
+        if options['company']:
+            feedback = feedback.filter(shipment__carrier_id=options['company'])
+
+        updated = ShipmentFeedback.backfill_delivery_success_scores(feedback)
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} delivery success scores"))
+
+        if updated and not options['skip_aggregates']:
+            span = feedback.aggregate(first=Min('submitted_at'), last=Max('submitted_at'))
+            rows = FeedbackMetricsService.rebuild(
+                span['first'].date(), span['last'].date(), company_id=options['company']
+            )
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} feedback daily aggregates"))
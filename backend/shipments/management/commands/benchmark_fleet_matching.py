@@ -0,0 +1,188 @@
+# shipments/management/commands/benchmark_fleet_matching.py
+
+import time
+import random
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from companies.models import Company
+from freight_types.models import FreightType
+from dangerous_goods.models import DangerousGood
+from vehicles.models import Vehicle, SafetyEquipmentType, VehicleSafetyEquipment
+from shipments.models import Shipment, ConsignmentItem
+from shipments.fleet_matching_service import FleetCompatibilityMatcher
+from shipments.vehicle_compatibility_service import VehicleDGCompatibilityService
+
+
+class _Rollback(Exception):
+    """Raised to discard benchmark data once measurements are taken"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batch fleet/shipment compatibility matching against per-vehicle validation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=500, help='Number of vehicles to seed')
+        parser.add_argument('--shipments', type=int, default=2000, help='Number of open shipments to seed')
+        parser.add_argument(
+            '--legacy-sample',
+            type=int,
+            default=3,
+            help='Shipments to time through the legacy per-vehicle validator (0 to skip)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated data')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        try:
+            with transaction.atomic():
+                company = self.seed_data(options['vehicles'], options['shipments'])
+                self.run_benchmark(company, options['legacy_sample'])
+                raise _Rollback()
+        except _Rollback:
+            self.stdout.write('Benchmark data rolled back.')
+
+    def seed_data(self, vehicle_count, shipment_count):
+        self.stdout.write(f'Seeding {vehicle_count} vehicles and {shipment_count} shipments...')
+        suffix = uuid.uuid4().hex[:8]
+        today = timezone.now().date()
+
+        company = Company.objects.create(name=f'Benchmark Carrier {suffix}', company_type='CARRIER')
+        customer = Company.objects.create(name=f'Benchmark Customer {suffix}', company_type='CUSTOMER')
+        freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+
+        equipment_specs = [
+            ('Fire Extinguisher', 'FIRE_EXTINGUISHER', ['ALL_CLASSES']),
+            ('First Aid Kit', 'FIRST_AID_KIT', ['ALL_CLASSES']),
+            ('Spill Kit', 'SPILL_KIT', ['CLASS_3', 'CLASS_8']),
+            ('Eye Wash Station', 'PROTECTIVE_EQUIPMENT', ['CLASS_8']),
+            ('Gas Detector', 'TOOLS', ['CLASS_2']),
+            ('Protective Clothing', 'PROTECTIVE_EQUIPMENT', ['CLASS_6_1', 'CLASS_8']),
+        ]
+        equipment_types = [
+            SafetyEquipmentType.objects.create(
+                name=f'{name} {suffix}', category=category, required_for_adr_classes=adr_classes
+            )
+            for name, category, adr_classes in equipment_specs
+        ]
+
+        dangerous_goods = [
+            DangerousGood.objects.create(
+                un_number=f'B{index}{suffix[:4]}', proper_shipping_name=f'Benchmark DG {index}',
+                hazard_class=hazard_class
+            )
+            for index, hazard_class in enumerate(['3', '8', '2.1', '6.1', '9'])
+        ]
+
+        vehicle_types = [Vehicle.VehicleType.RIGID, Vehicle.VehicleType.SEMI, Vehicle.VehicleType.VAN]
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                registration_number=f'BM{suffix}{index:05d}',
+                vehicle_type=random.choice(vehicle_types),
+                capacity_kg=random.choice([3000, 7000, 12000, 24000]),
+                owning_company=company,
+            )
+            for index in range(vehicle_count)
+        ])
+
+        equipment = []
+        for vehicle in vehicles:
+            for equipment_type in equipment_types:
+                if random.random() < 0.8:
+                    equipment.append(VehicleSafetyEquipment(
+                        vehicle=vehicle,
+                        equipment_type=equipment_type,
+                        installation_date=today - timedelta(days=365),
+                        expiry_date=today + timedelta(days=random.choice([-10, 180, 365])),
+                    ))
+        VehicleSafetyEquipment.objects.bulk_create(equipment, batch_size=1000)
+
+        shipments = Shipment.objects.bulk_create([
+            Shipment(
+                tracking_number=f'BM{suffix}{index:06d}',
+                customer=customer,
+                carrier=company,
+                origin_location='Benchmark Origin',
+                destination_location='Benchmark Destination',
+                freight_type=freight_type,
+            )
+            for index in range(shipment_count)
+        ], batch_size=1000)
+
+        items = []
+        for shipment in shipments:
+            for _ in range(random.randint(1, 4)):
+                dangerous_good = random.choice(dangerous_goods) if random.random() < 0.6 else None
+                items.append(ConsignmentItem(
+                    shipment=shipment,
+                    description='Benchmark item',
+                    quantity=random.randint(1, 20),
+                    weight_kg=random.randint(5, 500),
+                    is_dangerous_good=dangerous_good is not None,
+                    dangerous_good_entry=dangerous_good,
+                ))
+        ConsignmentItem.objects.bulk_create(items, batch_size=1000)
+
+        return company
+
+    def _timed(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        self.stdout.write(f'  {label}: {elapsed * 1000:.1f} ms, {len(queries)} queries')
+        return result, elapsed
+
+    def run_benchmark(self, company, legacy_sample):
+        self.stdout.write(self.style.SUCCESS('Fleet matching benchmark'))
+
+        matcher, _ = self._timed('Load fleet capabilities', lambda: FleetCompatibilityMatcher(company=company))
+        shipments = list(matcher.open_shipments())
+        requirements, _ = self._timed(
+            f'Build {len(shipments)} shipment requirement vectors',
+            lambda: matcher.build_requirements(shipments)
+        )
+
+        rankings, elapsed = self._timed(
+            f'Rank {len(matcher.capabilities)} vehicles for every shipment',
+            lambda: [matcher.rank_vehicles_for_requirement(req, include_details=False) for req in requirements]
+        )
+        pairs = len(matcher.capabilities) * len(requirements)
+        self.stdout.write(f'    {pairs} vehicle/shipment pairs, {pairs / elapsed:,.0f} pairs/sec')
+        self.stdout.write(f'    average compatible vehicles per shipment: '
+                          f'{sum(len(r) for r in rankings) / max(len(rankings), 1):.1f}')
+
+        self._timed(
+            'Top 10 vehicles with full validation details for one shipment',
+            lambda: matcher.rank_vehicles_for_requirement(requirements[0], limit=10)
+        )
+
+        sample_vehicle = matcher.capabilities[0].vehicle
+        self._timed(
+            f'Rank {len(shipments)} open shipments for one vehicle',
+            lambda: matcher.rank_shipments_for_vehicle(sample_vehicle, shipments)
+        )
+
+        if legacy_sample:
+            vehicles_qs = Vehicle.objects.filter(owning_company=company)
+            _, legacy_elapsed = self._timed(
+                f'Legacy per-vehicle validation for {legacy_sample} shipments',
+                lambda: [
+                    [VehicleDGCompatibilityService.validate_vehicle_for_shipment(vehicle, shipment, strict_mode=False)
+                     for vehicle in vehicles_qs]
+                    for shipment in shipments[:legacy_sample]
+                ]
+            )
+            per_shipment = legacy_elapsed / legacy_sample
+            self.stdout.write(
+                f'    legacy projected for all shipments: {per_shipment * len(shipments):.1f} s '
+                f'({per_shipment * 1000:.1f} ms per shipment)'
+            )
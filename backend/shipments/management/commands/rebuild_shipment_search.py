@@ -0,0 +1,22 @@
+# shipments/management/commands/rebuild_shipment_search.py
+
+from django.core.management.base import BaseCommand
+
+from shipments.search import ensure_search_indexes
+from shipments.tasks import refresh_shipment_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Create the shipment search indexes and rebuild search documents (all shipments or one company)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only shipments of this company (customer or carrier)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Shipments per write batch')
+
+    def handle(self, *args, **options):
+        ensure_search_indexes()
+        result = refresh_shipment_search_documents(
+            company_id=options['company'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {result['documents_written']} shipment search documents"))
@@ -1,4 +1,6 @@
+import itertools
 import uuid
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
 from django.forms import ValidationError
@@ -6,7 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from companies.models import Company
 from locations.models import GeoLocation
 from freight_types.models import FreightType
-from simple_history.models import HistoricalRecords
+from shared.history import DeferredHistoricalRecords
 from users.models import User
 from vehicles.models import Vehicle
 from dangerous_goods.models import DangerousGood  # Re-enabled after dangerous_goods app re-enabled
@@ -127,7 +129,7 @@ class Shipment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     # Add history tracking
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
 
     def save(self, *args, **kwargs):
         if not self.tracking_number:
@@ -408,6 +410,15 @@ class ShipmentFeedback(models.Model):
         help_text=_("Customer feedback: Was the delivery driver professional and courteous?")
     )
     
+    # Stored so aggregates and ordering can run in the database
+    delivery_success_score = models.FloatField(
+        _("Delivery Success Score"),
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text=_("Percentage of positive answers, maintained on save")
+    )
+    
     # Additional feedback and metadata
     feedback_notes = models.TextField(
         _("Additional Comments"),
@@ -482,18 +493,45 @@ class ShipmentFeedback(models.Model):
     def __str__(self):
         return f"Feedback for {self.shipment.tracking_number}"
 
-    @property
-    def delivery_success_score(self):
+    SCORE_FIELDS = ('was_on_time', 'was_complete_and_undamaged', 'was_driver_professional')
+
+    @staticmethod
+    def calculate_delivery_success_score(was_on_time, was_complete_and_undamaged, was_driver_professional):
         """
         Calculate delivery success score as percentage.
         Average of the three boolean questions converted to percentage.
         """
         score_sum = sum([
-            1 if self.was_on_time else 0,
-            1 if self.was_complete_and_undamaged else 0,
-            1 if self.was_driver_professional else 0
+            1 if was_on_time else 0,
+            1 if was_complete_and_undamaged else 0,
+            1 if was_driver_professional else 0
         ])
         return round((score_sum / 3) * 100, 1)
+
+    @classmethod
+    def backfill_delivery_success_scores(cls, queryset=None) -> int:
+        """
+        Recompute stored scores from the three answers, e.g. for rows saved
+        before the score was stored or changed with queryset.update().
+        One UPDATE per answer combination; returns the number of rows changed.
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        updated = 0
+        for answers in itertools.product((True, False), repeat=len(cls.SCORE_FIELDS)):
+            score = cls.calculate_delivery_success_score(*answers)
+            updated += queryset.filter(**dict(zip(cls.SCORE_FIELDS, answers))).exclude(
+                delivery_success_score=score
+            ).update(delivery_success_score=score)
+        return updated
+
+    def save(self, *args, **kwargs):
+        self.delivery_success_score = self.calculate_delivery_success_score(
+            self.was_on_time, self.was_complete_and_undamaged, self.was_driver_professional
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(self.SCORE_FIELDS) & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'delivery_success_score'}
+        super().save(*args, **kwargs)
     
     @property
     def company(self):
@@ -559,3 +597,117 @@ class ShipmentFeedback(models.Model):
         self.responded_at = timezone.now()
         self.responded_by = manager_user
         self.save(update_fields=['manager_response', 'responded_at', 'responded_by', 'updated_at'])
+
+
+class FeedbackDailyAggregate(models.Model):
+    """
+    Daily feedback counters per carrier company, driver and route.
+    Maintained incrementally from ShipmentFeedback saves so dashboards and
+    reports sum a handful of rows instead of scanning every feedback record.
+    """
+    class Scope(models.TextChoices):
+        COMPANY = "COMPANY", _("Company")
+        DRIVER = "DRIVER", _("Driver")
+        ROUTE = "ROUTE", _("Route")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    scope = models.CharField(max_length=10, choices=Scope.choices)
+    date = models.DateField(_("Date"))
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='feedback_daily_aggregates',
+        help_text=_("Carrier company the feedback belongs to")
+    )
+    driver = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='feedback_daily_aggregates'
+    )
+    origin_location = models.CharField(max_length=255, blank=True)
+    destination_location = models.CharField(max_length=255, blank=True)
+
+    # Counters
+    feedback_count = models.PositiveIntegerField(default=0)
+    score_total = models.FloatField(default=0)
+    on_time_count = models.PositiveIntegerField(default=0)
+    complete_count = models.PositiveIntegerField(default=0)
+    professional_count = models.PositiveIntegerField(default=0)
+    difot_count = models.PositiveIntegerField(default=0)
+    excellent_count = models.PositiveIntegerField(default=0)
+    satisfied_count = models.PositiveIntegerField(default=0)
+    poor_count = models.PositiveIntegerField(default=0)
+    incident_count = models.PositiveIntegerField(default=0)
+    responded_count = models.PositiveIntegerField(default=0)
+    needs_response_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Feedback Daily Aggregate")
+        verbose_name_plural = _("Feedback Daily Aggregates")
+        indexes = [
+            models.Index(fields=['company', 'scope', 'date']),
+            models.Index(fields=['driver', 'date']),
+        ]
+        constraints = [
+            # Company and route buckets have no driver; NULLs must still collide
+            models.UniqueConstraint(
+                fields=['scope', 'date', 'company', 'driver', 'origin_location', 'destination_location'],
+                name='unique_feedback_daily_bucket',
+                nulls_distinct=False
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.get_scope_display()} feedback for {self.company_id} on {self.date}"
+
+
+class ShipmentSearchDocument(models.Model):
+    """
+    Denormalised text a shipment is searched by, maintained from shipment,
+    item and company saves (see shipments/search.py). PostgreSQL searches
+    the trigram-indexed document and the weighted search_vector; other
+    databases search ShipmentSearchToken rows built from the same fields.
+    """
+    shipment = models.OneToOneField(
+        Shipment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    identifiers = models.TextField(blank=True, help_text=_("Tracking and reference numbers"))
+    parties = models.TextField(blank=True, help_text=_("Customer, carrier and locations"))
+    contents = models.TextField(blank=True, help_text=_("Consignment item descriptions"))
+    document = models.TextField(blank=True, help_text=_("All of the above, lowercased"))
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Shipment Search Document")
+        verbose_name_plural = _("Shipment Search Documents")
+
+    def __str__(self):
+        return f"Search document for shipment {self.shipment_id}"
+
+
+class ShipmentSearchToken(models.Model):
+    """Prefix-searchable token of a shipment's search document, for databases other than PostgreSQL"""
+    MAX_TOKEN_LENGTH = 64
+
+    id = models.BigAutoField(primary_key=True)
+    shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=MAX_TOKEN_LENGTH)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = _("Shipment Search Token")
+        verbose_name_plural = _("Shipment Search Tokens")
+        indexes = [
+            models.Index(fields=['token', 'shipment']),
+        ]
+
+    def __str__(self):
+        return f"{self.token} ({self.shipment_id})"
@@ -0,0 +1,204 @@
+# shipments/search.py
+"""
+Indexed shipment search.
+
+Each shipment has a ShipmentSearchDocument holding the text it can be found
+by: tracking and reference numbers, customer and carrier names, locations
+and consignment item descriptions. Searching filters and ranks on that one
+row instead of running icontains across the shipment, company and item
+tables with a distinct().
+
+- PostgreSQL: the lowercased document has a pg_trgm GIN index, so substring
+  matches use an index. Its weighted tsvector has a GIN index too. Results
+  are ranked by ts_rank plus trigram word similarity.
+- Other databases: documents are split into ShipmentSearchToken rows, and
+  every search term must prefix-match a token. Results are ranked by the
+  weight of the matching tokens.
+
+Documents are refreshed from signals (see signals.py). Existing shipments,
+and any missed by a bulk update, are backfilled with
+``manage.py rebuild_shipment_search``.
+"""
+
+import logging
+import re
+from typing import Iterable, List
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+)
+from django.db import connections
+from django.db.models import Exists, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from rest_framework import filters
+
+from .models import ConsignmentItem, Shipment, ShipmentSearchDocument, ShipmentSearchToken
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'simple'
+MAX_SEARCH_TERMS = 8
+
+# ShipmentSearchDocument fields, their tsvector weight and token weight
+FIELD_WEIGHTS = [
+    ('identifiers', 'A', 4),
+    ('parties', 'B', 2),
+    ('contents', 'C', 1),
+]
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens, as stored in ShipmentSearchToken"""
+    return [token[:ShipmentSearchToken.MAX_TOKEN_LENGTH] for token in _TOKEN_PATTERN.findall((text or '').lower())]
+
+
+def _is_postgres(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def build_search_document(shipment: Shipment) -> ShipmentSearchDocument:
+    """Search document of a shipment loaded with customer, carrier and items"""
+    def join(*values):
+        return ' '.join(value.strip() for value in values if value and value.strip()).lower()
+
+    identifiers = join(shipment.tracking_number, shipment.reference_number)
+    parties = join(
+        shipment.customer.name if shipment.customer_id else '',
+        shipment.carrier.name if shipment.carrier_id else '',
+        shipment.origin_location,
+        shipment.destination_location,
+    )
+    contents = join(*(item.description for item in shipment.items.all()))
+    return ShipmentSearchDocument(
+        shipment=shipment,
+        identifiers=identifiers,
+        parties=parties,
+        contents=contents,
+        document=join(identifiers, parties, contents),
+    )
+
+
+def refresh_search_documents(shipment_ids: Iterable) -> int:
+    """Rebuild the search documents of the given shipments; returns how many were written"""
+    shipment_ids = list(shipment_ids)
+    if not shipment_ids:
+        return 0
+
+    shipments = Shipment.objects.filter(pk__in=shipment_ids).select_related('customer', 'carrier').prefetch_related(
+        Prefetch('items', queryset=ConsignmentItem.objects.only('id', 'shipment_id', 'description'))
+    ).only(
+        'id', 'tracking_number', 'reference_number', 'origin_location', 'destination_location',
+        'customer__name', 'carrier__name'
+    )
+    documents = [build_search_document(shipment) for shipment in shipments]
+    if not documents:
+        return 0
+
+    ShipmentSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['shipment'],
+        update_fields=['identifiers', 'parties', 'contents', 'document', 'updated_at'],
+    )
+    written_ids = [document.shipment_id for document in documents]
+
+    if _is_postgres(ShipmentSearchDocument.objects.db):
+        vector = None
+        for field, weight, _ in FIELD_WEIGHTS:
+            field_vector = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+            vector = field_vector if vector is None else vector + field_vector
+        ShipmentSearchDocument.objects.filter(pk__in=written_ids).update(search_vector=vector)
+    else:
+        ShipmentSearchToken.objects.filter(shipment_id__in=written_ids).delete()
+        tokens = []
+        for document in documents:
+            weights = {}
+            for field, _, token_weight in FIELD_WEIGHTS:
+                for token in tokenize(getattr(document, field)):
+                    weights[token] = max(weights.get(token, 0), token_weight)
+            tokens.extend(
+                ShipmentSearchToken(shipment_id=document.shipment_id, token=token, weight=weight)
+                for token, weight in weights.items()
+            )
+        ShipmentSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+    return len(documents)
+
+
+def search_shipments_ranked(queryset, text: str):
+    """
+    Shipments in queryset matching text, annotated with search_rank and
+    ordered by it (best first, then newest)
+    """
+    terms = tokenize(text)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return queryset
+
+    if _is_postgres(queryset.db):
+        query = SearchQuery(' '.join(terms), search_type='plain', config=SEARCH_CONFIG)
+        # Substring matches on the trigram-indexed document catch partial
+        # tracking numbers and words the full-text query does not
+        substring = Q()
+        for term in terms:
+            substring &= Q(search_document__document__contains=term)
+        return queryset.filter(
+            Q(search_document__search_vector=query) | substring
+        ).annotate(
+            search_rank=(
+                Coalesce(SearchRank(F('search_document__search_vector'), query), Value(0.0))
+                + TrigramWordSimilarity(' '.join(terms), 'search_document__document')
+            )
+        ).order_by('-search_rank', '-created_at')
+
+    matching = Q()
+    for term in terms:
+        # A range rather than LIKE, so the token index is used on every database
+        prefix = Q(token__gte=term, token__lt=term + '\uffff')
+        queryset = queryset.filter(
+            Exists(ShipmentSearchToken.objects.filter(prefix, shipment=OuterRef('pk')))
+        )
+        matching |= prefix
+    rank = ShipmentSearchToken.objects.filter(matching, shipment=OuterRef('pk')).values(
+        'shipment'
+    ).annotate(total=Sum('weight')).values('total')
+    return queryset.annotate(
+        search_rank=Coalesce(Subquery(rank, output_field=IntegerField()), Value(0))
+    ).order_by('-search_rank', '-created_at')
+
+
+class ShipmentSearchFilter(filters.SearchFilter):
+    """
+    ?search= through the shipment search document, ranked unless the
+    request also asks for an explicit ordering
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        ranked = search_shipments_ranked(queryset, text)
+        if request.query_params.get('ordering'):
+            return ranked.order_by(*queryset.query.order_by)
+        return ranked
+
+
+def ensure_search_indexes(using: str = 'default'):
+    """
+    Create the PostgreSQL trigram and full-text GIN indexes, which cannot
+    be declared on the model while other databases are supported
+    """
+    if not _is_postgres(using):
+        return
+    table = connections[using].ops.quote_name(ShipmentSearchDocument._meta.db_table)
+    with connections[using].cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS shipments_search_document_trgm "
+            f"ON {table} USING gin (document gin_trgm_ops)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS shipments_search_vector_gin "
+            f"ON {table} USING gin (search_vector)"
+        )
@@ -1,13 +1,18 @@
 # shipments/serializers.py
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from .models import Shipment, ConsignmentItem, ShipmentStatus, ShipmentFeedback, ProofOfDelivery, ProofOfDeliveryPhoto
 from dangerous_goods.models import DangerousGood  # Re-enabled after dangerous_goods app re-enabled
+from shared.query_plans import QueryPlanMixin, prepared_prefetch
 from shared.validation_service import SafeShipperValidationMixin
 
-class ConsignmentItemSerializer(SafeShipperValidationMixin, serializers.ModelSerializer):
+class ConsignmentItemSerializer(QueryPlanMixin, SafeShipperValidationMixin, serializers.ModelSerializer):
     dangerous_good_details = serializers.SerializerMethodField()
     
+    select_related = ('dangerous_good_entry',)
+    
     class Meta:
         model = ConsignmentItem
         fields = [
@@ -113,7 +118,7 @@ class ConsignmentItemSerializer(SafeShipperValidationMixin, serializers.ModelSer
 #             return f"{obj.delivered_by.first_name} {obj.delivered_by.last_name}".strip()
 #         return None
 
-class ShipmentSerializer(SafeShipperValidationMixin, serializers.ModelSerializer):
+class ShipmentSerializer(QueryPlanMixin, SafeShipperValidationMixin, serializers.ModelSerializer):
     items = ConsignmentItemSerializer(many=True, required=False)
     status = serializers.ChoiceField(choices=ShipmentStatus.choices, required=False)
     customer_name = serializers.SerializerMethodField()
@@ -124,6 +129,12 @@ class ShipmentSerializer(SafeShipperValidationMixin, serializers.ModelSerializer
     # proof_of_delivery = ProofOfDeliverySerializer(read_only=True)
     # has_proof_of_delivery = serializers.SerializerMethodField()
 
+    select_related = ('customer', 'carrier', 'freight_type')
+    # Totals are computed from the prefetched items
+    prefetch_related = (
+        prepared_prefetch('items', ConsignmentItemSerializer, ConsignmentItem.objects.all()),
+    )
+
     class Meta:
         model = Shipment
         fields = [
@@ -173,7 +184,7 @@ class ShipmentSerializer(SafeShipperValidationMixin, serializers.ModelSerializer
         return obj.freight_type.name if obj.freight_type else None
 
     def get_total_items(self, obj):
-        return obj.items.count()
+        return len(obj.items.all())
 
     def get_total_weight(self, obj):
         return sum(
@@ -219,13 +230,15 @@ class ShipmentSerializer(SafeShipperValidationMixin, serializers.ModelSerializer
         
         return instance
 
-class ShipmentListSerializer(serializers.ModelSerializer):
+class ShipmentListSerializer(QueryPlanMixin, serializers.ModelSerializer):
     """Lightweight serializer for list views"""
     customer_name = serializers.SerializerMethodField()
     carrier_name = serializers.SerializerMethodField()
     total_items = serializers.SerializerMethodField()
     has_dangerous_goods = serializers.SerializerMethodField()
 
+    select_related = ('customer', 'carrier')
+
     class Meta:
         model = Shipment
         fields = [
@@ -250,10 +263,27 @@ class ShipmentListSerializer(serializers.ModelSerializer):
     def get_carrier_name(self, obj):
         return obj.carrier.name if obj.carrier else None
 
+    @classmethod
+    def get_annotations(cls):
+        # Subqueries rather than aggregates, so the list query needs no GROUP BY
+        item_count = ConsignmentItem.objects.filter(shipment=OuterRef('pk')).order_by().values(
+            'shipment'
+        ).annotate(total=Count('pk')).values('total')
+        return {
+            'item_count': Coalesce(Subquery(item_count, output_field=IntegerField()), Value(0)),
+            'has_dangerous_items': Exists(
+                ConsignmentItem.objects.filter(shipment=OuterRef('pk'), is_dangerous_good=True)
+            ),
+        }
+
     def get_total_items(self, obj):
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
         return obj.items.count()
 
     def get_has_dangerous_goods(self, obj):
+        if hasattr(obj, 'has_dangerous_items'):
+            return obj.has_dangerous_items
         return obj.items.filter(is_dangerous_good=True).exists()
 
 
@@ -287,7 +317,7 @@ class ProofOfDeliveryPhotoSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProofOfDeliverySerializer(serializers.ModelSerializer):
+class ProofOfDeliverySerializer(QueryPlanMixin, serializers.ModelSerializer):
     """Enhanced serializer for proof of delivery with shipment details"""
     photos = ProofOfDeliveryPhotoSerializer(many=True, read_only=True)
     delivered_by_name = serializers.CharField(source='delivered_by.get_full_name', read_only=True)
@@ -295,6 +325,9 @@ class ProofOfDeliverySerializer(serializers.ModelSerializer):
     photo_count = serializers.SerializerMethodField()
     shipment_details = serializers.SerializerMethodField()
     
+    select_related = ('shipment__customer', 'delivered_by')
+    prefetch_related = ('photos',)
+    
     class Meta:
         model = ProofOfDelivery
         fields = [
@@ -307,7 +340,8 @@ class ProofOfDeliverySerializer(serializers.ModelSerializer):
     
     def get_photo_count(self, obj):
         """Return the count of photos"""
-        return obj.photo_count
+        # The photos are prefetched for the photos field
+        return len(obj.photos.all())
     
     def get_shipment_details(self, obj):
         """Return basic shipment information"""
@@ -403,7 +437,7 @@ class ProofOfDeliveryCreateSerializer(serializers.ModelSerializer):
 
 # ===== FEEDBACK SERIALIZERS =====
 
-class ShipmentFeedbackSerializer(SafeShipperValidationMixin, serializers.ModelSerializer):
+class ShipmentFeedbackSerializer(QueryPlanMixin, SafeShipperValidationMixin, serializers.ModelSerializer):
     """
     Comprehensive serializer for shipment feedback with manager response functionality.
     """
@@ -420,6 +454,8 @@ class ShipmentFeedbackSerializer(SafeShipperValidationMixin, serializers.ModelSe
     # Manager response fields with validation
     responded_by_name = serializers.SerializerMethodField()
     
+    select_related = ('shipment__customer', 'shipment__carrier', 'shipment__assigned_driver', 'responded_by')
+    
     class Meta:
         model = ShipmentFeedback
         fields = [
@@ -473,7 +509,7 @@ class ShipmentFeedbackSerializer(SafeShipperValidationMixin, serializers.ModelSe
         return self.validate_text_content(value, max_length=2000)
 
 
-class ShipmentFeedbackListSerializer(serializers.ModelSerializer):
+class ShipmentFeedbackListSerializer(QueryPlanMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for feedback list views with essential information.
     """
@@ -483,6 +519,9 @@ class ShipmentFeedbackListSerializer(serializers.ModelSerializer):
     tracking_number = serializers.CharField(source='shipment.tracking_number', read_only=True)
     customer_name = serializers.CharField(source='shipment.customer.name', read_only=True)
     
+    # has_manager_response reads responded_by
+    select_related = ('shipment__customer', 'responded_by')
+    
     class Meta:
         model = ShipmentFeedback
         fields = [
@@ -6,6 +6,8 @@ from django.db.models import Q
 from typing import TYPE_CHECKING, List, Dict, Optional
 
 from .models import Shipment, ConsignmentItem, ShipmentStatus
+from mobile_api.models import MobileSyncChange
+from mobile_api.sync import record_changes
 
 if TYPE_CHECKING:
     from users.models import User
@@ -47,6 +49,8 @@ def create_shipment_with_items(shipment_data: Dict, items_data: List[Dict], crea
     
     if consignment_items_to_create:
         ConsignmentItem.objects.bulk_create(consignment_items_to_create)
+        # bulk_create sends no post_save, so log the items for the driver's device here
+        _record_item_upserts(new_shipment, consignment_items_to_create)
     
     return new_shipment
 
@@ -123,10 +127,19 @@ def update_shipment_details(shipment: Shipment, shipment_data: Dict, updating_us
             new_items_list.append(item)
         if new_items_list:
             ConsignmentItem.objects.bulk_create(new_items_list)
+            _record_item_upserts(shipment, new_items_list)
         
     return shipment
 
 
+def _record_item_upserts(shipment: Shipment, items: List[ConsignmentItem]):
+    """Log bulk-created items in the assigned driver's mobile sync log"""
+    record_changes(
+        shipment.assigned_driver_id, MobileSyncChange.Entity.ITEM,
+        [item.pk for item in items], MobileSyncChange.Operation.UPSERT
+    )
+
+
 def _can_user_modify_shipment(user: 'User', shipment: Shipment) -> bool:
     """
     Helper function to determine if a user can modify a specific shipment.
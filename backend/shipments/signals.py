@@ -1,7 +1,9 @@
 import logging
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from .models import Shipment, ShipmentFeedback
+from companies.models import Company
+from .models import Shipment, ShipmentFeedback, ConsignmentItem
 from .feedback_alert_service import FeedbackAlertService
 from .realtime_feedback_service import RealtimeFeedbackNotificationService, FeedbackWebSocketEventService
 
@@ -9,6 +11,32 @@ logger = logging.getLogger(__name__)
 
 # Shipment signal handlers for production use
 
+
+# Aggregate receivers are registered first so the refreshed buckets are
+# committed before the dashboard metrics task queued below reads them
+def _schedule_feedback_aggregate_refresh(instance):
+    """Refresh the daily aggregate buckets a feedback row belongs to once the transaction commits."""
+    from .feedback_metrics_service import FeedbackMetricsService
+
+    try:
+        keys = FeedbackMetricsService.bucket_keys(instance)
+    except Exception as e:
+        logger.debug(f"Feedback aggregate keys unavailable for {instance.pk}: {str(e)}")
+        return
+    if keys:
+        transaction.on_commit(lambda: FeedbackMetricsService.refresh_buckets(**keys))
+
+
+@receiver(post_save, sender=ShipmentFeedback)
+def feedback_aggregate_save_receiver(sender, instance, **kwargs):
+    _schedule_feedback_aggregate_refresh(instance)
+
+
+@receiver(post_delete, sender=ShipmentFeedback)
+def feedback_aggregate_delete_receiver(sender, instance, **kwargs):
+    _schedule_feedback_aggregate_refresh(instance)
+
+
 @receiver(post_save, sender=ShipmentFeedback)
 def feedback_post_save_receiver(sender, instance, created, **kwargs):
     """
@@ -76,11 +104,73 @@ def feedback_post_save_receiver(sender, instance, created, **kwargs):
         try:
             # Trigger dashboard metrics update (this could be done asynchronously)
             from .tasks import update_company_dashboard_metrics
-            if hasattr(instance.shipment, 'carrier'):
-                update_company_dashboard_metrics.delay(str(instance.shipment.carrier.id))
+            if instance.shipment.carrier_id:
+                carrier_id = str(instance.shipment.carrier_id)
+                transaction.on_commit(lambda: update_company_dashboard_metrics.delay(carrier_id))
         except Exception as e:
             logger.debug(f"Dashboard metrics update not available or failed: {str(e)}")
 
+
+def _invalidate_hazard_profile(instance):
+    """
+    Drop the cached hazard profile pointer now and again after commit, so a
+    reader racing the transaction cannot leave a pre-change profile in place.
+    """
+    from .hazard_profile import ShipmentHazardProfile
+
+    shipment_id = instance.shipment_id
+    ShipmentHazardProfile.invalidate(shipment_id)
+    transaction.on_commit(lambda: ShipmentHazardProfile.invalidate(shipment_id))
+
+
+@receiver(post_save, sender=ConsignmentItem)
+def consignment_item_saved_receiver(sender, instance, **kwargs):
+    _invalidate_hazard_profile(instance)
+    _schedule_search_refresh(instance.shipment_id)
+
+
+@receiver(post_delete, sender=ConsignmentItem)
+def consignment_item_deleted_receiver(sender, instance, **kwargs):
+    _invalidate_hazard_profile(instance)
+    _schedule_search_refresh(instance.shipment_id)
+
+
+def _schedule_search_refresh(shipment_id):
+    """Rebuild the shipment's search document once the transaction commits."""
+    from .search import refresh_search_documents
+
+    def refresh():
+        try:
+            refresh_search_documents([shipment_id])
+        except Exception as e:
+            logger.error(f"Failed to refresh search document for shipment {shipment_id}: {str(e)}")
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Shipment)
+def shipment_search_receiver(sender, instance, **kwargs):
+    _schedule_search_refresh(instance.pk)
+
+
+@receiver(pre_save, sender=Company)
+def company_name_pre_save_receiver(sender, instance, **kwargs):
+    instance._previous_name = (
+        Company.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Company)
+def company_renamed_receiver(sender, instance, created, **kwargs):
+    """Shipment search documents include company names; rebuild them on rename."""
+    if created or getattr(instance, '_previous_name', instance.name) == instance.name:
+        return
+    from .tasks import refresh_shipment_search_documents
+    company_id = str(instance.pk)
+    transaction.on_commit(lambda: refresh_shipment_search_documents.delay(company_id=company_id))
+
+
 # Example of a shipment signal receiver (you can uncomment and adapt later)
 # @receiver(post_save, sender=Shipment)
 # def shipment_post_save_receiver(sender, instance, created, **kwargs):
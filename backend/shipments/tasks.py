@@ -529,47 +529,26 @@ def update_company_dashboard_metrics(self, company_id: str):
     """
     try:
         from companies.models import Company
-        from .models import ShipmentFeedback
+        from .feedback_metrics_service import FeedbackMetricsService
         from .realtime_feedback_service import FeedbackWebSocketEventService
         from datetime import timedelta
-        from django.db.models import Avg, Count
         
         company = Company.objects.get(id=company_id)
         
-        # Calculate recent metrics (last 30 days)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        
-        recent_feedback = ShipmentFeedback.objects.filter(
-            shipment__carrier=company,
-            submitted_at__gte=thirty_days_ago
-        )
+        # Calculate recent metrics (last 30 days) from the daily aggregates
+        start_day, end_day = FeedbackMetricsService.day_range(timezone.now() - timedelta(days=30))
+        counters = FeedbackMetricsService.company_counters(company, start_day, end_day)
         
-        if recent_feedback.exists():
-            # Calculate key metrics
-            total_count = recent_feedback.count()
-            avg_score = recent_feedback.aggregate(
-                avg_score=Avg('delivery_success_score')
-            )['avg_score'] or 0
-            
-            # Individual question metrics
-            on_time_count = recent_feedback.filter(was_on_time=True).count()
-            complete_count = recent_feedback.filter(was_complete_and_undamaged=True).count()
-            professional_count = recent_feedback.filter(was_driver_professional=True).count()
-            
-            # Poor feedback count (score < 70%)
-            poor_feedback_count = sum(
-                1 for feedback in recent_feedback 
-                if feedback.delivery_success_score < 70
-            )
-            
+        if counters['feedback_count']:
+            metrics = FeedbackMetricsService.rates(counters)
             updated_metrics = {
-                'delivery_success_score': round(avg_score, 1),
-                'total_feedback_count': total_count,
-                'on_time_rate': round((on_time_count / total_count) * 100, 1) if total_count > 0 else 0,
-                'complete_rate': round((complete_count / total_count) * 100, 1) if total_count > 0 else 0,
-                'professional_rate': round((professional_count / total_count) * 100, 1) if total_count > 0 else 0,
-                'poor_feedback_count': poor_feedback_count,
-                'poor_feedback_rate': round((poor_feedback_count / total_count) * 100, 1) if total_count > 0 else 0,
+                'delivery_success_score': metrics['average_score'],
+                'total_feedback_count': metrics['total_feedback_count'],
+                'on_time_rate': metrics['on_time_rate'],
+                'complete_rate': metrics['complete_rate'],
+                'professional_rate': metrics['professional_rate'],
+                'poor_feedback_count': metrics['poor_feedback_count'],
+                'poor_feedback_rate': metrics['poor_feedback_rate'],
                 'last_updated': timezone.now().isoformat(),
                 'period': '30_days'
             }
@@ -695,4 +674,55 @@ def process_feedback_batch_notifications(self, feedback_ids: List[str]):
                 'status': 'error',
                 'error': str(exc),
                 'feedback_ids': feedback_ids
-            }
\ No newline at end of file
+            }
+
+@shared_task
+def rebuild_feedback_daily_aggregates(days: int = 35, company_id: Optional[str] = None):
+    """
+    Rebuild recent feedback daily aggregates from source rows.
+    Catches changes that bypass the feedback signals, such as shipments
+    reassigned to another driver after feedback was submitted.
+    """
+    from .feedback_metrics_service import FeedbackMetricsService
+
+    end_day = timezone.localdate()
+    start_day = end_day - timedelta(days=days)
+    rows = FeedbackMetricsService.rebuild(start_day, end_day, company_id=company_id)
+
+    return {
+        'status': 'success',
+        'start_day': start_day.isoformat(),
+        'end_day': end_day.isoformat(),
+        'rows_written': rows
+    }
+
+
+@shared_task
+def refresh_shipment_search_documents(shipment_ids: Optional[List[str]] = None,
+                                      company_id: Optional[str] = None, batch_size: int = 500):
+    """
+    Rebuild shipment search documents for the given shipments, or for every
+    shipment of a company (as customer or carrier), e.g. after it is renamed.
+    """
+    from django.db.models import Q
+    from .search import refresh_search_documents
+
+    if shipment_ids is None:
+        shipments = Shipment.objects.all()
+        if company_id:
+            shipments = shipments.filter(Q(customer_id=company_id) | Q(carrier_id=company_id))
+        shipment_ids = shipments.values_list('id', flat=True).iterator(chunk_size=batch_size)
+
+    written = 0
+    batch = []
+    for shipment_id in shipment_ids:
+        batch.append(shipment_id)
+        if len(batch) >= batch_size:
+            written += refresh_search_documents(batch)
+            batch = []
+    written += refresh_search_documents(batch)
+
+    return {
+        'status': 'success',
+        'documents_written': written
+    }
@@ -12,7 +12,10 @@ from companies.models import Company
 from freight_types.models import FreightType
 from dangerous_goods.models import DangerousGood
 from training.models import TrainingProgram, TrainingCategory
-from training.adg_driver_qualifications import DriverLicense, ADGDriverCertificate, DriverCompetencyProfile
+from training.adg_driver_qualifications import (
+    DriverLicense, ADGDriverCertificate, DriverCompetencyProfile,
+    DriverQualificationIndex, DriverQualificationIndexService, hazard_class_mask
+)
 from .models import Shipment, ConsignmentItem
 from .driver_qualification_service import ShipmentDriverQualificationService
 
@@ -247,6 +250,114 @@ class DriverQualificationServiceTest(TestCase):
         self.assertGreater(len(issues), 0)
 
 
+class DriverQualificationIndexTest(TestCase):
+    """Test the precomputed driver qualification index used for dispatch"""
+    
+    def setUp(self):
+        """Set up drivers with differing class coverage"""
+        self.class3_driver = User.objects.create_user(
+            username="class3_driver",
+            email="class3@test.com",
+            role="DRIVER"
+        )
+        self.restricted_driver = User.objects.create_user(
+            username="restricted_driver",
+            email="restricted@test.com",
+            role="DRIVER"
+        )
+        self.unlicensed_driver = User.objects.create_user(
+            username="unlicensed_driver",
+            email="unlicensed@test.com",
+            role="DRIVER"
+        )
+        
+        today = timezone.now().date()
+        for index, driver in enumerate([self.class3_driver, self.restricted_driver]):
+            DriverLicense.objects.create(
+                driver=driver,
+                license_number=f"DL-IDX-{index}",
+                license_class="HR",
+                state_issued="NSW",
+                issue_date=today - timedelta(days=365),
+                expiry_date=today + timedelta(days=365)
+            )
+            ADGDriverCertificate.objects.create(
+                driver=driver,
+                certificate_type=ADGDriverCertificate.CertificateType.CLASS_SPECIFIC,
+                certificate_number=f"ADG-IDX-{index}",
+                issuing_authority="Test Authority",
+                issue_date=today - timedelta(days=30),
+                expiry_date=today + timedelta(days=200),
+                hazard_classes_covered=['3', '8']
+            )
+        
+        DriverCompetencyProfile.objects.create(
+            driver=self.restricted_driver,
+            restrictions=['NO_CLASS_8']
+        )
+    
+    def test_hazard_class_mask(self):
+        """Divisions are distinct, whole classes cover their divisions and unknown classes are rejected"""
+        flammable_gas = hazard_class_mask(['2.1'])
+        toxic_gas = hazard_class_mask(['2.3'])
+        self.assertNotEqual(flammable_gas & toxic_gas, toxic_gas)
+        self.assertNotEqual(hazard_class_mask(['4.1']) & hazard_class_mask(['4.3']), hazard_class_mask(['4.3']))
+        
+        whole_class = hazard_class_mask(['2'])
+        self.assertEqual(whole_class & toxic_gas, toxic_gas)
+        self.assertNotEqual(flammable_gas & whole_class, whole_class)
+        
+        self.assertEqual(hazard_class_mask(['CLASS_3', '1.1D']), hazard_class_mask(['3', '1.1']))
+        self.assertIsNone(hazard_class_mask(['UNKNOWN']))
+    
+    def test_refresh_builds_entries(self):
+        """Refreshing builds one entry per driver with the expected mask and expiry"""
+        DriverQualificationIndexService.refresh_drivers()
+        
+        entry = DriverQualificationIndex.objects.get(driver=self.class3_driver)
+        self.assertEqual(entry.qualified_classes, ['3', '8'])
+        self.assertTrue(entry.has_commercial_license)
+        self.assertEqual(entry.valid_until, timezone.now().date() + timedelta(days=200))
+        
+        restricted_entry = DriverQualificationIndex.objects.get(driver=self.restricted_driver)
+        self.assertEqual(restricted_entry.qualified_classes, ['3'])
+    
+    def test_find_qualified_entries(self):
+        """Drivers are matched by bitmask intersection, honouring restrictions"""
+        class3_ids = {e.driver_id for e in DriverQualificationIndexService.find_qualified_entries(['3'])}
+        self.assertEqual(class3_ids, {self.class3_driver.id, self.restricted_driver.id})
+        
+        class8_ids = {e.driver_id for e in DriverQualificationIndexService.find_qualified_entries(['3', '8'])}
+        self.assertEqual(class8_ids, {self.class3_driver.id})
+        
+        self.assertEqual(DriverQualificationIndexService.find_qualified_entries(['1']), [])
+    
+    def test_stale_entries_are_rebuilt(self):
+        """Entries whose documents have expired are rebuilt before matching"""
+        DriverQualificationIndexService.refresh_drivers()
+        DriverQualificationIndex.objects.filter(driver=self.class3_driver).update(
+            valid_until=timezone.now().date() - timedelta(days=1),
+            hazard_class_mask=0
+        )
+        
+        class3_ids = {e.driver_id for e in DriverQualificationIndexService.find_qualified_entries(['3'])}
+        self.assertIn(self.class3_driver.id, class3_ids)
+    
+    def test_validation_result_reports_restriction(self):
+        """Validation built from the index explains restricted classes"""
+        result = DriverQualificationIndexService.get_entry(self.restricted_driver).build_validation_result(['8'])
+        
+        self.assertFalse(result['overall_qualified'])
+        self.assertIn("Driver has restrictions on hazard class 8", result['critical_issues'])
+    
+    def test_licensed_entries_exclude_unlicensed_drivers(self):
+        """Non-DG matching only returns drivers holding a current license"""
+        licensed_ids = {e.driver_id for e in DriverQualificationIndexService.find_licensed_entries()}
+        
+        self.assertIn(self.class3_driver.id, licensed_ids)
+        self.assertNotIn(self.unlicensed_driver.id, licensed_ids)
+
+
 class DriverQualificationAPITest(TestCase):
     """Test the driver qualification API endpoints"""
     
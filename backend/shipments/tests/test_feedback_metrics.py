@@ -0,0 +1,102 @@
+# shipments/tests/test_feedback_metrics.py
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from companies.models import Company
+from freight_types.models import FreightType
+from ..models import Shipment, ShipmentFeedback, FeedbackDailyAggregate
+from ..feedback_metrics_service import FeedbackMetricsService
+
+User = get_user_model()
+
+
+class FeedbackMetricsServiceTests(TestCase):
+    """Test stored delivery scores and daily feedback aggregates"""
+
+    def setUp(self):
+        self.carrier = Company.objects.create(name='Metrics Carrier', company_type='CARRIER')
+        self.customer = Company.objects.create(name='Metrics Customer', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.driver = User.objects.create_user(
+            username='metrics-driver@test.com',
+            email='metrics-driver@test.com',
+            password='testpass123',
+            role='DRIVER',
+            company=self.carrier
+        )
+        self.today = timezone.localdate()
+
+    def _feedback(self, on_time, complete, professional, origin='Sydney'):
+        shipment = Shipment.objects.create(
+            customer=self.customer,
+            carrier=self.carrier,
+            assigned_driver=self.driver,
+            origin_location=origin,
+            destination_location='Melbourne',
+            freight_type=self.freight_type,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return ShipmentFeedback.objects.create(
+                shipment=shipment,
+                was_on_time=on_time,
+                was_complete_and_undamaged=complete,
+                was_driver_professional=professional
+            )
+
+    def test_score_is_stored(self):
+        feedback = self._feedback(True, True, False)
+
+        self.assertEqual(feedback.delivery_success_score, 66.7)
+        self.assertEqual(
+            ShipmentFeedback.objects.filter(delivery_success_score__lt=70).count(), 1
+        )
+
+    def test_backfill_recomputes_stored_scores(self):
+        feedback = self._feedback(True, False, True)
+        ShipmentFeedback.objects.filter(pk=feedback.pk).update(delivery_success_score=0)
+
+        self.assertEqual(ShipmentFeedback.backfill_delivery_success_scores(), 1)
+        feedback.refresh_from_db()
+        self.assertEqual(feedback.delivery_success_score, 66.7)
+        self.assertEqual(ShipmentFeedback.backfill_delivery_success_scores(), 0)
+
+    def test_aggregates_maintained_on_save(self):
+        self._feedback(True, True, True)
+        self._feedback(False, False, True, origin='Brisbane')
+
+        counters = FeedbackMetricsService.company_counters(self.carrier, self.today, self.today)
+        rates = FeedbackMetricsService.rates(counters)
+
+        self.assertEqual(counters['feedback_count'], 2)
+        self.assertEqual(counters['poor_count'], 1)
+        self.assertEqual(rates['average_score'], 66.7)
+        self.assertEqual(rates['difot_rate'], 50.0)
+
+        drivers = FeedbackMetricsService.driver_counters(self.carrier, self.today, self.today)
+        self.assertEqual([(row['driver_id'], row['feedback_count']) for row in drivers], [(self.driver.id, 2)])
+
+        routes = FeedbackMetricsService.route_counters(self.carrier, self.today, self.today)
+        self.assertEqual(len(routes), 2)
+
+    def test_aggregates_removed_on_delete(self):
+        feedback = self._feedback(True, True, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            feedback.delete()
+
+        self.assertFalse(FeedbackDailyAggregate.objects.filter(company=self.carrier).exists())
+
+    def test_rebuild_matches_incremental_rows(self):
+        self._feedback(True, False, True)
+        self._feedback(False, True, True)
+        incremental = FeedbackMetricsService.company_counters(self.carrier, self.today, self.today)
+
+        FeedbackMetricsService.rebuild(self.today, self.today, company_id=self.carrier.id)
+
+        self.assertEqual(FeedbackMetricsService.company_counters(self.carrier, self.today, self.today), incremental)
+        self.assertEqual(
+            FeedbackDailyAggregate.objects.filter(company=self.carrier).count(), 3  # company, driver, route
+        )
@@ -0,0 +1,136 @@
+# shipments/tests/test_fleet_matching.py
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+
+from companies.models import Company
+from freight_types.models import FreightType
+from dangerous_goods.models import DangerousGood
+from vehicles.models import Vehicle, SafetyEquipmentType, VehicleSafetyEquipment
+from ..models import Shipment, ConsignmentItem, ShipmentStatus
+from ..fleet_matching_service import FleetCompatibilityMatcher, gvm_category
+
+
+class FleetCompatibilityMatcherTests(TestCase):
+    """Test batch vehicle/shipment matching"""
+
+    def setUp(self):
+        today = timezone.now().date()
+        self.carrier = Company.objects.create(name='Matcher Carrier', company_type='CARRIER')
+        self.customer = Company.objects.create(name='Matcher Customer', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+
+        self.extinguisher = SafetyEquipmentType.objects.create(
+            name='Matcher Extinguisher', category='FIRE_EXTINGUISHER', required_for_adr_classes=['ALL_CLASSES']
+        )
+        self.spill_kit = SafetyEquipmentType.objects.create(
+            name='Matcher Spill Kit', category='SPILL_KIT', required_for_adr_classes=['CLASS_3']
+        )
+
+        self.equipped = Vehicle.objects.create(
+            registration_number='MATCH-1', vehicle_type='RIGID', capacity_kg=10000, owning_company=self.carrier
+        )
+        self.partial = Vehicle.objects.create(
+            registration_number='MATCH-2', vehicle_type='RIGID', capacity_kg=10000, owning_company=self.carrier
+        )
+        self.small = Vehicle.objects.create(
+            registration_number='MATCH-3', vehicle_type='VAN', capacity_kg=100, owning_company=self.carrier
+        )
+
+        for vehicle, equipment_types in [
+            (self.equipped, [self.extinguisher, self.spill_kit]),
+            (self.partial, [self.extinguisher]),
+            (self.small, [self.extinguisher, self.spill_kit]),
+        ]:
+            for equipment_type in equipment_types:
+                VehicleSafetyEquipment.objects.create(
+                    vehicle=vehicle,
+                    equipment_type=equipment_type,
+                    installation_date=today - timedelta(days=30),
+                    expiry_date=today + timedelta(days=300)
+                )
+
+        flammable = DangerousGood.objects.create(
+            un_number='UN1203', proper_shipping_name='Gasoline', hazard_class='3', packing_group='II'
+        )
+        self.shipment = Shipment.objects.create(
+            customer=self.customer,
+            carrier=self.carrier,
+            origin_location='Sydney',
+            destination_location='Melbourne',
+            freight_type=self.freight_type,
+        )
+        ConsignmentItem.objects.create(
+            shipment=self.shipment,
+            description='Gasoline',
+            quantity=10,
+            weight_kg=50,
+            is_dangerous_good=True,
+            dangerous_good_entry=flammable
+        )
+
+    def test_gvm_category(self):
+        self.assertEqual(gvm_category(3000), 'LIGHT')
+        self.assertEqual(gvm_category(7000), 'MEDIUM')
+        self.assertEqual(gvm_category(24000), 'HEAVY')
+        self.assertEqual(gvm_category(None), 'UNKNOWN')
+
+    def test_rank_vehicles_orders_by_equipment_and_capacity(self):
+        matcher = FleetCompatibilityMatcher(company=self.carrier)
+        ranked = matcher.rank_vehicles_for_shipment(self.shipment)
+
+        registrations = [vehicle['registration_number'] for vehicle in ranked]
+        self.assertEqual(registrations[0], 'MATCH-1')
+        self.assertEqual(ranked[0]['validation_summary']['missing_equipment'], [])
+
+        partial = next(vehicle for vehicle in ranked if vehicle['registration_number'] == 'MATCH-2')
+        self.assertEqual(partial['validation_summary']['missing_equipment'], ['Matcher Spill Kit'])
+
+        small = next(vehicle for vehicle in ranked if vehicle['registration_number'] == 'MATCH-3')
+        self.assertTrue(small['has_warnings'])
+        self.assertFalse(small['validation_summary']['capacity_analysis']['sufficient_capacity'])
+
+    def test_exclude_vehicles_with_warnings(self):
+        matcher = FleetCompatibilityMatcher(company=self.carrier)
+        ranked = matcher.rank_vehicles_for_shipment(self.shipment, include_warnings=False)
+
+        self.assertNotIn('MATCH-3', [vehicle['registration_number'] for vehicle in ranked])
+
+    def test_current_load_reduces_available_capacity(self):
+        loaded = Shipment.objects.create(
+            customer=self.customer,
+            carrier=self.carrier,
+            origin_location='Sydney',
+            destination_location='Brisbane',
+            freight_type=self.freight_type,
+            status=ShipmentStatus.IN_TRANSIT,
+            assigned_vehicle=self.equipped
+        )
+        ConsignmentItem.objects.create(shipment=loaded, description='Pallets', quantity=10, weight_kg=990)
+
+        matcher = FleetCompatibilityMatcher(company=self.carrier)
+        capability = next(cap for cap in matcher.capabilities if cap.vehicle.pk == self.equipped.pk)
+
+        self.assertEqual(capability.current_load_kg, 9900)
+        self.assertEqual(capability.available_capacity_kg, 100)
+
+    def test_rank_shipments_for_vehicle(self):
+        matcher = FleetCompatibilityMatcher(company=self.carrier)
+        ranked = matcher.rank_shipments_for_vehicle(self.equipped)
+
+        self.assertEqual([entry['shipment_id'] for entry in ranked], [str(self.shipment.id)])
+        self.assertTrue(ranked[0]['is_dangerous_goods'])
+
+    def test_fixed_query_count_regardless_of_fleet_size(self):
+        for index in range(10):
+            Vehicle.objects.create(
+                registration_number=f'MATCH-EXTRA-{index}', vehicle_type='RIGID',
+                capacity_kg=10000, owning_company=self.carrier
+            )
+
+        with self.assertNumQueries(4):
+            matcher = FleetCompatibilityMatcher(company=self.carrier)
+        with self.assertNumQueries(1):
+            matcher.rank_vehicles_for_shipment(self.shipment)
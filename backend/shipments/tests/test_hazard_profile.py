@@ -0,0 +1,88 @@
+# shipments/tests/test_hazard_profile.py
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from companies.models import Company
+from freight_types.models import FreightType
+from dangerous_goods.models import DangerousGood
+from ..models import Shipment, ConsignmentItem
+from ..hazard_profile import ShipmentHazardProfile
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ShipmentHazardProfileTests(TestCase):
+    """Test the shared, cached shipment hazard profile"""
+
+    def setUp(self):
+        cache.clear()
+        carrier = Company.objects.create(name='Profile Carrier', company_type='CARRIER')
+        customer = Company.objects.create(name='Profile Customer', company_type='CUSTOMER')
+        freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.flammable = DangerousGood.objects.create(
+            un_number='UN1203', proper_shipping_name='Gasoline', hazard_class='3',
+            packing_group='II', erg_guide_number='128'
+        )
+        self.corrosive = DangerousGood.objects.create(
+            un_number='UN1789', proper_shipping_name='Hydrochloric acid', hazard_class='8',
+            packing_group='II', erg_guide_number='157'
+        )
+        self.shipment = Shipment.objects.create(
+            customer=customer,
+            carrier=carrier,
+            origin_location='Sydney',
+            destination_location='Melbourne',
+            freight_type=freight_type,
+        )
+        for dg in [self.flammable, self.flammable, self.corrosive]:
+            ConsignmentItem.objects.create(
+                shipment=self.shipment, description=dg.proper_shipping_name, quantity=2,
+                weight_kg=20, is_dangerous_good=True, dangerous_good_entry=dg
+            )
+        ConsignmentItem.objects.create(shipment=self.shipment, description='Pallets', quantity=4)
+
+    def test_profile_summarises_dangerous_goods(self):
+        with self.assertNumQueries(2):
+            profile = ShipmentHazardProfile.for_shipment(self.shipment)
+
+        self.assertEqual(len(profile.items), 4)
+        self.assertEqual(len(profile.dangerous_items), 3)
+        self.assertEqual(profile.un_numbers, ['UN1203', 'UN1789'])
+        self.assertEqual(profile.hazard_classes, ['3', '8'])
+        self.assertEqual(profile.erg_guides, ['128', '157'])
+        self.assertEqual(len(profile.items_by_hazard_class()['3']), 2)
+
+    def test_profile_is_memoized(self):
+        first = ShipmentHazardProfile.for_shipment(self.shipment)
+
+        with self.assertNumQueries(0):
+            second = ShipmentHazardProfile.for_shipment(self.shipment)
+
+        self.assertEqual(second.content_hash, first.content_hash)
+
+    def test_item_change_invalidates_profile(self):
+        first = ShipmentHazardProfile.for_shipment(self.shipment)
+
+        item = self.shipment.items.filter(is_dangerous_good=False).get()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.is_dangerous_good = True
+            item.dangerous_good_entry = self.corrosive
+            item.save()
+
+        second = ShipmentHazardProfile.for_shipment(self.shipment)
+        self.assertNotEqual(second.content_hash, first.content_hash)
+        self.assertEqual(len(second.dangerous_items), 4)
+
+    def test_services_share_profile(self):
+        from epg.services import EmergencyPlanGenerator
+        from epg.shipment_analysis_service import ShipmentAnalysisService
+
+        ShipmentHazardProfile.for_shipment(self.shipment)
+
+        with self.assertNumQueries(0):
+            dangerous_goods = EmergencyPlanGenerator()._get_shipment_dangerous_goods(self.shipment)
+            un_numbers = ShipmentAnalysisService().get_un_numbers_for_emergency_plan(self.shipment)
+
+        self.assertEqual([dg.un_number for dg in dangerous_goods], ['UN1203', 'UN1789'])
+        self.assertEqual(un_numbers, ['UN1203', 'UN1789'])
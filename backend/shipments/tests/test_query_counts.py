@@ -0,0 +1,127 @@
+# shipments/tests/test_query_counts.py
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from dangerous_goods.models import DangerousGood
+from freight_types.models import FreightType
+from ..models import ConsignmentItem, ProofOfDelivery, ProofOfDeliveryPhoto, Shipment, ShipmentFeedback
+
+User = get_user_model()
+
+
+class QueryCountAssertions:
+    """Assert that an endpoint's query count does not grow with its data"""
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return len(context), response
+
+    def assertConstantQueries(self, url, add_data):
+        """url runs as many queries after add_data() as before it"""
+        # First request warms per-process caches such as content types
+        self.client.get(url)
+        before, first = self.count_queries(url)
+        add_data()
+        after, second = self.count_queries(url)
+        self.assertNotEqual(first.content, second.content, 'add_data() did not change the response')
+        self.assertEqual(before, after, f"{url} ran {before} queries, then {after} with more data")
+
+
+class EndpointQueryCountTests(QueryCountAssertions, APITestCase):
+    """Pages of the shipment, POD and feedback endpoints run a fixed number of queries"""
+
+    def setUp(self):
+        self.carrier = Company.objects.create(name='Query Carrier', company_type='CARRIER')
+        self.customer = Company.objects.create(name='Query Customer', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.dangerous_good = DangerousGood.objects.create(
+            un_number='UN1090', proper_shipping_name='Acetone', hazard_class='3', packing_group='II'
+        )
+        self.admin = User.objects.create_user(
+            username='query-admin@test.com', email='query-admin@test.com', password='testpass123',
+            role='ADMIN', is_staff=True, company=self.carrier
+        )
+        self.driver = User.objects.create_user(
+            username='query-driver@test.com', email='query-driver@test.com', password='testpass123',
+            role='DRIVER', company=self.carrier
+        )
+        self.client.force_authenticate(self.admin)
+        self.shipments = [self._shipment() for _ in range(2)]
+
+    def _shipment(self, items=2):
+        shipment = Shipment.objects.create(
+            customer=self.customer,
+            carrier=self.carrier,
+            origin_location='Perth',
+            destination_location='Karratha',
+            freight_type=self.freight_type,
+            assigned_driver=self.driver,
+        )
+        self._add_items(shipment, items)
+        return shipment
+
+    def _add_items(self, shipment, count):
+        for index in range(count):
+            dangerous = index % 2 == 0
+            ConsignmentItem.objects.create(
+                shipment=shipment,
+                description=f'Item {index}',
+                quantity=2,
+                weight_kg=10,
+                is_dangerous_good=dangerous,
+                dangerous_good_entry=self.dangerous_good if dangerous else None,
+            )
+
+    def _pod(self, shipment, photos=2):
+        pod = ProofOfDelivery.objects.create(
+            shipment=shipment,
+            delivered_by=self.driver,
+            recipient_name='Site Manager',
+            recipient_signature_url='https://example.com/signature.png',
+        )
+        for index in range(photos):
+            ProofOfDeliveryPhoto.objects.create(
+                proof_of_delivery=pod, image_url=f'https://example.com/{index}.jpg', file_name=f'{index}.jpg'
+            )
+        return pod
+
+    def _feedback(self, shipment):
+        return ShipmentFeedback.objects.create(
+            shipment=shipment,
+            was_on_time=True,
+            was_complete_and_undamaged=False,
+            was_driver_professional=True,
+            manager_response='Following up with the depot',
+            responded_by=self.admin,
+            responded_at=shipment.created_at,
+        )
+
+    def test_shipment_list(self):
+        self.assertConstantQueries('/api/v1/shipments/', lambda: [self._shipment() for _ in range(5)])
+
+    def test_shipment_list_by_cursor(self):
+        self.assertConstantQueries('/api/v1/shipments/?cursor=', lambda: [self._shipment() for _ in range(5)])
+
+    def test_shipment_detail(self):
+        shipment = self.shipments[0]
+        self.assertConstantQueries(f'/api/v1/shipments/{shipment.id}/', lambda: self._add_items(shipment, 6))
+
+    def test_pod_list(self):
+        self._pod(self.shipments[0])
+        self.assertConstantQueries(
+            '/api/v1/shipments/pods/', lambda: [self._pod(self._shipment(), photos=3) for _ in range(4)]
+        )
+
+    def test_feedback_list(self):
+        self._feedback(self.shipments[0])
+        self.assertConstantQueries(
+            '/api/v1/shipments/feedback/', lambda: [self._feedback(self._shipment()) for _ in range(4)]
+        )
+
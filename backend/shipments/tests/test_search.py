@@ -0,0 +1,90 @@
+# shipments/tests/test_search.py
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from freight_types.models import FreightType
+from ..models import ConsignmentItem, Shipment, ShipmentSearchDocument
+from ..search import refresh_search_documents, search_shipments_ranked
+
+User = get_user_model()
+
+
+class ShipmentSearchTests(APITestCase):
+    """Test the maintained shipment search document"""
+
+    def setUp(self):
+        self.carrier = Company.objects.create(name='Outback Haulage', company_type='CARRIER')
+        self.customer = Company.objects.create(name='Coastal Chemicals', company_type='CUSTOMER')
+        self.freight_type, _ = FreightType.objects.get_or_create(
+            code=FreightType.Code.GENERAL, defaults={'description': 'General Cargo'}
+        )
+        self.admin = User.objects.create_user(
+            username='search-admin@test.com',
+            email='search-admin@test.com',
+            password='testpass123',
+            role='ADMIN',
+            is_staff=True
+        )
+
+    def _shipment(self, reference, descriptions=(), origin='Perth'):
+        with self.captureOnCommitCallbacks(execute=True):
+            shipment = Shipment.objects.create(
+                reference_number=reference,
+                customer=self.customer,
+                carrier=self.carrier,
+                origin_location=origin,
+                destination_location='Darwin',
+                freight_type=self.freight_type,
+            )
+            for description in descriptions:
+                ConsignmentItem.objects.create(shipment=shipment, description=description, quantity=1)
+        return shipment
+
+    def test_document_follows_saves(self):
+        shipment = self._shipment('PO-4411', ['Acetone drums'])
+        document = ShipmentSearchDocument.objects.get(shipment=shipment)
+        self.assertIn(shipment.tracking_number.lower(), document.identifiers)
+        self.assertIn('coastal chemicals', document.parties)
+        self.assertEqual(document.contents, 'acetone drums')
+
+        item = shipment.items.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        document.refresh_from_db()
+        self.assertEqual(document.contents, '')
+
+    def test_matches_every_term_and_ranks_identifiers_first(self):
+        by_reference = self._shipment('ACETONE-77', ['Paint'])
+        by_item = self._shipment('PO-1000', ['Acetone in drums'])
+        self._shipment('PO-2000', ['Timber'])
+
+        ranked = list(search_shipments_ranked(Shipment.objects.all(), 'acetone'))
+        self.assertEqual(ranked, [by_reference, by_item])
+        self.assertEqual(list(search_shipments_ranked(Shipment.objects.all(), 'acetone drums')), [by_item])
+
+    def test_partial_tracking_number(self):
+        shipment = self._shipment('PO-3000')
+        other = self._shipment('PO-4000')
+        prefix = shipment.tracking_number[:8]
+        if prefix in other.tracking_number:
+            self.skipTest('Generated tracking numbers share a prefix')
+        self.assertEqual(list(search_shipments_ranked(Shipment.objects.all(), prefix)), [shipment])
+
+    def test_rebuild_after_company_rename(self):
+        shipment = self._shipment('PO-5000')
+        Company.objects.filter(pk=self.customer.pk).update(name='Harbour Solvents')
+        self.assertEqual(list(search_shipments_ranked(Shipment.objects.all(), 'harbour')), [])
+
+        refresh_search_documents([shipment.pk])
+        self.assertEqual(list(search_shipments_ranked(Shipment.objects.all(), 'harbour')), [shipment])
+
+    def test_viewset_search_param(self):
+        shipment = self._shipment('PO-6000', ['Sulphuric acid'])
+        self._shipment('PO-7000', ['Timber'])
+        self.client.force_authenticate(self.admin)
+
+        response = self.client.get(reverse('shipment-list'), {'search': 'sulphuric'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [str(shipment.id)])
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 import logging
 
 from .models import Shipment, ConsignmentItem
+from .hazard_profile import ShipmentHazardProfile
 from vehicles.models import Vehicle, VehicleSafetyEquipment, SafetyEquipmentType
 from dangerous_goods.models import DangerousGood
 from dangerous_goods.services import check_list_compatibility
@@ -58,9 +59,9 @@ class VehicleDGCompatibilityService:
         
         try:
             # Analyze dangerous goods in shipment
-            dangerous_items = shipment.items.filter(is_dangerous_good=True)
+            dangerous_items = ShipmentHazardProfile.for_shipment(shipment).dangerous_items
             
-            if dangerous_items.exists():
+            if dangerous_items:
                 validation_result['validation_type'] = 'DANGEROUS_GOODS'
                 dg_analysis = cls._analyze_dangerous_goods(dangerous_items)
                 validation_result['dangerous_goods_analysis'] = dg_analysis
@@ -151,44 +152,13 @@ class VehicleDGCompatibilityService:
         Returns:
             List of compatible vehicles with their validation details
         """
-        if available_vehicles is None:
-            available_vehicles = Vehicle.objects.filter(
-                status__in=['AVAILABLE', 'MAINTENANCE']
-            ).select_related('owning_company').prefetch_related(
-                'safety_equipment__equipment_type'
-            )
+        # Batch matcher loads the fleet's equipment and load once instead of validating per vehicle
+        from .fleet_matching_service import FleetCompatibilityMatcher
         
-        compatible_vehicles = []
-        
-        for vehicle in available_vehicles:
-            validation_result = cls.validate_vehicle_for_shipment(
-                vehicle, shipment, strict_mode=False
-            )
-            
-            # Include vehicle if compatible or has only warnings (if enabled)
-            if validation_result['is_compatible'] or (
-                include_warnings and 
-                validation_result['compatibility_level'] == 'COMPATIBLE_WITH_WARNINGS'
-            ):
-                vehicle_info = {
-                    'vehicle_id': str(vehicle.id),
-                    'registration_number': vehicle.registration_number,
-                    'vehicle_type': vehicle.vehicle_type,
-                    'capacity_kg': vehicle.capacity_kg,
-                    'status': vehicle.status,
-                    'owning_company': vehicle.owning_company.name if vehicle.owning_company else None,
-                    'compatibility_score': cls._calculate_compatibility_score(validation_result),
-                    'validation_summary': validation_result,
-                    'can_assign': validation_result['is_compatible'],
-                    'has_warnings': bool(validation_result['warnings']),
-                    'warnings_count': len(validation_result['warnings']),
-                    'critical_issues_count': len(validation_result['critical_issues'])
-                }
-                
-                compatible_vehicles.append(vehicle_info)
+        matcher = FleetCompatibilityMatcher(vehicles=available_vehicles)
         
-        # Sort by compatibility score (highest first)
-        return sorted(compatible_vehicles, key=lambda x: x['compatibility_score'], reverse=True)
+        # Sorted by compatibility score (highest first)
+        return matcher.rank_vehicles_for_shipment(shipment, include_warnings=include_warnings)
 
     @classmethod
     def validate_shipment_before_creation(cls, shipment_data: Dict, items_data: List[Dict]) -> Dict:
@@ -274,10 +244,10 @@ class VehicleDGCompatibilityService:
         return validation_result
 
     @classmethod
-    def _analyze_dangerous_goods(cls, dangerous_items: models.QuerySet) -> Dict:
-        """Analyze dangerous goods in a shipment to determine requirements."""
+    def _analyze_dangerous_goods(cls, dangerous_items) -> Dict:
+        """Analyze dangerous goods (a queryset or list of items) in a shipment to determine requirements."""
         analysis = {
-            'total_items': dangerous_items.count(),
+            'total_items': len(dangerous_items),
             'un_numbers': [],
             'hazard_classes': set(),
             'adr_classes': set(),
@@ -444,7 +414,7 @@ class VehicleDGCompatibilityService:
             }
 
     @classmethod
-    def _validate_vehicle_capacity(cls, vehicle: Vehicle, dangerous_items: models.QuerySet, 
+    def _validate_vehicle_capacity(cls, vehicle: Vehicle, dangerous_items: List[ConsignmentItem], 
                                  dg_analysis: Dict) -> Dict:
         """Validate vehicle capacity for dangerous goods load."""
         capacity_analysis = {
@@ -534,7 +504,7 @@ class VehicleDGCompatibilityService:
 
     @classmethod
     def _generate_compatibility_recommendations(cls, validation_result: Dict, 
-                                              vehicle: Vehicle, dangerous_items: Optional[models.QuerySet]) -> List[str]:
+                                              vehicle: Vehicle, dangerous_items: Optional[List[ConsignmentItem]]) -> List[str]:
         """Generate recommendations based on validation results."""
         recommendations = []
         
@@ -553,7 +523,7 @@ class VehicleDGCompatibilityService:
             if any('capacity' in warning.lower() for warning in validation_result['warnings']):
                 recommendations.append("Consider using a larger capacity vehicle")
         
-        if dangerous_items and dangerous_items.exists():
+        if dangerous_items:
             recommendations.append("Ensure driver has appropriate dangerous goods training")
             recommendations.append("Verify emergency response procedures are in place")
         
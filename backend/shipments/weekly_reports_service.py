@@ -4,9 +4,10 @@ from django.utils import timezone
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
-from django.db.models import Q, Avg, Count, Case, When, IntegerField, F, FloatField
+from django.db.models import Avg, Count, F, ExpressionWrapper, DurationField
 from django.contrib.auth import get_user_model
 from .models import ShipmentFeedback
+from .feedback_metrics_service import FeedbackMetricsService
 from notifications.notification_preferences import FeedbackNotificationPreference
 from datetime import datetime, timedelta
 import logging
@@ -29,6 +30,10 @@ class WeeklyFeedbackReportService:
         """
         Generate comprehensive weekly feedback report for a company.
         
+        Scores, trends, driver and route figures are read from the daily
+        feedback aggregates; customer and response breakdowns query the
+        period's feedback directly.
+        
         Args:
             company: Company instance
             start_date: Report period start date
@@ -38,44 +43,43 @@ class WeeklyFeedbackReportService:
             Dict containing report data
         """
         try:
-            # Get feedback data for the period
+            start_day, end_day = FeedbackMetricsService.day_range(start_date, end_date)
+            counters = FeedbackMetricsService.company_counters(company, start_day, end_day)
+            
+            # Feedback rows are only needed for breakdowns not kept in the aggregates
             feedback_queryset = ShipmentFeedback.objects.filter(
                 shipment__carrier=company,
                 submitted_at__gte=start_date,
                 submitted_at__lt=end_date
-            ).select_related(
-                'shipment__customer',
-                'shipment__assigned_driver',
-                'responded_by'
             )
             
             # Overall statistics
-            overall_stats = self._calculate_overall_stats(feedback_queryset)
+            overall_stats = self._calculate_overall_stats(counters)
             
             # Performance trends
-            daily_trends = self._calculate_daily_trends(feedback_queryset, start_date, end_date)
+            daily_trends = self._calculate_daily_trends(company, start_date, end_date)
             
             # Driver performance
-            driver_performance = self._calculate_driver_performance(feedback_queryset)
+            driver_performance = self._calculate_driver_performance(company, start_day, end_day)
             
             # Customer satisfaction by customer
             customer_breakdown = self._calculate_customer_breakdown(feedback_queryset)
             
             # Route performance
-            route_performance = self._calculate_route_performance(feedback_queryset)
+            route_performance = self._calculate_route_performance(company, start_day, end_day)
             
             # Manager response statistics
             response_stats = self._calculate_response_stats(feedback_queryset)
             
             # Incidents created from feedback
-            incident_stats = self._calculate_incident_stats(feedback_queryset)
+            incident_stats = self._calculate_incident_stats(counters)
             
             # Performance categories breakdown
-            performance_breakdown = self._calculate_performance_breakdown(feedback_queryset)
+            performance_breakdown = self._calculate_performance_breakdown(counters)
             
             # Previous period comparison
             previous_period_comparison = self._calculate_previous_period_comparison(
-                company, start_date, end_date
+                company, start_date, end_date, current_counters=counters
             )
             
             report_data = {
@@ -108,65 +112,31 @@ class WeeklyFeedbackReportService:
             logger.error(f"Error generating weekly report for {company.name}: {e}")
             return {}
     
-    def _calculate_overall_stats(self, queryset) -> Dict:
-        """Calculate overall statistics for the period."""
-        total_feedback = queryset.count()
-        
-        if total_feedback == 0:
-            return {
-                'total_feedback_count': 0,
-                'average_score': 0,
-                'difot_rate': 0,
-                'on_time_rate': 0,
-                'complete_rate': 0,
-                'professional_rate': 0
-            }
-        
-        # Calculate averages and rates
-        stats = queryset.aggregate(
-            avg_score=Avg(
-                Case(
-                    When(was_on_time=True, was_complete_and_undamaged=True, was_driver_professional=True, then=100),
-                    When(was_on_time=True, was_complete_and_undamaged=True, then=67),
-                    When(was_on_time=True, was_driver_professional=True, then=67),
-                    When(was_complete_and_undamaged=True, was_driver_professional=True, then=67),
-                    When(was_on_time=True, then=33),
-                    When(was_complete_and_undamaged=True, then=33),
-                    When(was_driver_professional=True, then=33),
-                    default=0,
-                    output_field=FloatField()
-                )
-            ),
-            on_time_count=Count(Case(When(was_on_time=True, then=1), output_field=IntegerField())),
-            complete_count=Count(Case(When(was_complete_and_undamaged=True, then=1), output_field=IntegerField())),
-            professional_count=Count(Case(When(was_driver_professional=True, then=1), output_field=IntegerField())),
-            difot_count=Count(Case(
-                When(was_on_time=True, was_complete_and_undamaged=True, then=1),
-                output_field=IntegerField()
-            ))
-        )
+    def _calculate_overall_stats(self, counters: Dict) -> Dict:
+        """Calculate overall statistics from aggregate counters."""
+        rates = FeedbackMetricsService.rates(counters)
         
         return {
-            'total_feedback_count': total_feedback,
-            'average_score': round(stats['avg_score'] or 0, 1),
-            'difot_rate': round((stats['difot_count'] / total_feedback) * 100, 1),
-            'on_time_rate': round((stats['on_time_count'] / total_feedback) * 100, 1),
-            'complete_rate': round((stats['complete_count'] / total_feedback) * 100, 1),
-            'professional_rate': round((stats['professional_count'] / total_feedback) * 100, 1)
+            'total_feedback_count': rates['total_feedback_count'],
+            'average_score': rates['average_score'],
+            'difot_rate': rates['difot_rate'],
+            'on_time_rate': rates['on_time_rate'],
+            'complete_rate': rates['complete_rate'],
+            'professional_rate': rates['professional_rate']
         }
     
-    def _calculate_daily_trends(self, queryset, start_date: datetime, end_date: datetime) -> List[Dict]:
+    def _calculate_daily_trends(self, company, start_date: datetime, end_date: datetime) -> List[Dict]:
         """Calculate daily performance trends."""
+        daily_counters = FeedbackMetricsService.company_daily_counters(
+            company, start_date.date(), end_date.date()
+        )
+        
         daily_data = []
         current_date = start_date.date()
         end_date_only = end_date.date()
         
         while current_date < end_date_only:
-            day_feedback = queryset.filter(
-                submitted_at__date=current_date
-            )
-            
-            day_stats = self._calculate_overall_stats(day_feedback)
+            day_stats = self._calculate_overall_stats(daily_counters.get(current_date, {}))
             day_stats['date'] = current_date.isoformat()
             day_stats['day_name'] = current_date.strftime('%A')
             
@@ -175,62 +145,26 @@ class WeeklyFeedbackReportService:
         
         return daily_data
     
-    def _calculate_driver_performance(self, queryset) -> List[Dict]:
+    def _calculate_driver_performance(self, company, start_day, end_day) -> List[Dict]:
         """Calculate performance statistics by driver."""
-        driver_stats = queryset.values(
-            'shipment__assigned_driver__id',
-            'shipment__assigned_driver__first_name',
-            'shipment__assigned_driver__last_name'
-        ).annotate(
-            feedback_count=Count('id'),
-            avg_score=Avg(
-                Case(
-                    When(was_on_time=True, was_complete_and_undamaged=True, was_driver_professional=True, then=100),
-                    When(was_on_time=True, was_complete_and_undamaged=True, then=67),
-                    When(was_on_time=True, was_driver_professional=True, then=67),
-                    When(was_complete_and_undamaged=True, was_driver_professional=True, then=67),
-                    When(was_on_time=True, then=33),
-                    When(was_complete_and_undamaged=True, then=33),
-                    When(was_driver_professional=True, then=33),
-                    default=0,
-                    output_field=FloatField()
-                )
-            ),
-            difot_rate=Avg(
-                Case(
-                    When(was_on_time=True, was_complete_and_undamaged=True, then=100),
-                    default=0,
-                    output_field=FloatField()
-                )
-            ),
-            excellent_count=Count(Case(
-                When(was_on_time=True, was_complete_and_undamaged=True, was_driver_professional=True, then=1),
-                output_field=IntegerField()
-            )),
-            poor_count=Count(Case(
-                When(was_on_time=False, was_complete_and_undamaged=False, then=1),
-                When(was_on_time=False, was_driver_professional=False, then=1),
-                When(was_complete_and_undamaged=False, was_driver_professional=False, then=1),
-                output_field=IntegerField()
-            ))
-        ).filter(
-            shipment__assigned_driver__isnull=False
-        ).order_by('-avg_score')
-        
         driver_performance = []
-        for driver in driver_stats:
-            if driver['feedback_count'] > 0:
-                driver_performance.append({
-                    'driver_id': driver['shipment__assigned_driver__id'],
-                    'driver_name': f"{driver['shipment__assigned_driver__first_name']} {driver['shipment__assigned_driver__last_name']}".strip(),
-                    'feedback_count': driver['feedback_count'],
-                    'average_score': round(driver['avg_score'] or 0, 1),
-                    'difot_rate': round(driver['difot_rate'] or 0, 1),
-                    'excellent_count': driver['excellent_count'],
-                    'poor_count': driver['poor_count'],
-                    'performance_category': self._get_performance_category(driver['avg_score'] or 0)
-                })
+        for driver in FeedbackMetricsService.driver_counters(company, start_day, end_day):
+            if not driver['feedback_count']:
+                continue
+            
+            rates = FeedbackMetricsService.rates(driver)
+            driver_performance.append({
+                'driver_id': driver['driver_id'],
+                'driver_name': f"{driver['driver__first_name']} {driver['driver__last_name']}".strip(),
+                'feedback_count': driver['feedback_count'],
+                'average_score': rates['average_score'],
+                'difot_rate': rates['difot_rate'],
+                'excellent_count': driver['excellent_count'],
+                'poor_count': driver['incident_count'],
+                'performance_category': self._get_performance_category(rates['average_score'])
+            })
         
+        driver_performance.sort(key=lambda driver: driver['average_score'], reverse=True)
         return driver_performance
     
     def _calculate_customer_breakdown(self, queryset) -> List[Dict]:
@@ -240,19 +174,7 @@ class WeeklyFeedbackReportService:
             'shipment__customer__name'
         ).annotate(
             feedback_count=Count('id'),
-            avg_score=Avg(
-                Case(
-                    When(was_on_time=True, was_complete_and_undamaged=True, was_driver_professional=True, then=100),
-                    When(was_on_time=True, was_complete_and_undamaged=True, then=67),
-                    When(was_on_time=True, was_driver_professional=True, then=67),
-                    When(was_complete_and_undamaged=True, was_driver_professional=True, then=67),
-                    When(was_on_time=True, then=33),
-                    When(was_complete_and_undamaged=True, then=33),
-                    When(was_driver_professional=True, then=33),
-                    default=0,
-                    output_field=FloatField()
-                )
-            )
+            avg_score=Avg('delivery_success_score')
         ).order_by('-avg_score')
         
         customer_breakdown = []
@@ -268,44 +190,25 @@ class WeeklyFeedbackReportService:
         
         return customer_breakdown
     
-    def _calculate_route_performance(self, queryset) -> List[Dict]:
+    def _calculate_route_performance(self, company, start_day, end_day) -> List[Dict]:
         """Calculate performance by route (origin-destination pairs)."""
-        route_stats = queryset.values(
-            'shipment__origin_location',
-            'shipment__destination_location'
-        ).annotate(
-            feedback_count=Count('id'),
-            avg_score=Avg(
-                Case(
-                    When(was_on_time=True, was_complete_and_undamaged=True, was_driver_professional=True, then=100),
-                    When(was_on_time=True, was_complete_and_undamaged=True, then=67),
-                    When(was_on_time=True, was_driver_professional=True, then=67),
-                    When(was_complete_and_undamaged=True, was_driver_professional=True, then=67),
-                    When(was_on_time=True, then=33),
-                    When(was_complete_and_undamaged=True, then=33),
-                    When(was_driver_professional=True, then=33),
-                    default=0,
-                    output_field=FloatField()
-                )
-            ),
-            on_time_rate=Avg(
-                Case(When(was_on_time=True, then=100), default=0, output_field=FloatField())
-            )
-        ).filter(
-            feedback_count__gte=2  # Only include routes with at least 2 feedback entries
-        ).order_by('-avg_score')
-        
         route_performance = []
-        for route in route_stats:
+        for route in FeedbackMetricsService.route_counters(company, start_day, end_day):
+            # Only include routes with at least 2 feedback entries
+            if route['feedback_count'] < 2:
+                continue
+            
+            rates = FeedbackMetricsService.rates(route)
             route_performance.append({
-                'route': f"{route['shipment__origin_location']} → {route['shipment__destination_location']}",
-                'origin': route['shipment__origin_location'],
-                'destination': route['shipment__destination_location'],
+                'route': f"{route['origin_location']} → {route['destination_location']}",
+                'origin': route['origin_location'],
+                'destination': route['destination_location'],
                 'feedback_count': route['feedback_count'],
-                'average_score': round(route['avg_score'] or 0, 1),
-                'on_time_rate': round(route['on_time_rate'] or 0, 1)
+                'average_score': rates['average_score'],
+                'on_time_rate': rates['on_time_rate']
             })
         
+        route_performance.sort(key=lambda route: route['average_score'], reverse=True)
         return route_performance
     
     def _calculate_response_stats(self, queryset) -> Dict:
@@ -321,47 +224,30 @@ class WeeklyFeedbackReportService:
                 'avg_response_time_hours': 0
             }
         
-        # Calculate average response time
-        responded_queryset = queryset.filter(
+        # Calculate average response time in the database
+        avg_response_time = queryset.filter(
             manager_response__isnull=False,
             responded_at__isnull=False
-        )
-        
-        response_times = []
-        for feedback in responded_queryset:
-            if feedback.responded_at and feedback.submitted_at:
-                time_diff = feedback.responded_at - feedback.submitted_at
-                response_times.append(time_diff.total_seconds() / 3600)  # Convert to hours
-        
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+        ).aggregate(
+            avg_response=Avg(
+                ExpressionWrapper(F('responded_at') - F('submitted_at'), output_field=DurationField())
+            )
+        )['avg_response']
         
         return {
             'total_feedback': total_feedback,
             'responded_count': responded_feedback,
             'response_rate': round((responded_feedback / total_feedback) * 100, 1),
-            'avg_response_time_hours': round(avg_response_time, 1)
+            'avg_response_time_hours': round(avg_response_time.total_seconds() / 3600, 1) if avg_response_time else 0
         }
     
-    def _calculate_incident_stats(self, queryset) -> Dict:
+    def _calculate_incident_stats(self, counters: Dict) -> Dict:
         """Calculate incident creation statistics."""
-        total_feedback = queryset.count()
-        poor_feedback = queryset.filter(
-            Q(was_on_time=False) | Q(was_complete_and_undamaged=False) | Q(was_driver_professional=False)
-        ).count()
-        
-        # Calculate feedback that would trigger incidents (< 67%)
-        incident_threshold_feedback = 0
-        for feedback in queryset:
-            score = 0
-            if feedback.was_on_time:
-                score += 33.33
-            if feedback.was_complete_and_undamaged:
-                score += 33.33
-            if feedback.was_driver_professional:
-                score += 33.33
-            
-            if score < 67:
-                incident_threshold_feedback += 1
+        total_feedback = counters.get('feedback_count') or 0
+        # Any negative answer; only a perfect score has none
+        poor_feedback = total_feedback - (counters.get('excellent_count') or 0)
+        # Feedback that would trigger incidents (< 67%)
+        incident_threshold_feedback = counters.get('incident_count') or 0
         
         return {
             'total_feedback': total_feedback,
@@ -370,79 +256,46 @@ class WeeklyFeedbackReportService:
             'incident_rate': round((incident_threshold_feedback / total_feedback) * 100, 1) if total_feedback > 0 else 0
         }
     
-    def _calculate_performance_breakdown(self, queryset) -> Dict:
+    def _calculate_performance_breakdown(self, counters: Dict) -> Dict:
         """Calculate breakdown by performance categories."""
-        total_feedback = queryset.count()
-        
-        if total_feedback == 0:
-            return {
-                'excellent': {'count': 0, 'percentage': 0},
-                'good': {'count': 0, 'percentage': 0},
-                'needs_improvement': {'count': 0, 'percentage': 0},
-                'poor': {'count': 0, 'percentage': 0}
-            }
-        
-        categories = {'excellent': 0, 'good': 0, 'needs_improvement': 0, 'poor': 0}
+        rates = FeedbackMetricsService.rates(counters)
+        total_feedback = rates['total_feedback_count']
         
-        for feedback in queryset:
-            score = 0
-            if feedback.was_on_time:
-                score += 33.33
-            if feedback.was_complete_and_undamaged:
-                score += 33.33
-            if feedback.was_driver_professional:
-                score += 33.33
-            
-            if score > 95:
-                categories['excellent'] += 1
-            elif score >= 85:
-                categories['good'] += 1
-            elif score >= 70:
-                categories['needs_improvement'] += 1
-            else:
-                categories['poor'] += 1
+        categories = {
+            'excellent': rates['excellent_count'],
+            'good': rates['good_count'],
+            'needs_improvement': rates['needs_improvement_count'],
+            'poor': rates['poor_count'],
+        }
         
         return {
-            'excellent': {
-                'count': categories['excellent'],
-                'percentage': round((categories['excellent'] / total_feedback) * 100, 1)
-            },
-            'good': {
-                'count': categories['good'],
-                'percentage': round((categories['good'] / total_feedback) * 100, 1)
-            },
-            'needs_improvement': {
-                'count': categories['needs_improvement'],
-                'percentage': round((categories['needs_improvement'] / total_feedback) * 100, 1)
-            },
-            'poor': {
-                'count': categories['poor'],
-                'percentage': round((categories['poor'] / total_feedback) * 100, 1)
+            name: {
+                'count': count,
+                'percentage': round((count / total_feedback) * 100, 1) if total_feedback else 0
             }
+            for name, count in categories.items()
         }
     
-    def _calculate_previous_period_comparison(self, company, start_date: datetime, end_date: datetime) -> Dict:
+    def _calculate_previous_period_comparison(self, company, start_date: datetime, end_date: datetime,
+                                              current_counters: Optional[Dict] = None) -> Dict:
         """Calculate comparison with previous period."""
         try:
             period_length = end_date - start_date
             previous_start = start_date - period_length
             previous_end = start_date
             
-            previous_feedback = ShipmentFeedback.objects.filter(
-                shipment__carrier=company,
-                submitted_at__gte=previous_start,
-                submitted_at__lt=previous_end
+            previous_stats = self._calculate_overall_stats(
+                FeedbackMetricsService.company_counters(
+                    company, *FeedbackMetricsService.day_range(previous_start, previous_end)
+                )
             )
             
-            previous_stats = self._calculate_overall_stats(previous_feedback)
-            
             # Calculate current period stats for comparison
-            current_feedback = ShipmentFeedback.objects.filter(
-                shipment__carrier=company,
-                submitted_at__gte=start_date,
-                submitted_at__lt=end_date
-            )
-            current_stats = self._calculate_overall_stats(current_feedback)
+            if current_counters is None:
+                current_counters = FeedbackMetricsService.company_counters(
+                    company, *FeedbackMetricsService.day_range(start_date, end_date)
+                )
+            current_stats = self._calculate_overall_stats(current_counters)
             
             return {
                 'previous_period': previous_stats,
@@ -17,6 +17,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_datetime
+from shared.pagination import KeysetPagination
 from vehicles.models import Vehicle
 from tracking.models import GPSEvent
 from tracking.services.map_performance import map_performance_service
@@ -383,8 +386,7 @@ def invalidate_map_cache(request):
             )
         else:
             # Invalidate all cache for company
-            company_id = data.get('company_id')
-            # This would implement broader invalidation
+            redis_map_cache.invalidate_company(data.get('company_id'))
             
         return Response({'message': 'Cache invalidated successfully'})
     
@@ -416,4 +418,68 @@ def map_performance_stats(request):
         return Response(
             {'error': 'Internal server error'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+class GPSHistoryPagination(KeysetPagination):
+    """GPS history is only paged by keyset: vehicles log hundreds of thousands of events"""
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
+    allow_page_numbers = False
+    keyset_ordering = ['-timestamp', '-id']
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vehicle_gps_history(request, vehicle_id):
+    """
+    Get a vehicle's GPS events, newest first, paged by cursor.
+    
+    Query parameters:
+    - start, end: optional ISO 8601 timestamps bounding the history
+    - cursor: from the next/previous links of a previous page
+    - page_size: events per page (max 5000)
+    - count=estimate: include an estimated total
+    """
+    vehicle = get_object_or_404(Vehicle, id=vehicle_id)
+    user_company = getattr(request.user, 'company', None)
+    if not request.user.is_staff and user_company and vehicle.owning_company_id != user_company.id:
+        return Response(
+            {'error': 'Insufficient permissions'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    events = GPSEvent.objects.filter(vehicle=vehicle)
+    for param, lookup in (('start', 'timestamp__gte'), ('end', 'timestamp__lte')):
+        value = request.GET.get(param)
+        if value:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return Response(
+                    {'error': f'Invalid {param} timestamp'}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            events = events.filter(**{lookup: parsed})
+    
+    paginator = GPSHistoryPagination()
+    page = paginator.paginate_queryset(
+        events.only(
+            'id', 'timestamp', 'latitude', 'longitude', 'speed', 'heading', 'accuracy', 'source', 'shipment_id'
+        ),
+        request
+    )
+    return paginator.get_paginated_response([
+        {
+            'id': str(event.id),
+            'timestamp': event.timestamp.isoformat(),
+            'latitude': event.latitude,
+            'longitude': event.longitude,
+            'speed': event.speed,
+            'heading': event.heading,
+            'accuracy': event.accuracy,
+            'source': event.source,
+            'shipment_id': str(event.shipment_id) if event.shipment_id else None,
+        }
+        for event in page
+    ])
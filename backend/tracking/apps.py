@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TrackingConfig(AppConfig):
@@ -16,13 +17,11 @@ class TrackingConfig(AppConfig):
         except ImportError:
             pass
         
-        # Register periodic tasks if Celery is available
-        try:
-            self._setup_periodic_tasks()
-        except ImportError:
-            pass
+        # Register periodic tasks after migrations rather than on every boot,
+        # so web and worker startup never touches the database here
+        post_migrate.connect(self._setup_periodic_tasks, sender=self)
     
-    def _setup_periodic_tasks(self):
+    def _setup_periodic_tasks(self, **kwargs):
         """
         Set up periodic tasks for spatial indexing maintenance.
         """
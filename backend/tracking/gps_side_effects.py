@@ -0,0 +1,190 @@
+"""
+Coalesced side effects of GPS pings.
+
+Every saved GPSEvent used to update its Vehicle row, invalidate the map
+cache around it, enqueue a geofence check and look at materialized view
+staleness. With thousands of vehicles pinging every few seconds most of
+that work is redundant, so pings are now buffered per vehicle and time
+window in the shared cache, and applied once per window:
+
+- one bulk UPDATE of last known locations, for vehicles whose latest ping
+  is newer than their stored location
+- one map cache invalidation covering every region touched in the window
+- one geofence check task per batch of vehicles, on each vehicle's latest ping
+- one materialized view staleness check
+
+The first ping of a window schedules flush_gps_side_effects to run once the
+window closes, so a window costs one Celery message however many pings it
+holds. A ping costs two or three cache operations. If scheduling fails,
+the next ping in the window sees no pending flush and tries again. With
+GPS_SIDE_EFFECT_WINDOW_SECONDS set to 0, each ping's side effects are
+applied after its transaction commits, as before.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'gps_side_effects'
+DEFAULT_WINDOW_SECONDS = 10
+# Pings commit shortly after the window closes; give them time to register
+FLUSH_GRACE_SECONDS = 2
+GEOFENCE_BATCH_SIZE = 500
+# Stored locations within this radius of a ping are invalidated
+INVALIDATION_RADIUS_KM = 2.0
+
+
+def window_seconds() -> int:
+    return getattr(settings, 'GPS_SIDE_EFFECT_WINDOW_SECONDS', DEFAULT_WINDOW_SECONDS)
+
+
+def _window_key(window: int, kind: str, suffix: Any = '') -> str:
+    return f"{CACHE_PREFIX}:{window}:{kind}:{suffix}"
+
+
+def _ping(gps_event) -> Dict[str, Any]:
+    return {
+        'event_id': str(gps_event.id),
+        'vehicle_id': gps_event.vehicle_id,
+        'latitude': gps_event.latitude,
+        'longitude': gps_event.longitude,
+        'timestamp': gps_event.timestamp,
+    }
+
+
+def record_gps_event(gps_event):
+    """Queue a saved GPS event's side effects once its transaction commits"""
+    ping = _ping(gps_event)
+    transaction.on_commit(lambda: _buffer_ping(ping))
+
+
+def _buffer_ping(ping: Dict[str, Any]):
+    width = window_seconds()
+    if width <= 0:
+        apply_side_effects([ping])
+        return
+
+    now = time.time()
+    window = int(now // width)
+    ttl = width * 3 + FLUSH_GRACE_SECONDS + 60
+    vehicle_key = _window_key(window, 'vehicle', ping['vehicle_id'])
+
+    flush_key = _window_key(window, 'flush')
+    countdown = (window + 1) * width - now + FLUSH_GRACE_SECONDS
+
+    try:
+        if cache.add(vehicle_key, ping, ttl):
+            # First ping of this vehicle in the window: add it to the window's members
+            cache.add(_window_key(window, 'count'), 0, ttl)
+            index = cache.incr(_window_key(window, 'count'))
+            cache.set(_window_key(window, 'member', index), ping['vehicle_id'], ttl)
+            if index == 1 or cache.get(flush_key) is None:
+                _schedule_flush(window, countdown, flush_key, ttl)
+            return
+
+        found = cache.get_many([vehicle_key, flush_key])
+        latest = found.get(vehicle_key)
+        if latest is None or ping['timestamp'] >= latest['timestamp']:
+            cache.set(vehicle_key, ping, ttl)
+        if flush_key not in found:
+            _schedule_flush(window, countdown, flush_key, ttl)
+
+    except Exception as e:
+        # Without a shared cache there is nothing to coalesce on
+        logger.warning(f"GPS side effect buffering failed, applying inline: {e}")
+        apply_side_effects([ping])
+
+
+def _schedule_flush(window: int, countdown: float, flush_key: str, ttl: int):
+    """Schedule the window's flush unless another ping already has"""
+    from .tasks import flush_gps_side_effects
+
+    if not cache.add(flush_key, True, ttl):
+        return
+    try:
+        flush_gps_side_effects.apply_async(args=[window], countdown=max(0.0, countdown))
+    except Exception:
+        # Leave the window without a pending flush so the next ping retries
+        cache.delete(flush_key)
+        raise
+
+
+def flush_window(window: int) -> Dict[str, int]:
+    """Apply the buffered side effects of one window and drop its buffer"""
+    count = cache.get(_window_key(window, 'count')) or 0
+    member_keys = [_window_key(window, 'member', index) for index in range(1, count + 1)]
+    vehicle_ids = cache.get_many(member_keys).values()
+    vehicle_keys = [_window_key(window, 'vehicle', vehicle_id) for vehicle_id in vehicle_ids]
+    pings = list(cache.get_many(vehicle_keys).values())
+
+    result = apply_side_effects(pings)
+    cache.delete_many(member_keys + vehicle_keys + [_window_key(window, 'count'), _window_key(window, 'flush')])
+    return result
+
+
+def apply_side_effects(pings: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Update last known locations, invalidate map cache regions, queue
+    geofence checks and check view staleness for each vehicle's latest ping.
+    """
+    from vehicles.models import Vehicle
+    from .signals import invalidate_map_cache_for_locations, trigger_conditional_view_refresh
+    from .tasks import check_geofence_intersections_batch
+
+    latest: Dict[Any, Dict[str, Any]] = {}
+    for ping in pings:
+        current = latest.get(ping['vehicle_id'])
+        if current is None or ping['timestamp'] >= current['timestamp']:
+            latest[ping['vehicle_id']] = ping
+    if not latest:
+        return {'vehicles': 0, 'locations_updated': 0, 'regions_invalidated': 0}
+
+    vehicles = Vehicle.objects.only(
+        'id', 'owning_company_id', 'last_known_location_lat', 'last_known_location_lng', 'last_reported_at'
+    ).in_bulk(list(latest))
+
+    now = timezone.now()
+    updated: List[Vehicle] = []
+    locations = []
+    for vehicle_id, ping in latest.items():
+        vehicle = vehicles.get(vehicle_id)
+        if vehicle is None:
+            continue
+        locations.append((ping['latitude'], ping['longitude'], vehicle.owning_company_id))
+        if vehicle.last_reported_at and ping['timestamp'] <= vehicle.last_reported_at:
+            continue
+        if vehicle.last_known_location_lat is not None and vehicle.last_known_location_lng is not None:
+            locations.append((vehicle.last_known_location_lat, vehicle.last_known_location_lng,
+                              vehicle.owning_company_id))
+        vehicle.last_known_location_lat = ping['latitude']
+        vehicle.last_known_location_lng = ping['longitude']
+        vehicle.last_reported_at = ping['timestamp']
+        vehicle.updated_at = now
+        updated.append(vehicle)
+
+    Vehicle.objects.bulk_update(
+        updated,
+        ['last_known_location_lat', 'last_known_location_lng', 'last_reported_at', 'updated_at'],
+        batch_size=GEOFENCE_BATCH_SIZE
+    )
+
+    regions = invalidate_map_cache_for_locations(locations, radius_km=INVALIDATION_RADIUS_KM)
+
+    event_ids = [latest[vehicle_id]['event_id'] for vehicle_id in latest if vehicle_id in vehicles]
+    for start in range(0, len(event_ids), GEOFENCE_BATCH_SIZE):
+        check_geofence_intersections_batch.delay(event_ids[start:start + GEOFENCE_BATCH_SIZE])
+
+    trigger_conditional_view_refresh()
+
+    return {
+        'vehicles': len(vehicles),
+        'locations_updated': len(updated),
+        'regions_invalidated': regions,
+    }
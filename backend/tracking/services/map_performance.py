@@ -17,9 +17,12 @@ from django.utils import timezone
 from vehicles.models import Vehicle
 from tracking.models import GPSEvent
 from locations.models import GeoLocation
+from shared.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+fleet_data_flight = SingleFlight('map_fleet_data', wait_timeout=5.0)
+
 
 @dataclass
 class BoundingBox:
@@ -114,6 +117,7 @@ class MapPerformanceService:
     CLUSTER_CACHE_TTL = 60      # 1 minute for cluster data
     INDIVIDUAL_CACHE_TTL = 30   # 30 seconds for individual vehicles
     BOUNDS_CACHE_TTL = 300      # 5 minutes for fleet bounds
+    STALE_SERVE_TTL = 30        # Serve a previous snapshot this long while it is rebuilt
     
     def __init__(self):
         self.cache_prefix = "map_perf"
@@ -136,40 +140,34 @@ class MapPerformanceService:
             Dictionary containing GeoJSON features and metadata
         """
         cache_key = bounds.cache_key(zoom, company_id)
+        clustered = zoom < self.CLUSTER_ZOOM_THRESHOLD
+        cache_ttl = self.CLUSTER_CACHE_TTL if clustered else self.INDIVIDUAL_CACHE_TTL
         
-        # Try to get cached data first
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            logger.debug(f"Cache hit for map data: {cache_key}")
-            return cached_data
-        
-        # Determine display mode based on zoom level
-        if zoom < self.CLUSTER_ZOOM_THRESHOLD:
-            data = self._get_clustered_data(bounds, zoom, company_id)
-            cache_ttl = self.CLUSTER_CACHE_TTL
-        else:
-            data = self._get_individual_data(bounds, zoom, company_id)
-            cache_ttl = self.INDIVIDUAL_CACHE_TTL
-        
-        # Add metadata
-        result = {
-            "type": "FeatureCollection",
-            "features": data,
-            "metadata": {
-                "zoom_level": zoom,
-                "display_mode": "clustered" if zoom < self.CLUSTER_ZOOM_THRESHOLD else "individual",
-                "bounds": asdict(bounds),
-                "generated_at": timezone.now().isoformat(),
-                "cache_ttl": cache_ttl,
-                "feature_count": len(data)
+        def build_fleet_data():
+            # Determine display mode based on zoom level
+            if clustered:
+                data = self._get_clustered_data(bounds, zoom, company_id)
+            else:
+                data = self._get_individual_data(bounds, zoom, company_id)
+            
+            logger.info(f"Generated map data: {cache_key} ({len(data)} features)")
+            return {
+                "type": "FeatureCollection",
+                "features": data,
+                "metadata": {
+                    "zoom_level": zoom,
+                    "display_mode": "clustered" if clustered else "individual",
+                    "bounds": asdict(bounds),
+                    "generated_at": timezone.now().isoformat(),
+                    "cache_ttl": cache_ttl,
+                    "feature_count": len(data)
+                }
             }
-        }
         
-        # Cache the result
-        cache.set(cache_key, result, cache_ttl)
-        logger.info(f"Generated and cached map data: {cache_key} ({len(data)} features)")
-        
-        return result
+        # One worker rebuilds an expired viewport; the rest wait or get the previous snapshot
+        return fleet_data_flight.get_or_compute(
+            cache_key, build_fleet_data, ttl=cache_ttl, stale_ttl=self.STALE_SERVE_TTL
+        )
     
     def _get_clustered_data(
         self, 
@@ -299,8 +297,7 @@ class MapPerformanceService:
         if bounds:
             # Invalidate specific viewport caches
             for zoom in range(5, 19):  # Common zoom range
-                cache_key = bounds.cache_key(zoom, company_id)
-                cache.delete(cache_key)
+                fleet_data_flight.delete(bounds.cache_key(zoom, company_id))
         else:
             # Invalidate all map caches for company
             pattern = f"{self.cache_prefix}:*"
@@ -316,7 +313,8 @@ class MapPerformanceService:
             "cache_implementation": "django_cache",
             "hit_rate_estimate": "85%",  # Would be calculated from actual metrics
             "total_keys": "unknown",     # Would query Redis
-            "memory_usage": "unknown"    # Would query Redis
+            "memory_usage": "unknown",   # Would query Redis
+            "single_flight": fleet_data_flight.stats()
         }
 
 
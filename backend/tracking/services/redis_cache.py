@@ -7,13 +7,15 @@ import json
 import hashlib
 import logging
 import pickle
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterable, List, Optional, Any, Union, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from django.conf import settings
 from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
 
+from shared.tiered_cache import TagGenerations
+
 try:
     import redis
     from rediscluster import RedisCluster
@@ -91,10 +93,16 @@ class RedisMapCache:
     Enterprise Redis caching system for map data with geographic clustering.
     """
     
+    # Geohash prefix length used as the regional invalidation tag
+    REGION_TAG_PRECISION = 4
+    
     def __init__(self):
         self.enabled = REDIS_AVAILABLE and hasattr(settings, 'REDIS_CLUSTER_CONFIG')
         self.cluster = None
         self.fallback_cache = cache  # Django default cache as fallback
+        # Generation counters for region/company tags; invalidation bumps a
+        # counter instead of scanning the keyspace
+        self.generations = TagGenerations('map_data', cache)
         
         if self.enabled:
             self._initialize_cluster()
@@ -157,6 +165,28 @@ class RedisMapCache:
         
         return ":".join(parts)
     
+    def _region_tags(self, geo_hash: str, company_id: Optional[int]) -> List[str]:
+        """Invalidation tags for a map data entry."""
+        region = geo_hash[:self.REGION_TAG_PRECISION]
+        company = company_id or 'all'
+        return ['*', f"geo:{region}", f"company:{company}", f"geo:{region}:company:{company}"]
+    
+    def _map_data_key(self, bounds: Dict[str, float], zoom: int, company_id: Optional[int]) -> str:
+        """Versioned cache key for map data within bounds."""
+        center_lat = (bounds['min_lat'] + bounds['max_lat']) / 2
+        center_lng = (bounds['min_lng'] + bounds['max_lng']) / 2
+        
+        geo_hash = GeographicHashStrategy.get_geo_hash(center_lat, center_lng)
+        
+        return self._get_cache_key(
+            "map_data",
+            geo_hash,
+            zoom=zoom,
+            company=company_id,
+            bounds=f"{bounds['min_lat']:.4f},{bounds['min_lng']:.4f},{bounds['max_lat']:.4f},{bounds['max_lng']:.4f}",
+            v=self.generations.token(self._region_tags(geo_hash, company_id))
+        )
+    
     def _serialize_data(self, data: Any) -> str:
         """Serialize data for Redis storage."""
         try:
@@ -204,14 +234,7 @@ class RedisMapCache:
             center_lng = (bounds['min_lng'] + bounds['max_lng']) / 2
             
             geo_hash = GeographicHashStrategy.get_geo_hash(center_lat, center_lng)
-            
-            cache_key = self._get_cache_key(
-                "map_data",
-                geo_hash,
-                zoom=zoom,
-                company=company_id,
-                bounds=f"{bounds['min_lat']:.4f},{bounds['min_lng']:.4f},{bounds['max_lat']:.4f},{bounds['max_lng']:.4f}"
-            )
+            cache_key = self._map_data_key(bounds, zoom, company_id)
             
             serialized_data = self._serialize_data(data)
             
@@ -254,18 +277,7 @@ class RedisMapCache:
             Cached data or None if not found
         """
         try:
-            center_lat = (bounds['min_lat'] + bounds['max_lat']) / 2
-            center_lng = (bounds['min_lng'] + bounds['max_lng']) / 2
-            
-            geo_hash = GeographicHashStrategy.get_geo_hash(center_lat, center_lng)
-            
-            cache_key = self._get_cache_key(
-                "map_data",
-                geo_hash,
-                zoom=zoom,
-                company=company_id,
-                bounds=f"{bounds['min_lat']:.4f},{bounds['min_lng']:.4f},{bounds['max_lat']:.4f},{bounds['max_lng']:.4f}"
-            )
+            cache_key = self._map_data_key(bounds, zoom, company_id)
             
             if self.enabled and self.cluster:
                 cached_data = self.cluster.get(cache_key)
@@ -297,27 +309,56 @@ class RedisMapCache:
             company_id: Optional company filter
         """
         try:
-            # Generate geohashes for the region
-            geo_hashes = self._get_region_geohashes(center_lat, center_lng, radius_km)
-            
-            if self.enabled and self.cluster:
-                # Find and delete all keys matching the region
-                for geo_hash in geo_hashes:
-                    pattern = f"safeshipper:map_data:{geo_hash}*"
-                    if company_id:
-                        pattern += f"*company:{company_id}*"
-                    
-                    # Use SCAN to find matching keys
-                    for key in self.cluster.scan_iter(match=pattern):
-                        self.cluster.delete(key)
-                        # Also delete metadata
-                        self.cluster.delete(f"{key}:meta")
+            # Bump the region tags; entries keyed with the old generation
+            # are orphaned and expire with their TTL
+            self.generations.bump(self._region_invalidation_tags(center_lat, center_lng, radius_km, company_id))
             
             logger.info(f"Invalidated cache region: {center_lat}, {center_lng} ({radius_km}km)")
             
         except Exception as e:
             logger.error(f"Failed to invalidate cache region: {e}")
     
+    def invalidate_regions(
+        self,
+        locations: Iterable[Tuple[float, float, Optional[int]]],
+        radius_km: float = 10
+    ) -> int:
+        """
+        Invalidate the regions around many (lat, lng, company_id) locations
+        with a single generation bump. Nearby locations share region tags,
+        so each region is bumped once. Returns the number of tags bumped.
+        """
+        try:
+            tags = set()
+            for lat, lng, company_id in locations:
+                tags.update(self._region_invalidation_tags(lat, lng, radius_km, company_id))
+            if tags:
+                self.generations.bump(tags)
+            
+            logger.debug(f"Invalidated {len(tags)} cache region tags")
+            return len(tags)
+            
+        except Exception as e:
+            logger.error(f"Failed to invalidate cache regions: {e}")
+            return 0
+    
+    def _region_invalidation_tags(
+        self,
+        center_lat: float,
+        center_lng: float,
+        radius_km: float,
+        company_id: Optional[int] = None
+    ) -> List[str]:
+        geo_hashes = self._get_region_geohashes(center_lat, center_lng, radius_km)
+        if company_id:
+            return [f"geo:{geo_hash}:company:{company_id}" for geo_hash in geo_hashes]
+        return [f"geo:{geo_hash}" for geo_hash in geo_hashes]
+    
+    def invalidate_company(self, company_id: Optional[int] = None):
+        """Invalidate all cached map data for a company, or everything when no company is given."""
+        self.generations.bump([f"company:{company_id}"] if company_id else ['*'])
+        logger.info(f"Invalidated map cache for company {company_id or 'all'}")
+    
     def _get_region_geohashes(
         self, 
         center_lat: float, 
@@ -344,8 +385,8 @@ class RedisMapCache:
             lat = min_lat + (lat_step / lat_steps) * (max_lat - min_lat)
             for lng_step in range(lng_steps + 1):
                 lng = min_lng + (lng_step / lng_steps) * (max_lng - min_lng)
-                geohash = GeographicHashStrategy.get_geo_hash(lat, lng, precision=4)
-                geohashes.add(geohash[:4])  # Use 4-character prefix for broader coverage
+                geohash = GeographicHashStrategy.get_geo_hash(lat, lng, precision=self.REGION_TAG_PRECISION)
+                geohashes.add(geohash)  # 4-character prefix for broader coverage
         
         return list(geohashes)
     
@@ -462,4 +503,4 @@ class TileCache:
 
 # Global cache instances
 redis_map_cache = RedisMapCache()
-tile_cache = TileCache(redis_map_cache)
\ No newline at end of file
+tile_cache = TileCache(redis_map_cache)
\ No newline at end of file
@@ -10,9 +10,10 @@ from django.db import connection
 from django.utils import timezone
 from datetime import timedelta
 import logging
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
 from .models import GPSEvent, LocationVisit
+from .gps_side_effects import record_gps_event
 from vehicles.models import Vehicle
 from locations.models import GeoLocation
 from .services.redis_cache import redis_map_cache
@@ -26,37 +27,15 @@ def handle_gps_event_created(sender, instance, created, **kwargs):
     """
     Handle GPS event creation for real-time optimizations.
     
-    This signal:
-    1. Updates vehicle last known location
-    2. Invalidates relevant map cache regions
-    3. Triggers materialized view refresh if needed
-    4. Updates geofence intersection status
+    The vehicle's last known location, map cache invalidation, geofence
+    check and materialized view refresh are coalesced per vehicle and time
+    window rather than run for every ping (see gps_side_effects.py).
     """
-    if not created or not instance.coordinates:
+    if not created or instance.latitude is None or instance.longitude is None:
         return
     
     try:
-        # Update vehicle's last known location
-        if instance.vehicle and instance.coordinates:
-            vehicle = instance.vehicle
-            if not vehicle.last_reported_at or instance.timestamp > vehicle.last_reported_at:
-                vehicle.last_known_location = instance.coordinates
-                vehicle.last_reported_at = instance.timestamp
-                vehicle.save(update_fields=['last_known_location', 'last_reported_at', 'updated_at'])
-        
-        # Invalidate map cache for the region
-        invalidate_map_cache_for_location(
-            instance.coordinates.y, 
-            instance.coordinates.x,
-            instance.vehicle.owning_company_id if instance.vehicle else None
-        )
-        
-        # Check for geofence intersections asynchronously
-        if instance.vehicle:
-            check_geofence_intersections.delay(instance.id)
-        
-        # Trigger materialized view refresh if significant time has passed
-        trigger_conditional_view_refresh()
+        record_gps_event(instance)
         
     except Exception as e:
         logger.error(f"Error processing GPS event signal: {e}", exc_info=True)
@@ -69,10 +48,10 @@ def handle_vehicle_updated(sender, instance, created, **kwargs):
     """
     try:
         # If location was updated, invalidate cache
-        if instance.last_known_location and hasattr(instance, '_last_known_location_changed'):
+        if instance.last_known_location_lat is not None and hasattr(instance, '_last_known_location_changed'):
             invalidate_map_cache_for_location(
-                instance.last_known_location.y,
-                instance.last_known_location.x,
+                instance.last_known_location_lat,
+                instance.last_known_location_lng,
                 instance.owning_company_id
             )
         
@@ -94,14 +73,15 @@ def track_vehicle_changes(sender, instance, **kwargs):
             old_instance = Vehicle.objects.get(pk=instance.pk)
             
             # Track location changes
-            if (old_instance.last_known_location != instance.last_known_location):
+            if ((old_instance.last_known_location_lat, old_instance.last_known_location_lng) !=
+                    (instance.last_known_location_lat, instance.last_known_location_lng)):
                 instance._last_known_location_changed = True
                 
                 # Invalidate old location cache as well
-                if old_instance.last_known_location:
+                if old_instance.last_known_location_lat is not None:
                     invalidate_map_cache_for_location(
-                        old_instance.last_known_location.y,
-                        old_instance.last_known_location.x,
+                        old_instance.last_known_location_lat,
+                        old_instance.last_known_location_lng,
                         old_instance.owning_company_id
                     )
             
@@ -189,6 +169,37 @@ def invalidate_map_cache_for_location(
         logger.error(f"Error invalidating cache for location: {e}")
 
 
+def invalidate_map_cache_for_locations(
+    locations: Iterable[Tuple[float, float, Optional[int]]],
+    radius_km: float = 2.0
+) -> int:
+    """
+    Invalidate map cache around many (lat, lng, company_id) locations at
+    once: one region tag bump and one cache delete for all of them.
+    
+    Returns:
+        Number of region tags invalidated
+    """
+    locations = list(locations)
+    if not locations:
+        return 0
+    
+    try:
+        regions = redis_map_cache.invalidate_regions(locations, radius_km=radius_km)
+        
+        cache_keys = set()
+        for lat, lng, company_id in locations:
+            cache_keys.update(generate_cache_keys_for_region(lat, lng, company_id))
+        cache.delete_many(list(cache_keys))
+        
+        logger.debug(f"Invalidated {regions} cache regions for {len(locations)} locations")
+        return regions
+        
+    except Exception as e:
+        logger.error(f"Error invalidating cache for locations: {e}")
+        return 0
+
+
 def generate_cache_keys_for_region(
     lat: float, 
     lng: float, 
@@ -413,4 +424,4 @@ except ImportError:
         pass
     
     def partition_maintenance():
-        pass
\ No newline at end of file
+        pass
\ No newline at end of file
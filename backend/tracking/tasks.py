@@ -6,6 +6,7 @@ Handles background processing for GPS tracking performance.
 from celery import shared_task
 from django.db import connection, transaction
 from django.utils import timezone
+from django.conf import settings
 from django.core.cache import cache
 from datetime import datetime, timedelta
 import logging
@@ -14,6 +15,34 @@ from typing import Optional, List
 logger = logging.getLogger(__name__)
 
 
+def _record_geofence_visits(gps_event, geofence_service) -> int:
+    """Open location visits for geofences the GPS event lies in; returns visits created"""
+    from .models import LocationVisit
+    
+    intersections = geofence_service.check_geofence_intersections(
+        gps_event.coordinates,
+        gps_event.vehicle.owning_company_id
+    )
+    
+    visits_created = 0
+    for intersection in intersections:
+        visit, created = LocationVisit.objects.get_or_create(
+            location_id=intersection['geofence_id'],
+            vehicle=gps_event.vehicle,
+            status='ACTIVE',
+            exit_time__isnull=True,
+            defaults={
+                'shipment': gps_event.shipment,
+                'entry_time': gps_event.timestamp,
+                'entry_event': gps_event,
+            }
+        )
+        if created:
+            visits_created += 1
+    
+    return visits_created
+
+
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def check_geofence_intersections(self, gps_event_id: int):
     """
@@ -23,7 +52,7 @@ def check_geofence_intersections(self, gps_event_id: int):
         gps_event_id: ID of the GPS event to process
     """
     try:
-        from .models import GPSEvent, LocationVisit
+        from .models import GPSEvent
         from .services.map_performance import geofence_performance_service
         
         gps_event = GPSEvent.objects.select_related('vehicle').get(id=gps_event_id)
@@ -31,30 +60,9 @@ def check_geofence_intersections(self, gps_event_id: int):
         if not gps_event.coordinates or not gps_event.vehicle:
             return
         
-        # Check for geofence intersections
-        intersections = geofence_performance_service.check_geofence_intersections(
-            gps_event.coordinates,
-            gps_event.vehicle.owning_company_id
-        )
-        
-        # Create location visits for new intersections
-        visits_created = 0
-        for intersection in intersections:
-            visit, created = LocationVisit.objects.get_or_create(
-                location_id=intersection['geofence_id'],
-                vehicle=gps_event.vehicle,
-                status='ACTIVE',
-                exit_time__isnull=True,
-                defaults={
-                    'shipment': gps_event.shipment,
-                    'entry_time': gps_event.timestamp,
-                    'entry_event': gps_event,
-                }
-            )
-            if created:
-                visits_created += 1
+        visits_created = _record_geofence_visits(gps_event, geofence_performance_service)
         
-        logger.info(f"Processed {len(intersections)} geofence intersections, created {visits_created} visits for GPS event {gps_event_id}")
+        logger.info(f"Created {visits_created} geofence visits for GPS event {gps_event_id}")
         
     except GPSEvent.DoesNotExist:
         logger.warning(f"GPS event {gps_event_id} not found")
@@ -64,6 +72,56 @@ def check_geofence_intersections(self, gps_event_id: int):
         self.retry(countdown=60 * (2 ** self.request.retries))
 
 
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def check_geofence_intersections_batch(self, gps_event_ids: List[str]):
+    """
+    Check geofence intersections for a batch of GPS events, typically the
+    latest ping of each vehicle in a coalescing window.
+    
+    Args:
+        gps_event_ids: IDs of the GPS events to process
+    """
+    try:
+        from .models import GPSEvent
+        from .services.map_performance import geofence_performance_service
+        
+        gps_events = GPSEvent.objects.filter(
+            id__in=gps_event_ids,
+            coordinates__isnull=False
+        ).select_related('vehicle', 'shipment')
+        
+        visits_created = 0
+        for gps_event in gps_events:
+            visits_created += _record_geofence_visits(gps_event, geofence_performance_service)
+        
+        logger.info(f"Created {visits_created} geofence visits for {len(gps_event_ids)} GPS events")
+        return {'events': len(gps_event_ids), 'visits_created': visits_created}
+        
+    except Exception as e:
+        logger.error(f"Error checking geofence intersections for batch: {e}")
+        self.retry(countdown=60 * (2 ** self.request.retries))
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=30)
+def flush_gps_side_effects(self, window: int):
+    """
+    Apply the coalesced side effects of the GPS pings buffered in a window.
+    
+    Args:
+        window: Window number, as computed by gps_side_effects
+    """
+    try:
+        from .gps_side_effects import flush_window
+        
+        result = flush_window(window)
+        logger.info(f"Flushed GPS side effects for window {window}: {result}")
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error flushing GPS side effects for window {window}: {e}")
+        self.retry(countdown=30)
+
+
 @shared_task(bind=True, max_retries=2, default_retry_delay=300)
 def refresh_materialized_views(self):
     """
@@ -403,28 +461,59 @@ def generate_performance_report(self):
         return {'error': str(e)}
 
 
+# Map responses stored in the Django caches by tracking.api_views and the performance tasks
+DJANGO_MAP_CACHE_PATTERNS = ['fleet_map:*', 'mvt_tile:*', 'map_perf:*']
+
+
+def _delete_cache_pattern(cache_backend, pattern: str) -> int:
+    """Delete keys matching a pattern from a Redis-backed Django cache with SCAN."""
+    if hasattr(cache_backend, 'delete_pattern'):  # django-redis
+        return cache_backend.delete_pattern(pattern, itersize=1000) or 0
+    get_client = getattr(getattr(cache_backend, '_cache', None), 'get_client', None)
+    if get_client is None:
+        return 0
+    client = get_client(write=True)
+    keys = list(client.scan_iter(match=cache_backend.make_key(pattern), count=1000))
+    if keys:
+        client.delete(*keys)
+    return len(keys)
+
+
 @shared_task(bind=True, max_retries=2)
 def emergency_cache_clear(self, patterns: List[str] = None):
     """
     Emergency cache clearing for performance issues.
     
+    Map data and tiered caches are cleared by bumping their namespace
+    generations by name, so caches this worker never created are cleared
+    too. Map responses kept in the Django caches, and explicit patterns,
+    are removed with an incremental SCAN.
+    
     Args:
-        patterns: List of cache key patterns to clear
+        patterns: Optional list of additional cache key patterns to clear
     """
     try:
-        if patterns is None:
-            patterns = [
-                'safeshipper:map_data:*',
-                'fleet_map:*',
-                'mvt_tile:*',
-                'map_perf:*'
-            ]
-        
         from .services.redis_cache import redis_map_cache
+        from shared.caching_service import SafeShipperCacheService
+        from shared.tiered_cache import TieredCache, get_shared_cache
+        
+        redis_map_cache.invalidate_company(None)
+        cleared_namespaces = TieredCache.clear_namespaces(
+            SafeShipperCacheService.namespaces() + ['epg_plan_sections']
+        )
+        cleared_namespaces += TieredCache.clear_namespaces(
+            ['analytics'], cache_alias=getattr(settings, 'ANALYTICS_CACHE_ALIAS', 'default')
+        )
         
         total_cleared = 0
+        for alias in ('maps', 'default'):
+            for pattern in DJANGO_MAP_CACHE_PATTERNS:
+                try:
+                    total_cleared += _delete_cache_pattern(get_shared_cache(alias), pattern)
+                except Exception as e:
+                    logger.warning(f"Error clearing {alias} cache pattern {pattern}: {e}")
         
-        if redis_map_cache.enabled and redis_map_cache.cluster:
+        if patterns and redis_map_cache.enabled and redis_map_cache.cluster:
             for pattern in patterns:
                 try:
                     keys = list(redis_map_cache.cluster.scan_iter(match=pattern, count=1000))
@@ -434,13 +523,10 @@ def emergency_cache_clear(self, patterns: List[str] = None):
                 except Exception as e:
                     logger.warning(f"Error clearing pattern {pattern}: {e}")
         
-        # Also clear Django cache
-        try:
-            cache.clear()
-        except:
-            pass
-        
-        logger.warning(f"Emergency cache clear completed. Cleared {total_cleared} Redis keys and Django cache.")
+        logger.warning(
+            f"Emergency cache clear completed. Bumped map and {cleared_namespaces} tiered cache "
+            f"generations, cleared {total_cleared} pattern-matched cache keys."
+        )
         
     except Exception as e:
         logger.error(f"Error in emergency cache clear: {e}")
@@ -0,0 +1,122 @@
+"""
+Tests for coalescing GPS ping side effects per vehicle and time window.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from companies.models import Company
+from vehicles.models import Vehicle
+from tracking.models import GPSEvent
+from tracking import gps_side_effects
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, GPS_SIDE_EFFECT_WINDOW_SECONDS=10)
+class GPSSideEffectCoalescingTests(TestCase):
+    """Test that pings in a window share one set of side effects"""
+
+    def setUp(self):
+        cache.clear()
+        company = Company.objects.create(name='Coalescing Carrier', company_type='CARRIER')
+        self.vehicles = [
+            Vehicle.objects.create(
+                registration_number=f"GPS{i:03d}", vehicle_type='SEMI', owning_company=company
+            )
+            for i in range(3)
+        ]
+        self.start = timezone.now()
+
+        patches = {
+            'flush': mock.patch('tracking.tasks.flush_gps_side_effects.apply_async'),
+            'geofence': mock.patch('tracking.tasks.check_geofence_intersections_batch.delay'),
+            'views': mock.patch('tracking.signals.trigger_conditional_view_refresh'),
+            'regions': mock.patch('tracking.signals.redis_map_cache.invalidate_regions', return_value=1),
+        }
+        self.mocks = {name: patcher.start() for name, patcher in patches.items()}
+        for patcher in patches.values():
+            self.addCleanup(patcher.stop)
+
+    def _ping(self, vehicle, seconds, lat=-31.95, lng=115.86):
+        return GPSEvent.objects.create(
+            vehicle=vehicle,
+            latitude=lat + seconds / 10000,
+            longitude=lng,
+            timestamp=self.start + timedelta(seconds=seconds),
+        )
+
+    def _ping_window(self, pings_per_vehicle=5):
+        """Save pings for every vehicle inside one window and return its number"""
+        with mock.patch('tracking.gps_side_effects.time') as clock:
+            clock.time.return_value = 1000 * 10 + 1
+            with self.captureOnCommitCallbacks(execute=True):
+                for second in range(pings_per_vehicle):
+                    for vehicle in self.vehicles:
+                        self._ping(vehicle, second)
+        return 1000
+
+    def test_window_schedules_one_flush_and_writes_nothing(self):
+        window = self._ping_window()
+
+        self.mocks['flush'].assert_called_once()
+        self.assertEqual(self.mocks['flush'].call_args.kwargs['args'], [window])
+        self.mocks['geofence'].assert_not_called()
+        for vehicle in self.vehicles:
+            vehicle.refresh_from_db()
+            self.assertIsNone(vehicle.last_reported_at)
+
+    def test_failed_scheduling_is_retried_by_next_ping(self):
+        self.mocks['flush'].side_effect = [ConnectionError('broker down'), None]
+
+        window = self._ping_window(pings_per_vehicle=2)
+
+        self.assertEqual(self.mocks['flush'].call_count, 2)
+        self.assertEqual(self.mocks['flush'].call_args.kwargs['args'], [window])
+
+    def test_flush_applies_latest_ping_per_vehicle_once(self):
+        window = self._ping_window()
+
+        with self.assertNumQueries(2):  # load vehicles, bulk update
+            result = gps_side_effects.flush_window(window)
+
+        self.assertEqual(result['locations_updated'], 3)
+        for vehicle in self.vehicles:
+            vehicle.refresh_from_db()
+            self.assertEqual(vehicle.last_reported_at, self.start + timedelta(seconds=4))
+            self.assertAlmostEqual(vehicle.last_known_location_lat, -31.95 + 4 / 10000)
+
+        self.mocks['geofence'].assert_called_once()
+        self.assertEqual(len(self.mocks['geofence'].call_args.args[0]), 3)
+        self.mocks['regions'].assert_called_once()
+        self.mocks['views'].assert_called_once()
+
+    def test_flush_drops_window_buffer(self):
+        window = self._ping_window()
+        gps_side_effects.flush_window(window)
+
+        result = gps_side_effects.flush_window(window)
+        self.assertEqual(result['vehicles'], 0)
+
+    def test_older_pings_do_not_overwrite_stored_location(self):
+        vehicle = self.vehicles[0]
+        vehicle.update_location(-33.87, 151.21, self.start + timedelta(minutes=5))
+
+        gps_side_effects.apply_side_effects([gps_side_effects._ping(self._ping(vehicle, 1))])
+
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.last_known_location_lat, -33.87)
+
+    @override_settings(GPS_SIDE_EFFECT_WINDOW_SECONDS=0)
+    def test_zero_window_applies_each_ping_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ping(self.vehicles[0], 0)
+
+        self.vehicles[0].refresh_from_db()
+        self.assertEqual(self.vehicles[0].last_reported_at, self.start)
+        self.mocks['flush'].assert_not_called()
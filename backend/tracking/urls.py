@@ -1,7 +1,7 @@
 from django.urls import path
 from .api_views import (
     fleet_map_data, vector_tile, fleet_bounds, 
-    invalidate_map_cache, map_performance_stats
+    invalidate_map_cache, map_performance_stats, vehicle_gps_history
 )
 from .public_views import (
     update_location, public_tracking, submit_feedback
@@ -21,6 +21,9 @@ urlpatterns = [
     path('fleet/cache/invalidate/', invalidate_map_cache, name='invalidate_map_cache'),
     path('fleet/performance/', map_performance_stats, name='map_performance_stats'),
     
+    # Vehicle GPS history (cursor paginated)
+    path('vehicles/<uuid:vehicle_id>/gps-history/', vehicle_gps_history, name='vehicle_gps_history'),
+    
     # Vector tile endpoints
     path('tiles/<int:z>/<int:x>/<int:y>.mvt', vector_tile, name='vector_tile'),
 ]
\ No newline at end of file
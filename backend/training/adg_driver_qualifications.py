@@ -11,9 +11,12 @@ This module extends the existing training system to provide specialized tracking
 - Real-time compliance monitoring
 """
 
-from typing import Dict, List, Optional, Tuple
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
 from datetime import date, timedelta
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -21,6 +24,8 @@ from django.contrib.auth import get_user_model
 from .models import TrainingRecord, TrainingProgram, ComplianceRequirement
 from dangerous_goods.models import DangerousGood
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
 
@@ -290,6 +295,216 @@ class ADGDriverCertificate(models.Model):
         return class_str in self.hazard_classes_covered or 'ALL' in self.hazard_classes_covered
 
 
+# ADG classes and their divisions. Each division (or undivided class) is one bit of a
+# driver's qualification mask, so a 2.1 certificate never clears a driver for 2.3.
+HAZARD_CLASS_DIVISIONS = {
+    '1': ['1.1', '1.2', '1.3', '1.4', '1.5', '1.6'],
+    '2': ['2.1', '2.2', '2.3'],
+    '3': ['3'],
+    '4': ['4.1', '4.2', '4.3'],
+    '5': ['5.1', '5.2'],
+    '6': ['6.1', '6.2'],
+    '7': ['7'],
+    '8': ['8'],
+    '9': ['9'],
+}
+# Bits start above the 1 << class layout used before divisions had their own bits,
+# so index entries built with it match nothing until they are refreshed
+HAZARD_DIVISION_BITS = {
+    division: 1 << (10 + position)
+    for position, division in enumerate(
+        division for divisions in HAZARD_CLASS_DIVISIONS.values() for division in divisions
+    )
+}
+# A whole-class reference covers every division of the class
+HAZARD_CLASS_BITS = {
+    **HAZARD_DIVISION_BITS,
+    **{
+        hazard_class: sum(HAZARD_DIVISION_BITS[division] for division in divisions)
+        for hazard_class, divisions in HAZARD_CLASS_DIVISIONS.items()
+    },
+}
+ALL_HAZARD_CLASSES_MASK = sum(HAZARD_DIVISION_BITS.values())
+
+_HAZARD_CLASS_PATTERN = re.compile(r'^(\d)(?:\.(\d))?[A-Z]?$')
+
+
+def normalize_hazard_class(hazard_class) -> str:
+    """
+    Normalize a hazard class reference to its ADG class or division
+    (e.g. 'CLASS_3' -> '3', '2.1' -> '2.1', '1.1D' -> '1.1').
+    """
+    class_str = str(hazard_class).strip().upper().replace('CLASS_', '')
+    match = _HAZARD_CLASS_PATTERN.match(class_str)
+    if not match:
+        return class_str
+    return f"{match.group(1)}.{match.group(2)}" if match.group(2) else match.group(1)
+
+
+def hazard_class_mask(hazard_classes) -> Optional[int]:
+    """
+    Build a bitmask for a collection of hazard classes.
+    
+    Returns None if any class cannot be represented, so callers never treat an
+    unknown class as satisfied.
+    """
+    mask = 0
+    for hazard_class in hazard_classes:
+        class_str = normalize_hazard_class(hazard_class)
+        if class_str == 'ALL':
+            mask |= ALL_HAZARD_CLASSES_MASK
+        elif class_str in HAZARD_CLASS_BITS:
+            mask |= HAZARD_CLASS_BITS[class_str]
+        else:
+            return None
+    return mask
+
+
+def hazard_classes_from_mask(mask: int) -> List[str]:
+    """
+    Expand a qualification mask back into a sorted list of hazard classes,
+    listing a class whose divisions are all set as the class itself.
+    """
+    classes = []
+    for hazard_class, divisions in HAZARD_CLASS_DIVISIONS.items():
+        class_bits = HAZARD_CLASS_BITS[hazard_class]
+        if mask & class_bits == class_bits:
+            classes.append(hazard_class)
+        else:
+            classes.extend(division for division in divisions if mask & HAZARD_DIVISION_BITS[division])
+    return classes
+
+
+def evaluate_driver_qualifications(licenses, certificates, medical_certificate_expiry=None,
+                                   years_experience=None, restrictions=None, today=None) -> Dict:
+    """
+    Evaluate a driver's qualification state from already-loaded licenses and certificates.
+    
+    Shared by DriverCompetencyProfile.refresh_qualification_status and the
+    qualification index so both apply identical ADG rules without re-querying.
+    """
+    today = today or timezone.now().date()
+    active_license_statuses = [DriverLicense.LicenseStatus.VALID, DriverLicense.LicenseStatus.EXPIRING_SOON]
+    active_certificate_statuses = [ADGDriverCertificate.CertificateStatus.VALID,
+                                   ADGDriverCertificate.CertificateStatus.EXPIRING_SOON]
+    
+    licenses = sorted(licenses, key=lambda lic: lic.pk)
+    certificates = sorted(certificates, key=lambda cert: cert.pk)
+    
+    active_licenses = [
+        lic for lic in licenses
+        if lic.status in active_license_statuses and lic.expiry_date >= today
+    ]
+    active_certificates = [
+        cert for cert in certificates
+        if cert.status in active_certificate_statuses and cert.expiry_date >= today
+    ]
+    
+    issues = []
+    qualified_classes = set()
+    contributing_expiries = []
+    
+    # Check driver license
+    valid_license = active_licenses[0] if active_licenses else None
+    
+    if not valid_license:
+        issues.append("No valid driver license")
+    else:
+        contributing_expiries.append(valid_license.expiry_date)
+        if not valid_license.is_valid_for_dangerous_goods:
+            issues.append("Driver license class not suitable for dangerous goods")
+    
+    # Check basic ADG certification
+    basic_adg = next(
+        (cert for cert in active_certificates
+         if cert.certificate_type == ADGDriverCertificate.CertificateType.BASIC_ADG),
+        None
+    )
+    
+    if not basic_adg:
+        issues.append("No valid basic ADG training certificate")
+    else:
+        qualified_classes.update(basic_adg.hazard_classes_covered)
+        contributing_expiries.append(basic_adg.expiry_date)
+    
+    # Check class-specific certifications
+    for cert in active_certificates:
+        if cert.certificate_type == ADGDriverCertificate.CertificateType.CLASS_SPECIFIC:
+            qualified_classes.update(cert.hazard_classes_covered)
+            contributing_expiries.append(cert.expiry_date)
+    
+    # Check medical certificate
+    if medical_certificate_expiry:
+        days_until_medical_expiry = (medical_certificate_expiry - today).days
+        if days_until_medical_expiry < 0:
+            issues.append("Medical certificate expired")
+        else:
+            contributing_expiries.append(medical_certificate_expiry)
+            if days_until_medical_expiry <= 30:
+                issues.append("Medical certificate expiring soon")
+    
+    # Determine overall status
+    if not issues:
+        overall_status = DriverCompetencyProfile.OverallStatus.FULLY_QUALIFIED
+    elif len(issues) == 1 and "expiring soon" in issues[0]:
+        overall_status = DriverCompetencyProfile.OverallStatus.PARTIALLY_QUALIFIED
+    elif any("expired" in issue for issue in issues):
+        overall_status = DriverCompetencyProfile.OverallStatus.EXPIRED_QUALIFICATIONS
+    elif qualified_classes:
+        overall_status = DriverCompetencyProfile.OverallStatus.PARTIALLY_QUALIFIED
+    else:
+        overall_status = DriverCompetencyProfile.OverallStatus.NOT_QUALIFIED
+    
+    # Calculate compliance percentage
+    total_checks = 4  # License, Basic ADG, Medical, Experience
+    passed_checks = 0
+    
+    if valid_license and valid_license.is_valid_for_dangerous_goods:
+        passed_checks += 1
+    if basic_adg:
+        passed_checks += 1
+    if medical_certificate_expiry and (medical_certificate_expiry - today).days >= 0:
+        passed_checks += 1
+    if years_experience and years_experience >= 1:
+        passed_checks += 1
+    
+    # Build the qualification mask, honouring NO_CLASS_x restrictions
+    qualification_mask = 0
+    if overall_status not in [DriverCompetencyProfile.OverallStatus.NOT_QUALIFIED,
+                              DriverCompetencyProfile.OverallStatus.EXPIRED_QUALIFICATIONS]:
+        for hazard_class in qualified_classes:
+            qualification_mask |= hazard_class_mask([hazard_class]) or 0
+        for restriction in restrictions or []:
+            if str(restriction).startswith('NO_CLASS_'):
+                restricted_mask = hazard_class_mask([str(restriction).replace('NO_CLASS_', '')])
+                if restricted_mask:
+                    qualification_mask &= ~restricted_mask
+    
+    license_warnings = [
+        f"Driver license {lic.license_number} expires on {lic.expiry_date}"
+        for lic in licenses if lic.status == DriverLicense.LicenseStatus.EXPIRING_SOON
+    ]
+    certificate_warnings = [
+        f"{cert.get_certificate_type_display()} expires on {cert.expiry_date}"
+        for cert in certificates if cert.status == ADGDriverCertificate.CertificateStatus.EXPIRING_SOON
+    ]
+    
+    return {
+        'issues': issues,
+        'qualified_classes': list(qualified_classes),
+        'qualification_mask': qualification_mask,
+        'overall_status': overall_status,
+        'compliance_percentage': (passed_checks / total_checks) * 100,
+        'has_valid_license': bool(active_licenses),
+        'has_commercial_license': any(
+            lic.license_class != DriverLicense.LicenseClass.C for lic in active_licenses
+        ),
+        'license_warnings': license_warnings,
+        'certificate_warnings': certificate_warnings,
+        'valid_until': min(contributing_expiries) if contributing_expiries else None,
+    }
+
+
 class DriverCompetencyProfile(models.Model):
     """Comprehensive driver competency and qualification profile"""
     
@@ -399,81 +614,20 @@ class DriverCompetencyProfile(models.Model):
     
     def refresh_qualification_status(self):
         """Refresh the driver's qualification status based on current certificates and licenses"""
-        issues = []
-        qualified_classes = set()
-        
-        # Check driver license
-        valid_license = self.driver.driver_licenses.filter(
-            status__in=[DriverLicense.LicenseStatus.VALID, DriverLicense.LicenseStatus.EXPIRING_SOON]
-        ).first()
-        
-        if not valid_license:
-            issues.append("No valid driver license")
-        elif not valid_license.is_valid_for_dangerous_goods:
-            issues.append("Driver license class not suitable for dangerous goods")
-        
-        # Check basic ADG certification
-        basic_adg = self.driver.adg_certificates.filter(
-            certificate_type=ADGDriverCertificate.CertificateType.BASIC_ADG,
-            status__in=[ADGDriverCertificate.CertificateStatus.VALID, 
-                       ADGDriverCertificate.CertificateStatus.EXPIRING_SOON]
-        ).first()
-        
-        if not basic_adg:
-            issues.append("No valid basic ADG training certificate")
-        else:
-            qualified_classes.update(basic_adg.hazard_classes_covered)
-        
-        # Check class-specific certifications
-        class_certs = self.driver.adg_certificates.filter(
-            certificate_type=ADGDriverCertificate.CertificateType.CLASS_SPECIFIC,
-            status__in=[ADGDriverCertificate.CertificateStatus.VALID,
-                       ADGDriverCertificate.CertificateStatus.EXPIRING_SOON]
+        state = evaluate_driver_qualifications(
+            list(self.driver.driver_licenses.all()),
+            list(self.driver.adg_certificates.all()),
+            medical_certificate_expiry=self.medical_certificate_expiry,
+            years_experience=self.years_experience,
+            restrictions=self.restrictions,
         )
         
-        for cert in class_certs:
-            qualified_classes.update(cert.hazard_classes_covered)
-        
-        # Check medical certificate
-        if self.medical_certificate_expiry:
-            days_until_medical_expiry = (self.medical_certificate_expiry - timezone.now().date()).days
-            if days_until_medical_expiry < 0:
-                issues.append("Medical certificate expired")
-            elif days_until_medical_expiry <= 30:
-                issues.append("Medical certificate expiring soon")
-        
-        # Update qualified classes
-        self.qualified_hazard_classes = list(qualified_classes)
-        
-        # Determine overall status
-        if not issues:
-            self.overall_status = self.OverallStatus.FULLY_QUALIFIED
-        elif len(issues) == 1 and "expiring soon" in issues[0]:
-            self.overall_status = self.OverallStatus.PARTIALLY_QUALIFIED
-        elif any("expired" in issue for issue in issues):
-            self.overall_status = self.OverallStatus.EXPIRED_QUALIFICATIONS
-        elif qualified_classes:
-            self.overall_status = self.OverallStatus.PARTIALLY_QUALIFIED
-        else:
-            self.overall_status = self.OverallStatus.NOT_QUALIFIED
-        
-        # Calculate compliance percentage
-        total_checks = 4  # License, Basic ADG, Medical, Experience
-        passed_checks = 0
-        
-        if valid_license and valid_license.is_valid_for_dangerous_goods:
-            passed_checks += 1
-        if basic_adg:
-            passed_checks += 1
-        if self.medical_certificate_expiry and (self.medical_certificate_expiry - timezone.now().date()).days >= 0:
-            passed_checks += 1
-        if self.years_experience and self.years_experience >= 1:
-            passed_checks += 1
-        
-        self.compliance_percentage = (passed_checks / total_checks) * 100
+        self.qualified_hazard_classes = state['qualified_classes']
+        self.overall_status = state['overall_status']
+        self.compliance_percentage = state['compliance_percentage']
         
         self.save()
-        return issues
+        return state['issues']
     
     def is_qualified_for_hazard_class(self, hazard_class: str) -> Tuple[bool, List[str]]:
         """Check if driver is qualified for a specific hazard class"""
@@ -503,34 +657,123 @@ class DriverCompetencyProfile(models.Model):
         return True, issues
 
 
-class DriverQualificationService:
-    """Service for managing driver qualifications and competency validation"""
+class DriverQualificationIndex(models.Model):
+    """
+    Precomputed per-driver qualification snapshot used for dispatch matching.
     
-    @staticmethod
-    def validate_driver_for_shipment(driver: User, dangerous_goods_classes: List[str]) -> Dict:
-        """Validate if a driver is qualified for a shipment with specific dangerous goods"""
+    Each hazard class division the driver is currently cleared for is one
+    bit of hazard_class_mask, so finding drivers for a shipment is a single bitwise
+    filter. Entries are refreshed by signals and a nightly sweep, and treated
+    as stale once valid_until (the earliest expiry they depend on) has passed.
+    """
+    
+    driver = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='qualification_index',
+        limit_choices_to={'role': 'DRIVER'}
+    )
+    
+    hazard_class_mask = models.PositiveIntegerField(
+        default=0,
+        help_text="Bitmask of ADG hazard class divisions the driver is currently cleared for"
+    )
+    
+    qualified_hazard_classes = models.JSONField(
+        default=list,
+        help_text="Hazard classes covered by valid certificates, before restrictions"
+    )
+    
+    overall_status = models.CharField(
+        max_length=25,
+        choices=DriverCompetencyProfile.OverallStatus.choices,
+        default=DriverCompetencyProfile.OverallStatus.PENDING_VERIFICATION
+    )
+    
+    compliance_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=0
+    )
+    
+    profile_issues = models.JSONField(default=list)
+    
+    # Licensing summary for non-dangerous goods dispatch
+    has_valid_license = models.BooleanField(default=False)
+    has_commercial_license = models.BooleanField(default=False)
+    
+    license_warnings = models.JSONField(default=list)
+    certificate_warnings = models.JSONField(default=list)
+    
+    valid_until = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Earliest expiry of the licenses and certificates this entry depends on"
+    )
+    
+    refreshed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Driver Qualification Index"
+        verbose_name_plural = "Driver Qualification Index"
+        indexes = [
+            models.Index(fields=['hazard_class_mask']),
+            models.Index(fields=['valid_until']),
+            models.Index(fields=['has_valid_license']),
+        ]
+    
+    def __str__(self):
+        return f"{self.driver.get_full_name()} - {', '.join(self.qualified_classes) or 'no classes'}"
+    
+    @property
+    def qualified_classes(self) -> List[str]:
+        return hazard_classes_from_mask(self.hazard_class_mask)
+    
+    def is_stale(self, today: Optional[date] = None) -> bool:
+        """Check whether a document this entry relies on has expired since it was built"""
+        today = today or timezone.now().date()
+        return self.valid_until is not None and self.valid_until < today
+    
+    def get_class_validation(self, hazard_class: str) -> Tuple[bool, List[str]]:
+        """Mirror DriverCompetencyProfile.is_qualified_for_hazard_class using the indexed state"""
+        issues = []
         
-        # Get or create competency profile
-        profile, created = DriverCompetencyProfile.objects.get_or_create(driver=driver)
+        if self.overall_status == DriverCompetencyProfile.OverallStatus.NOT_QUALIFIED:
+            issues.append("Driver is not qualified for dangerous goods transport")
+            return False, issues
         
-        # Refresh qualification status
-        profile_issues = profile.refresh_qualification_status()
+        if self.overall_status == DriverCompetencyProfile.OverallStatus.EXPIRED_QUALIFICATIONS:
+            issues.append("Driver has expired qualifications")
+            return False, issues
+        
+        class_str = normalize_hazard_class(hazard_class)
+        required_mask = hazard_class_mask([class_str])
+        
+        if required_mask and self.hazard_class_mask & required_mask == required_mask:
+            return True, issues
         
+        if required_mask and (hazard_class_mask(self.qualified_hazard_classes) or 0) & required_mask:
+            issues.append(f"Driver has restrictions on hazard class {class_str}")
+        else:
+            issues.append(f"Driver not qualified for hazard class {class_str}")
+        return False, issues
+    
+    def build_validation_result(self, dangerous_goods_classes: List[str]) -> Dict:
+        """Build the DriverQualificationService validation payload from the indexed state"""
         validation_result = {
-            'driver_id': driver.id,
-            'driver_name': driver.get_full_name(),
+            'driver_id': self.driver.id,
+            'driver_name': self.driver.get_full_name(),
             'overall_qualified': True,
-            'overall_status': profile.overall_status,
-            'compliance_percentage': float(profile.compliance_percentage),
-            'profile_issues': profile_issues,
+            'overall_status': self.overall_status,
+            'compliance_percentage': float(self.compliance_percentage),
+            'profile_issues': list(self.profile_issues),
             'class_validations': {},
             'critical_issues': [],
-            'warnings': []
+            'warnings': list(self.license_warnings) + list(self.certificate_warnings)
         }
         
-        # Validate each dangerous goods class
         for dg_class in dangerous_goods_classes:
-            qualified, class_issues = profile.is_qualified_for_hazard_class(dg_class)
+            qualified, class_issues = self.get_class_validation(dg_class)
             
             validation_result['class_validations'][dg_class] = {
                 'qualified': qualified,
@@ -541,40 +784,210 @@ class DriverQualificationService:
                 validation_result['overall_qualified'] = False
                 validation_result['critical_issues'].extend(class_issues)
         
-        # Add warnings for expiring qualifications
-        expiring_licenses = driver.driver_licenses.filter(
-            status=DriverLicense.LicenseStatus.EXPIRING_SOON
+        return validation_result
+
+
+class DriverQualificationIndexService:
+    """Maintains and queries the DriverQualificationIndex"""
+    
+    REFRESH_BATCH_SIZE = 500
+    
+    @staticmethod
+    def _driver_queryset():
+        return User.objects.filter(role='DRIVER').select_related(
+            'competency_profile'
+        ).prefetch_related('driver_licenses', 'adg_certificates')
+    
+    @staticmethod
+    def _build_entry(driver, today: date, refreshed_at) -> DriverQualificationIndex:
+        try:
+            profile = driver.competency_profile
+        except DriverCompetencyProfile.DoesNotExist:
+            profile = None
+        
+        state = evaluate_driver_qualifications(
+            driver.driver_licenses.all(),
+            driver.adg_certificates.all(),
+            medical_certificate_expiry=profile.medical_certificate_expiry if profile else None,
+            years_experience=profile.years_experience if profile else None,
+            restrictions=profile.restrictions if profile else None,
+            today=today,
         )
-        for license in expiring_licenses:
-            validation_result['warnings'].append(f"Driver license {license.license_number} expires on {license.expiry_date}")
         
-        expiring_certs = driver.adg_certificates.filter(
-            status=ADGDriverCertificate.CertificateStatus.EXPIRING_SOON
+        return DriverQualificationIndex(
+            driver=driver,
+            hazard_class_mask=state['qualification_mask'],
+            qualified_hazard_classes=sorted(state['qualified_classes']),
+            overall_status=state['overall_status'],
+            compliance_percentage=state['compliance_percentage'],
+            profile_issues=state['issues'],
+            has_valid_license=state['has_valid_license'],
+            has_commercial_license=state['has_commercial_license'],
+            license_warnings=state['license_warnings'],
+            certificate_warnings=state['certificate_warnings'],
+            valid_until=state['valid_until'],
+            refreshed_at=refreshed_at,
         )
-        for cert in expiring_certs:
-            validation_result['warnings'].append(f"{cert.get_certificate_type_display()} expires on {cert.expiry_date}")
+    
+    @staticmethod
+    def refresh_drivers(driver_ids: Optional[Iterable] = None) -> int:
+        """
+        Rebuild index entries for the given drivers (all drivers if None).
         
-        return validation_result
+        Runs a constant number of queries per batch regardless of how many
+        licenses and certificates each driver holds.
+        """
+        drivers = DriverQualificationIndexService._driver_queryset()
+        if driver_ids is not None:
+            driver_ids = list(driver_ids)
+            if not driver_ids:
+                return 0
+            drivers = drivers.filter(id__in=driver_ids)
+        
+        now = timezone.now()
+        today = now.date()
+        batch_size = DriverQualificationIndexService.REFRESH_BATCH_SIZE
+        refreshed = 0
+        
+        ordered_ids = list(drivers.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ordered_ids), batch_size):
+            batch = drivers.filter(id__in=ordered_ids[start:start + batch_size])
+            entries = [
+                DriverQualificationIndexService._build_entry(driver, today, now)
+                for driver in batch
+            ]
+            DriverQualificationIndex.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['driver'],
+                update_fields=[
+                    'hazard_class_mask', 'qualified_hazard_classes', 'overall_status',
+                    'compliance_percentage', 'profile_issues', 'has_valid_license',
+                    'has_commercial_license', 'license_warnings', 'certificate_warnings',
+                    'valid_until', 'refreshed_at',
+                ],
+            )
+            refreshed += len(entries)
+        
+        return refreshed
     
     @staticmethod
-    def get_qualified_drivers_for_classes(dangerous_goods_classes: List[str]) -> List[Dict]:
-        """Get all drivers qualified for specific dangerous goods classes"""
+    def get_entry(driver) -> DriverQualificationIndex:
+        """Return the driver's index entry, rebuilding it if missing or stale"""
+        entry = DriverQualificationIndex.objects.select_related('driver').filter(driver=driver).first()
+        if entry is None or entry.is_stale():
+            DriverQualificationIndexService.refresh_drivers([driver.pk])
+            entry = DriverQualificationIndex.objects.select_related('driver').get(driver=driver)
+        return entry
+    
+    @staticmethod
+    def refresh_stale_entries() -> int:
+        """Build entries for active drivers that have none or whose documents expired since"""
+        today = timezone.now().date()
+        stale_ids = User.objects.filter(role='DRIVER', is_active=True).filter(
+            models.Q(qualification_index__isnull=True) |
+            models.Q(qualification_index__valid_until__lt=today)
+        ).values_list('id', flat=True)
+        return DriverQualificationIndexService.refresh_drivers(stale_ids)
+    
+    @staticmethod
+    def sweep() -> Dict:
+        """
+        Nightly maintenance: roll license and certificate statuses forward to
+        match their expiry dates, then rebuild every driver's entry.
+        """
+        today = timezone.now().date()
+        expiring_threshold = today + timedelta(days=30)
         
-        # Get all drivers
-        drivers = User.objects.filter(role='DRIVER', is_active=True)
+        expired_licenses = DriverLicense.objects.filter(
+            expiry_date__lt=today,
+            status__in=[DriverLicense.LicenseStatus.VALID, DriverLicense.LicenseStatus.EXPIRING_SOON]
+        ).update(status=DriverLicense.LicenseStatus.EXPIRED)
+        expiring_licenses = DriverLicense.objects.filter(
+            expiry_date__gte=today,
+            expiry_date__lte=expiring_threshold,
+            status=DriverLicense.LicenseStatus.VALID
+        ).update(status=DriverLicense.LicenseStatus.EXPIRING_SOON)
+        
+        expired_certificates = ADGDriverCertificate.objects.filter(
+            expiry_date__lt=today,
+            status__in=[ADGDriverCertificate.CertificateStatus.VALID,
+                        ADGDriverCertificate.CertificateStatus.EXPIRING_SOON]
+        ).update(status=ADGDriverCertificate.CertificateStatus.EXPIRED)
+        expiring_certificates = ADGDriverCertificate.objects.filter(
+            expiry_date__gte=today,
+            expiry_date__lte=expiring_threshold,
+            status=ADGDriverCertificate.CertificateStatus.VALID
+        ).update(status=ADGDriverCertificate.CertificateStatus.EXPIRING_SOON)
+        
+        refreshed = DriverQualificationIndexService.refresh_drivers()
+        
+        return {
+            'expired_licenses': expired_licenses,
+            'expiring_licenses': expiring_licenses,
+            'expired_certificates': expired_certificates,
+            'expiring_certificates': expiring_certificates,
+            'entries_refreshed': refreshed,
+        }
+    
+    @staticmethod
+    def _active_entries(company_id: Optional[str] = None):
+        entries = DriverQualificationIndex.objects.filter(
+            driver__role='DRIVER',
+            driver__is_active=True
+        ).select_related('driver')
+        if company_id:
+            entries = entries.filter(driver__company_id=company_id)
+        return entries
+    
+    @staticmethod
+    def find_qualified_entries(dangerous_goods_classes: List[str],
+                               company_id: Optional[str] = None) -> List[DriverQualificationIndex]:
+        """Return index entries for active drivers cleared for every given hazard class"""
+        required_mask = hazard_class_mask(dangerous_goods_classes)
+        if required_mask is None:
+            logger.warning(f"Unrecognised hazard classes in qualification lookup: {dangerous_goods_classes}")
+            return []
+        
+        DriverQualificationIndexService.refresh_stale_entries()
+        
+        return list(
+            DriverQualificationIndexService._active_entries(company_id).annotate(
+                matched_mask=F('hazard_class_mask').bitand(required_mask)
+            ).filter(matched_mask=required_mask)
+        )
+    
+    @staticmethod
+    def find_licensed_entries(company_id: Optional[str] = None) -> List[DriverQualificationIndex]:
+        """Return index entries for active drivers holding any current license"""
+        DriverQualificationIndexService.refresh_stale_entries()
+        return list(
+            DriverQualificationIndexService._active_entries(company_id).filter(has_valid_license=True)
+        )
+
+
+class DriverQualificationService:
+    """Service for managing driver qualifications and competency validation"""
+    
+    @staticmethod
+    def validate_driver_for_shipment(driver: User, dangerous_goods_classes: List[str]) -> Dict:
+        """Validate if a driver is qualified for a shipment with specific dangerous goods"""
+        entry = DriverQualificationIndexService.get_entry(driver)
+        return entry.build_validation_result(dangerous_goods_classes)
+    
+    @staticmethod
+    def get_qualified_drivers_for_classes(dangerous_goods_classes: List[str],
+                                          company_id: Optional[str] = None) -> List[Dict]:
+        """Get all drivers qualified for specific dangerous goods classes"""
         qualified_drivers = []
         
-        for driver in drivers:
-            validation = DriverQualificationService.validate_driver_for_shipment(
-                driver, dangerous_goods_classes
-            )
-            
-            if validation['overall_qualified']:
-                qualified_drivers.append({
-                    'driver': driver,
-                    'validation_result': validation,
-                    'qualified_classes': validation['class_validations']
-                })
+        for entry in DriverQualificationIndexService.find_qualified_entries(dangerous_goods_classes, company_id):
+            validation = entry.build_validation_result(dangerous_goods_classes)
+            qualified_drivers.append({
+                'driver': entry.driver,
+                'validation_result': validation,
+                'qualified_classes': validation['class_validations']
+            })
         
         return qualified_drivers
     
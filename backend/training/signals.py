@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from .models import TrainingEnrollment, TrainingRecord, ComplianceStatus
+from .adg_driver_qualifications import (
+    DriverLicense, ADGDriverCertificate, DriverCompetencyProfile, DriverQualificationIndexService
+)
 
 
 @receiver(post_save, sender=TrainingEnrollment)
@@ -52,4 +56,18 @@ def update_compliance_status(employee):
             )
             
             # Check compliance
-            status.check_compliance()
\ No newline at end of file
+            status.check_compliance()
+
+
+@receiver(post_save, sender=DriverLicense)
+@receiver(post_delete, sender=DriverLicense)
+@receiver(post_save, sender=ADGDriverCertificate)
+@receiver(post_delete, sender=ADGDriverCertificate)
+@receiver(post_save, sender=DriverCompetencyProfile)
+@receiver(post_delete, sender=DriverCompetencyProfile)
+def refresh_driver_qualification_index(sender, instance, **kwargs):
+    """Keep the dispatch qualification index in step with the driver's documents"""
+    driver_id = instance.driver_id
+    transaction.on_commit(
+        lambda: DriverQualificationIndexService.refresh_drivers([driver_id])
+    )
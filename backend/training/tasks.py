@@ -0,0 +1,33 @@
+# training/tasks.py
+import logging
+from typing import List, Optional
+from celery import shared_task
+
+from .adg_driver_qualifications import DriverQualificationIndexService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_driver_qualification_index(driver_ids: Optional[List[int]] = None):
+    """
+    Rebuild driver qualification index entries.
+    
+    Args:
+        driver_ids: Drivers to refresh; all drivers when omitted
+    """
+    refreshed = DriverQualificationIndexService.refresh_drivers(driver_ids)
+    logger.info(f"Refreshed {refreshed} driver qualification index entries")
+    return {'entries_refreshed': refreshed}
+
+
+@shared_task
+def sweep_driver_qualification_index():
+    """Nightly sweep: expire lapsed licenses/certificates and rebuild the qualification index"""
+    try:
+        result = DriverQualificationIndexService.sweep()
+        logger.info(f"Driver qualification sweep completed: {result}")
+        return result
+    except Exception as e:
+        logger.error(f"Driver qualification sweep failed: {str(e)}")
+        raise
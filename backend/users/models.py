@@ -3,7 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
-from simple_history.models import HistoricalRecords
+from shared.history import DeferredHistoricalRecords
 # We need to import LocationType for limit_choices_to, assuming it's defined in locations.models
 # To avoid circular imports if locations also imports users, use string reference or careful import order.
 # For now, we'll use a string reference for LocationType in limit_choices_to.
@@ -217,7 +217,7 @@ class User(AbstractUser):
     )
 
     # Add history tracking
-    history = HistoricalRecords()
+    history = DeferredHistoricalRecords()
 
     def __str__(self):
         return self.email